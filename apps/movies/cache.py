@@ -7,6 +7,7 @@ Film verileri için cache fonksiyonları.
 from django.core.cache import cache
 from django.conf import settings
 import hashlib
+import time
 
 
 # Cache key prefixleri
@@ -16,6 +17,9 @@ CACHE_KEYS = {
     'trending': 'movies:trending:{lang}',
     'upcoming': 'movies:upcoming:{lang}',
     'user_recommendations': 'user:{user_id}:recommendations',
+    'user_recommendations_entry': 'user:{user_id}:recommendations:{version}:{params_hash}',
+    'group_recommendations_entry': 'group:{members}:recommendations:{versions_hash}:{params_hash}',
+    'recommendation_stats': 'stats:recommendations:{counter}',
     'user_watchlist': 'user:{user_id}:watchlist',
     'user_ratings': 'user:{user_id}:ratings',
     'genre_list': 'genres:all',
@@ -132,6 +136,112 @@ def invalidate_user_ratings(user_id: int) -> None:
     cache.delete(key)
 
 
+def get_user_recommendations_version(user_id: int):
+    """
+    Kullanıcının öneri cache versiyonu (yoksa oluşturulur)
+    Hesaplamadan önce alınıp cache_user_recommendations'a verilmeli; arada
+    invalidate olursa sonuç eski versiyona yazılır ve hiç okunmaz.
+    """
+    key = get_cache_key('user_recommendations', user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key)
+    return version
+
+
+def _incr_recommendation_counter(counter: str) -> None:
+    key = get_cache_key('recommendation_stats', counter=counter)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def _user_recommendations_key(user_id: int, version, params: dict) -> str:
+    return get_cache_key(
+        'user_recommendations_entry',
+        user_id=user_id, version=version, params_hash=make_filters_hash(params)
+    )
+
+
+def cache_user_recommendations(user_id: int, version, params: dict, entries: list) -> None:
+    """
+    Kullanıcı önerilerini cache'le
+    entries: (movie_id, final, content, collab, pop) listesi (Movie nesnesi değil)
+    """
+    key = _user_recommendations_key(user_id, version, params)
+    cache.set(key, entries, CACHE_TIMEOUTS['user_recommendations'])
+
+
+def get_cached_user_recommendations(user_id: int, version, params: dict):
+    """Cache'den kullanıcı önerilerini al (hit/miss sayaçlarını günceller)"""
+    entries = cache.get(_user_recommendations_key(user_id, version, params))
+    _incr_recommendation_counter('hits' if entries is not None else 'misses')
+    return entries
+
+
+def invalidate_user_recommendations(user_id: int) -> None:
+    """Kullanıcının tüm öneri cache kayıtlarını geçersiz kıl"""
+    key = get_cache_key('user_recommendations', user_id=user_id)
+    cache.delete(key)
+
+
+def invalidate_users_recommendations(user_ids) -> None:
+    """Birden çok kullanıcının öneri cache'ini tek çağrıda geçersiz kıl"""
+    cache.delete_many([
+        get_cache_key('user_recommendations', user_id=user_id) for user_id in user_ids
+    ])
+
+
+def get_group_recommendations_versions(user_ids) -> list:
+    """
+    Grup üyelerinin öneri cache versiyonları (üye ID sırasıyla)
+    Grup kaydı bu versiyonlarla anahtarlanır; üyelerden birinin
+    invalidate_user_recommendations çağrısı grup kayıtlarını da geçersiz kılar.
+    """
+    return [get_user_recommendations_version(user_id) for user_id in sorted(user_ids)]
+
+
+def _group_recommendations_key(user_ids, versions: list, params: dict) -> str:
+    return get_cache_key(
+        'group_recommendations_entry',
+        members='-'.join(str(user_id) for user_id in sorted(user_ids)),
+        versions_hash=make_filters_hash({'versions': versions}),
+        params_hash=make_filters_hash(params),
+    )
+
+
+def cache_group_recommendations(user_ids, versions: list, params: dict, entries: list) -> None:
+    """
+    Grup (veya çift) önerilerini cache'le
+    entries: (movie_id, group_score, member_scores, pop) listesi
+    """
+    key = _group_recommendations_key(user_ids, versions, params)
+    cache.set(key, entries, CACHE_TIMEOUTS['user_recommendations'])
+
+
+def get_cached_group_recommendations(user_ids, versions: list, params: dict):
+    """Cache'den grup önerilerini al (hit/miss sayaçlarını günceller)"""
+    entries = cache.get(_group_recommendations_key(user_ids, versions, params))
+    _incr_recommendation_counter('hits' if entries is not None else 'misses')
+    return entries
+
+
+def get_recommendation_cache_stats() -> dict:
+    """Öneri cache hit/miss sayaçları (tüm worker'lar)"""
+    hits = cache.get(get_cache_key('recommendation_stats', counter='hits')) or 0
+    misses = cache.get(get_cache_key('recommendation_stats', counter='misses')) or 0
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
 def cache_genre_list(genres: list) -> None:
     """Tür listesini cache'le"""
     key = get_cache_key('genre_list')
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0005_watchedmovie"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(
+                fields=["-popularity"], name="movies_popular_74d716_idx"
+            ),
+        ),
+    ]
@@ -131,6 +131,7 @@ class Movie(models.Model):
             models.Index(fields=['title']),
             models.Index(fields=['release_date']),
             models.Index(fields=['-vote_average']),
+            models.Index(fields=['-popularity']),
         ]
 
     def __str__(self):
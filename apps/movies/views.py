@@ -21,6 +21,7 @@ from .rating_serializers import (
     RatingDetailSerializer,
 )
 from .services import tmdb_service
+from apps.recommendations.neighbours import similar_movies as similar_movies_for
 
 
 class MovieFilterSet(FilterSet):
@@ -182,19 +183,22 @@ class MovieViewSet(viewsets.ReadOnlyModelViewSet):
     def similar(self, request, pk=None):
         """
         Benzer filmler
-        Basit algoritma: Aynı türdeki, benzer puanlı filmler
+        Önceden hesaplanmış komşu tablosu; film henüz tabloda yoksa
+        aynı türdeki, benzer puanlı filmler
         """
 
         movie = self.get_object()
 
-        #Aynı türdeki filmler
-        genre_ids = movie.genres.values_list('id', flat=True)
+        similar_movies = similar_movies_for(movie.id, 10)
+        if not similar_movies:
+            #Aynı türdeki filmler
+            genre_ids = movie.genres.values_list('id', flat=True)
 
-        similar_movies = Movie.objects.filter(
-            genres__id__in=genre_ids
-        ).exclude(
-            id=movie.id
-        ).distinct().order_by('-vote_average', '-popularity')[:10]
+            similar_movies = Movie.objects.filter(
+                genres__id__in=genre_ids
+            ).exclude(
+                id=movie.id
+            ).distinct().order_by('-vote_average', '-popularity')[:10]
 
 
         serializer = self.get_serializer(similar_movies, many=True)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserTasteProfile, MovieLensMapping, RecommendationLog
+from .models import UserTasteProfile, MovieLensMapping, RecommendationLog, MovieNeighbour
 
 
 @admin.register(UserTasteProfile)
@@ -44,3 +44,10 @@ class RecommendationLogAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'movie__title']
     date_hierarchy = 'created_at'
     raw_id_fields = ['user', 'movie']
+
+
+@admin.register(MovieNeighbour)
+class MovieNeighbourAdmin(admin.ModelAdmin):
+    list_display = ['movie', 'rank', 'neighbour', 'score', 'computed_at']
+    search_fields = ['movie__title']
+    raw_id_fields = ['movie', 'neighbour']
@@ -0,0 +1,232 @@
+"""
+Approximate Nearest Neighbour Index
+===================================
+NCF film embedding'leri için saf NumPy IVF-flat index.
+
+- Eğitim: normalize vektörler üzerinde spherical k-means (nlist merkez)
+- Arama: sorguya en yakın nprobe merkezin listelerindeki filmler tam skorlanır
+- nprobe, tam aramaya karşı ölçülen recall hedefine göre seçilir
+
+build_ann_index management command'ı ile oluşturulup ncf_model.pkl'in
+yanına (ncf_model_ann.npz) kaydedilir. Dosyada movie_id listesi ve
+embedding matrisinin parmak izi saklanır; yeniden eğitilen modelde
+(aynı filmler, farklı vektörler) eski index yüklenmez.
+"""
+
+import hashlib
+import os
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+
+ASSIGN_CHUNK = 8192   # Atama sırasında bellek sınırı için satır parçası
+FINGERPRINT_ROWS = 1024   # Parmak izine giren (eşit aralıklı) satır sayısı
+
+
+def ann_path_for(model_path: str) -> str:
+    """ncf_model.pkl -> ncf_model_ann.npz"""
+    return os.path.splitext(model_path)[0] + '_ann.npz'
+
+
+def matrix_fingerprint(matrix: np.ndarray) -> str:
+    """
+    Embedding matrisinin parmak izi (boyut + eşit aralıklı en fazla
+    FINGERPRINT_ROWS satır); memory-map'li matrisin tamamı okunmaz
+    """
+    rows = np.unique(np.linspace(0, max(len(matrix) - 1, 0), min(len(matrix), FINGERPRINT_ROWS)).astype(np.int64))
+    digest = hashlib.sha1(str(matrix.shape).encode())
+    digest.update(np.ascontiguousarray(matrix[rows], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Her satırı en yakın (en yüksek iç çarpım) merkeze ata"""
+    labels = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), ASSIGN_CHUNK):
+        block = matrix[start:start + ASSIGN_CHUNK]
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def _exact_top_rows(matrix: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = matrix @ query
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class IVFIndex:
+    """
+    Inverted file index (CSR düzeninde)
+    
+    centroids: (nlist, dim) normalize merkezler
+    list_rows: merkeze göre sıralanmış satır indeksleri
+    offsets:   (nlist + 1,) her listenin list_rows içindeki başlangıcı
+    """
+    
+    def __init__(self, centroids: np.ndarray, list_rows: np.ndarray, offsets: np.ndarray, nprobe: int = 8):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.list_rows = np.asarray(list_rows, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.nprobe = int(nprobe)
+    
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+    
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        nlist: int = None,
+        n_iter: int = 10,
+        sample_size: int = 100_000,
+        seed: int = 42,
+    ) -> 'IVFIndex':
+        """
+        Normalize matris üzerinde spherical k-means ile index oluştur
+        
+        Args:
+            matrix: (n_items, dim) L2-normalize float32 (ItemEmbeddingIndex.matrix)
+            nlist: Liste sayısı (varsayılan ~4*sqrt(n))
+            n_iter: k-means iterasyonu
+            sample_size: Merkez eğitimi için örnek sayısı
+        """
+        n = len(matrix)
+        if n == 0:
+            raise ValueError("Bos matris icin ANN index olusturulamaz")
+        nlist = int(nlist or max(1, min(n, round(4 * np.sqrt(n)))))
+        rng = np.random.default_rng(seed)
+        
+        sample = matrix
+        if n > sample_size:
+            sample = matrix[rng.choice(n, size=sample_size, replace=False)]
+        
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            labels = _assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            # Boş kalan merkezleri rastgele bir noktayla yeniden başlat
+            empty = norms == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+                norms[empty] = np.linalg.norm(sums[empty], axis=1)
+            centroids = (sums / np.maximum(norms, 1e-12)[:, None]).astype(np.float32)
+        
+        labels = _assign(matrix, centroids)
+        list_rows = np.argsort(labels, kind='stable')
+        counts = np.bincount(labels, minlength=nlist)
+        offsets = np.r_[0, np.cumsum(counts)]
+        return cls(centroids, list_rows, offsets)
+    
+    def candidate_rows(self, query: np.ndarray, nprobe: int = None) -> np.ndarray:
+        """Sorguya en yakın nprobe listedeki satırlar"""
+        nprobe = min(int(nprobe or self.nprobe), self.nlist)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.nlist)
+        return np.concatenate([
+            self.list_rows[self.offsets[p]:self.offsets[p + 1]] for p in probes
+        ])
+    
+    def search(self, matrix: np.ndarray, query: np.ndarray, k: int, nprobe: int = None) -> np.ndarray:
+        """Yaklaşık en yakın k satır (azalan skor)"""
+        rows = self.candidate_rows(query, nprobe)
+        if not len(rows):
+            return rows
+        return rows[_exact_top_rows(matrix[rows], query, k)]
+    
+    def evaluate(
+        self,
+        matrix: np.ndarray,
+        k: int = 100,
+        n_queries: int = 200,
+        nprobe: int = None,
+        seed: int = 0,
+    ) -> Dict:
+        """
+        Tam aramaya karşı recall@k ve ortalama gecikme
+        
+        Sorgular katalogdaki rastgele filmlerin vektörleridir.
+        """
+        rng = np.random.default_rng(seed)
+        queries = matrix[rng.choice(len(matrix), size=min(n_queries, len(matrix)), replace=False)]
+        k = min(k, len(matrix))
+        
+        exact_time = 0.0
+        ann_time = 0.0
+        hits = 0
+        for query in queries:
+            start = time.perf_counter()
+            exact = _exact_top_rows(matrix, query, k)
+            exact_time += time.perf_counter() - start
+            
+            start = time.perf_counter()
+            approx = self.search(matrix, query, k, nprobe)
+            ann_time += time.perf_counter() - start
+            
+            hits += len(np.intersect1d(exact, approx, assume_unique=True))
+        
+        return {
+            'nprobe': int(nprobe or self.nprobe),
+            'recall': hits / (k * len(queries)),
+            'exact_ms': exact_time / len(queries) * 1000,
+            'ann_ms': ann_time / len(queries) * 1000,
+        }
+    
+    def tune(self, matrix: np.ndarray, recall_target: float = 0.95, k: int = 100, n_queries: int = 200) -> Dict:
+        """
+        Recall hedefini sağlayan en küçük nprobe'u seç (1, 2, 4, ... nlist)
+        Seçilen değer self.nprobe'a yazılır.
+        """
+        history = []
+        nprobe = 1
+        while True:
+            stats = self.evaluate(matrix, k=k, n_queries=n_queries, nprobe=nprobe)
+            history.append(stats)
+            if stats['recall'] >= recall_target or nprobe >= self.nlist:
+                break
+            nprobe = min(nprobe * 2, self.nlist)
+        self.nprobe = history[-1]['nprobe']
+        return {'selected': history[-1], 'history': history}
+    
+    def save(self, path: str, movie_ids: np.ndarray, matrix: np.ndarray):
+        """
+        Index'i movie_id listesi ve matrisin parmak iziyle birlikte kaydet
+        (yüklerken tutarlılık kontrolü için)
+        """
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                list_rows=self.list_rows,
+                offsets=self.offsets,
+                nprobe=np.array(self.nprobe),
+                movie_ids=np.asarray(movie_ids, dtype=np.int64),
+                fingerprint=np.array(matrix_fingerprint(matrix)),
+            )
+    
+    @classmethod
+    def load(cls, path: str, movie_ids: np.ndarray = None, matrix: np.ndarray = None) -> Optional['IVFIndex']:
+        """
+        Kaydedilmiş index'i yükle
+        movie_ids / matrix verilirse ve index farklı bir film listesi veya
+        embedding matrisi için oluşturulmuşsa (parmak izi yoksa da) None
+        döner (yeniden build gerekir).
+        """
+        with np.load(path) as data:
+            if movie_ids is not None and not np.array_equal(data['movie_ids'], movie_ids):
+                return None
+            if matrix is not None and (
+                'fingerprint' not in data.files or str(data['fingerprint']) != matrix_fingerprint(matrix)
+            ):
+                return None
+            return cls(
+                data['centroids'], data['list_rows'], data['offsets'], int(data['nprobe'])
+            )
@@ -1,4 +1,26 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
+
+
+# Bu programlarla başlatılan process'ler web worker sayılır
+WEB_SERVERS = ('gunicorn', 'uwsgi', 'daphne', 'uvicorn', 'hypercorn')
+
+
+def is_web_process(argv=None) -> bool:
+    """
+    İstek karşılayan process mi? (migrate, Celery, diğer komutlar ve testler değil)
+    runserver'da sadece autoreloader'ın çocuk process'i sayılır.
+    """
+    argv = sys.argv if argv is None else argv
+    if not argv:
+        return False
+    program = os.path.basename(argv[0])
+    if any(server in program for server in WEB_SERVERS):
+        return True
+    return len(argv) > 1 and argv[1] == 'runserver' and os.environ.get('RUN_MAIN') == 'true'
 
 
 class RecommendationsConfig(AppConfig):
@@ -8,3 +30,8 @@ class RecommendationsConfig(AppConfig):
     
     def ready(self):
         import apps.recommendations.signals  # noqa
+        
+        # Web worker'larda model arka planda yüklenir; diğer process'lerde ilk kullanımda
+        if getattr(settings, 'RECOMMENDER_WARMUP', True) and is_web_process():
+            from apps.recommendations.services import recommender
+            recommender.warm_up()
@@ -0,0 +1,983 @@
+"""
+Recommendation Benchmarks
+=========================
+Öneri sistemi performans ölçümleri için sentetik veri ve ölçüm yardımcıları.
+benchmark_recommender management command'ı tarafından kullanılır.
+"""
+
+import random
+import statistics
+import time
+from datetime import date
+from typing import Callable, Dict, List, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from apps.movies.models import Movie, Genre, Person, MovieCast, MovieCrew, Rating
+
+
+BENCH_TMDB_OFFSET = 900_000_000   # Gerçek TMDB ID'leriyle çakışmasın
+
+User = get_user_model()
+
+
+class QueryCounter:
+    """Sorgu sayacı (CaptureQueriesContext'in 9000 sorgu limiti yok)"""
+    
+    def __init__(self):
+        self.count = 0
+        self.active = True
+    
+    def __call__(self, execute, sql, params, many, context):
+        if self.active:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(func: Callable, repeat: int = 3) -> Tuple[float, int, object]:
+    """
+    Fonksiyonu repeat kez çalıştır
+    
+    Returns:
+        (medyan süre ms, ilk çalıştırmadaki sorgu sayısı, son sonuç)
+    """
+    counter = QueryCounter()
+    timings = []
+    result = None
+    for i in range(repeat):
+        counter.active = i == 0
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), counter.count, result
+
+
+def build_synthetic_catalog(n_movies: int, seed: int = 42) -> List[int]:
+    """
+    Tür, yönetmen ve oyunculu sentetik film kataloğu oluştur (bulk_create)
+    Transaction içinde çağrılıp geri alınmalı.
+    
+    Returns:
+        Oluşturulan film ID'leri
+    """
+    rng = random.Random(seed)
+    
+    genres = []
+    for i in range(19):
+        genre, _ = Genre.objects.get_or_create(
+            tmdb_id=BENCH_TMDB_OFFSET + i,
+            defaults={'name': f'Bench Genre {i}'}
+        )
+        genres.append(genre)
+    
+    n_people = max(n_movies // 2, 50)
+    Person.objects.bulk_create([
+        Person(tmdb_id=BENCH_TMDB_OFFSET + i, name=f'Bench Person {i}')
+        for i in range(n_people)
+    ], batch_size=5000)
+    person_ids = list(
+        Person.objects.filter(tmdb_id__gte=BENCH_TMDB_OFFSET)
+        .values_list('id', flat=True)
+    )
+    
+    Movie.objects.bulk_create([
+        Movie(
+            tmdb_id=BENCH_TMDB_OFFSET + i,
+            title=f'Bench Movie {i}',
+            original_title=f'Bench Movie {i}',
+            original_language='en',
+            poster_path=f'/bench{i}.jpg',
+            release_date=date(rng.randint(1960, 2024), rng.randint(1, 12), 1),
+            runtime=rng.randint(70, 180),
+            vote_average=round(rng.uniform(3, 9), 1),
+            vote_count=rng.randint(0, 20000),
+            popularity=rng.uniform(0, 1000),
+        )
+        for i in range(n_movies)
+    ], batch_size=5000)
+    movie_ids = list(
+        Movie.objects.filter(tmdb_id__gte=BENCH_TMDB_OFFSET)
+        .values_list('id', flat=True)
+    )
+    
+    through = Movie.genres.through
+    genre_links = []
+    crew = []
+    cast = []
+    for movie_id in movie_ids:
+        for genre in rng.sample(genres, rng.randint(1, 3)):
+            genre_links.append(through(movie_id=movie_id, genre_id=genre.id))
+        crew.append(MovieCrew(
+            movie_id=movie_id, person_id=rng.choice(person_ids),
+            job='Director', department='Directing'
+        ))
+        for order, person_id in enumerate(rng.sample(person_ids, 8)):
+            cast.append(MovieCast(
+                movie_id=movie_id, person_id=person_id,
+                character_name=f'Role {order}', cast_order=order
+            ))
+    through.objects.bulk_create(genre_links, batch_size=5000)
+    MovieCrew.objects.bulk_create(crew, batch_size=5000)
+    MovieCast.objects.bulk_create(cast, batch_size=5000)
+    
+    return movie_ids
+
+
+def build_synthetic_user(movie_ids: List[int], n_ratings: int = 40, seed: int = 42, username: str = None):
+    """Rastgele puanları olan sentetik kullanıcı (profil güncellenmiş)"""
+    from apps.recommendations.models import UserTasteProfile
+    
+    rng = random.Random(seed)
+    username = username or f'bench_user_{seed}'
+    user = User.objects.create(username=username, email=f'{username}@bench.local')
+    Rating.objects.bulk_create([
+        Rating(user=user, movie_id=movie_id, score=rng.randint(1, 10))
+        for movie_id in rng.sample(movie_ids, min(n_ratings, len(movie_ids)))
+    ])
+    profile, _ = UserTasteProfile.objects.get_or_create(user=user)
+    profile.update_from_ratings()
+    return user
+
+
+def legacy_recommend(user, n: int = 10, candidate_limit: int = 300, item_embeddings: Dict = None) -> List[Dict]:
+    """
+    Batch skorlamadan önceki recommend() döngüsünün kopyası (sadece ölçüm için)
+    
+    Film başına get_content_score / get_collaborative_score /
+    get_popularity_score mantığı ve sorguları aynen korunur; tek fark
+    prefetch edilmiş cast listesinde values_list hatasının atlanmasıdır.
+    Filtreler (mood, süre, dönem, tür) ve watchlist hariç tutma yoktur.
+    
+    Args:
+        item_embeddings: Film ID -> NCF embedding (eski _item_embeddings)
+    """
+    import numpy as np
+    from sklearn.metrics.pairwise import cosine_similarity
+    from apps.movies.models import WatchedMovie
+    from apps.recommendations.models import UserTasteProfile
+    
+    item_embeddings = item_embeddings or {}
+    
+    profile, created = UserTasteProfile.objects.get_or_create(user=user)
+    if created or not profile.genre_weights:
+        profile.update_from_ratings()
+    
+    def content_score(movie):
+        if not profile or not profile.genre_weights:
+            return 0.5
+        score = 0.0
+        weights_sum = sum(profile.genre_weights.values())
+        if weights_sum == 0:
+            return 0.5
+        movie_genre_ids = list(movie.genres.values_list('id', flat=True))
+        for genre_id in movie_genre_ids:
+            score += profile.genre_weights.get(str(genre_id), 0)
+        if movie_genre_ids:
+            score = score / len(movie_genre_ids)
+        if profile.favorite_directors:
+            director_ids = list(movie.crew.filter(job='Director').values_list('person_id', flat=True))
+            for d_id in director_ids:
+                if d_id in profile.favorite_directors:
+                    score += 0.15
+                    break
+        if profile.favorite_actors:
+            actor_ids = [c.person_id for c in movie.cast.all()[:5]]
+            actor_bonus = 0
+            for a_id in actor_ids:
+                if a_id in profile.favorite_actors:
+                    actor_bonus += 0.1
+            score += min(actor_bonus, 0.2)
+        return min(max(score, 0.0), 1.0)
+    
+    def collaborative_score(movie):
+        if item_embeddings and movie.id in item_embeddings:
+            try:
+                user_ratings = Rating.objects.filter(user=user, score__gte=7)
+                if user_ratings.exists():
+                    liked_ids = list(user_ratings.values_list('movie_id', flat=True))
+                    liked_embeddings = [item_embeddings[lid] for lid in liked_ids[:20] if lid in item_embeddings]
+                    if liked_embeddings:
+                        avg_liked = np.mean(liked_embeddings, axis=0)
+                        sim = cosine_similarity([avg_liked], [item_embeddings[movie.id]])[0][0]
+                        return float((sim + 1) / 2)
+            except Exception:
+                pass
+        user_ratings = Rating.objects.filter(user=user, score__gte=7)
+        if not user_ratings.exists():
+            return 0.5
+        liked_movie_ids = list(user_ratings.values_list('movie_id', flat=True))
+        liked_genres = set()
+        for m in Movie.objects.filter(id__in=liked_movie_ids).prefetch_related('genres'):
+            liked_genres.update(m.genres.values_list('id', flat=True))
+        movie_genres = set(movie.genres.values_list('id', flat=True))
+        if not liked_genres:
+            return 0.5
+        intersection = len(liked_genres & movie_genres)
+        union = len(liked_genres | movie_genres)
+        return intersection / union if union > 0 else 0.5
+    
+    def popularity_score(movie):
+        vote_score = (movie.vote_average or 0) / 10.0
+        count_bonus = min(np.log10(movie.vote_count + 1) / 5, 0.2) if movie.vote_count else 0
+        return min(vote_score + count_bonus, 1.0)
+    
+    if profile.total_rated_movies < 3:
+        content_w, collab_w, pop_w = 0.2, 0.0, 0.8
+    elif profile.total_rated_movies < 10:
+        content_w, collab_w, pop_w = 0.4, 0.2, 0.4
+    elif profile.total_rated_movies < 30:
+        content_w, collab_w, pop_w = 0.5, 0.3, 0.2
+    else:
+        content_w, collab_w, pop_w = 0.4, 0.5, 0.1
+    
+    rated_ids = set(Rating.objects.filter(user=user).values_list('movie_id', flat=True))
+    watched_ids = set(WatchedMovie.objects.filter(user=user).values_list('movie_id', flat=True))
+    candidates = Movie.objects.filter(
+        poster_path__isnull=False
+    ).exclude(poster_path='').exclude(id__in=rated_ids | watched_ids)
+    candidates = candidates.distinct().prefetch_related('genres', 'cast', 'crew')[:candidate_limit]
+    
+    scored_movies = []
+    for movie in candidates:
+        content = content_score(movie)
+        collab = collaborative_score(movie)
+        pop = popularity_score(movie)
+        scored_movies.append({
+            'movie': movie,
+            'final_score': content_w * content + collab_w * collab + pop_w * pop,
+            'content_score': content,
+            'collab_score': collab,
+            'pop_score': pop,
+        })
+    scored_movies.sort(key=lambda x: x['final_score'], reverse=True)
+    return scored_movies[:n]
+
+
+def scoring_benchmark(user, sizes: List[int], repeat: int = 3, legacy_max: int = 3000) -> List[Dict]:
+    """
+    recommend() skor hesabını aday sayısına göre karşılaştır
+    
+    Modlar:
+        batch: recommend() (varsayılan, vektörize skorlama)
+        iterative: recommend(), batch_scoring=False (ortak UserContext ile film başına)
+        legacy: legacy_recommend() - batch skorlamadan önceki döngü
+    """
+    from apps.recommendations.services import HybridRecommender
+    
+    recommender = HybridRecommender()
+    index = recommender._embedding_index
+    item_embeddings = {}
+    if index is not None:
+        # Eski sözlük normalize edilmemiş vektörleri tutuyordu
+        raw = index.matrix * index.norms[:, None]
+        item_embeddings = dict(zip(index.movie_ids.tolist(), raw))
+    previous = recommender.batch_scoring
+    results = []
+    try:
+        for size in sizes:
+            modes = [('batch', True)]
+            if size <= legacy_max:
+                modes += [('iterative', False), ('legacy', None)]
+            for name, batch in modes:
+                if batch is None:
+                    func = lambda: legacy_recommend(user, n=10, candidate_limit=size, item_embeddings=item_embeddings)
+                else:
+                    recommender.batch_scoring = batch
+                    func = lambda: recommender.recommend(user=user, n=10, candidate_limit=size, use_cache=False)
+                ms, queries, recs = measure(func, repeat=repeat if batch else 1)
+                results.append({
+                    'candidates': size,
+                    'mode': name,
+                    'ms': ms,
+                    'queries': queries,
+                    'top_ids': [r['movie'].id for r in recs],
+                })
+    finally:
+        recommender.batch_scoring = previous
+    return results
+
+
+def embedding_benchmark(n_items: int, dim: int = 128, k: int = 100, repeat: int = 5, seed: int = 42) -> List[Dict]:
+    """
+    Tüm katalogda ItemEmbeddingIndex.top_k ile eski yöntem
+    (dict + film başına sklearn cosine_similarity, 300 aday) karşılaştırması
+    """
+    import numpy as np
+    from sklearn.metrics.pairwise import cosine_similarity
+    from apps.recommendations.embeddings import ItemEmbeddingIndex
+    
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n_items, dim)).astype(np.float32)
+    movie_ids = np.arange(1, n_items + 1)
+    query = vectors[:20].mean(axis=0)
+    
+    start = time.perf_counter()
+    index = ItemEmbeddingIndex(movie_ids, vectors)
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    legacy = {int(m): v for m, v in zip(movie_ids[:300], vectors[:300])}
+    
+    def legacy_scores():
+        return [cosine_similarity([query], [legacy[m]])[0][0] for m in legacy]
+    
+    legacy_ms, _, _ = measure(legacy_scores, repeat=repeat)
+    topk_ms, _, _ = measure(lambda: index.top_k(query, k), repeat=repeat)
+    allowed = movie_ids[::2]
+    allowed_ms, _, _ = measure(lambda: index.top_k(query, k, allowed_ids=allowed), repeat=repeat)
+    
+    return [
+        {'name': f'index build ({n_items:,} item)', 'ms': build_ms},
+        {'name': 'legacy cosine (300 item)', 'ms': legacy_ms},
+        {'name': f'top_k full catalog (k={k})', 'ms': topk_ms},
+        {'name': f'top_k allowed_ids ({len(allowed):,})', 'ms': allowed_ms},
+    ]
+
+
+def ann_benchmark(
+    n_items: int,
+    dim: int = 128,
+    k: int = 100,
+    recall_target: float = 0.95,
+    n_queries: int = 100,
+    seed: int = 42,
+) -> Dict:
+    """
+    IVF-flat ANN index'inin tam aramaya karşı recall@k / gecikme ölçümü
+    
+    Embedding'ler gerçek modeldeki gibi kümeli olsun diye rastgele
+    merkezler etrafında üretilir.
+    """
+    import numpy as np
+    from apps.recommendations.ann import IVFIndex
+    from apps.recommendations.embeddings import ItemEmbeddingIndex
+    
+    rng = np.random.default_rng(seed)
+    n_clusters = max(1, n_items // 500)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n_items)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n_items, dim)).astype(np.float32)
+    index = ItemEmbeddingIndex(np.arange(1, n_items + 1), vectors)
+    
+    start = time.perf_counter()
+    ann = IVFIndex.build(index.matrix, seed=seed)
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    tuning = ann.tune(index.matrix, recall_target=recall_target, k=k, n_queries=n_queries)
+    return {'nlist': ann.nlist, 'build_ms': build_ms, **tuning}
+
+
+def retrieval_benchmark(user, sizes: List[int], repeat: int = 3) -> Dict:
+    """
+    Çok kaynaklı aday havuzu ile eski havuzun (sadece popülerlik)
+    gecikme, sorgu sayısı ve ilk 10 ortalama skor karşılaştırması
+    """
+    from apps.recommendations.retrieval import CandidateRetriever, PopularSource
+    from apps.recommendations.services import HybridRecommender
+    
+    recommender = HybridRecommender()
+    previous = recommender.retriever
+    multi = CandidateRetriever()
+    modes = [('popular', CandidateRetriever([PopularSource()])), ('multi', multi)]
+    rows = []
+    try:
+        for size in sizes:
+            for name, retriever in modes:
+                recommender.retriever = retriever
+                ms, queries, recs = measure(
+                    lambda: recommender.recommend(user=user, n=10, candidate_limit=size, use_cache=False),
+                    repeat=repeat,
+                )
+                scores = [r['final_score'] for r in recs]
+                rows.append({
+                    'pool': size,
+                    'mode': name,
+                    'ms': ms,
+                    'queries': queries,
+                    'mean_score': statistics.mean(scores) if scores else 0.0,
+                })
+    finally:
+        recommender.retriever = previous
+    return {'rows': rows, 'sources': multi.stats()}
+
+
+def group_benchmark(movie_ids: List[int], sizes: List[int], repeat: int = 3) -> List[Dict]:
+    """
+    recommend_for_group gecikmesi (üye sayısı ve strateji başına)
+    
+    Args:
+        sizes: Üye sayıları (2-10)
+    """
+    from apps.recommendations import group
+    from apps.recommendations.services import HybridRecommender
+    
+    recommender = HybridRecommender()
+    users = [
+        build_synthetic_user(movie_ids, seed=100 + i, username=f'bench_group_{i}')
+        for i in range(max(sizes))
+    ]
+    rows = []
+    for size in sizes:
+        for strategy in group.STRATEGIES:
+            ms, queries, recs = measure(
+                lambda: recommender.recommend_for_group(
+                    users[:size], n=10, strategy=strategy, use_cache=False
+                ),
+                repeat=repeat,
+            )
+            rows.append({
+                'members': size,
+                'strategy': strategy,
+                'ms': ms,
+                'queries': queries,
+                'results': len(recs),
+            })
+    return rows
+
+
+def bundle_benchmark(n_items: int, n_users: int = 10000, embedding_dim: int = 64, repeat: int = 3) -> Dict:
+    """
+    Soğuk başlangıç: checkpoint (torch.load + pickle + embedding hesabı)
+    ile memory-map serving bundle açılışının karşılaştırması
+    """
+    import pickle
+    import tempfile
+    
+    from apps.recommendations.bundle import ServingBundle, export_bundle, mapping_path_for
+    from apps.recommendations.embeddings import ItemEmbeddingIndex
+    from apps.recommendations.ncf_model import NCFModel, NCFTrainer
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = f"{tmp}/ncf_model.pkl"
+        NCFTrainer(NCFModel(n_users, n_items, embedding_dim=embedding_dim)).save(model_path)
+        item_map = {ml_id: ml_id for ml_id in range(n_items)}
+        with open(mapping_path_for(model_path), 'wb') as f:
+            pickle.dump({'item_map': item_map, 'ml_to_movie': {i: i + 1 for i in item_map}}, f)
+        
+        def checkpoint_load():
+            model = NCFTrainer.load(model_path).model
+            with open(mapping_path_for(model_path), 'rb') as f:
+                ml_data = pickle.load(f)
+            return ItemEmbeddingIndex.from_model(model, ml_data['item_map'], ml_data['ml_to_movie'])
+        
+        def bundle_load():
+            bundle = ServingBundle.load(f"{tmp}/bundle")
+            bundle.index.matrix[-1].sum()   # İlk sayfa erişimi
+            return bundle.index
+        
+        start = time.perf_counter()
+        export_bundle(model_path, f"{tmp}/bundle")
+        export_ms = (time.perf_counter() - start) * 1000
+        
+        checkpoint_ms, _, expected = measure(checkpoint_load, repeat=repeat)
+        bundle_ms, _, index = measure(bundle_load, repeat=repeat)
+        query = expected.matrix[0]
+        return {
+            'export_ms': export_ms,
+            'checkpoint_ms': checkpoint_ms,
+            'bundle_ms': bundle_ms,
+            'same_top_k': expected.top_k(query, 100)[0].tolist() == index.top_k(query, 100)[0].tolist(),
+        }
+
+
+# Ayrı process'te ölçülen başlangıç senaryoları
+STARTUP_SCENARIOS = {
+    'manage.py check': (
+        "import django; django.setup()\n"
+        "from django.core.management import call_command; call_command('check', verbosity=0)"
+    ),
+    'web worker (wsgi import)': "import config.wsgi",
+    'celery worker (task import)': (
+        "from config.celery import app; app.loader.import_default_modules()"
+    ),
+    'recommender ilk kullanim': (
+        "import django; django.setup()\n"
+        "from apps.recommendations.services import recommender; recommender.ensure_loaded()"
+    ),
+}
+HEAVY_MODULES = ('torch', 'sklearn', 'pandas', 'scipy')
+
+
+def startup_benchmark(repeat: int = 3) -> List[Dict]:
+    """
+    Process başlangıç süreleri (yeni Python process'i, medyan) ve
+    yüklenen ağır modüller
+    """
+    import os
+    import subprocess
+    import sys
+    
+    from django.conf import settings
+    
+    env = dict(os.environ, RECOMMENDER_WARMUP='False')
+    rows = []
+    for name, code in STARTUP_SCENARIOS.items():
+        script = (
+            "import os, sys\n"
+            f"os.environ.setdefault('DJANGO_SETTINGS_MODULE', {os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')!r})\n"
+            f"{code}\n"
+            f"print('HEAVY=' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+        )
+        timings = []
+        heavy = ''
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-c', script],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+            if result.returncode != 0:
+                raise RuntimeError(f"{name} basarisiz: {result.stderr.strip()[-500:]}")
+            heavy = result.stdout.rsplit('HEAVY=', 1)[-1].strip()
+        rows.append({'name': name, 'ms': statistics.median(timings), 'heavy': heavy or '-'})
+    return rows
+
+
+# MovieLens veri seti boyutları: (kullanıcı, film, rating)
+RATING_SHAPES = {
+    'ml-latest-small': (610, 9_724, 100_836),
+    'ml-1m': (6_040, 3_706, 1_000_209),
+    'ml-25m': (162_541, 59_047, 25_000_095),
+}
+LEGACY_SAMPLING_MAX = 2_000_000   # Eski set-farkı döngüsü bu rating sayısına kadar ölçülür
+
+
+def build_synthetic_ratings(num_users: int, num_items: int, n_ratings: int, seed: int = 42) -> Tuple:
+    """
+    MovieLens benzeri sentetik etkileşimler (log-normal kullanıcı
+    aktivitesi, Zipf film popülerliği), tekrarsız
+    
+    Returns:
+        (user_ids, item_ids) int64 dizileri
+    """
+    import numpy as np
+    
+    rng = np.random.default_rng(seed)
+    activity = rng.lognormal(0, 1.2, num_users)
+    counts = np.maximum(activity / activity.sum() * n_ratings, 1).astype(np.int64)
+    counts = np.minimum(counts, num_items // 2)
+    popularity = 1.0 / np.arange(1, num_items + 1) ** 0.9
+    users = np.repeat(np.arange(num_users, dtype=np.int64), counts)
+    items = rng.choice(num_items, size=len(users), p=popularity / popularity.sum())
+    keys = np.unique(users * num_items + items)   # Sıralı: kullanıcıya göre gruplu
+    return keys // num_items, keys % num_items
+
+
+def legacy_negatives(user_ids, item_ids, num_items: int, ratio: int, seed: int = 42) -> Tuple:
+    """train_model'in eski kullanıcı başına set farkı örneklemesi (karşılaştırma için)"""
+    import numpy as np
+    
+    rng = np.random.RandomState(seed)
+    user_items = {}
+    for u, i in zip(user_ids, item_ids):
+        user_items.setdefault(u, set()).add(i)
+    all_items = set(range(num_items))
+    neg_users, neg_items = [], []
+    for u, positive_items in user_items.items():
+        negative_items = list(all_items - positive_items)
+        n_neg = min(len(positive_items) * ratio, len(negative_items))
+        if n_neg > 0:
+            neg_users.extend([u] * n_neg)
+            neg_items.extend(rng.choice(negative_items, size=n_neg, replace=False))
+    return np.array(neg_users), np.array(neg_items)
+
+
+def sampling_benchmark(shapes: List[str], ratio: int = 2, repeat: int = 3) -> List[Dict]:
+    """
+    Negatif örnekleme: eski set-farkı döngüsü ile vektörize
+    sample_negatives karşılaştırması (sentetik MovieLens boyutları)
+    """
+    import tracemalloc
+    
+    from apps.recommendations.training import sample_negatives
+    
+    rows = []
+    for shape in shapes:
+        num_users, num_items, n_ratings = RATING_SHAPES[shape]
+        users, items = build_synthetic_ratings(num_users, num_items, n_ratings)
+        modes = [('vectorized', sample_negatives)]
+        if len(users) <= LEGACY_SAMPLING_MAX:
+            modes.insert(0, ('legacy', legacy_negatives))
+        for mode, sampler in modes:
+            ms, _, (neg_users, _) = measure(
+                lambda: sampler(users, items, num_items, ratio, seed=42), repeat=repeat
+            )
+            tracemalloc.start()
+            sampler(users, items, num_items, ratio, seed=42)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            rows.append({
+                'shape': shape,
+                'ratings': len(users),
+                'mode': mode,
+                'ms': ms,
+                'peak_mb': peak / 1024 / 1024,
+                'negatives': len(neg_users),
+            })
+    return rows
+
+
+def loader_benchmark(n_samples: int, batch_size: int = 1024, repeat: int = 3) -> List[Dict]:
+    """
+    Eğitim veri yolu: per-sample Dataset + DataLoader ile TensorBatchLoader
+    karşılaştırması (sadece iterasyon ve tam epoch, örnek/saniye)
+    """
+    import numpy as np
+    import torch
+    from torch.utils.data import DataLoader, Dataset
+    
+    from apps.recommendations.ncf_model import NCFModel, NCFTrainer, TensorBatchLoader
+    
+    class RatingsDataset(Dataset):
+        """train_model'in eski per-sample dataset'i"""
+        
+        def __init__(self, user_ids, item_ids, labels):
+            self.user_ids = torch.tensor(user_ids, dtype=torch.long)
+            self.item_ids = torch.tensor(item_ids, dtype=torch.long)
+            self.labels = torch.tensor(labels, dtype=torch.float32)
+        
+        def __len__(self):
+            return len(self.labels)
+        
+        def __getitem__(self, idx):
+            return {'user_id': self.user_ids[idx], 'item_id': self.item_ids[idx], 'label': self.labels[idx]}
+    
+    num_users, num_items, _ = RATING_SHAPES['ml-1m']
+    rng = np.random.default_rng(42)
+    users = rng.integers(0, num_users, n_samples)
+    items = rng.integers(0, num_items, n_samples)
+    labels = (rng.random(n_samples) < 1 / 3).astype(np.float32)
+    
+    loaders = {
+        'DataLoader': DataLoader(RatingsDataset(users, items, labels), batch_size=batch_size, shuffle=True),
+        'TensorBatchLoader': TensorBatchLoader(users, items, labels, batch_size=batch_size, shuffle=True, seed=42),
+        'TensorBatchLoader+prefetch': TensorBatchLoader(
+            users, items, labels, batch_size=batch_size, shuffle=True, prefetch=4, seed=42
+        ),
+    }
+    rows = []
+    for name, loader in loaders.items():
+        iterate_ms, _, _ = measure(lambda: sum(1 for _ in loader), repeat=repeat)
+        torch.manual_seed(42)
+        trainer = NCFTrainer(NCFModel(num_users, num_items, embedding_dim=32))
+        epoch_ms, _, _ = measure(lambda: trainer.train_epoch(loader), repeat=repeat)
+        rows.append({
+            'loader': name,
+            'iterate_per_s': n_samples / (iterate_ms / 1000),
+            'epoch_per_s': n_samples / (epoch_ms / 1000),
+        })
+    return rows
+
+
+def scaling_benchmark(workers: List[int], n_samples: int = 500_000, batch_size: int = 1024) -> List[Dict]:
+    """
+    train_model --workers ölçekleme: 1 epoch, sentetik ml-1m boyutunda
+    veri, process sayısına göre eğitim hızı (process başlatma hariç)
+    """
+    import numpy as np
+    
+    from apps.recommendations.distributed import train_distributed
+    
+    num_users, num_items, _ = RATING_SHAPES['ml-1m']
+    rng = np.random.default_rng(42)
+    
+    def split(n):
+        return {
+            'user_ids': rng.integers(0, num_users, n),
+            'item_ids': rng.integers(0, num_items, n),
+            'labels': (rng.random(n) < 1 / 3).astype(np.float32),
+        }
+    
+    train, test = split(n_samples), split(n_samples // 4)
+    config = {
+        'num_users': num_users, 'num_items': num_items, 'embedding_dim': 64,
+        'mlp_layers': [128, 64, 32], 'dropout': 0.2, 'learning_rate': 0.001,
+        'batch_size': batch_size, 'epochs': 1, 'seed': 42, 'output': None,
+    }
+    rows = []
+    for world_size in workers:
+        start = time.perf_counter()
+        row = train_distributed(world_size, train, test, config)[0]
+        rows.append({
+            'workers': world_size,
+            'samples_per_s': row['samples'] / row['train_seconds'],
+            'wall_s': time.perf_counter() - start,
+            'auc': row['auc'],
+        })
+    base = rows[0]['samples_per_s'] if rows else 1
+    for row in rows:
+        row['speedup'] = row['samples_per_s'] / base
+    return rows
+
+
+def ncf_scoring_benchmark(
+    sizes: List[int], threads: List[int], n_items: int = 100_000, embedding_dim: int = 64, repeat: int = 5
+) -> List[Dict]:
+    """
+    Tek kullanıcı için aday skorlama: eski predict (Python listesi, no_grad),
+    tensör forward (inference_mode) ve NCFScorer; scorer her thread sayısıyla
+    ayrıca ölçülür. max_diff: scorer ile forward arasındaki en büyük fark.
+    """
+    import numpy as np
+    import torch
+    
+    from apps.recommendations.ncf_model import NCFModel, NCFScorer
+    
+    previous_threads = torch.get_num_threads()
+    torch.manual_seed(42)
+    model = NCFModel(num_users=1000, num_items=max(n_items, max(sizes)), embedding_dim=embedding_dim).eval()
+    user_id = 7
+    vector = model.get_user_embedding(user_id)
+    rng = np.random.default_rng(42)
+    
+    def legacy(item_list):
+        with torch.no_grad():
+            return model(torch.tensor([user_id] * len(item_list)), torch.tensor(item_list)).numpy()
+    
+    def forward(rows):
+        with torch.inference_mode():
+            return model(torch.full((len(rows),), user_id), torch.as_tensor(rows)).numpy()
+    
+    results = []
+    try:
+        for size in sizes:
+            rows = rng.integers(0, model.num_items, size)
+            item_list = rows.tolist()
+            torch.set_num_threads(previous_threads)
+            legacy_ms, _, _ = measure(lambda: legacy(item_list), repeat=repeat)
+            forward_ms, _, expected = measure(lambda: forward(rows), repeat=repeat)
+            results.append({'candidates': size, 'mode': 'predict (eski)', 'threads': previous_threads, 'ms': legacy_ms, 'max_diff': 0.0})
+            results.append({'candidates': size, 'mode': 'forward', 'threads': previous_threads, 'ms': forward_ms, 'max_diff': 0.0})
+            for count in threads:
+                scorer = NCFScorer(model, num_threads=count)
+                scorer_ms, _, scores = measure(lambda: scorer.score(vector, rows), repeat=repeat)
+                results.append({
+                    'candidates': size, 'mode': 'scorer', 'threads': count, 'ms': scorer_ms,
+                    'max_diff': float(np.abs(scores - expected).max()),
+                })
+    finally:
+        torch.set_num_threads(previous_threads)
+    return results
+
+
+# Worker bellek senaryoları: recommender.ensure_loaded + bir fold-in (solve + tüm filmleri skorla)
+QUANTIZATION_SCENARIOS = {
+    'checkpoint': ('', False, False),
+    'bundle + float32 ag': ('bundle_fp32', True, False),
+    'bundle + int8 ag': ('bundle_int8', True, True),
+}
+
+
+def quantization_benchmark(
+    n_users: int = 162_541,
+    n_items: int = 59_047,
+    mapped: int = 10_000,
+    embedding_dim: int = 64,
+    repeat: int = 5,
+) -> Dict:
+    """
+    Servis ağı küçültme / int8: ayrı process'lerde worker bellek artışı
+    (VmRSS; RssAnon = worker'a özel, RssFile = page cache'ten paylaşılan),
+    dosya boyutları, skor uyumu ve NCFScorer süresi
+    
+    Varsayılan boyutlar ml-25m; mapped: Movie'ye eşlenen film sayısı.
+    """
+    import os
+    import pickle
+    import subprocess
+    import sys
+    import tempfile
+    
+    import numpy as np
+    import torch
+    from django.conf import settings
+    
+    from apps.recommendations.bundle import ServingBundle, export_bundle, mapping_path_for
+    from apps.recommendations.ncf_model import NCFModel, NCFScorer, NCFTrainer
+    
+    torch.manual_seed(42)
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = f"{tmp}/ncf_model.pkl"
+        model = NCFModel(n_users, n_items, embedding_dim=embedding_dim).eval()
+        NCFTrainer(model).save(model_path)
+        item_map = {ml_id: ml_id for ml_id in range(n_items)}
+        mapped_ids = np.sort(rng.choice(n_items, min(mapped, n_items), replace=False))
+        with open(mapping_path_for(model_path), 'wb') as f:
+            pickle.dump({'item_map': item_map, 'ml_to_movie': {int(i): int(i) + 1 for i in mapped_ids}}, f)
+        
+        manifests = {
+            'bundle_fp32': export_bundle(model_path, f"{tmp}/bundle_fp32", network=True),
+            'bundle_int8': export_bundle(model_path, f"{tmp}/bundle_int8", quantize=True),
+        }
+        
+        env = dict(os.environ, RECOMMENDER_WARMUP='False', MODEL_BUNDLE_ROOT=f"{tmp}/registry")
+        rows = []
+        for name, (bundle, has_network, quantized) in QUANTIZATION_SCENARIOS.items():
+            script = (
+                "import os\n"
+                f"os.environ.setdefault('DJANGO_SETTINGS_MODULE', {os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')!r})\n"
+                "import django; django.setup()\n"
+                "import torch\n"
+                "from django.conf import settings\n"
+                "from apps.recommendations.services import recommender\n"
+                "def rss():\n"
+                "    with open('/proc/self/status') as f:\n"
+                "        return {k: int(v.split()[0]) for k, v in (l.split(':', 1) for l in f) if k.startswith('Rss') or k == 'VmRSS'}\n"
+                f"settings.NCF_MODEL_PATH = {model_path!r}\n"
+                f"settings.NCF_BUNDLE_PATH = {os.path.join(tmp, bundle or 'missing')!r}\n"
+                "before = rss()\n"
+                "recommender.ensure_loaded()\n"
+                "fold_in = recommender._fold_in\n"
+                "movie_ids = fold_in.index.movie_ids\n"
+                "vector = fold_in.solve(movie_ids[:20].tolist(), seed=1)\n"
+                "fold_in.score(vector, movie_ids)\n"
+                "after = rss()\n"
+                "print('RSS=' + ','.join(f'{k}:{after[k] - before[k]}' for k in ('VmRSS', 'RssAnon', 'RssFile')))\n"
+            )
+            result = subprocess.run(
+                [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if result.returncode != 0 or 'RSS=' not in result.stdout:
+                raise RuntimeError(f"{name} basarisiz: {(result.stderr or result.stdout).strip()[-500:]}")
+            rss = dict(item.split(':') for item in result.stdout.rsplit('RSS=', 1)[-1].strip().split(','))
+            path = os.path.join(tmp, bundle) if bundle else model_path
+            files = [os.path.join(path, n) for n in os.listdir(path)] if bundle else [path, mapping_path_for(path)]
+            row = {
+                'name': name,
+                'rss_mb': int(rss['VmRSS']) / 1024,
+                'anon_mb': int(rss['RssAnon']) / 1024,
+                'file_mb': int(rss['RssFile']) / 1024,
+                'disk_mb': sum(os.path.getsize(f) for f in files) / 1024 / 1024,
+                'agreement': manifests[bundle]['network']['agreement'] if bundle else None,
+            }
+            
+            # Skorlama süresi (tüm eşlenen filmler, tek kullanıcı)
+            if has_network:
+                served = ServingBundle.load(path).load_network()
+                scorer = NCFScorer(served, quantize=quantized)
+                candidates = np.arange(served.num_items)
+            else:
+                scorer, candidates = NCFScorer(model), mapped_ids
+            vector = model.get_user_embedding(7)
+            row['score_ms'], _, _ = measure(lambda: scorer.score(vector, candidates), repeat=repeat)
+            rows.append(row)
+    return {'users': n_users, 'items': n_items, 'mapped': len(mapped_ids), 'rows': rows}
+
+
+def build_synthetic_preferences(
+    num_users: int = 1000, num_items: int = 2000, per_user: int = 50, dim: int = 8, seed: int = 42
+) -> Tuple:
+    """
+    Gizli faktörlü sentetik etkileşimler: kullanıcı başına per_user film,
+    exp(u.v + popülerlik) ile orantılı olasılıkla tekrarsız (Gumbel top-k)
+    
+    Returns:
+        (user_ids, item_ids) int64 dizileri
+    """
+    import numpy as np
+    
+    rng = np.random.default_rng(seed)
+    users = rng.standard_normal((num_users, dim)) / dim ** 0.25
+    items = rng.standard_normal((num_items, dim)) / dim ** 0.25
+    popularity = -0.8 * np.log(np.arange(1, num_items + 1))
+    logits = users @ items.T + popularity + rng.gumbel(size=(num_users, num_items))
+    chosen = np.argpartition(-logits, per_user, axis=1)[:, :per_user]
+    return np.repeat(np.arange(num_users, dtype=np.int64), per_user), chosen.reshape(-1).astype(np.int64)
+
+
+OBJECTIVES = {
+    # ad: (negatif stratejisi - None: açık negatifler, loss)
+    'explicit+bce': (None, 'bce'),
+    'uniform+bce': ('uniform', 'bce'),
+    'popularity+bce': ('popularity', 'bce'),
+    'in_batch+bce': ('in_batch', 'bce'),
+    'uniform+bpr': ('uniform', 'bpr'),
+}
+
+
+def objective_benchmark(
+    seconds: float = 20.0, ratio: int = 4, batch_size: int = 1024, n_candidates: int = 100, seed: int = 42
+) -> List[Dict]:
+    """
+    Eğitim hedefleri eşit eğitim süresinde: açık negatifli BCE ile batch
+    başına çekilen negatifler (uniform / popularity / in-batch, BCE / BPR)
+    
+    Kullanıcı başına bir pozitif tutulur; tutulan film + n_candidates - 1
+    örneklenmiş negatif üzerinden HR@10, NDCG@10 ve AUC raporlanır.
+    """
+    import numpy as np
+    import torch
+    
+    from apps.recommendations.ncf_model import NCFTrainer, TensorBatchLoader
+    from apps.recommendations.training import explicit_dataset, leave_one_out_metrics, sample_negatives
+    
+    num_users, num_items = 1000, 2000
+    users, items = build_synthetic_preferences(num_users, num_items, seed=seed)
+    rng = np.random.default_rng(seed)
+    
+    # Leave-one-out: kullanıcı başına rastgele bir pozitif test için
+    per_user = len(users) // num_users
+    held = np.arange(num_users) * per_user + rng.integers(0, per_user, num_users)
+    train_mask = np.ones(len(users), dtype=bool)
+    train_mask[held] = False
+    train_users, train_items = users[train_mask], items[train_mask]
+    neg_users, neg_items = sample_negatives(
+        users[held], items[held], num_items, n_candidates - 1, seed=seed, exclude=(train_users, train_items)
+    )
+    candidates = np.concatenate([items[held, None], neg_items.reshape(num_users, n_candidates - 1)], axis=1)
+    
+    rows = []
+    for name, (negatives, loss) in OBJECTIVES.items():
+        torch.manual_seed(seed)
+        start = time.perf_counter()
+        if negatives is None:
+            data, _ = explicit_dataset(train_users, train_items, num_items, ratio, seed=seed, train_fraction=1.0)
+        else:
+            data = {
+                'user_ids': train_users, 'item_ids': train_items,
+                'labels': np.ones(len(train_users), dtype=np.float32),
+            }
+        prep_ms = (time.perf_counter() - start) * 1000
+        
+        trainer = NCFTrainer.from_config({
+            'num_users': num_users, 'num_items': num_items, 'embedding_dim': 32,
+            'mlp_layers': [64, 32, 16], 'dropout': 0.1, 'learning_rate': 0.002,
+            'negatives': negatives, 'num_negatives': ratio, 'loss': loss, 'seed': seed,
+            'item_counts': np.bincount(train_items, minlength=num_items),
+        })
+        loader = TensorBatchLoader(
+            data['user_ids'], data['item_ids'], data['labels'], batch_size=batch_size, shuffle=True, seed=seed
+        )
+        
+        trainer.network.train()
+        steps = samples = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for batch in loader:
+                trainer._step(batch, 'cpu')
+                steps += 1
+                samples += len(batch['label'])
+                if time.perf_counter() >= deadline:
+                    break
+        
+        trainer.model.eval()
+        with torch.no_grad():
+            scores = trainer.model(
+                torch.arange(num_users).repeat_interleave(n_candidates),
+                torch.as_tensor(candidates.reshape(-1)),
+            ).reshape(num_users, n_candidates).numpy()
+        metrics = leave_one_out_metrics(scores, k=10)
+        rows.append({
+            'objective': name,
+            'prep_ms': prep_ms,
+            'dataset_mb': sum(t.nbytes for t in (loader.user_ids, loader.item_ids, loader.labels)) / 1024 / 1024,
+            'steps': steps,
+            'epochs': samples / len(data['labels']),
+            'auc': metrics['auc'],
+            'hr10': metrics['hr'],
+            'ndcg10': metrics['ndcg'],
+        })
+    return rows
@@ -0,0 +1,202 @@
+"""
+Serving Bundle
+==============
+NCF modelinin servis için dışa aktarılmış hali (export_serving_bundle).
+
+ncf_model_bundle/
+    manifest.json     Format, boyutlar, dosyalar ve kaynak model bilgisi
+    movie_ids.npy     Sıralı movie_id'ler (int64), embedding satır sırası
+    embeddings.npy    L2-normalize film embedding'leri (float32)
+    norms.npy         Orijinal vektör normları (float32)
+    item_rows.npy     movie_ids ile hizalı model item index'leri (int64)
+    ml_ids.npy        Sıralı MovieLens ID'leri (int64)
+    ml_movie_ids.npy  ml_ids ile hizalı movie_id'ler (eşleşmeyen: -1)
+    network.pt        İsteğe bağlı (--network / --quantize): kullanıcı
+                      tabloları atılmış, item'ları movie_ids sırasına
+                      indirgenmiş NCF ağı (quantization.prune_for_serving)
+
+Diziler np.load(mmap_mode='r') ile açılır: torch import edilmez, checkpoint
+ve pickle okunmaz, embedding'ler yeniden hesaplanmaz. Sayfalar OS page
+cache üzerinden tüm worker process'leri arasında paylaşılır. network.pt
+sadece fold-in için (load_network) torch ile okunur.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from apps.recommendations.embeddings import ItemEmbeddingIndex
+
+
+BUNDLE_FORMAT = 1
+MANIFEST = 'manifest.json'
+ARRAYS = ('movie_ids', 'embeddings', 'norms', 'item_rows', 'ml_ids', 'ml_movie_ids')
+NETWORK = 'network.pt'
+
+
+def bundle_path_for(model_path: str) -> str:
+    """ncf_model.pkl -> ncf_model_bundle"""
+    return os.path.splitext(model_path)[0] + '_bundle'
+
+
+def mapping_path_for(model_path: str) -> str:
+    """ncf_model.pkl -> ncf_model_ml_mapping.pkl (train_model çıktısı)"""
+    return os.path.splitext(model_path)[0] + '_ml_mapping.pkl'
+
+
+def _source_info(model_path: str) -> Dict:
+    stat = os.stat(model_path)
+    return {'path': os.path.abspath(model_path), 'mtime': stat.st_mtime, 'size': stat.st_size}
+
+
+def export_bundle(model_path: str, output: str = None, network: bool = False, quantize: bool = False) -> Dict:
+    """
+    Checkpoint + mapping pickle'ından serving bundle yaz
+    
+    Dizin önce geçici bir yola yazılır, sonra yerine taşınır; yarım
+    yazılmış bundle okunmaz.
+    
+    network: Küçültülmüş NCF ağını da yaz (network.pt)
+    quantize: Ağı int8 yaz (network'ü içerir); manifest'e float32 modelle
+              skor uyumu (quantization.score_agreement) eklenir
+    
+    Returns:
+        manifest
+    """
+    from apps.recommendations.ncf_model import NCFTrainer
+    
+    output = output or bundle_path_for(model_path)
+    model = NCFTrainer.load(model_path).model
+    with open(mapping_path_for(model_path), 'rb') as f:
+        ml_data = pickle.load(f)
+    item_map = ml_data.get('item_map', {})
+    ml_to_movie = ml_data.get('ml_to_movie', {})
+    
+    index = ItemEmbeddingIndex.from_model(model, item_map, ml_to_movie)
+    movie_to_idx = ItemEmbeddingIndex.movie_item_rows(item_map, ml_to_movie)
+    ml_ids = np.array(sorted(item_map), dtype=np.int64)
+    arrays = {
+        'movie_ids': index.movie_ids,
+        'embeddings': index.matrix,
+        'norms': index.norms,
+        'item_rows': np.array([movie_to_idx[int(m)] for m in index.movie_ids], dtype=np.int64),
+        'ml_ids': ml_ids,
+        'ml_movie_ids': np.array([ml_to_movie.get(int(m), -1) for m in ml_ids], dtype=np.int64),
+    }
+    
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'created_at': time.time(),
+        'source': _source_info(model_path),
+        'num_users': model.num_users,
+        'num_items': model.num_items,
+        'embedding_dim': model.embedding_dim,
+        'items': len(index),
+        'dim': index.dim,
+        'arrays': {
+            name: {'dtype': str(array.dtype), 'shape': list(array.shape)}
+            for name, array in arrays.items()
+        },
+    }
+    
+    tmp = f"{output}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    if network or quantize:
+        manifest['network'] = _export_network(model, arrays['item_rows'], os.path.join(tmp, NETWORK), quantize)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, f'{name}.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(tmp, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    if os.path.exists(output):
+        shutil.rmtree(output)
+    os.replace(tmp, output)
+    return manifest
+
+
+def _export_network(model, item_rows: np.ndarray, path: str, quantize: bool) -> Dict:
+    from apps.recommendations.quantization import (
+        network_bytes, prune_for_serving, save_network, score_agreement,
+    )
+    
+    served = prune_for_serving(model, item_rows, quantize=quantize)
+    save_network(served, path, quantized=quantize)
+    return {
+        'file': NETWORK,
+        'quantized': quantize,
+        'items': served.num_items,
+        'bytes': network_bytes(served),
+        'agreement': score_agreement(model, served, item_rows, quantize=quantize),
+    }
+
+
+class ServingBundle:
+    """Memory-map ile açılmış serving bundle"""
+    
+    def __init__(self, path: str, manifest: Dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+        self.index = ItemEmbeddingIndex.from_arrays(
+            arrays['movie_ids'], arrays['embeddings'], arrays['norms']
+        )
+    
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'ServingBundle':
+        """
+        Bundle'ı aç (mmap=False ise diziler belleğe okunur)
+        Format veya dizi boyutları manifest ile uyuşmazsa ValueError.
+        """
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"Desteklenmeyen bundle formati: {manifest.get('format')}")
+        
+        arrays = {}
+        for name in ARRAYS:
+            array = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            expected = manifest['arrays'][name]
+            if list(array.shape) != expected['shape'] or str(array.dtype) != expected['dtype']:
+                raise ValueError(f"Bundle dizisi manifest ile uyusmuyor: {name}")
+            arrays[name] = array
+        return cls(path, manifest, arrays)
+    
+    @property
+    def has_network(self) -> bool:
+        return 'network' in self.manifest
+    
+    def load_network(self):
+        """Küçültülmüş NCF ağı (item i = index satırı i); yoksa None"""
+        if not self.has_network:
+            return None
+        from apps.recommendations.quantization import load_network
+        
+        return load_network(os.path.join(self.path, self.manifest['network']['file']))
+    
+    def is_stale(self, model_path: str) -> bool:
+        """Kaynak checkpoint bundle'dan sonra değişmişse True"""
+        if not os.path.exists(model_path):
+            return False
+        source = self.manifest.get('source', {})
+        current = _source_info(model_path)
+        return (current['mtime'], current['size']) != (source.get('mtime'), source.get('size'))
+
+
+def load_bundle(model_path: str, path: str = None) -> Optional[ServingBundle]:
+    """
+    Modelin güncel serving bundle'ı (yoksa veya eskimişse None)
+    """
+    path = path or bundle_path_for(model_path)
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        return None
+    bundle = ServingBundle.load(path)
+    if bundle.is_stale(model_path):
+        print(f"[WARN] Serving bundle modelden eski, checkpoint kullanilacak: {path}")
+        return None
+    return bundle
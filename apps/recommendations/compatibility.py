@@ -0,0 +1,273 @@
+"""
+Compatibility Engine
+====================
+Arkadaş çiftleri için toplu uyumluluk hesabı (CompatibilityScore).
+
+- Ortak puanlanan filmlerin puan farkları ve ortak izlenen film sayıları
+  çift başına değil, çift listesiyle (VALUES) join'lenen tek gruplu
+  sorguyla hesaplanır.
+- Tür benzerliği profillerin genre_weights vektörleri üzerinde
+  vektörize cosine ile hesaplanır.
+- Sadece skoru olmayan veya kullanıcılardan birinin profili (puan/izleme
+  değişikliğiyle) skordan sonra güncellenmiş çiftler yeniden hesaplanır.
+
+Formül (HybridRecommender.calculate_compatibility de bunu kullanır):
+    0.4 * tür + 0.4 * puan + 0.2 * favori kişi
+Puan benzerliği iki kullanıcının da puanladığı tüm filmlerden hesaplanır
+(eski hesap: ortak izlenen filmlerden ilk 50'sinin puanları).
+"""
+
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from django.db import connection
+
+from apps.movies.models import Rating, WatchedMovie
+
+
+PAIR_CHUNK_SIZE = 200     # Tek sorguda hesaplanan çift sayısı
+
+GENRE_WEIGHT = 0.4
+RATING_WEIGHT = 0.4
+PERSON_WEIGHT = 0.2
+NEUTRAL = 0.5             # Veri yoksa kullanılan benzerlik
+
+# calculate_compatibility / quick_match şablonunun kullandığı anahtarlar
+RESULT_KEYS = (
+    'score', 'common_movies', 'genre_similarity', 'rating_similarity',
+    'common_actors', 'common_directors',
+)
+
+Pair = Tuple[int, int]
+
+
+def pair_key(user_a: int, user_b: int) -> Pair:
+    """Çiftin sıralı anahtarı (user_1 < user_2)"""
+    return (user_a, user_b) if user_a < user_b else (user_b, user_a)
+
+
+def accepted_pairs() -> List[Pair]:
+    """Kabul edilmiş arkadaşlıkların sıralı çiftleri"""
+    from apps.users.models import Friendship
+    
+    return sorted({
+        pair_key(a, b)
+        for a, b in Friendship.objects.filter(status='accepted').values_list('user_id', 'friend_id')
+        if a != b
+    })
+
+
+def _co_aggregates(table: str, pairs: List[Pair], diff: bool) -> Dict[Pair, Tuple[int, int]]:
+    """
+    Verilen çiftler için aynı filme sahip satırların sayısı (ve diff=True
+    ise mutlak puan farkı toplamı)
+    
+    Join sadece çift listesi (VALUES) üzerinden yapılır; parçadaki diğer
+    kullanıcı kombinasyonları taranmaz.
+    """
+    qn = connection.ops.quote_name
+    values = ', '.join(['(%s, %s)'] * len(pairs))
+    total = 'SUM(ABS(a.score - b.score))' if diff else '0'
+    sql = (
+        f"WITH pairs (user_a, user_b) AS (VALUES {values}) "
+        f"SELECT p.user_a, p.user_b, COUNT(*), {total} "
+        f"FROM pairs p "
+        f"JOIN {qn(table)} a ON a.user_id = p.user_a "
+        f"JOIN {qn(table)} b ON b.user_id = p.user_b AND b.movie_id = a.movie_id "
+        f"GROUP BY p.user_a, p.user_b"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [u for pair in pairs for u in pair])
+        return {(a, b): (count, total or 0) for a, b, count, total in cursor.fetchall()}
+
+
+def _genre_similarity(pairs: List[Pair], profiles: Dict) -> np.ndarray:
+    """Çiftlerin genre_weights cosine benzerliği (boş profilde NEUTRAL)"""
+    user_ids = sorted({u for pair in pairs for u in pair})
+    genres = sorted({g for p in profiles.values() for g in (p.genre_weights or {})})
+    rows = {user_id: i for i, user_id in enumerate(user_ids)}
+    columns = {genre: j for j, genre in enumerate(genres)}
+    
+    matrix = np.zeros((len(user_ids), max(len(genres), 1)), dtype=np.float64)
+    for user_id, profile in profiles.items():
+        for genre, weight in (profile.genre_weights or {}).items():
+            matrix[rows[user_id], columns[genre]] = weight
+    
+    a = matrix[[rows[u] for u, _ in pairs]]
+    b = matrix[[rows[v] for _, v in pairs]]
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    dots = np.einsum('ij,ij->i', a, b)
+    valid = (a.sum(axis=1) > 0) & (b.sum(axis=1) > 0)
+    return np.where(valid, dots / np.where(norms > 0, norms, 1.0), NEUTRAL)
+
+
+def _values(profile, field: str) -> set:
+    return set(getattr(profile, field, None) or []) if profile else set()
+
+
+def compute_pairs(pairs: Iterable[Pair]) -> Dict[Pair, Dict]:
+    """
+    Çiftlerin uyumluluğunu hesapla (kaydetmeden)
+    
+    Returns:
+        {(user_1, user_2): calculate_compatibility ile aynı anahtarlar +
+         similar_genres / similar_actors / similar_directors}
+    """
+    from apps.recommendations.models import UserTasteProfile
+    
+    pairs = sorted({pair_key(*pair) for pair in pairs})
+    if not pairs:
+        return {}
+    user_ids = sorted({u for pair in pairs for u in pair})
+    
+    profiles = {p.user_id: p for p in UserTasteProfile.objects.filter(user_id__in=user_ids)}
+    co_rated = _co_aggregates(Rating._meta.db_table, pairs, diff=True)
+    co_watched = _co_aggregates(WatchedMovie._meta.db_table, pairs, diff=False)
+    genre_sims = _genre_similarity(pairs, profiles)
+    
+    results = {}
+    for (user_a, user_b), genre_sim in zip(pairs, genre_sims.tolist()):
+        profile_a = profiles.get(user_a)
+        profile_b = profiles.get(user_b)
+        
+        # Ortak puanlanan filmlerin ortalama mutlak farkı
+        count, diff_sum = co_rated.get((user_a, user_b), (0, 0))
+        rating_sim = 1 - diff_sum / count / 10 if count else NEUTRAL
+        
+        # Favori kişi benzerliği
+        common_actors = sorted(
+            _values(profile_a, 'favorite_actors') & _values(profile_b, 'favorite_actors')
+        )
+        common_directors = sorted(
+            _values(profile_a, 'favorite_directors') & _values(profile_b, 'favorite_directors')
+        )
+        weights_a = profile_a.genre_weights if profile_a else {}
+        weights_b = profile_b.genre_weights if profile_b else {}
+        person_sim = min((len(common_actors) + len(common_directors) * 2) / 10, 1.0)
+        
+        final_score = genre_sim * GENRE_WEIGHT + rating_sim * RATING_WEIGHT + person_sim * PERSON_WEIGHT
+        results[(user_a, user_b)] = {
+            'score': int(final_score * 100),
+            'common_movies': co_watched.get((user_a, user_b), (0, 0))[0],
+            'genre_similarity': int(genre_sim * 100),
+            'rating_similarity': int(rating_sim * 100),
+            'common_actors': len(common_actors),
+            'common_directors': len(common_directors),
+            'similar_genres': {
+                genre: min(weight, weights_b[genre])
+                for genre, weight in weights_a.items() if genre in weights_b
+            },
+            'similar_actors': common_actors,
+            'similar_directors': common_directors,
+        }
+    return results
+
+
+def _store(results: Dict[Pair, Dict]):
+    from apps.users.models import CompatibilityScore
+    
+    fields = [
+        'score', 'common_movies', 'genre_similarity', 'rating_similarity',
+        'similar_genres', 'similar_actors', 'similar_directors',
+    ]
+    CompatibilityScore.objects.bulk_create(
+        [
+            CompatibilityScore(user_1_id=a, user_2_id=b, **{f: values[f] for f in fields})
+            for (a, b), values in results.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['user_1', 'user_2'],
+        update_fields=fields + ['calculated_at'],
+    )
+
+
+def _is_stale(calculated_at, updated_at: List) -> bool:
+    return calculated_at is None or any(t and t > calculated_at for t in updated_at)
+
+
+def stale_pairs(pairs: List[Pair]) -> List[Pair]:
+    """Skoru olmayan veya profillerinden biri skordan sonra değişmiş çiftler"""
+    from apps.recommendations.models import UserTasteProfile
+    from apps.users.models import CompatibilityScore
+    
+    if not pairs:
+        return []
+    user_ids = {u for pair in pairs for u in pair}
+    updated = dict(
+        UserTasteProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'updated_at')
+    )
+    calculated = {
+        (a, b): at
+        for a, b, at in CompatibilityScore.objects.filter(
+            user_1_id__in=user_ids, user_2_id__in=user_ids
+        ).values_list('user_1_id', 'user_2_id', 'calculated_at')
+    }
+    return [
+        pair for pair in pairs
+        if _is_stale(calculated.get(pair), [updated.get(u) for u in pair])
+    ]
+
+
+def refresh_compatibility(full: bool = False, chunk_size: int = PAIR_CHUNK_SIZE) -> Dict:
+    """
+    Kabul edilmiş tüm arkadaş çiftlerinin skorlarını güncelle
+    
+    Varsayılan olarak sadece değişen çiftler hesaplanır; artık arkadaş
+    olmayan çiftlerin skorları silinir.
+    """
+    from apps.users.models import CompatibilityScore
+    
+    start = time.perf_counter()
+    pairs = accepted_pairs()
+    computed = 0
+    for offset in range(0, len(pairs), chunk_size):
+        chunk = pairs[offset:offset + chunk_size]
+        targets = chunk if full else stale_pairs(chunk)
+        if targets:
+            _store(compute_pairs(targets))
+            computed += len(targets)
+    
+    # Arkadaşlığı bitmiş çiftler
+    keep = set(pairs)
+    removed = [
+        pk for pk, a, b in CompatibilityScore.objects.values_list('id', 'user_1_id', 'user_2_id')
+        if (a, b) not in keep
+    ]
+    if removed:
+        CompatibilityScore.objects.filter(id__in=removed).delete()
+    
+    return {
+        'pairs': len(pairs),
+        'computed': computed,
+        'removed': len(removed),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def get_compatibility(user_a, user_b) -> Dict:
+    """
+    Saklanan uyumluluk skoru (quick_match)
+    Skor yoksa veya eskimişse sadece bu çift hesaplanıp kaydedilir.
+    """
+    from apps.recommendations.models import UserTasteProfile
+    from apps.users.models import CompatibilityScore
+    
+    pair = pair_key(user_a.id, user_b.id)
+    row = CompatibilityScore.objects.filter(user_1_id=pair[0], user_2_id=pair[1]).first()
+    if row is not None:
+        updated = UserTasteProfile.objects.filter(user_id__in=pair).values_list('updated_at', flat=True)
+        if not _is_stale(row.calculated_at, list(updated)):
+            return {
+                'score': row.score,
+                'common_movies': row.common_movies,
+                'genre_similarity': row.genre_similarity,
+                'rating_similarity': row.rating_similarity,
+                'common_actors': len(row.similar_actors or []),
+                'common_directors': len(row.similar_directors or []),
+            }
+    
+    results = compute_pairs([pair])
+    _store(results)
+    return {key: results[pair][key] for key in RESULT_KEYS}
@@ -0,0 +1,158 @@
+"""
+Distributed NCF Training
+========================
+train_model --workers N: CPU üzerinde torch.distributed (gloo) ile veri
+paralel eğitim.
+
+- Eğitim ve test setleri parent process'te eşit boyutlu parçalara
+  ayrılır; her worker sadece kendi parçasını alır.
+- Model DistributedDataParallel ile sarılır; gradyanlar her adımda
+  all-reduce edilir, tüm rank'ler aynı ağırlıklarla ilerler.
+- Değerlendirme senkron: tahminler all_gather ile toplanır, AUC her
+  rank'te aynı hesaplanır. Checkpoint'ı sadece rank 0 yazar.
+- Epoch sonuçları rank 0'dan kuyrukla parent'a iletilir.
+
+Worker'lar spawn ile başlar; bu modül Django import etmez.
+"""
+
+import os
+import queue
+import socket
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import torch
+
+from apps.recommendations.ncf_model import NCFTrainer, TensorBatchLoader
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def shard(arrays: Dict[str, np.ndarray], rank: int, world_size: int) -> Dict[str, np.ndarray]:
+    """
+    Rank'in ardışık parçası (tüm parçalar eşit boyutlu)
+    DDP'de her rank epoch başına aynı sayıda adım atmalıdır; kalan en fazla
+    world_size - 1 örnek atılır.
+    """
+    per_rank = len(next(iter(arrays.values()))) // world_size
+    return {name: array[rank * per_rank:(rank + 1) * per_rank] for name, array in arrays.items()}
+
+
+def _worker(rank: int, world_size: int, port: int, train: Dict, test: Dict, config: Dict, results):
+    import torch.distributed as dist
+    
+    dist.init_process_group(
+        'gloo', init_method=f'tcp://127.0.0.1:{port}', rank=rank, world_size=world_size
+    )
+    try:
+        torch.set_num_threads(config['threads'])
+        torch.manual_seed(config['seed'])
+        trainer = NCFTrainer.from_config({**config, 'seed': config['seed'] + rank})
+        trainer.distribute()
+        
+        train_loader = TensorBatchLoader(
+            train['user_ids'], train['item_ids'], train['labels'],
+            batch_size=config['batch_size'], shuffle=True, seed=config['seed'] + rank,
+        )
+        test_loader = TensorBatchLoader(
+            test['user_ids'], test['item_ids'], test['labels'], batch_size=config['batch_size'],
+        )
+        
+        best_auc = 0.0
+        for epoch in range(config['epochs']):
+            start = time.perf_counter()
+            loss = torch.tensor([trainer.train_epoch(train_loader)])
+            train_seconds = time.perf_counter() - start
+            dist.all_reduce(loss)
+            
+            test_loss, test_auc = trainer.evaluate(test_loader)
+            saved = False
+            if test_auc > best_auc:
+                best_auc = test_auc
+                if rank == 0 and config.get('output'):
+                    trainer.save(config['output'])
+                    saved = True
+            if rank == 0:
+                results.put({
+                    'epoch': epoch + 1,
+                    'train_loss': loss.item() / world_size,
+                    'test_loss': test_loss,
+                    'auc': test_auc,
+                    'saved': saved,
+                    'train_seconds': train_seconds,
+                    'samples': train_loader.num_samples * world_size,
+                })
+            dist.barrier()
+    finally:
+        dist.destroy_process_group()
+
+
+def train_distributed(
+    world_size: int,
+    train: Dict[str, np.ndarray],
+    test: Dict[str, np.ndarray],
+    config: Dict,
+    on_epoch: Optional[Callable[[Dict], None]] = None,
+) -> List[Dict]:
+    """
+    world_size process ile eğit
+    
+    Args:
+        train, test: {'user_ids', 'item_ids', 'labels'} dizileri (karıştırılmış)
+        config: NCFTrainer.from_config ayarları + batch_size (rank başına),
+                epochs, seed, output (checkpoint yolu, boşsa yazılmaz),
+                threads (opsiyonel)
+        on_epoch: Her epoch sonucu için çağrılır
+    
+    Returns:
+        Epoch sonuçları (loss, AUC, eğitim süresi, örnek sayısı)
+    """
+    import torch.multiprocessing as mp
+    
+    config = {
+        **config,
+        'threads': config.get('threads') or max(1, (os.cpu_count() or 1) // world_size),
+    }
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    port = _free_port()
+    processes = [
+        ctx.Process(
+            target=_worker,
+            args=(rank, world_size, port, shard(train, rank, world_size), shard(test, rank, world_size), config, results),
+        )
+        for rank in range(world_size)
+    ]
+    for process in processes:
+        process.start()
+    
+    history = []
+    try:
+        while len(history) < config['epochs']:
+            try:
+                row = results.get(timeout=1)
+            except queue.Empty:
+                failed = [p.exitcode for p in processes if p.exitcode not in (None, 0)]
+                if failed:
+                    raise RuntimeError(f"Egitim worker'i basarisiz oldu (exit code {failed[0]})")
+                continue
+            history.append(row)
+            if on_epoch:
+                on_epoch(row)
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+    
+    failed = [p.exitcode for p in processes if p.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"Egitim worker'i basarisiz oldu (exit code {failed[0]})")
+    return history
@@ -0,0 +1,216 @@
+"""
+Item Embedding Index
+====================
+NCF film embedding'leri için tek parça, L2-normalize float32 matris.
+Satırlar movie_id'ye göre sıralıdır; benzerlik aramaları tek bir
+matris-vektör çarpımıyla tüm katalog üzerinde yapılır.
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class ItemEmbeddingIndex:
+    """
+    movie_id -> embedding satırı
+    
+    matrix: (n_items, dim) L2-normalize float32
+    norms:  orijinal vektör normları (ham vektör = matrix * norms)
+    """
+    
+    def __init__(self, movie_ids: Iterable[int], vectors: np.ndarray):
+        movie_ids = np.asarray(list(movie_ids), dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(movie_ids), -1)
+        
+        order = np.argsort(movie_ids, kind='stable')
+        self.movie_ids = movie_ids[order]
+        vectors = vectors[order]
+        
+        norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+        safe = np.where(norms > 0, norms, 1.0).astype(np.float32)
+        self.matrix = np.ascontiguousarray(vectors / safe[:, None], dtype=np.float32)
+        self.norms = norms
+        self.ann = None   # Opsiyonel yaklaşık arama index'i (ann.IVFIndex)
+    
+    @classmethod
+    def from_arrays(cls, movie_ids: np.ndarray, matrix: np.ndarray, norms: np.ndarray) -> 'ItemEmbeddingIndex':
+        """
+        Önceden sıralanmış ve normalize edilmiş dizilerden index (kopyasız)
+        Serving bundle'daki memory-map dizileri için (bundle.ServingBundle).
+        """
+        index = cls.__new__(cls)
+        index.movie_ids = movie_ids
+        index.matrix = matrix
+        index.norms = norms
+        index.ann = None
+        return index
+    
+    @staticmethod
+    def movie_item_rows(item_map: Dict, ml_to_movie: Dict) -> Dict[int, int]:
+        """movie_id -> model item index (aynı filme eşleşen birden fazla MovieLens ID varsa sonuncusu)"""
+        movie_to_idx = {}
+        for ml_id, idx in item_map.items():
+            if ml_id in ml_to_movie:
+                movie_to_idx[ml_to_movie[ml_id]] = idx
+        return movie_to_idx
+    
+    @classmethod
+    def from_model(cls, model, item_map: Dict, ml_to_movie: Dict) -> 'ItemEmbeddingIndex':
+        """
+        NCF modelinin embedding tablolarından index oluştur
+        (GMF + MLP embedding'leri yan yana, get_item_embedding ile aynı)
+        """
+        import torch
+        
+        movie_to_idx = cls.movie_item_rows(item_map, ml_to_movie)
+        
+        with torch.no_grad():
+            weights = torch.cat(
+                [model.item_embedding_gmf.weight, model.item_embedding_mlp.weight],
+                dim=1
+            ).cpu().numpy()
+        
+        movie_ids = list(movie_to_idx.keys())
+        rows = np.fromiter(movie_to_idx.values(), dtype=np.int64, count=len(movie_ids))
+        return cls(movie_ids, weights[rows] if len(rows) else np.zeros((0, weights.shape[1])))
+    
+    def __len__(self):
+        return len(self.movie_ids)
+    
+    def __contains__(self, movie_id) -> bool:
+        row = np.searchsorted(self.movie_ids, movie_id)
+        return bool(row < len(self.movie_ids) and self.movie_ids[row] == movie_id)
+    
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+    
+    def rows(self, movie_ids: Iterable[int]) -> np.ndarray:
+        """movie_id'lerin satırları (index'te olmayanlar için -1)"""
+        ids = np.asarray(list(movie_ids) if not isinstance(movie_ids, np.ndarray) else movie_ids,
+                         dtype=np.int64)
+        if not len(self.movie_ids) or not len(ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        rows = np.searchsorted(self.movie_ids, ids)
+        rows = np.minimum(rows, len(self.movie_ids) - 1)
+        return np.where(self.movie_ids[rows] == ids, rows, -1)
+    
+    def vector(self, movie_id: int) -> Optional[np.ndarray]:
+        """Ham (normalize edilmemiş) embedding"""
+        row = self.rows([movie_id])[0]
+        if row < 0:
+            return None
+        return self.matrix[row] * self.norms[row]
+    
+    def mean_vector(self, movie_ids: Iterable[int]) -> Optional[np.ndarray]:
+        """Verilen filmlerin ham embedding ortalaması (index'te olmayanlar atlanır)"""
+        rows = self.rows(movie_ids)
+        rows = rows[rows >= 0]
+        if not len(rows):
+            return None
+        raw = self.matrix[rows] * self.norms[rows, None]
+        return raw.mean(axis=0)
+    
+    def _query(self, query_vec: np.ndarray) -> np.ndarray:
+        query = np.asarray(query_vec, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+    
+    def similarity(self, query_vec: np.ndarray, movie_ids: Iterable[int] = None) -> np.ndarray:
+        """
+        Cosine benzerliği [-1, 1]
+        
+        movie_ids verilmezse tüm katalog (satır sırası), verilirse aynı
+        sırada döner; index'te olmayan filmler için NaN.
+        """
+        scores = self.matrix @ self._query(query_vec)
+        if movie_ids is None:
+            return scores
+        rows = self.rows(movie_ids)
+        result = np.full(len(rows), np.nan, dtype=np.float32)
+        found = rows >= 0
+        result[found] = scores[rows[found]]
+        return result
+    
+    def top_k(
+        self,
+        query_vec: np.ndarray,
+        k: int,
+        allowed_ids: Iterable[int] = None,
+        exclude_ids: Iterable[int] = None,
+        exact: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        En benzer k film (tek matris-vektör çarpımı + argpartition)
+        
+        ANN index yüklüyse ve allowed_ids verilmemişse yaklaşık arama
+        kullanılır (allowed_ids ile aday kümesi zaten küçüktür).
+        
+        Args:
+            query_vec: Sorgu vektörü (normalize edilmesi gerekmez)
+            k: Sonuç sayısı
+            allowed_ids: Sadece bu filmler arasında ara
+            exclude_ids: Bu filmleri hariç tut
+            exact: True ise ANN index'i kullanma
+        
+        Returns:
+            (movie_ids, cosine skorları) azalan sırada
+        """
+        if self.ann is not None and not exact and allowed_ids is None:
+            result = self._approximate_top_k(query_vec, k, exclude_ids)
+            if result is not None:
+                return result
+        
+        scores = self.matrix @ self._query(query_vec)
+        candidate_rows = None
+        if allowed_ids is not None:
+            rows = self.rows(allowed_ids)
+            candidate_rows = np.unique(rows[rows >= 0])
+        if exclude_ids is not None:
+            excluded = self.rows(exclude_ids)
+            excluded = np.unique(excluded[excluded >= 0])
+            if candidate_rows is None:
+                mask = np.ones(len(scores), dtype=bool)
+                mask[excluded] = False
+                candidate_rows = np.flatnonzero(mask)
+            else:
+                candidate_rows = np.setdiff1d(candidate_rows, excluded, assume_unique=True)
+        
+        if candidate_rows is not None:
+            scores = scores[candidate_rows]
+        k = min(int(k), len(scores))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        
+        rows = candidate_rows[top] if candidate_rows is not None else top
+        return self.movie_ids[rows], scores[top]
+    
+    def _approximate_top_k(self, query_vec: np.ndarray, k: int, exclude_ids: Iterable[int] = None):
+        """
+        ANN index ile top_k
+        Hariç tutulanlar çıkarıldıktan sonra k sonuç kalmazsa None (tam aramaya düşülür).
+        """
+        query = self._query(query_vec)
+        excluded = np.zeros(0, dtype=np.int64)
+        if exclude_ids is not None:
+            excluded = self.rows(exclude_ids)
+            excluded = np.unique(excluded[excluded >= 0])
+        
+        k = min(int(k), len(self) - len(excluded))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        
+        rows = self.ann.search(self.matrix, query, k + len(excluded))
+        if len(excluded):
+            rows = rows[~np.isin(rows, excluded)]
+        if len(rows) < k:
+            return None
+        rows = rows[:k]
+        return self.movie_ids[rows], self.matrix[rows] @ query
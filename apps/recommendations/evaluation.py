@@ -0,0 +1,279 @@
+"""
+Offline Evaluation
+==================
+evaluate_recommender komutu için sıralama değerlendirmesi.
+
+- split_leave_last_out / split_temporal: Etkileşimleri zamana göre böl
+  (test maskesi döner).
+- rank_full_catalog: NCF modeliyle her test kullanıcısını tüm filmlere
+  karşı batch'li (kullanıcı x film) skor matrisiyle sıralar; eğitim
+  pozitifleri maskelenir, top-K torch.topk ile seçilir.
+- ranking_metrics: HR@K, NDCG@K, recall@K ve coverage (vektörize).
+- evaluate_hybrid: HybridRecommender uçtan uca; tutulan puanlar
+  transaction içinde silinir, öneriler alınır ve her şey geri alınır.
+- StageTimer: Aşama bazında süre ölçümü.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+import numpy as np
+
+from apps.recommendations.training import _contains, _sorted_unique
+
+
+LEAVE_LAST_OUT = 'leave-last-out'
+TEMPORAL = 'temporal'
+SPLITS = (LEAVE_LAST_OUT, TEMPORAL)
+
+MAX_SCORE_PAIRS = 262_144     # Tek ileri geçişte skorlanan (kullanıcı, film) çifti
+
+
+class StageTimer:
+    """Aşama süreleri (saniye, eklenme sırasıyla)"""
+    
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+    
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def split_leave_last_out(user_ids: np.ndarray, timestamps: np.ndarray, min_interactions: int = 2) -> np.ndarray:
+    """
+    Her kullanıcının en son etkileşimi test (eşit zamanda sonraki satır)
+    En az min_interactions etkileşimi olmayan kullanıcılar tamamen eğitimde kalır.
+    """
+    user_ids = np.asarray(user_ids)
+    n = len(user_ids)
+    test = np.zeros(n, dtype=bool)
+    if not n:
+        return test
+    order = np.lexsort((np.arange(n), timestamps, user_ids))
+    sorted_users = user_ids[order]
+    last = np.ones(n, dtype=bool)
+    last[:-1] = sorted_users[1:] != sorted_users[:-1]
+    counts = np.bincount(user_ids)
+    test[order[last & (counts[sorted_users] >= min_interactions)]] = True
+    return test
+
+
+def split_temporal(
+    user_ids: np.ndarray, item_ids: np.ndarray, timestamps: np.ndarray, test_fraction: float = 0.2
+) -> np.ndarray:
+    """
+    Global zaman eşiği: son test_fraction kadar etkileşim test
+    Eğitimde hiç görünmeyen kullanıcı/filmlerin test satırları atılır
+    (model onları skorlayamaz).
+    """
+    user_ids, item_ids = np.asarray(user_ids), np.asarray(item_ids)
+    if not len(user_ids):
+        return np.zeros(0, dtype=bool)
+    test = timestamps > np.quantile(timestamps, 1 - test_fraction)
+    known_users = np.zeros(user_ids.max() + 1, dtype=bool)
+    known_items = np.zeros(item_ids.max() + 1, dtype=bool)
+    known_users[user_ids[~test]] = True
+    known_items[item_ids[~test]] = True
+    return test & known_users[user_ids] & known_items[item_ids]
+
+
+def rank_full_catalog(
+    model,
+    users: np.ndarray,
+    train_user_ids: np.ndarray,
+    train_item_ids: np.ndarray,
+    num_items: int,
+    k: int = 10,
+    max_pairs: int = MAX_SCORE_PAIRS,
+) -> np.ndarray:
+    """
+    Kullanıcıları tüm filmlere karşı skorla, eğitim pozitiflerini çıkar
+    
+    Returns:
+        (len(users), k) en yüksek skorlu film index'leri
+    """
+    import torch
+    
+    users = np.asarray(users, dtype=np.int64)
+    keys = _sorted_unique(np.asarray(train_user_ids, dtype=np.int64) * num_items + train_item_ids)
+    batch_users = max(1, max_pairs // num_items)
+    k = min(k, num_items)
+    all_items = torch.arange(num_items)
+    top = np.empty((len(users), k), dtype=np.int64)
+    
+    model.eval()
+    with torch.inference_mode():
+        for start in range(0, len(users), batch_users):
+            chunk = users[start:start + batch_users]
+            scores = model(
+                torch.as_tensor(chunk).repeat_interleave(num_items), all_items.repeat(len(chunk))
+            ).reshape(len(chunk), num_items)
+            
+            # Eğitim pozitifleri (CSR aralıkları) -inf
+            starts = np.searchsorted(keys, chunk * num_items)
+            lengths = np.searchsorted(keys, (chunk + 1) * num_items) - starts
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            rows = np.repeat(np.arange(len(chunk)), lengths)
+            scores[torch.as_tensor(rows), torch.as_tensor(keys[offsets] % num_items)] = float('-inf')
+            
+            top[start:start + len(chunk)] = torch.topk(scores, k, dim=1).indices.numpy()
+    return top
+
+
+def ranking_metrics(
+    top_items: np.ndarray,
+    users: np.ndarray,
+    test_user_ids: np.ndarray,
+    test_item_ids: np.ndarray,
+    key_space: int,
+    catalog_size: int = None,
+) -> Dict[str, float]:
+    """
+    Top-K listelerinden HR@K, NDCG@K, recall@K ve coverage
+    
+    Args:
+        top_items: (kullanıcı, K) önerilen item'lar (eksik: -1)
+        users: top_items satırlarının kullanıcıları
+        test_user_ids, test_item_ids: Tutulan (ilgili) etkileşimler
+        key_space: item ID üst sınırı (user * key_space + item anahtarı)
+        catalog_size: Coverage paydası (varsayılan key_space)
+    """
+    users = np.asarray(users, dtype=np.int64)
+    if not len(users):
+        return {'users': 0, 'hr': 0.0, 'ndcg': 0.0, 'recall': 0.0, 'coverage': 0.0}
+    k = top_items.shape[1]
+    keys = _sorted_unique(np.asarray(test_user_ids, dtype=np.int64) * key_space + test_item_ids)
+    hits = (top_items >= 0) & _contains(keys, (users[:, None] * key_space + top_items).reshape(-1)).reshape(top_items.shape)
+    
+    relevant = np.searchsorted(keys, (users + 1) * key_space) - np.searchsorted(keys, users * key_space)
+    ideal = np.clip(np.minimum(relevant, k), 1, None)
+    discounts = 1.0 / np.log2(np.arange(k) + 2)
+    dcg = (hits * discounts).sum(axis=1)
+    idcg = np.cumsum(discounts)[ideal - 1]
+    recommended = np.unique(top_items[top_items >= 0])
+    return {
+        'users': len(users),
+        'hr': float(hits.any(axis=1).mean()),
+        'ndcg': float((dcg / idcg).mean()),
+        'recall': float((hits.sum(axis=1) / ideal).mean()),
+        'coverage': len(recommended) / (catalog_size or key_space),
+    }
+
+
+def hybrid_holdout(users: List, split: str = LEAVE_LAST_OUT, test_fraction: float = 0.2, min_ratings: int = 2) -> Dict[int, List]:
+    """
+    Uygulama kullanıcıları için tutulacak beğenilen puanlar
+    
+    leave-last-out: Kullanıcının en son beğendiği film (en az min_ratings puanı varsa)
+    temporal: Tüm puanların son test_fraction'ı içindeki beğenilen filmler
+              (eşikten önce en az bir puanı olan kullanıcılar için)
+    
+    Returns:
+        {user_id: [Rating, ...]}
+    """
+    from apps.movies.models import Rating
+    from apps.recommendations.services import UserContext
+    
+    ratings = list(
+        Rating.objects.filter(user__in=users).order_by('user_id', 'created_at', 'id')
+        .only('id', 'user_id', 'movie_id', 'score', 'created_at')
+    )
+    by_user: Dict[int, List] = {}
+    for rating in ratings:
+        by_user.setdefault(rating.user_id, []).append(rating)
+    
+    held: Dict[int, List] = {}
+    if split == LEAVE_LAST_OUT:
+        for user_id, rows in by_user.items():
+            liked = [r for r in rows if r.score >= UserContext.LIKED_THRESHOLD]
+            if len(rows) >= min_ratings and liked:
+                held[user_id] = [liked[-1]]
+        return held
+    
+    if not ratings:
+        return held
+    stamps = np.array([r.created_at.timestamp() for r in ratings])
+    cutoff = np.quantile(stamps, 1 - test_fraction)
+    for user_id, rows in by_user.items():
+        if rows[0].created_at.timestamp() > cutoff:
+            continue
+        recent = [
+            r for r in rows
+            if r.created_at.timestamp() > cutoff and r.score >= UserContext.LIKED_THRESHOLD
+        ]
+        if recent:
+            held[user_id] = recent
+    return held
+
+
+def evaluate_hybrid(
+    users: List,
+    k: int = 10,
+    split: str = LEAVE_LAST_OUT,
+    test_fraction: float = 0.2,
+    min_ratings: int = 2,
+    recommender=None,
+    timer: StageTimer = None,
+) -> Dict:
+    """
+    HybridRecommender'ı uçtan uca değerlendir
+    
+    Tutulan puanlar (ve aynı filmlerin izlendi kayıtları) silinir; profil
+    güncellemeleri normal sinyallerle çalışır. recommend(use_cache=False)
+    her kullanıcı için çağrılır, sonra transaction geri alınır.
+    
+    Returns:
+        ranking_metrics + kullanıcı başına gecikme (p50/p95 ms)
+    """
+    from django.db import transaction
+    
+    from apps.movies.models import Movie, WatchedMovie
+    from apps.recommendations.services import recommender as default_recommender
+    
+    recommender = recommender or default_recommender
+    timer = timer or StageTimer()
+    with timer.stage('model'):
+        recommender.ensure_loaded()
+    with timer.stage('split'):
+        held = hybrid_holdout(users, split, test_fraction, min_ratings)
+    
+    evaluated = [user for user in users if user.id in held]
+    top_items = np.full((len(evaluated), k), -1, dtype=np.int64)
+    latencies = []
+    with transaction.atomic():
+        with timer.stage('holdout'):
+            for user_id, ratings in held.items():
+                for rating in ratings:
+                    rating.delete()
+                WatchedMovie.objects.filter(
+                    user_id=user_id, movie_id__in=[r.movie_id for r in ratings]
+                ).delete()
+        with timer.stage('recommend'):
+            for row, user in enumerate(evaluated):
+                start = time.perf_counter()
+                results = recommender.recommend(user, n=k, use_cache=False)
+                latencies.append((time.perf_counter() - start) * 1000)
+                movie_ids = [r['movie'].id for r in results][:k]
+                top_items[row, :len(movie_ids)] = movie_ids
+        transaction.set_rollback(True)
+    
+    with timer.stage('metrics'):
+        test_pairs = [(user_id, r.movie_id) for user_id, ratings in held.items() for r in ratings]
+        key_space = max([m for _, m in test_pairs] + [int(top_items.max()), 0]) + 1
+        metrics = ranking_metrics(
+            top_items,
+            np.array([user.id for user in evaluated], dtype=np.int64),
+            np.array([u for u, _ in test_pairs], dtype=np.int64),
+            np.array([m for _, m in test_pairs], dtype=np.int64),
+            key_space,
+            catalog_size=Movie.objects.count(),
+        )
+    metrics['p50_ms'] = float(np.percentile(latencies, 50)) if latencies else 0.0
+    metrics['p95_ms'] = float(np.percentile(latencies, 95)) if latencies else 0.0
+    return metrics
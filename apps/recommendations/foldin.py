@@ -0,0 +1,133 @@
+"""
+User Fold-In
+============
+NCF sadece MovieLens kullanıcılarıyla eğitilir; uygulama kullanıcıları
+user_map'te yoktur. FoldIn, film embedding'leri ve ağ ağırlıkları
+dondurulmuş modelde kullanıcının GMF/MLP embedding'ini beğendiği
+(etiket 1), beğenmediği ve rastgele seçilen puanlamadığı filmlerden
+(etiket 0) birkaç gradyan adımıyla çözer.
+
+- Başlangıç noktası ve L2 çekimi eğitim kullanıcılarının ortalama
+  embedding'i: az puanlı kullanıcılar ortalamadan fazla uzaklaşmaz.
+- Gradyan sadece iki kullanıcı vektörü için hesaplanır
+  (torch.autograd.grad); model parametreleri değişmez, model istekler
+  arasında paylaşılabilir.
+- Çözülen vektör UserTasteProfile.user_vector'da modelin anahtarıyla
+  saklanır; puanlar değişince temizlenir (UserTasteProfile.derive_from_stats).
+- score: adayların hepsi tek inference_mode geçişinde skorlanır
+  (ncf_model.NCFScorer).
+"""
+
+import hashlib
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from apps.recommendations.ncf_model import NCFScorer
+
+
+FOLD_IN_STEPS = 30        # Gradyan adımı
+FOLD_IN_LR = 0.05         # Adam öğrenme oranı
+FOLD_IN_L2 = 0.01         # Ortalama kullanıcıya çekim
+FOLD_IN_NEGATIVES = 4     # Beğeni başına rastgele negatif
+
+
+def model_key(source: dict) -> str:
+    """Model kimliği ({path, mtime, size}); saklanan vektörler bu anahtarla eşleşmeli"""
+    digest = hashlib.sha1(f"{source['path']}:{source['mtime']}:{source['size']}".encode())
+    return digest.hexdigest()[:16]
+
+
+def checkpoint_key(model_path: str) -> str:
+    """Checkpoint dosyasının model_key'i (aynı checkpoint'ten bundle'la aynı)"""
+    stat = os.stat(model_path)
+    return model_key({'path': os.path.abspath(model_path), 'mtime': stat.st_mtime, 'size': stat.st_size})
+
+
+class FoldIn:
+    """
+    Donmuş NCF modeli üzerinde uygulama kullanıcısı vektörü ve skorları
+    
+    index: ItemEmbeddingIndex (movie_id -> satır)
+    item_rows: index satırlarıyla hizalı model item index'leri
+    key: Model kimliği (checkpoint_key)
+    num_threads: Skorlama için torch thread sayısı (NCFScorer)
+    quantize: Skorlama int8 (NCFScorer); solve her zaman float32 ağla
+    """
+    
+    def __init__(self, model, index, item_rows: np.ndarray, key: str, num_threads: int = None, quantize: bool = False):
+        self.model = model.eval()
+        self.scorer = NCFScorer(model, num_threads=num_threads, quantize=quantize)
+        self.index = index
+        self.item_rows = np.asarray(item_rows, dtype=np.int64)
+        self.key = key
+        with torch.no_grad():
+            self._prior = (
+                model.user_embedding_gmf.weight.mean(dim=0),
+                model.user_embedding_mlp.weight.mean(dim=0),
+            )
+    
+    def rows(self, movie_ids: Iterable[int]) -> np.ndarray:
+        """movie_id'lerin model item index'leri (modelde olmayanlar için -1)"""
+        rows = self.index.rows(movie_ids)
+        return np.where(rows >= 0, self.item_rows[np.maximum(rows, 0)], -1)
+    
+    def solve(
+        self,
+        liked_ids: Iterable[int],
+        disliked_ids: Iterable[int] = (),
+        seed: int = None,
+        steps: int = FOLD_IN_STEPS,
+    ) -> Optional[np.ndarray]:
+        """
+        Kullanıcı vektörünü çöz
+        
+        Returns:
+            [gmf, mlp] birleşik float32 vektör (2 * embedding_dim) veya
+            modelde beğenilen film yoksa None
+        """
+        positives = self.rows(liked_ids)
+        positives = positives[positives >= 0]
+        if not len(positives):
+            return None
+        negatives = self.rows(disliked_ids)
+        negatives = negatives[negatives >= 0]
+        
+        rng = np.random.default_rng(seed)
+        sampled = rng.integers(0, self.model.num_items, FOLD_IN_NEGATIVES * len(positives))
+        sampled = sampled[~np.isin(sampled, np.concatenate([positives, negatives]))]
+        items = torch.as_tensor(np.concatenate([positives, negatives, sampled]))
+        labels = torch.zeros(len(items))
+        labels[:len(positives)] = 1.0
+        
+        prior_gmf, prior_mlp = self._prior
+        user_gmf = prior_gmf.clone().requires_grad_()
+        user_mlp = prior_mlp.clone().requires_grad_()
+        optimizer = torch.optim.Adam([user_gmf, user_mlp], lr=FOLD_IN_LR)
+        n = len(items)
+        with torch.enable_grad():
+            for _ in range(steps):
+                logits = self.model.score_embeddings(
+                    user_gmf.expand(n, -1), user_mlp.expand(n, -1), items, logits=True
+                ).reshape(-1)
+                loss = F.binary_cross_entropy_with_logits(logits, labels) + FOLD_IN_L2 * (
+                    (user_gmf - prior_gmf).pow(2).sum() + (user_mlp - prior_mlp).pow(2).sum()
+                )
+                user_gmf.grad, user_mlp.grad = torch.autograd.grad(loss, [user_gmf, user_mlp])
+                optimizer.step()
+        
+        return torch.cat([user_gmf, user_mlp]).detach().numpy().astype(np.float32)
+    
+    def score(self, vector: np.ndarray, movie_ids: Iterable[int]) -> np.ndarray:
+        """
+        NCF tahmini (0-1), movie_ids sırasıyla; modelde olmayan filmler için NaN
+        """
+        rows = self.rows(movie_ids)
+        result = np.full(len(rows), np.nan, dtype=np.float32)
+        found = rows >= 0
+        if found.any():
+            result[found] = self.scorer.score(vector, rows[found])
+        return result
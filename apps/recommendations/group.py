@@ -0,0 +1,151 @@
+"""
+Group Recommendations
+=====================
+2-10 kişilik gruplar için ortak film önerisi (HybridRecommender.recommend_for_group).
+
+- Üyelerin puan ve izleme kayıtları tek UNION sorgusuyla yüklenir; hariç
+  tutulan filmler tüm üyelerin birleşimidir.
+- Aday havuzu recommend() ile aynı CandidateRetriever'dan, grubun ortalama
+  profili üzerinden gelir.
+- Her üyenin content skoru ortak aday matrisi üzerinde tek geçişte
+  hesaplanır (scoring.content_score_matrix) ve stratejiye göre birleştirilir.
+"""
+
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+from django.db.models import DateTimeField, IntegerField, Value
+
+from apps.movies.models import Rating, WatchedMovie
+
+
+MIN_MEMBERS = 2
+MAX_MEMBERS = 10
+
+LEAST_MISERY = 'least_misery'   # En az memnun üyenin skoru
+AVERAGE = 'average'             # Üyelerin ortalaması
+FAIRNESS = 'fairness'           # Havuzdan genel olarak az memnun üyeye daha çok ağırlık
+STRATEGIES = (LEAST_MISERY, AVERAGE, FAIRNESS)
+
+POPULARITY_BONUS = 0.2    # get_movies_for_both ile aynı popülerlik katkısı
+
+
+class GroupProfile:
+    """Üye profillerinin birleşimi (aday kaynakları için UserTasteProfile yerine)"""
+    
+    def __init__(self, profiles: List):
+        profiles = [p for p in profiles if p is not None]
+        totals: Dict[str, float] = {}
+        for profile in profiles:
+            for genre_id, weight in (profile.genre_weights or {}).items():
+                totals[genre_id] = totals.get(genre_id, 0) + weight
+        self.genre_weights = {g: w / len(profiles) for g, w in totals.items()}
+        self.favorite_directors = sorted({p for pr in profiles for p in (pr.favorite_directors or [])})
+        self.favorite_actors = sorted({p for pr in profiles for p in (pr.favorite_actors or [])})
+
+
+class GroupContext:
+    """
+    Grup isteği boyunca paylaşılan veri
+    
+    UserContext ile aynı adları (profile, seen_ids, liked_vector,
+    embedding_index) sağlar; böylece _filtered_candidates ve aday
+    kaynakları grup için de kullanılabilir.
+    """
+    
+    LIKED_THRESHOLD = 7
+    LIKED_VECTOR_SIZE = 20
+    
+    def __init__(self, users: List, profiles: List, embedding_index=None):
+        self.users = users
+        self.member_ids = [u.id for u in users]
+        self.profiles = profiles          # Üye sırasıyla (profili yoksa None)
+        self.profile = GroupProfile(profiles)
+        self._embedding_index = embedding_index
+        
+        # Puanlar ve izlenenler tek sorguda (score None = sadece izlendi)
+        watched = WatchedMovie.objects.filter(user_id__in=self.member_ids).order_by().values_list(
+            'user_id', 'movie_id', Value(None, output_field=IntegerField()),
+            Value(None, output_field=DateTimeField()),
+        )
+        rows = (
+            Rating.objects.filter(user_id__in=self.member_ids).order_by()
+            .values_list('user_id', 'movie_id', 'score', 'created_at')
+            .union(watched, all=True)
+        )
+        self.seen_ids: Set[int] = set()
+        liked: Dict[int, List] = {user_id: [] for user_id in self.member_ids}
+        for user_id, movie_id, score, created_at in rows:
+            self.seen_ids.add(movie_id)
+            if score is not None and score >= self.LIKED_THRESHOLD:
+                liked[user_id].append((created_at, movie_id))
+        # UserContext.liked_ids ile aynı sıra: en yeni puan önce
+        self.liked_ids: Dict[int, List[int]] = {
+            user_id: [movie_id for _, movie_id in sorted(pairs, key=lambda p: p[0], reverse=True)]
+            for user_id, pairs in liked.items()
+        }
+    
+    @classmethod
+    def load(cls, users: List, get_profile: Callable, embedding_index=None) -> 'GroupContext':
+        """
+        Profiller tek sorguda okunur; olmayan veya hiç hesaplanmamış
+        profiller get_profile (HybridRecommender.get_or_create_profile)
+        ile oluşturulur / yeniden kurulur.
+        """
+        from apps.recommendations.models import UserTasteProfile
+        
+        by_user = UserTasteProfile.objects.in_bulk([u.id for u in users], field_name='user_id')
+        profiles = []
+        for user in users:
+            profile = by_user.get(user.id)
+            if profile is None or not profile.genre_weights:
+                profile = get_profile(user)
+            profiles.append(profile)
+        return cls(users, profiles, embedding_index)
+    
+    @property
+    def embedding_index(self):
+        return self._embedding_index
+    
+    @cached_property
+    def liked_vector(self) -> Optional[np.ndarray]:
+        """Üyelerin beğeni vektörlerinin ortalaması (üye başına UserContext.liked_vector)"""
+        index = self._embedding_index
+        if not index:
+            return None
+        vectors = [
+            index.mean_vector(liked[:self.LIKED_VECTOR_SIZE])
+            for liked in self.liked_ids.values() if liked
+        ]
+        vectors = [v for v in vectors if v is not None]
+        if not vectors:
+            return None
+        return np.mean(vectors, axis=0)
+
+
+def validate_members(users: List) -> List:
+    """Tekrarları at, üye sayısını kontrol et"""
+    unique = list({u.id: u for u in users}.values())
+    if not MIN_MEMBERS <= len(unique) <= MAX_MEMBERS:
+        raise ValueError(f"Grup {MIN_MEMBERS}-{MAX_MEMBERS} kisi olmali (verilen: {len(unique)})")
+    return unique
+
+
+def aggregate(scores: np.ndarray, strategy: str = LEAST_MISERY) -> np.ndarray:
+    """
+    (üye, aday) skor matrisini aday başına grup skoruna indir
+    
+    fairness: Üye ağırlıkları, üyenin havuzdaki ortalama skoruyla ters
+    orantılıdır; havuzun genel olarak daha az hitap ettiği üyenin
+    tercihleri sıralamada daha etkili olur.
+    """
+    if strategy == LEAST_MISERY:
+        return scores.min(axis=0)
+    if strategy == AVERAGE:
+        return scores.mean(axis=0)
+    if strategy == FAIRNESS:
+        weights = 1.0 / np.maximum(scores.mean(axis=1), 1e-6)
+        return (weights / weights.sum()) @ scores
+    raise ValueError(f"Bilinmeyen grup stratejisi: {strategy}")
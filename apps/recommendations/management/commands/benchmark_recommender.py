@@ -0,0 +1,286 @@
+"""
+Recommender Benchmark
+=====================
+Sentetik veriyle öneri sistemi performansını ölç.
+Tüm veri tek transaction içinde oluşturulur ve sonunda geri alınır.
+
+Kullanım:
+    python manage.py benchmark_recommender --suite scoring --sizes 300,3000,30000
+    python manage.py benchmark_recommender --suite embeddings --sizes 100000
+    python manage.py benchmark_recommender --suite ann --sizes 100000 --recall-target 0.95
+    python manage.py benchmark_recommender --suite retrieval --sizes 300,1000
+    python manage.py benchmark_recommender --suite group --sizes 2,5,10 --catalog 50000
+    python manage.py benchmark_recommender --suite bundle --sizes 10000,100000
+    python manage.py benchmark_recommender --suite startup
+    python manage.py benchmark_recommender --suite sampling --shapes ml-latest-small,ml-1m,ml-25m
+    python manage.py benchmark_recommender --suite loader --sizes 1000000
+    python manage.py benchmark_recommender --suite scaling --sizes 1,2,4,8,16,32
+    python manage.py benchmark_recommender --suite objectives --seconds 30
+    python manage.py benchmark_recommender --suite ncf --sizes 1000,10000,100000 --threads 1,4
+    python manage.py benchmark_recommender --suite quantization --sizes 10000
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.recommendations import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark recommendation scoring on a synthetic catalog (rolled back)'
+    
+    SUITES = ['scoring', 'embeddings', 'ann', 'retrieval', 'group', 'bundle', 'startup', 'sampling', 'loader', 'scaling', 'objectives', 'ncf', 'quantization']
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--suite',
+            type=str,
+            default='scoring',
+            choices=self.SUITES,
+            help='Benchmark suite to run'
+        )
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='300,3000,30000',
+            help='Comma separated candidate / catalog sizes'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Repetitions per measurement (median is reported)'
+        )
+        parser.add_argument(
+            '--legacy-max',
+            type=int,
+            default=3000,
+            help='Largest candidate count to run the per-movie scorer on'
+        )
+        parser.add_argument(
+            '--recall-target',
+            type=float,
+            default=0.95,
+            help='Recall@k target used to pick nprobe (ann suite)'
+        )
+        parser.add_argument(
+            '--catalog',
+            type=int,
+            default=50000,
+            help='Synthetic catalog size (group suite)'
+        )
+        parser.add_argument(
+            '--shapes',
+            type=str,
+            default=','.join(benchmarks.RATING_SHAPES),
+            help='Comma separated MovieLens shapes (sampling suite)'
+        )
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=20.0,
+            help='Training time per objective (objectives suite)'
+        )
+        parser.add_argument(
+            '--threads',
+            type=str,
+            default='1',
+            help='Comma separated torch thread counts for the scorer (ncf suite)'
+        )
+    
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in options['sizes'].split(',') if s.strip()]
+        except ValueError:
+            raise CommandError('--sizes virgülle ayrılmış tam sayılar olmalı')
+        
+        self.stdout.write("\n" + "="*60)
+        self.stdout.write(f"RECOMMENDER BENCHMARK ({options['suite']})")
+        self.stdout.write("="*60 + "\n")
+        
+        with transaction.atomic():
+            getattr(self, f"run_{options['suite']}")(sizes, options)
+            transaction.set_rollback(True)
+        
+        self.stdout.write(self.style.SUCCESS("\n[DONE] Sentetik veri geri alindi."))
+    
+    def run_scoring(self, sizes, options):
+        self.stdout.write(f"[INFO] {max(sizes):,} filmlik sentetik katalog olusturuluyor...")
+        movie_ids = benchmarks.build_synthetic_catalog(max(sizes))
+        user = benchmarks.build_synthetic_user(movie_ids)
+        
+        results = benchmarks.scoring_benchmark(
+            user, sizes, repeat=options['repeat'], legacy_max=options['legacy_max']
+        )
+        
+        self.stdout.write(f"\n{'Aday':>8} {'Mod':>10} {'Sorgu':>7} {'Sure (ms)':>11}")
+        for row in results:
+            self.stdout.write(
+                f"{row['candidates']:>8,} {row['mode']:>10} {row['queries']:>7} {row['ms']:>11.1f}"
+            )
+        
+        # Sıralama eşitliği (batch / iterative) ve eski döngüye göre hızlanma
+        by_size = {}
+        for row in results:
+            by_size.setdefault(row['candidates'], {})[row['mode']] = row
+        for size, modes in by_size.items():
+            if 'iterative' in modes:
+                same = modes['batch']['top_ids'] == modes['iterative']['top_ids']
+                status = "ayni" if same else "FARKLI"
+                self.stdout.write(f"   {size:,} aday: siralama {status}")
+            if 'legacy' in modes:
+                speedup = modes['legacy']['ms'] / max(modes['batch']['ms'], 1e-6)
+                self.stdout.write(f"   {size:,} aday: eski donguye gore {speedup:.0f}x")
+    
+    def run_embeddings(self, sizes, options):
+        for size in sizes:
+            self.stdout.write(f"\n[INFO] {size:,} film, 128 boyut")
+            for row in benchmarks.embedding_benchmark(size, repeat=options['repeat']):
+                self.stdout.write(f"   {row['name']:<36} {row['ms']:>10.2f} ms")
+    
+    def run_ann(self, sizes, options):
+        for size in sizes:
+            self.stdout.write(f"\n[INFO] {size:,} film, 128 boyut, hedef recall {options['recall_target']}")
+            result = benchmarks.ann_benchmark(size, recall_target=options['recall_target'])
+            self.stdout.write(f"   {result['nlist']} liste, build {result['build_ms']:.0f} ms")
+            self.stdout.write(f"   {'nprobe':>8} {'Recall':>8} {'Tam (ms)':>10} {'ANN (ms)':>10}")
+            for row in result['history']:
+                self.stdout.write(
+                    f"   {row['nprobe']:>8} {row['recall']:>8.3f} {row['exact_ms']:>10.2f} {row['ann_ms']:>10.2f}"
+                )
+            selected = result['selected']
+            self.stdout.write(
+                f"   Secilen nprobe={selected['nprobe']}: "
+                f"{selected['exact_ms'] / max(selected['ann_ms'], 1e-9):.1f}x hizli"
+            )
+    
+    def run_retrieval(self, sizes, options):
+        catalog_size = max(max(sizes) * 20, 20000)
+        self.stdout.write(f"[INFO] {catalog_size:,} filmlik sentetik katalog olusturuluyor...")
+        movie_ids = benchmarks.build_synthetic_catalog(catalog_size)
+        user = benchmarks.build_synthetic_user(movie_ids)
+        
+        result = benchmarks.retrieval_benchmark(user, sizes, repeat=options['repeat'])
+        
+        self.stdout.write(f"\n{'Havuz':>8} {'Mod':>10} {'Sorgu':>7} {'Sure (ms)':>11} {'Ort. skor':>10}")
+        for row in result['rows']:
+            self.stdout.write(
+                f"{row['pool']:>8,} {row['mode']:>10} {row['queries']:>7} "
+                f"{row['ms']:>11.1f} {row['mean_score']:>10.3f}"
+            )
+        
+        self.stdout.write(f"\n{'Kaynak':>10} {'Cagri':>6} {'Hit':>7} {'Havuza':>7} {'Ort. ms':>8} {'Butce asimi':>12}")
+        for name, stats in result['sources'].items():
+            self.stdout.write(
+                f"{name:>10} {stats['calls']:>6} {stats['hits']:>7} {stats['kept']:>7} "
+                f"{stats['avg_ms']:>8.1f} {stats['over_budget']:>12}"
+            )
+    
+    def run_group(self, sizes, options):
+        self.stdout.write(f"[INFO] {options['catalog']:,} filmlik sentetik katalog olusturuluyor...")
+        movie_ids = benchmarks.build_synthetic_catalog(options['catalog'])
+        
+        rows = benchmarks.group_benchmark(movie_ids, sizes, repeat=options['repeat'])
+        
+        self.stdout.write(f"\n{'Uye':>5} {'Strateji':>14} {'Sorgu':>7} {'Sure (ms)':>11} {'Sonuc':>7}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['members']:>5} {row['strategy']:>14} {row['queries']:>7} "
+                f"{row['ms']:>11.1f} {row['results']:>7}"
+            )
+    
+    def run_bundle(self, sizes, options):
+        self.stdout.write(f"{'Film':>10} {'Checkpoint (ms)':>16} {'Bundle (ms)':>12} {'Hizlanma':>9} {'top_k':>7}")
+        for size in sizes:
+            row = benchmarks.bundle_benchmark(size, repeat=options['repeat'])
+            self.stdout.write(
+                f"{size:>10,} {row['checkpoint_ms']:>16.1f} {row['bundle_ms']:>12.2f} "
+                f"{row['checkpoint_ms'] / max(row['bundle_ms'], 1e-9):>8.0f}x "
+                f"{'ayni' if row['same_top_k'] else 'FARKLI':>7}"
+            )
+    
+    def run_startup(self, sizes, options):
+        self.stdout.write(f"{'Senaryo':<30} {'Sure (ms)':>10}  Yuklenen agir moduller")
+        for row in benchmarks.startup_benchmark(repeat=options['repeat']):
+            self.stdout.write(f"{row['name']:<30} {row['ms']:>10.0f}  {row['heavy']}")
+    
+    def run_sampling(self, sizes, options):
+        shapes = [s.strip() for s in options['shapes'].split(',') if s.strip()]
+        unknown = set(shapes) - set(benchmarks.RATING_SHAPES)
+        if unknown:
+            raise CommandError(f"Bilinmeyen shape: {', '.join(sorted(unknown))}")
+        
+        self.stdout.write(f"{'Veri seti':<16} {'Rating':>12} {'Mod':>11} {'Sure (ms)':>11} {'Tepe (MB)':>10} {'Negatif':>12}")
+        for row in benchmarks.sampling_benchmark(shapes, repeat=options['repeat']):
+            self.stdout.write(
+                f"{row['shape']:<16} {row['ratings']:>12,} {row['mode']:>11} "
+                f"{row['ms']:>11.1f} {row['peak_mb']:>10.1f} {row['negatives']:>12,}"
+            )
+    
+    def run_loader(self, sizes, options):
+        for size in sizes:
+            self.stdout.write(f"\n[INFO] {size:,} ornek, batch 1024")
+            self.stdout.write(f"   {'Loader':<28} {'Iterasyon (ornek/s)':>20} {'Epoch (ornek/s)':>16}")
+            for row in benchmarks.loader_benchmark(size, repeat=options['repeat']):
+                self.stdout.write(
+                    f"   {row['loader']:<28} {row['iterate_per_s']:>20,.0f} {row['epoch_per_s']:>16,.0f}"
+                )
+    
+    def run_scaling(self, sizes, options):
+        import os
+        
+        self.stdout.write(f"[INFO] {os.cpu_count()} CPU, 1 epoch, batch 1024 / worker")
+        self.stdout.write(f"{'Worker':>7} {'Ornek/s':>12} {'Hizlanma':>9} {'Toplam (s)':>11} {'AUC':>7}")
+        for row in benchmarks.scaling_benchmark(sizes):
+            self.stdout.write(
+                f"{row['workers']:>7} {row['samples_per_s']:>12,.0f} {row['speedup']:>8.2f}x "
+                f"{row['wall_s']:>11.1f} {row['auc']:>7.3f}"
+            )
+    
+    def run_objectives(self, sizes, options):
+        self.stdout.write(
+            f"[INFO] Sentetik gizli faktorlu veri (1000 kullanici, 2000 film), "
+            f"hedef basina {options['seconds']:.0f}s egitim"
+        )
+        self.stdout.write(
+            f"\n{'Hedef':<16} {'Hazirlik (ms)':>14} {'Veri (MB)':>10} {'Adim':>7} {'Epoch':>7} "
+            f"{'AUC':>7} {'HR@10':>7} {'NDCG@10':>8}"
+        )
+        for row in benchmarks.objective_benchmark(seconds=options['seconds']):
+            self.stdout.write(
+                f"{row['objective']:<16} {row['prep_ms']:>14.0f} {row['dataset_mb']:>10.2f} {row['steps']:>7} "
+                f"{row['epochs']:>7.1f} {row['auc']:>7.3f} {row['hr10']:>7.3f} {row['ndcg10']:>8.3f}"
+            )
+    
+    def run_ncf(self, sizes, options):
+        try:
+            threads = [int(t) for t in options['threads'].split(',') if t.strip()]
+        except ValueError:
+            raise CommandError('--threads virgülle ayrılmış tam sayılar olmalı')
+        
+        self.stdout.write("[INFO] Rastgele NCF modeli (1000 kullanici, 100.000 film, 64 boyut), tek kullanici")
+        self.stdout.write(f"\n{'Aday':>9} {'Mod':>16} {'Thread':>7} {'Sure (ms)':>11} {'Aday/ms':>9} {'Max fark':>10}")
+        for row in benchmarks.ncf_scoring_benchmark(sizes, threads, repeat=options['repeat']):
+            self.stdout.write(
+                f"{row['candidates']:>9,} {row['mode']:>16} {row['threads']:>7} {row['ms']:>11.2f} "
+                f"{row['candidates'] / max(row['ms'], 1e-9):>9,.0f} {row['max_diff']:>10.1e}"
+            )
+    
+    def run_quantization(self, sizes, options):
+        for size in sizes:
+            result = benchmarks.quantization_benchmark(mapped=size, repeat=options['repeat'])
+            self.stdout.write(
+                f"\n[INFO] ml-25m boyutlu rastgele NCF ({result['users']:,} kullanici, {result['items']:,} film), "
+                f"{result['mapped']:,} eslenen film; worker basina bellek artisi"
+            )
+            self.stdout.write(
+                f"{'Senaryo':<22} {'RSS (MB)':>9} {'Ozel (MB)':>10} {'Paylasilan':>11} {'Disk (MB)':>10} "
+                f"{'Skor (ms)':>10} {'Max fark':>9} {'Top-10':>7}"
+            )
+            for row in result['rows']:
+                agreement = row['agreement']
+                self.stdout.write(
+                    f"{row['name']:<22} {row['rss_mb']:>9.1f} {row['anon_mb']:>10.1f} {row['file_mb']:>11.1f} "
+                    f"{row['disk_mb']:>10.1f} {row['score_ms']:>10.2f} "
+                    + (f"{agreement['max_abs']:>9.1e} {agreement['topk_overlap']:>7.3f}" if agreement else f"{'-':>9} {'-':>7}")
+                )
@@ -0,0 +1,117 @@
+"""
+Build ANN Index
+===============
+NCF film embedding'leri için IVF-flat yaklaşık arama index'i oluştur.
+Index ncf_model.pkl'in yanına (sürümlü model etkinse sürüm dizinine)
+kaydedilir ve HybridRecommender tarafından otomatik yüklenir.
+
+Kullanım:
+    python manage.py build_ann_index
+    python manage.py build_ann_index --recall-target 0.98 --nlist 512
+"""
+
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.recommendations import model_registry
+from apps.recommendations.ann import IVFIndex, ann_path_for
+
+
+class Command(BaseCommand):
+    help = 'Build an approximate nearest-neighbour index over NCF item embeddings'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--nlist',
+            type=int,
+            default=None,
+            help='Number of inverted lists (default: ~4*sqrt(items))'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=10,
+            help='k-means iterations'
+        )
+        parser.add_argument(
+            '--recall-target',
+            type=float,
+            default=0.95,
+            help='Minimum recall@k against exact search used to pick nprobe'
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=100,
+            help='k used when measuring recall'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Number of sample queries for recall measurement'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Output path (default: active model version or next to NCF_MODEL_PATH)'
+        )
+    
+    def handle(self, *args, **options):
+        if not 0 < options['recall_target'] <= 1:
+            raise CommandError('--recall-target 0 ile 1 arasinda olmali')
+        
+        from apps.recommendations.services import HybridRecommender
+        
+        index = HybridRecommender()._embedding_index
+        if index is None or not len(index):
+            raise CommandError('NCF modeli veya film embedding\'leri bulunamadi (once train_model)')
+        
+        # Sürümlü model etkinse index o sürümün dizinine yazılır
+        model_path = getattr(settings, 'NCF_MODEL_PATH', 'ncf_model.pkl')
+        version = model_registry.current_version()
+        if version:
+            default_output = os.path.join(model_registry.version_path(version), 'ann.npz')
+        else:
+            default_output = ann_path_for(model_path)
+        output = options['output'] or default_output
+        
+        self.stdout.write("\n" + "="*60)
+        self.stdout.write("ANN INDEX")
+        self.stdout.write("="*60 + "\n")
+        self.stdout.write(f"[INFO] {len(index):,} film, {index.dim} boyut")
+        
+        start = time.perf_counter()
+        ann = IVFIndex.build(index.matrix, nlist=options['nlist'], n_iter=options['iterations'])
+        self.stdout.write(f"[OK] {ann.nlist} liste olusturuldu ({time.perf_counter() - start:.1f}s)")
+        
+        tuning = ann.tune(
+            index.matrix,
+            recall_target=options['recall_target'],
+            k=options['k'],
+            n_queries=options['queries'],
+        )
+        self.stdout.write(f"\n{'nprobe':>8} {'Recall':>8} {'Tam (ms)':>10} {'ANN (ms)':>10}")
+        for row in tuning['history']:
+            self.stdout.write(
+                f"{row['nprobe']:>8} {row['recall']:>8.3f} {row['exact_ms']:>10.2f} {row['ann_ms']:>10.2f}"
+            )
+        
+        selected = tuning['selected']
+        if selected['recall'] < options['recall_target']:
+            self.stdout.write(self.style.WARNING(
+                f"[WARN] Recall hedefi ({options['recall_target']}) saglanamadi"
+            ))
+        
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        ann.save(output, index.movie_ids, index.matrix)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"\n[DONE] ANN index kaydedildi: {output}"
+            f"\n   nprobe: {selected['nprobe']}"
+            f"\n   Recall@{options['k']}: {selected['recall']:.3f}"
+        ))
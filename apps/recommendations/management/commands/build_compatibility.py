@@ -0,0 +1,44 @@
+"""
+Build Compatibility
+===================
+Kabul edilmiş arkadaş çiftleri için uyumluluk skorlarını
+(CompatibilityScore) hesapla. Varsayılan olarak sadece skoru olmayan veya
+profili skordan sonra değişen çiftler yeniden hesaplanır.
+
+Kullanım:
+    python manage.py build_compatibility
+    python manage.py build_compatibility --full
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.recommendations.compatibility import PAIR_CHUNK_SIZE, refresh_compatibility
+
+
+class Command(BaseCommand):
+    help = 'Compute compatibility scores for all accepted friend pairs'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every pair instead of only pairs whose profiles changed'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=PAIR_CHUNK_SIZE,
+            help='Pairs computed per query batch'
+        )
+    
+    def handle(self, *args, **options):
+        self.stdout.write("[INFO] Uyumluluk skorlari hesaplaniyor...")
+        stats = refresh_compatibility(full=options['full'], chunk_size=options['chunk_size'])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"\n[DONE] Tamamlandi!"
+            f"\n   Arkadas cifti: {stats['pairs']}"
+            f"\n   Hesaplanan: {stats['computed']}"
+            f"\n   Silinen: {stats['removed']}"
+            f"\n   Sure: {stats['seconds']:.1f}s"
+        ))
@@ -0,0 +1,58 @@
+"""
+Build Movie Neighbours
+======================
+Her film için benzer film tablosunu (MovieNeighbour) hesapla.
+Varsayılan olarak sadece son çalıştırmadan sonra güncellenen filmler
+yeniden hesaplanır.
+
+Kullanım:
+    python manage.py build_movie_neighbours
+    python manage.py build_movie_neighbours --full --neighbours 30
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.recommendations.neighbours import NEIGHBOUR_COUNT, refresh_neighbours
+
+
+class Command(BaseCommand):
+    help = 'Precompute top-N similar movies for the catalog'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every movie instead of only movies updated since the last run'
+        )
+        parser.add_argument(
+            '--neighbours',
+            type=int,
+            default=NEIGHBOUR_COUNT,
+            help='Neighbours stored per movie'
+        )
+        parser.add_argument(
+            '--no-embeddings',
+            action='store_true',
+            help='Skip NCF embedding similarity (content only)'
+        )
+    
+    def handle(self, *args, **options):
+        embedding_index = None
+        if not options['no_embeddings']:
+            from apps.recommendations.services import HybridRecommender
+            embedding_index = HybridRecommender()._embedding_index
+        
+        self.stdout.write("[INFO] Benzer film tablosu hesaplaniyor...")
+        stats = refresh_neighbours(
+            full=options['full'],
+            n=options['neighbours'],
+            embedding_index=embedding_index,
+        )
+        
+        mode = 'tam' if stats['full'] else 'artimli'
+        self.stdout.write(self.style.SUCCESS(
+            f"\n[DONE] Tamamlandi! ({mode})"
+            f"\n   Film: {stats['movies']}"
+            f"\n   Komsu satiri: {stats['rows']}"
+            f"\n   Sure: {stats['seconds']:.1f}s"
+        ))
@@ -0,0 +1,299 @@
+"""
+Recommender Evaluation
+======================
+Çevrimdışı sıralama değerlendirmesi: HR@K, NDCG@K, recall@K, coverage ve
+aşama süreleri.
+
+- ncf: MovieLens ratings zamana göre bölünür (leave-last-out veya temporal),
+  model eğitim kısmıyla eğitilir (ya da --model ile yüklenir) ve her test
+  kullanıcısı tüm filmlere karşı batch'li matrisle skorlanır.
+- hybrid: Uygulama kullanıcılarının son beğendikleri filmler geçici olarak
+  silinir, HybridRecommender uçtan uca çağrılır; veri geri alınır.
+
+Kullanım:
+    python manage.py evaluate_recommender --ratings-path data/ml-latest-small/ratings.csv
+    python manage.py evaluate_recommender --ratings-path ratings.csv --split temporal --k 20
+    python manage.py evaluate_recommender --ratings-path ratings.csv --model ncf_model.pkl
+    python manage.py evaluate_recommender --target hybrid --users 200
+"""
+
+import pickle
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.recommendations.evaluation import (
+    LEAVE_LAST_OUT, SPLITS, StageTimer, evaluate_hybrid, rank_full_catalog,
+    ranking_metrics, split_leave_last_out, split_temporal,
+)
+
+
+class Command(BaseCommand):
+    help = 'Offline ranking evaluation (HR@K, NDCG@K, coverage) for NCF or the hybrid recommender'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            type=str,
+            default='ncf',
+            choices=['ncf', 'hybrid'],
+            help='ncf: full-catalog ranking on MovieLens; hybrid: end-to-end on app users'
+        )
+        parser.add_argument(
+            '--split',
+            type=str,
+            default=LEAVE_LAST_OUT,
+            choices=SPLITS,
+            help='Hold out each user\'s last interaction or everything after a global time cutoff'
+        )
+        parser.add_argument(
+            '--test-fraction',
+            type=float,
+            default=0.2,
+            help='Share of interactions after the cutoff (temporal split)'
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=10,
+            help='Cutoff for HR@K / NDCG@K'
+        )
+        parser.add_argument(
+            '--ratings-path',
+            type=str,
+            default=None,
+            help='Path to ratings.csv (ncf)'
+        )
+        parser.add_argument(
+            '--model',
+            type=str,
+            default=None,
+            help='Evaluate an existing checkpoint instead of training on the train split (ncf)'
+        )
+        parser.add_argument(
+            '--max-ratings',
+            type=int,
+            default=1000000,
+            help='Maximum number of ratings to use (ncf)'
+        )
+        parser.add_argument(
+            '--max-users',
+            type=int,
+            default=0,
+            help='Evaluate a random subset of held-out users (ncf, 0: all)'
+        )
+        parser.add_argument(
+            '--epochs',
+            type=int,
+            default=3,
+            help='Training epochs on the train split (ncf)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1024,
+            help='Training batch size (ncf)'
+        )
+        parser.add_argument(
+            '--embedding-dim',
+            type=int,
+            default=64,
+            help='Embedding dimension (ncf)'
+        )
+        parser.add_argument(
+            '--negative-ratio',
+            type=int,
+            default=4,
+            help='Negative samples per positive (ncf)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=200,
+            help='Maximum number of app users to evaluate (hybrid)'
+        )
+        parser.add_argument(
+            '--min-ratings',
+            type=int,
+            default=5,
+            help='Minimum ratings for a user to be evaluated'
+        )
+    
+    def handle(self, *args, **options):
+        if options['k'] < 1:
+            raise CommandError('--k en az 1 olmali')
+        if not 0 < options['test_fraction'] < 1:
+            raise CommandError('--test-fraction 0 ile 1 arasinda olmali')
+        
+        self.stdout.write("\n" + "="*60)
+        self.stdout.write(f"RECOMMENDER DEGERLENDIRME ({options['target']}, {options['split']}, K={options['k']})")
+        self.stdout.write("="*60 + "\n")
+        
+        timer = StageTimer()
+        if options['target'] == 'hybrid':
+            metrics = self.evaluate_hybrid(options, timer)
+        else:
+            metrics = self.evaluate_ncf(options, timer)
+        
+        k = options['k']
+        self.stdout.write(f"\n   {'Kullanici:':<13}{metrics['users']:,}")
+        for name, key in ((f'HR@{k}', 'hr'), (f'NDCG@{k}', 'ndcg'), (f'Recall@{k}', 'recall')):
+            self.stdout.write(f"   {name + ':':<13}{metrics[key]:.4f}")
+        self.stdout.write(f"   {'Coverage:':<13}{metrics['coverage']:.4f}")
+        if 'p50_ms' in metrics:
+            self.stdout.write(
+                f"   {'Gecikme:':<13}p50 {metrics['p50_ms']:.1f} ms, p95 {metrics['p95_ms']:.1f} ms"
+            )
+        
+        self.stdout.write(f"\n   {'Asama':<12} {'Sure (s)':>10}")
+        for name, seconds in timer.stages.items():
+            self.stdout.write(f"   {name:<12} {seconds:>10.2f}")
+        self.stdout.write(self.style.SUCCESS("\n[DONE] Degerlendirme tamamlandi."))
+    
+    def evaluate_hybrid(self, options, timer):
+        from django.contrib.auth import get_user_model
+        from django.db.models import Count
+        
+        users = list(
+            get_user_model().objects.annotate(num_ratings=Count('ratings'))
+            .filter(num_ratings__gte=options['min_ratings'])
+            .order_by('id')[:options['users']]
+        )
+        if not users:
+            raise CommandError(f"En az {options['min_ratings']} puani olan kullanici yok")
+        self.stdout.write(f"[INFO] {len(users):,} kullanici degerlendiriliyor (veri geri alinacak)...")
+        
+        return evaluate_hybrid(
+            users,
+            k=options['k'],
+            split=options['split'],
+            test_fraction=options['test_fraction'],
+            min_ratings=options['min_ratings'],
+            timer=timer,
+        )
+    
+    def evaluate_ncf(self, options, timer):
+        import torch
+        
+        from apps.recommendations.models import MovieLensMapping
+        from apps.recommendations.training import load_ratings, ratings_cache_dir
+        
+        if not options['ratings_path']:
+            raise CommandError('--target ncf icin --ratings-path gerekli')
+        seed = options['seed']
+        torch.manual_seed(seed)
+        
+        # 1. Ratings (zaman damgalariyla)
+        self.stdout.write("[1/4] MovieLens ratings yukleniyor...")
+        with timer.stage('load'):
+            valid_ml_ids = set(
+                MovieLensMapping.objects.filter(movie__isnull=False)
+                .values_list('movielens_id', flat=True)
+            )
+            if not valid_ml_ids:
+                raise CommandError('Eslesen film bulunamadi. Once import_movielens calistirin.')
+            ratings, stats = load_ratings(
+                options['ratings_path'],
+                valid_ml_ids,
+                max_ratings=options['max_ratings'],
+                seed=seed,
+                cache_dir=ratings_cache_dir(options['ratings_path']),
+                timestamps=True,
+            )
+            if options['model']:
+                trainer, user_ids, item_ids, keep = self._checkpoint(options['model'], ratings)
+                ratings = {name: array[keep] for name, array in ratings.items()}
+                num_items = trainer.model.item_embedding_gmf.num_embeddings
+            else:
+                _, user_ids = np.unique(ratings['user_ids'], return_inverse=True)
+                unique_items, item_ids = np.unique(ratings['movie_ids'], return_inverse=True)
+                num_items = len(unique_items)
+        self.stdout.write(f"      Rating: {len(user_ids):,} ({stats['matched']:,} eslesen)")
+        
+        # 2. Bolme
+        self.stdout.write(f"\n[2/4] Bolunuyor ({options['split']})...")
+        with timer.stage('split'):
+            if options['split'] == LEAVE_LAST_OUT:
+                test = split_leave_last_out(user_ids, ratings['timestamps'], options['min_ratings'])
+            else:
+                test = split_temporal(user_ids, item_ids, ratings['timestamps'], options['test_fraction'])
+        if not test.any():
+            raise CommandError('Test etkilesimi yok (--min-ratings / --test-fraction kontrol edin)')
+        train_users, train_items = user_ids[~test], item_ids[~test]
+        self.stdout.write(f"      Train: {len(train_users):,}, Test: {int(test.sum()):,}")
+        
+        # 3. Egitim (sadece train kismi)
+        if options['model']:
+            self.stdout.write(
+                "\n[3/4] [WARN] Checkpoint tum veriyle egitildiyse test etkilesimlerini gormustur; "
+                "sonuclar iyimser olabilir."
+            )
+        else:
+            self.stdout.write(f"\n[3/4] Model egitiliyor ({options['epochs']} epoch)...")
+            with timer.stage('train'):
+                trainer = self._train(train_users, train_items, int(user_ids.max()) + 1, num_items, options)
+        
+        # 4. Tum katalog siralamasi
+        users = np.unique(user_ids[test])
+        if options['max_users'] and len(users) > options['max_users']:
+            users = np.sort(np.random.default_rng(seed).choice(users, options['max_users'], replace=False))
+        self.stdout.write(f"\n[4/4] {len(users):,} kullanici x {num_items:,} film skorlaniyor...")
+        with timer.stage('score'):
+            top_items = rank_full_catalog(
+                trainer.model, users, train_users, train_items, num_items, k=options['k']
+            )
+        with timer.stage('metrics'):
+            return ranking_metrics(top_items, users, user_ids[test], item_ids[test], num_items)
+    
+    def _checkpoint(self, path, ratings):
+        """Checkpoint + mapping; modelin bilmedigi kullanici/filmler atilir"""
+        from apps.recommendations.ncf_model import NCFTrainer
+        
+        mapping_path = path.replace('.pkl', '_mappings.pkl')
+        try:
+            trainer = NCFTrainer.load(path)
+            with open(mapping_path, 'rb') as f:
+                mappings = pickle.load(f)
+        except FileNotFoundError as e:
+            raise CommandError(f"Model dosyasi bulunamadi: {e.filename}")
+        
+        def lookup(mapping, keys):
+            known = np.array(sorted(mapping), dtype=np.int64)
+            index = np.array([mapping[key] for key in known.tolist()], dtype=np.int64)
+            positions = np.clip(np.searchsorted(known, keys), 0, max(len(known) - 1, 0))
+            return index[positions], known[positions] == keys
+        
+        user_ids, user_known = lookup(mappings['user_map'], ratings['user_ids'])
+        item_ids, item_known = lookup(mappings['item_map'], ratings['movie_ids'])
+        keep = user_known & item_known
+        return trainer, user_ids[keep], item_ids[keep], keep
+    
+    def _train(self, user_ids, item_ids, num_users, num_items, options):
+        from apps.recommendations.ncf_model import NCFTrainer, TensorBatchLoader
+        from apps.recommendations.training import explicit_dataset
+        
+        train, _ = explicit_dataset(
+            user_ids, item_ids, num_items, options['negative_ratio'], seed=options['seed'], train_fraction=1.0
+        )
+        trainer = NCFTrainer.from_config({
+            'num_users': num_users,
+            'num_items': num_items,
+            'embedding_dim': options['embedding_dim'],
+            'mlp_layers': [128, 64, 32],
+            'dropout': 0.2,
+            'learning_rate': 0.001,
+        })
+        loader = TensorBatchLoader(
+            train['user_ids'], train['item_ids'], train['labels'],
+            batch_size=options['batch_size'], shuffle=True, seed=options['seed'],
+        )
+        for epoch in range(options['epochs']):
+            loss = trainer.train_epoch(loader)
+            self.stdout.write(f"      Epoch {epoch + 1}/{options['epochs']} - Train Loss: {loss:.4f}")
+        return trainer
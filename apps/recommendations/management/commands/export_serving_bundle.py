@@ -0,0 +1,95 @@
+"""
+Export Serving Bundle
+=====================
+Eğitilmiş NCF checkpoint'ını servis için memory-map edilebilir bundle'a
+dönüştür (embeddings .npy, sıralı ID dizileri, JSON manifest).
+Bundle ncf_model.pkl'in yanına (ncf_model_bundle/) yazılır ve
+HybridRecommender tarafından checkpoint yerine otomatik yüklenir.
+--network / --quantize ile kullanıcı tabloları atılmış (isteğe bağlı
+int8) NCF ağı da yazılır; worker'lar fold-in için checkpoint'ı yüklemez.
+
+Kullanım:
+    python manage.py export_serving_bundle
+    python manage.py export_serving_bundle --model models/ncf_model.pkl --output /srv/bundle
+    python manage.py export_serving_bundle --quantize
+"""
+
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.recommendations.bundle import ServingBundle, bundle_path_for, export_bundle, mapping_path_for
+
+
+class Command(BaseCommand):
+    help = 'Export NCF item embeddings and id maps as a memory-mappable serving bundle'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            type=str,
+            default=None,
+            help='Checkpoint path (default: NCF_MODEL_PATH)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Bundle directory (default: next to the checkpoint)'
+        )
+        parser.add_argument(
+            '--network',
+            action='store_true',
+            help='Also write the pruned NCF network (no user tables, mapped items only) for fold-in'
+        )
+        parser.add_argument(
+            '--quantize',
+            action='store_true',
+            help='Write the pruned network with int8 item embeddings and linear layers (implies --network)'
+        )
+    
+    def handle(self, *args, **options):
+        model_path = options['model'] or getattr(settings, 'NCF_MODEL_PATH', 'ncf_model.pkl')
+        for path in (model_path, mapping_path_for(model_path)):
+            if not os.path.exists(path):
+                raise CommandError(f'Dosya bulunamadi: {path} (once train_model)')
+        
+        self.stdout.write(f"[INFO] Checkpoint: {model_path}")
+        
+        start = time.perf_counter()
+        manifest = export_bundle(
+            model_path, options['output'], network=options['network'], quantize=options['quantize']
+        )
+        export_seconds = time.perf_counter() - start
+        
+        output = options['output'] or bundle_path_for(model_path)
+        size = sum(
+            os.path.getsize(os.path.join(output, name)) for name in os.listdir(output)
+        )
+        
+        # Soğuk başlangıç karşılaştırması (checkpoint + pickle + embedding hesabı vs mmap)
+        start = time.perf_counter()
+        bundle = ServingBundle.load(output)
+        bundle.index.matrix[-1].sum()   # İlk erişim
+        bundle_ms = (time.perf_counter() - start) * 1000
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"\n[DONE] Serving bundle yazildi: {output}"
+            f"\n   Film: {manifest['items']:,} x {manifest['dim']} boyut"
+            f"\n   Boyut: {size / 1024 / 1024:.1f} MB"
+            f"\n   Disa aktarma (checkpoint yukleme dahil): {export_seconds:.2f}s"
+            f"\n   Bundle acilisi: {bundle_ms:.1f} ms"
+        ))
+        
+        network = manifest.get('network')
+        if network:
+            agreement = network['agreement']
+            self.stdout.write(
+                f"   Ag: {network['bytes'] / 1024 / 1024:.1f} MB "
+                f"({'int8' if network['quantized'] else 'float32'}, {network['items']:,} film)"
+                f"\n   Skor uyumu ({agreement['users']} kullanici): "
+                f"max {agreement['max_abs']:.5f}, ort {agreement['mean_abs']:.5f}, "
+                f"top-10 ortak {agreement['topk_overlap']:.3f}"
+            )
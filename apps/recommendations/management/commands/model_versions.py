@@ -0,0 +1,111 @@
+"""
+Model Versions
+==============
+Sürümlü serving bundle'ları yönet (model_registry).
+Worker'lar etkin sürümü MODEL_RELOAD_INTERVAL saniyede bir kontrol eder
+ve yeniden başlatılmadan yeni modele geçer.
+
+Kullanım:
+    python manage.py model_versions                       # Sürümleri listele
+    python manage.py model_versions --publish             # NCF_MODEL_PATH'ten yeni sürüm
+    python manage.py model_versions --publish --model models/ncf_model.pkl --name v2 --no-activate
+    python manage.py model_versions --publish --quantize    # int8 servis ağıyla
+    python manage.py model_versions --activate 20261017-101500
+    python manage.py model_versions --rollback
+"""
+
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.recommendations import model_registry
+from apps.recommendations.bundle import MANIFEST
+
+
+class Command(BaseCommand):
+    help = 'List, publish, activate or roll back versioned model bundles'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--publish',
+            action='store_true',
+            help='Export the checkpoint as a new version'
+        )
+        parser.add_argument(
+            '--model',
+            type=str,
+            default=None,
+            help='Checkpoint to publish (default: NCF_MODEL_PATH)'
+        )
+        parser.add_argument(
+            '--name',
+            type=str,
+            default=None,
+            help='Version name for --publish (default: timestamp)'
+        )
+        parser.add_argument(
+            '--no-activate',
+            action='store_true',
+            help='Publish without making the version current'
+        )
+        parser.add_argument(
+            '--network',
+            action='store_true',
+            help='Include the pruned NCF network in the published bundle'
+        )
+        parser.add_argument(
+            '--quantize',
+            action='store_true',
+            help='Include the pruned network as int8 (implies --network)'
+        )
+        parser.add_argument(
+            '--activate',
+            type=str,
+            default=None,
+            help='Make the given version current'
+        )
+        parser.add_argument(
+            '--rollback',
+            action='store_true',
+            help='Switch back to the previously active version'
+        )
+    
+    def handle(self, *args, **options):
+        root = model_registry.registry_root()
+        try:
+            if options['publish']:
+                model_path = options['model'] or getattr(settings, 'NCF_MODEL_PATH', 'ncf_model.pkl')
+                if not os.path.exists(model_path):
+                    raise CommandError(f'Checkpoint bulunamadi: {model_path} (once train_model)')
+                version = model_registry.publish(
+                    model_path,
+                    version=options['name'],
+                    make_active=not options['no_activate'],
+                    network=options['network'],
+                    quantize=options['quantize'],
+                )
+                self.stdout.write(self.style.SUCCESS(f"[OK] Surum yayinlandi: {version}"))
+            elif options['activate']:
+                entry = model_registry.activate(options['activate'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"[OK] Etkin surum: {entry['version']} (onceki: {entry['previous'] or '-'})"
+                ))
+            elif options['rollback']:
+                entry = model_registry.rollback()
+                self.stdout.write(self.style.SUCCESS(f"[OK] Geri donuldu: {entry['version']}"))
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        current = model_registry.current_version(root)
+        versions = model_registry.list_versions(root)
+        self.stdout.write(f"\n[INFO] {root}: {len(versions)} surum")
+        for version in versions:
+            with open(os.path.join(model_registry.version_path(version, root), MANIFEST)) as f:
+                manifest = json.load(f)
+            marker = '*' if version == current else ' '
+            self.stdout.write(f"  {marker} {version}  {manifest['items']:>8,} film  {manifest['dim']} boyut")
+        if options['publish'] or options['activate'] or options['rollback']:
+            interval = getattr(settings, 'MODEL_RELOAD_INTERVAL', 60)
+            self.stdout.write(f"\n[INFO] Worker'lar en gec {interval}s icinde yeni surume gecer")
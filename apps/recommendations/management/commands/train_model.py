@@ -2,39 +2,25 @@
 NCF Model Egitimi (Optimized)
 ==============================
 MovieLens verileriyle Neural Collaborative Filtering modeli egit
-- Sampling destegi (buyuk veri setleri icin)
+- Sampling destegi (buyuk veri setleri icin, reservoir)
+- Parca parca int32 CSV okuma ve .npy cache
 - Progress bar
 - Optimize edilmis veri yukleme
+- Vektorize, seed'li negative sampling
+- Tensor dilimli batch loader (DataLoader + per-sample Dataset yerine)
+- --workers N: gloo ile cok process'li CPU egitimi
+- --negatives / --loss: negatifleri batch basina cekme (uniform, popularity, in_batch; bce, bpr)
 """
 
 import os
 import pickle
 import numpy as np
-import pandas as pd
 import torch
-from torch.utils.data import DataLoader, Dataset
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from apps.recommendations.models import MovieLensMapping
-from apps.recommendations.ncf_model import NCFModel, NCFTrainer
-
-
-class RatingsDataset(Dataset):
-    """Optimized MovieLens ratings dataset"""
-    
-    def __init__(self, user_ids, item_ids, labels):
-        self.user_ids = torch.tensor(user_ids, dtype=torch.long)
-        self.item_ids = torch.tensor(item_ids, dtype=torch.long)
-        self.labels = torch.tensor(labels, dtype=torch.float32)
-    
-    def __len__(self):
-        return len(self.labels)
-    
-    def __getitem__(self, idx):
-        return {
-            'user_id': self.user_ids[idx],
-            'item_id': self.item_ids[idx],
-            'label': self.labels[idx]
-        }
+from apps.recommendations.bundle import mapping_path_for
+from apps.recommendations.ncf_model import NCFTrainer, NegativeSampler, TensorBatchLoader
+from apps.recommendations.training import explicit_dataset, load_ratings, positive_dataset, ratings_cache_dir
 
 
 class Command(BaseCommand):
@@ -83,19 +69,73 @@ class Command(BaseCommand):
             default=2,
             help='Negative samples per positive sample'
         )
+        parser.add_argument(
+            '--negatives',
+            type=str,
+            default='explicit',
+            choices=['explicit', *NegativeSampler.STRATEGIES],
+            help='explicit: materialize negatives up front; otherwise draw them per batch'
+        )
+        parser.add_argument(
+            '--loss',
+            type=str,
+            default=NCFTrainer.BCE,
+            choices=NCFTrainer.LOSSES,
+            help='Training loss (bpr requires per-batch negatives)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed for sampling, shuffling and weight init'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000000,
+            help='Rows per CSV chunk while reading ratings'
+        )
+        parser.add_argument(
+            '--cache-dir',
+            type=str,
+            default=None,
+            help='Preprocessed ratings cache (default: <ratings>_cache next to the CSV)'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Always parse the CSV and do not write the .npy cache'
+        )
+        parser.add_argument(
+            '--pin-memory',
+            action='store_true',
+            help='Pin batch tensors for faster host-to-GPU copies (CUDA only)'
+        )
+        parser.add_argument(
+            '--prefetch',
+            type=int,
+            default=0,
+            help='Batches prepared ahead in a background thread (0: off)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Data-parallel CPU training processes (torch.distributed, gloo)'
+        )
     
     def handle(self, *args, **options):
         self.stdout.write("\n" + "="*60)
         self.stdout.write("NCF MODEL EGITIMI")
         self.stdout.write("="*60 + "\n")
         
-        # 1. Ratings yukle
-        self.stdout.write("[1/5] MovieLens ratings yukleniyor...")
-        ratings_df = pd.read_csv(options['ratings_path'])
-        self.stdout.write(f"      Toplam rating: {len(ratings_df):,}")
+        seed = options['seed']
+        torch.manual_seed(seed)
+        if options['loss'] == NCFTrainer.BPR and options['negatives'] == 'explicit':
+            raise CommandError('--loss bpr icin --negatives uniform/popularity/in_batch secin')
         
-        # 2. Sadece eslesen filmleri al
-        self.stdout.write("\n[2/5] Eslesen filmler filtreleniyor...")
+        # 1. Eslesen filmler
+        self.stdout.write("[1/5] Eslesen filmler aliniyor...")
         valid_ml_ids = set(
             MovieLensMapping.objects.filter(movie__isnull=False)
             .values_list('movielens_id', flat=True)
@@ -107,22 +147,33 @@ class Command(BaseCommand):
             )
             return
         
-        ratings_df = ratings_df[ratings_df['movieId'].isin(valid_ml_ids)]
-        self.stdout.write(f"      Eslesen rating: {len(ratings_df):,}")
-        
-        # 3. Sampling (cok buyuk veri setleri icin)
-        max_ratings = options['max_ratings']
-        if len(ratings_df) > max_ratings:
-            self.stdout.write(f"      Sampling: {max_ratings:,} rating seciliyor...")
-            ratings_df = ratings_df.sample(n=max_ratings, random_state=42)
-        
-        # 4. User ve Item mapping
+        # 2. Ratings yukle (parca parca, int32/float32, okurken filtre + sampling)
+        self.stdout.write("\n[2/5] MovieLens ratings yukleniyor...")
+        cache_dir = None
+        if not options['no_cache']:
+            cache_dir = options['cache_dir'] or ratings_cache_dir(options['ratings_path'])
+        ratings, stats = load_ratings(
+            options['ratings_path'],
+            valid_ml_ids,
+            max_ratings=options['max_ratings'],
+            seed=seed,
+            chunksize=options['chunk_size'],
+            cache_dir=cache_dir,
+        )
+        if stats['cached']:
+            self.stdout.write(f"      Cache'ten yuklendi: {cache_dir}")
+        self.stdout.write(f"      Toplam rating: {stats['total']:,}")
+        self.stdout.write(f"      Eslesen rating: {stats['matched']:,}")
+        if stats['matched'] > len(ratings['user_ids']):
+            self.stdout.write(f"      Sampling: {len(ratings['user_ids']):,} rating secildi")
+        
+        # 3. User ve Item mapping
         self.stdout.write("\n[3/5] Mapping olusturuluyor...")
-        unique_users = ratings_df['userId'].unique()
-        unique_items = ratings_df['movieId'].unique()
+        unique_users, user_ids = np.unique(ratings['user_ids'], return_inverse=True)
+        unique_items, item_ids = np.unique(ratings['movie_ids'], return_inverse=True)
         
-        user_map = {uid: idx for idx, uid in enumerate(unique_users)}
-        item_map = {iid: idx for idx, iid in enumerate(unique_items)}
+        user_map = {uid: idx for idx, uid in enumerate(unique_users.tolist())}
+        item_map = {iid: idx for idx, iid in enumerate(unique_items.tolist())}
         
         # Reverse mapping (model kullanimi icin)
         reverse_item_map = {idx: iid for iid, idx in item_map.items()}
@@ -133,94 +184,105 @@ class Command(BaseCommand):
         self.stdout.write(f"      Kullanici: {num_users:,}")
         self.stdout.write(f"      Film: {num_items:,}")
         
-        # 5. Dataset olustur (vectorized)
+        # 4. Dataset olustur (vectorized)
         self.stdout.write("\n[4/5] Dataset hazirlaniyor...")
         
-        # Positive samples
-        user_ids = ratings_df['userId'].map(user_map).values
-        item_ids = ratings_df['movieId'].map(item_map).values
-        
-        # User-item interaction matrix (negative sampling icin)
-        user_items = {}
-        for u, i in zip(user_ids, item_ids):
-            if u not in user_items:
-                user_items[u] = set()
-            user_items[u].add(i)
-        
-        # Negative sampling
-        self.stdout.write("      Negative sampling yapiliyor...")
-        neg_ratio = options['negative_ratio']
-        all_items = set(range(num_items))
-        
-        neg_user_ids = []
-        neg_item_ids = []
+        negatives = options['negatives']
+        if negatives == 'explicit':
+            # Negative sampling (vektorize, pozitifler sirali anahtarlarla reddedilir)
+            self.stdout.write("      Negative sampling yapiliyor...")
+            train, test = explicit_dataset(
+                user_ids, item_ids, num_items, options['negative_ratio'], seed=seed
+            )
+        else:
+            # Egitim seti sadece pozitifler; negatifler her batch'te cekilir
+            self.stdout.write(
+                f"      Negatifler egitimde cekilecek ({negatives}, {options['loss']})"
+            )
+            train, test = positive_dataset(
+                user_ids, item_ids, num_items, options['negative_ratio'], seed=seed
+            )
         
-        for u in user_items:
-            positive_items = user_items[u]
-            negative_items = list(all_items - positive_items)
-            
-            n_neg = min(len(positive_items) * neg_ratio, len(negative_items))
-            if n_neg > 0:
-                sampled_neg = np.random.choice(negative_items, size=n_neg, replace=False)
-                neg_user_ids.extend([u] * n_neg)
-                neg_item_ids.extend(sampled_neg)
+        self.stdout.write(f"      Train: {len(train['labels']):,} sample")
+        self.stdout.write(f"      Test: {len(test['labels']):,} sample")
         
-        # Birlestir
-        all_user_ids = np.concatenate([user_ids, np.array(neg_user_ids)])
-        all_item_ids = np.concatenate([item_ids, np.array(neg_item_ids)])
-        all_labels = np.concatenate([
-            np.ones(len(user_ids)),
-            np.zeros(len(neg_user_ids))
-        ])
+        # 5. Model olustur ve egit
+        self.stdout.write("\n[5/5] Model egitiliyor...")
         
-        # Shuffle
-        shuffle_idx = np.random.permutation(len(all_labels))
-        all_user_ids = all_user_ids[shuffle_idx]
-        all_item_ids = all_item_ids[shuffle_idx]
-        all_labels = all_labels[shuffle_idx]
+        config = {
+            'num_users': num_users,
+            'num_items': num_items,
+            'embedding_dim': options['embedding_dim'],
+            'mlp_layers': [128, 64, 32],
+            'dropout': 0.2,
+            'learning_rate': 0.001,
+        }
+        if negatives != 'explicit':
+            config.update({
+                'negatives': negatives,
+                'num_negatives': options['negative_ratio'],
+                'item_counts': np.bincount(train['item_ids'], minlength=num_items),
+                'loss': options['loss'],
+                'seed': seed,
+            })
+        if options['workers'] > 1:
+            best_auc = self._train_distributed(train, test, config, options)
+        else:
+            best_auc = self._train_local(train, test, config, options)
         
-        # Train/Test split
-        split_idx = int(0.8 * len(all_labels))
+        # Mapping bilgilerini kaydet
+        mapping_path = options['output'].replace('.pkl', '_mappings.pkl')
+        with open(mapping_path, 'wb') as f:
+            pickle.dump({
+                'user_map': user_map,
+                'item_map': item_map,
+                'reverse_item_map': reverse_item_map,
+                'num_users': num_users,
+                'num_items': num_items,
+            }, f)
         
-        train_dataset = RatingsDataset(
-            all_user_ids[:split_idx],
-            all_item_ids[:split_idx],
-            all_labels[:split_idx]
-        )
-        test_dataset = RatingsDataset(
-            all_user_ids[split_idx:],
-            all_item_ids[split_idx:],
-            all_labels[split_idx:]
+        # MovieLens ID -> Our Movie ID mapping
+        ml_to_movie = dict(
+            MovieLensMapping.objects.filter(movie__isnull=False)
+            .values_list('movielens_id', 'movie_id')
         )
         
-        train_loader = DataLoader(
-            train_dataset, 
-            batch_size=options['batch_size'], 
+        ml_mapping_path = mapping_path_for(options['output'])
+        with open(ml_mapping_path, 'wb') as f:
+            pickle.dump({
+                'item_map': item_map,  # MovieLens ID -> Model index
+                'ml_to_movie': ml_to_movie,  # MovieLens ID -> Our DB Movie ID
+            }, f)
+        
+        self.stdout.write("\n" + "="*60)
+        self.stdout.write(self.style.SUCCESS("EGITIM TAMAMLANDI!"))
+        self.stdout.write(f"   Best AUC: {best_auc:.4f}")
+        self.stdout.write(f"   Model: {options['output']}")
+        self.stdout.write(f"   Mappings: {mapping_path}")
+        self.stdout.write("="*60 + "\n")
+    
+    def _train_local(self, train, test, config, options):
+        """Tek process egitim; en iyi AUC'yi dondurur"""
+        trainer = NCFTrainer.from_config(config)
+        
+        train_loader = TensorBatchLoader(
+            train['user_ids'],
+            train['item_ids'],
+            train['labels'],
+            batch_size=options['batch_size'],
             shuffle=True,
-            num_workers=0
+            pin_memory=options['pin_memory'],
+            prefetch=options['prefetch'],
+            seed=options['seed'],
         )
-        test_loader = DataLoader(
-            test_dataset, 
+        test_loader = TensorBatchLoader(
+            test['user_ids'],
+            test['item_ids'],
+            test['labels'],
             batch_size=options['batch_size'],
-            num_workers=0
-        )
-        
-        self.stdout.write(f"      Train: {len(train_dataset):,} sample")
-        self.stdout.write(f"      Test: {len(test_dataset):,} sample")
-        
-        # 6. Model olustur ve egit
-        self.stdout.write("\n[5/5] Model egitiliyor...")
-        
-        model = NCFModel(
-            num_users=num_users,
-            num_items=num_items,
-            embedding_dim=options['embedding_dim'],
-            mlp_layers=[128, 64, 32],
-            dropout=0.2
+            pin_memory=options['pin_memory'],
         )
         
-        trainer = NCFTrainer(model, learning_rate=0.001)
-        
         device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self.stdout.write(f"      Device: {device}")
         self.stdout.write(f"      Epochs: {options['epochs']}")
@@ -231,25 +293,19 @@ class Command(BaseCommand):
         
         for epoch in range(options['epochs']):
             # Training with progress
-            model.train()
-            epoch_loss = 0
-            
-            for batch_idx, batch in enumerate(train_loader):
-                loss = trainer._train_batch(batch, device)
-                epoch_loss += loss
-                
+            def progress(batch_idx, loss, epoch=epoch):
                 # Progress her 100 batch'te bir
                 if (batch_idx + 1) % 100 == 0:
-                    progress = (batch_idx + 1) / total_batches * 100
+                    percent = (batch_idx + 1) / total_batches * 100
                     self.stdout.write(
                         f"\r      Epoch {epoch+1}/{options['epochs']} - "
-                        f"[{'#' * int(progress/5)}{' ' * (20-int(progress/5))}] "
-                        f"{progress:.1f}%",
+                        f"[{'#' * int(percent/5)}{' ' * (20-int(percent/5))}] "
+                        f"{percent:.1f}%",
                         ending=''
                     )
                     self.stdout.flush()
             
-            train_loss = epoch_loss / len(train_loader)
+            train_loss = trainer.train_epoch(train_loader, device, on_batch=progress)
             
             # Evaluation
             test_loss, test_auc = trainer.evaluate(test_loader, device)
@@ -266,33 +322,34 @@ class Command(BaseCommand):
                 trainer.save(options['output'])
                 self.stdout.write(f"      >> Yeni best model kaydedildi! (AUC: {test_auc:.4f})")
         
-        # Mapping bilgilerini kaydet
-        mapping_path = options['output'].replace('.pkl', '_mappings.pkl')
-        with open(mapping_path, 'wb') as f:
-            pickle.dump({
-                'user_map': user_map,
-                'item_map': item_map,
-                'reverse_item_map': reverse_item_map,
-                'num_users': num_users,
-                'num_items': num_items,
-            }, f)
-        
-        # MovieLens ID -> Our Movie ID mapping
-        ml_to_movie = dict(
-            MovieLensMapping.objects.filter(movie__isnull=False)
-            .values_list('movielens_id', 'movie_id')
-        )
+        return best_auc
+    
+    def _train_distributed(self, train, test, config, options):
+        """--workers N: gloo ile veri paralel CPU egitimi (checkpoint rank 0)"""
+        from apps.recommendations.distributed import train_distributed
         
-        ml_mapping_path = options['output'].replace('.pkl', '_ml_mapping.pkl')
-        with open(ml_mapping_path, 'wb') as f:
-            pickle.dump({
-                'item_map': item_map,  # MovieLens ID -> Model index
-                'ml_to_movie': ml_to_movie,  # MovieLens ID -> Our DB Movie ID
-            }, f)
+        workers = options['workers']
+        self.stdout.write(f"      Device: cpu x {workers} process (gloo)")
+        self.stdout.write(f"      Epochs: {options['epochs']}")
+        self.stdout.write(f"      Batch: {options['batch_size']} / worker")
+        self.stdout.write("")
         
-        self.stdout.write("\n" + "="*60)
-        self.stdout.write(self.style.SUCCESS("EGITIM TAMAMLANDI!"))
-        self.stdout.write(f"   Best AUC: {best_auc:.4f}")
-        self.stdout.write(f"   Model: {options['output']}")
-        self.stdout.write(f"   Mappings: {mapping_path}")
-        self.stdout.write("="*60 + "\n")
+        def report(row):
+            self.stdout.write(
+                f"      Epoch {row['epoch']}/{options['epochs']} - "
+                f"Train Loss: {row['train_loss']:.4f}, "
+                f"Test Loss: {row['test_loss']:.4f}, "
+                f"AUC: {row['auc']:.4f} "
+                f"({row['samples'] / max(row['train_seconds'], 1e-9):,.0f} sample/s)"
+            )
+            if row['saved']:
+                self.stdout.write(f"      >> Yeni best model kaydedildi! (AUC: {row['auc']:.4f})")
+        
+        history = train_distributed(workers, train, test, {
+            **config,
+            'batch_size': options['batch_size'],
+            'epochs': options['epochs'],
+            'seed': options['seed'],
+            'output': options['output'],
+        }, on_epoch=report)
+        return max((row['auc'] for row in history), default=0)
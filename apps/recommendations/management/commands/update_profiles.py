@@ -2,11 +2,22 @@
 Update User Taste Profiles
 ===========================
 Tüm kullanıcıların zevk profillerini güncelle
+
+--bulk: Kullanıcı başına sorgu yerine kullanıcı ID aralıkları halinde
+gruplu SQL toplamları ve toplu UPDATE kullanır; --workers ile parçalar
+process havuzuna dağıtılır.
+
+Kullanım:
+    python manage.py update_profiles
+    python manage.py update_profiles --bulk --chunk-size 2000 --workers 4
 """
 
+import time
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from apps.recommendations.models import UserTasteProfile
+from apps.recommendations.profile_updates import BULK_CHUNK_SIZE, bulk_rebuild_profiles
 from apps.movies.models import Rating
 
 User = get_user_model()
@@ -26,8 +37,28 @@ class Command(BaseCommand):
             action='store_true',
             help='Create profiles for users who dont have one'
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Set-based rebuild with grouped aggregations and batched writes'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=BULK_CHUNK_SIZE,
+            help='Users per chunk in bulk mode'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes in bulk mode'
+        )
     
     def handle(self, *args, **options):
+        if options['bulk']:
+            return self.handle_bulk(options)
+        
         if options['user']:
             # Tek kullanıcı
             try:
@@ -42,6 +73,7 @@ class Command(BaseCommand):
         
         self.stdout.write(f"[INFO] {len(users)} kullanici islenecek...")
         
+        start = time.perf_counter()
         created = 0
         updated = 0
         skipped = 0
@@ -61,10 +93,53 @@ class Command(BaseCommand):
             else:
                 skipped += 1
         
+        seconds = time.perf_counter() - start
         self.stdout.write(self.style.SUCCESS(
             f"\n[DONE] Tamamlandi!"
             f"\n   Olusturulan: {created}"
             f"\n   Guncellenen: {updated}"
             f"\n   Atlanan (rating yok): {skipped}"
+            f"\n   Sure: {seconds:.1f}s ({updated / seconds if seconds else 0:.1f} kullanici/s)"
+        ))
+    
+    def handle_bulk(self, options):
+        user_ids = None
+        if options['user']:
+            user_ids = list(User.objects.filter(username=options['user']).values_list('id', flat=True))
+            if not user_ids:
+                self.stderr.write(f"Kullanıcı bulunamadı: {options['user']}")
+                return
+        
+        created = 0
+        if options['create_missing']:
+            # Puanı olmayan kullanıcılar için boş profil (puanı olanlar
+            # toplu hesaplamada oluşturulur)
+            missing = User.objects.filter(taste_profile__isnull=True, ratings__isnull=True)
+            if user_ids is not None:
+                missing = missing.filter(id__in=user_ids)
+            created = len(UserTasteProfile.objects.bulk_create(
+                [UserTasteProfile(user_id=user_id) for user_id in missing.values_list('id', flat=True)],
+                ignore_conflicts=True,
+            ))
+        
+        self.stdout.write(
+            f"[INFO] Toplu mod: parca {options['chunk_size']} kullanici, {options['workers']} worker"
+        )
+        
+        def progress(done, total):
+            self.stdout.write(f"  [OK] Parca {done}/{total}")
+        
+        result = bulk_rebuild_profiles(
+            user_ids=user_ids,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            progress=progress,
+        )
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"\n[DONE] Tamamlandi!"
+            f"\n   Olusturulan (bos): {created}"
+            f"\n   Guncellenen: {result['users']}"
+            f"\n   Parca: {result['chunks']}"
+            f"\n   Sure: {result['seconds']:.1f}s ({result['users_per_sec']:.1f} kullanici/s)"
         ))
-
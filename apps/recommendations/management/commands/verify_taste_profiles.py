@@ -0,0 +1,66 @@
+"""
+Verify Taste Profiles
+=====================
+Artımlı güncellenen profil toplamlarını (genre_stats, decade_stats,
+rating_sum, total_rated_movies) puanlardan yapılan tam hesaplamayla
+karşılaştır.
+
+Sinyalleri atlayan yazımlar (bulk_create, queryset.update) veya sonradan
+değişen film türleri toplamları bozabilir; --fix bu profilleri yeniden
+hesaplar.
+
+Kullanım:
+    python manage.py verify_taste_profiles
+    python manage.py verify_taste_profiles --user ali --fix
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.recommendations.models import UserTasteProfile
+
+
+class Command(BaseCommand):
+    help = 'Compare incrementally maintained taste profiles against a full rebuild'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Verify only specific user (username)'
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rebuild profiles whose stats do not match'
+        )
+    
+    def handle(self, *args, **options):
+        profiles = UserTasteProfile.objects.select_related('user').order_by('id')
+        if options['user']:
+            profiles = profiles.filter(user__username=options['user'])
+        
+        checked = 0
+        mismatched = 0
+        fixed = 0
+        
+        for profile in profiles.iterator():
+            checked += 1
+            fields = profile.stats_mismatches()
+            if not fields:
+                continue
+            
+            mismatched += 1
+            self.stdout.write(self.style.WARNING(
+                f"  [WARN] {profile.user.username}: {', '.join(fields)}"
+            ))
+            if options['fix']:
+                profile.update_from_ratings()
+                fixed += 1
+        
+        style = self.style.SUCCESS if not mismatched or fixed == mismatched else self.style.WARNING
+        self.stdout.write(style(
+            f"\n[DONE] Tamamlandi!"
+            f"\n   Kontrol edilen: {checked}"
+            f"\n   Uyusmayan: {mismatched}"
+            f"\n   Duzeltilen: {fixed}"
+        ))
@@ -0,0 +1,53 @@
+# Generated by Django 5.0 on 2026-10-17 02:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0005_watchedmovie"),
+        ("recommendations", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MovieNeighbour",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("score", models.FloatField()),
+                ("computed_at", models.DateTimeField(db_index=True)),
+                (
+                    "movie",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbours",
+                        to="movies.movie",
+                    ),
+                ),
+                (
+                    "neighbour",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbour_of",
+                        to="movies.movie",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Benzer Film",
+                "verbose_name_plural": "Benzer Filmler",
+                "ordering": ["movie", "rank"],
+                "unique_together": {("movie", "rank")},
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.0 on 2026-10-17 02:51
+
+from django.db import migrations, models
+
+
+def backfill_stats(apps, schema_editor):
+    """Mevcut profillerin toplamlarını puanlardan hesapla"""
+    UserTasteProfile = apps.get_model("recommendations", "UserTasteProfile")
+    Rating = apps.get_model("movies", "Rating")
+    Movie = apps.get_model("movies", "Movie")
+
+    def add(stats, key, score):
+        entry = stats.setdefault(key, {"sum": 0, "n": 0})
+        entry["sum"] += score
+        entry["n"] += 1
+
+    for profile in UserTasteProfile.objects.all().iterator():
+        ratings = list(
+            Rating.objects.filter(user_id=profile.user_id).values_list(
+                "movie_id", "score", "movie__release_date"
+            )
+        )
+        movie_genres = {}
+        for movie_id, genre_id in Movie.genres.through.objects.filter(
+            movie__ratings__user_id=profile.user_id
+        ).values_list("movie_id", "genre_id"):
+            movie_genres.setdefault(movie_id, []).append(genre_id)
+
+        genre_stats = {}
+        decade_stats = {}
+        for movie_id, score, release_date in ratings:
+            for genre_id in movie_genres.get(movie_id, ()):
+                add(genre_stats, str(genre_id), score)
+            if release_date:
+                year = release_date.year
+                if year >= 2020:
+                    decade = "2020s"
+                elif year >= 2010:
+                    decade = "2010s"
+                elif year >= 2000:
+                    decade = "2000s"
+                else:
+                    decade = "classic"
+                add(decade_stats, decade, score)
+
+        profile.genre_stats = genre_stats
+        profile.decade_stats = decade_stats
+        profile.rating_sum = sum(r[1] for r in ratings)
+        profile.total_rated_movies = len(ratings)
+        profile.save(
+            update_fields=[
+                "genre_stats", "decade_stats", "rating_sum", "total_rated_movies"
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0005_watchedmovie"),
+        ("recommendations", "0002_movieneighbour"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usertasteprofile",
+            name="decade_stats",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="usertasteprofile",
+            name="genre_stats",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="usertasteprofile",
+            name="rating_sum",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recommendations", "0003_taste_profile_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usertasteprofile",
+            name="user_vector",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="usertasteprofile",
+            name="user_vector_model",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,151 @@
+"""
+Model Registry
+==============
+Sürümlü serving bundle'lar ve etkin sürüm işaretçisi (hot reload).
+
+MODEL_BUNDLE_ROOT/
+    20261017-101500/     export_bundle çıktısı (sürüm başına bir dizin)
+    20261018-090000/
+    current -> 20261018-090000   Etkin sürüm (sembolik link)
+    history.json         Etkinleştirme geçmişi (rollback için)
+
+- Etkinleştirme: geçici link oluşturulup os.replace ile "current" üzerine
+  taşınır (atomik); okuyan process yarım durum görmez.
+- Worker'lar MODEL_RELOAD_INTERVAL saniyede bir "current"ı okur (readlink,
+  DB sorgusu yok); sürüm değiştiyse yeni bundle'ı açıp tek atamayla
+  değiştirir (HybridRecommender.check_for_update).
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.recommendations.bundle import MANIFEST, ServingBundle, export_bundle
+
+
+CURRENT = 'current'
+HISTORY = 'history.json'
+
+
+def registry_root() -> str:
+    """MODEL_BUNDLE_ROOT (varsayılan: NCF_MODEL_PATH'in yanında ncf_bundles/)"""
+    root = getattr(settings, 'MODEL_BUNDLE_ROOT', '')
+    if root:
+        return str(root)
+    model_path = getattr(settings, 'NCF_MODEL_PATH', 'ncf_model.pkl')
+    return os.path.join(os.path.dirname(model_path) or '.', 'ncf_bundles')
+
+
+def version_path(version: str, root: str = None) -> str:
+    return os.path.join(root or registry_root(), version)
+
+
+def list_versions(root: str = None) -> List[str]:
+    """Yayınlanmış sürümler (eskiden yeniye)"""
+    root = root or registry_root()
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if name != CURRENT and os.path.exists(os.path.join(root, name, MANIFEST))
+    )
+
+
+def current_version(root: str = None) -> Optional[str]:
+    """Etkin sürüm (yoksa None)"""
+    try:
+        return os.path.basename(os.readlink(os.path.join(root or registry_root(), CURRENT)))
+    except OSError:
+        return None
+
+
+def history(root: str = None) -> List[Dict]:
+    try:
+        with open(os.path.join(root or registry_root(), HISTORY)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def activate(version: str, root: str = None, previous: str = None, rollback: bool = False) -> Dict:
+    """
+    Sürümü etkinleştir ("current" linkini atomik olarak değiştir)
+    Bundle açılamıyorsa (eksik/bozuk) ValueError; işaretçi değişmez.
+    
+    Args:
+        previous: Geçmişe yazılacak önceki sürüm (varsayılan: şu an etkin olan)
+    """
+    root = root or registry_root()
+    path = version_path(version, root)
+    try:
+        ServingBundle.load(path)
+    except (OSError, KeyError) as e:
+        raise ValueError(f"Gecersiz model surumu {version}: {e}")
+    
+    entry = {
+        'version': version,
+        'previous': current_version(root) if previous is None else previous,
+        'activated_at': timezone.now().isoformat(),
+        'rollback': rollback,
+    }
+    
+    tmp = os.path.join(root, f'.{CURRENT}-{os.getpid()}')
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    os.symlink(version, tmp)   # Göreli hedef: dizin taşınsa da geçerli
+    os.replace(tmp, os.path.join(root, CURRENT))
+    
+    entries = history(root) + [entry]
+    tmp = os.path.join(root, f'.{HISTORY}-{os.getpid()}')
+    with open(tmp, 'w') as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp, os.path.join(root, HISTORY))
+    return entry
+
+
+def rollback(root: str = None) -> Dict:
+    """
+    Etkin sürümden önceki sürüme dön
+    Art arda rollback'ler geçmişte geriye doğru ilerler.
+    """
+    root = root or registry_root()
+    entries = history(root)
+    current = current_version(root)
+    last = next((e for e in reversed(entries) if e['version'] == current), None)
+    if last is None or not last.get('previous'):
+        raise ValueError('Geri donulecek onceki surum yok')
+    
+    target = last['previous']
+    # Hedef sürümün kendi öncesi: bir sonraki rollback oraya döner
+    before = next((e for e in reversed(entries) if e['version'] == target), None)
+    return activate(target, root, previous=(before or {}).get('previous') or '', rollback=True)
+
+
+def publish(
+    model_path: str,
+    version: str = None,
+    root: str = None,
+    make_active: bool = True,
+    network: bool = False,
+    quantize: bool = False,
+) -> str:
+    """
+    Checkpoint'tan yeni sürüm yayınla (export_bundle) ve isteğe bağlı etkinleştir
+    network / quantize: export_bundle'a aktarılır
+    
+    Returns:
+        Sürüm adı
+    """
+    root = root or registry_root()
+    version = version or timezone.now().strftime('%Y%m%d-%H%M%S')
+    if os.path.exists(version_path(version, root)):
+        raise ValueError(f"Surum zaten var: {version}")
+    
+    os.makedirs(root, exist_ok=True)
+    export_bundle(model_path, version_path(version, root), network=network, quantize=quantize)
+    if make_active:
+        activate(version, root)
+    return version
@@ -8,6 +8,11 @@ from django.db import models
 from django.conf import settings
 
 
+# preferred_decades anahtarları (başlangıç yılı, anahtar), yeniden eskiye
+DECADE_STARTS = [(2020, '2020s'), (2010, '2010s'), (2000, '2000s')]
+CLASSIC_DECADE = 'classic'
+
+
 class UserTasteProfile(models.Model):
     """Kullanıcı film zevki profili"""
     
@@ -45,6 +50,18 @@ class UserTasteProfile(models.Model):
     average_rating = models.DecimalField(max_digits=3, decimal_places=1, default=0)
     total_rated_movies = models.IntegerField(default=0)
     
+    # Artımlı bakım için ham puan toplamları (genre_weights ve
+    # preferred_decades bunlardan türetilir)
+    genre_stats = models.JSONField(default=dict, blank=True)
+    # Örnek: {"28": {"sum": 16, "n": 2}}
+    decade_stats = models.JSONField(default=dict, blank=True)
+    rating_sum = models.IntegerField(default=0)
+    
+    # NCF fold-in kullanıcı vektörü ([gmf, mlp], foldin.FoldIn) ve üretildiği
+    # modelin anahtarı; puanlar değişince temizlenir, öneride yeniden çözülür
+    user_vector = models.JSONField(default=list, blank=True)
+    user_vector_model = models.CharField(max_length=64, blank=True)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -57,65 +74,129 @@ class UserTasteProfile(models.Model):
         return f"{self.user.username} - Zevk Profili"
     
     def update_from_ratings(self):
-        """Kullanıcının puanlarından profili güncelle"""
-        from apps.movies.models import Rating
-        from collections import defaultdict
+        """Kullanıcının puanlarından profili baştan hesapla (tam rebuild)"""
+        stats = self.compute_stats(self.user_id)
+        self.genre_stats, self.decade_stats, self.rating_sum, self.total_rated_movies = stats
+        self.derive_from_stats()
+        self.save()
+    
+    @staticmethod
+    def decade_of(release_date):
+        """Çıkış tarihinin dönem anahtarı (tarih yoksa None)"""
+        if not release_date:
+            return None
+        year = release_date.year
+        for start, decade in DECADE_STARTS:
+            if year >= start:
+                return decade
+        return CLASSIC_DECADE
+    
+    @staticmethod
+    def _add(stats, key, score, sign):
+        entry = stats.setdefault(key, {'sum': 0, 'n': 0})
+        entry['sum'] += sign * score
+        entry['n'] += sign
+        if entry['n'] <= 0:
+            del stats[key]
+    
+    @classmethod
+    def compute_stats(cls, user_id):
+        """
+        Puanlardan toplamları hesapla (kaydetmeden)
         
-        ratings = Rating.objects.filter(user=self.user).select_related('movie').prefetch_related('movie__genres')
+        Returns:
+            (genre_stats, decade_stats, rating_sum, total_rated_movies)
+        """
+        from apps.movies.models import Movie, Rating
         
-        if not ratings.exists():
-            return
+        ratings = list(
+            Rating.objects.filter(user_id=user_id)
+            .values_list('movie_id', 'score', 'movie__release_date')
+        )
+        movie_genres = {}
+        for movie_id, genre_id in Movie.genres.through.objects.filter(
+            movie__ratings__user_id=user_id
+        ).values_list('movie_id', 'genre_id'):
+            movie_genres.setdefault(movie_id, []).append(genre_id)
         
-        # Tür ağırlıkları hesapla
-        genre_scores = defaultdict(list)
-        decade_scores = defaultdict(list)
-        all_scores = []
+        genre_stats = {}
+        decade_stats = {}
+        for movie_id, score, release_date in ratings:
+            for genre_id in movie_genres.get(movie_id, ()):
+                cls._add(genre_stats, str(genre_id), score, 1)
+            decade = cls.decade_of(release_date)
+            if decade:
+                cls._add(decade_stats, decade, score, 1)
         
-        for rating in ratings:
-            normalized_score = rating.score / 10.0
-            all_scores.append(rating.score)
-            
-            # Türler
-            for genre in rating.movie.genres.all():
-                genre_scores[str(genre.id)].append(normalized_score)
-            
-            # Dönemler
-            if rating.movie.release_date:
-                year = rating.movie.release_date.year
-                if year >= 2020:
-                    decade = '2020s'
-                elif year >= 2010:
-                    decade = '2010s'
-                elif year >= 2000:
-                    decade = '2000s'
-                else:
-                    decade = 'classic'
-                decade_scores[decade].append(normalized_score)
+        return genre_stats, decade_stats, sum(r[1] for r in ratings), len(ratings)
+    
+    def apply_rating(self, movie_id, score, sign=1, save=True):
+        """
+        Tek bir puanı toplamlara ekle (sign=1) veya çıkar (sign=-1)
+        
+        Kullanıcının puan sayısından bağımsız, sabit sayıda sorgu (filmin
+        türleri ve çıkış tarihi). Güncellemede eski puan çıkarılıp yenisi
+        eklenir (signals.py).
+        """
+        from apps.movies.models import Movie
+        
+        release_date = Movie.objects.filter(id=movie_id).values_list('release_date', flat=True).first()
+        genre_ids = Movie.genres.through.objects.filter(movie_id=movie_id).values_list('genre_id', flat=True)
+        for genre_id in genre_ids:
+            self._add(self.genre_stats, str(genre_id), score, sign)
+        decade = self.decade_of(release_date)
+        if decade:
+            self._add(self.decade_stats, decade, score, sign)
+        
+        self.rating_sum += sign * score
+        self.total_rated_movies += sign
+        self.derive_from_stats()
+        if save:
+            self.save()
+    
+    def derive_from_stats(self):
+        """Toplamlardan tür/dönem ağırlıklarını, ortalamayı ve puan stilini hesapla"""
+        # Puanlar değişti: fold-in vektörü bir sonraki öneride yeniden çözülür
+        self.user_vector = []
+        self.user_vector_model = ''
         
-        # Ağırlıkları hesapla
+        # Ağırlıklar 0-1 arası ortalama puan (puan / 10)
         self.genre_weights = {
-            genre_id: round(sum(scores) / len(scores), 2)
-            for genre_id, scores in genre_scores.items()
+            genre_id: round(entry['sum'] / entry['n'] / 10.0, 2)
+            for genre_id, entry in self.genre_stats.items()
         }
-        
         self.preferred_decades = {
-            decade: round(sum(scores) / len(scores), 2)
-            for decade, scores in decade_scores.items()
+            decade: round(entry['sum'] / entry['n'] / 10.0, 2)
+            for decade, entry in self.decade_stats.items()
         }
         
         # İstatistikler
-        self.total_rated_movies = len(all_scores)
-        self.average_rating = sum(all_scores) / len(all_scores)
+        if self.total_rated_movies > 0:
+            self.average_rating = self.rating_sum / self.total_rated_movies
+        else:
+            self.average_rating = 0
         
         # Puan stili
-        if self.average_rating >= 7.5:
+        if not self.total_rated_movies:
+            self.rating_style = 'balanced'
+        elif self.average_rating >= 7.5:
             self.rating_style = 'generous'
         elif self.average_rating <= 5.5:
             self.rating_style = 'harsh'
         else:
             self.rating_style = 'balanced'
+    
+    def stats_mismatches(self):
+        """
+        Artımlı toplamları tam rebuild ile karşılaştır
         
-        self.save()
+        Returns:
+            Uyuşmayan alan adları (boş liste = tutarlı)
+        """
+        expected = self.compute_stats(self.user_id)
+        current = (self.genre_stats, self.decade_stats, self.rating_sum, self.total_rated_movies)
+        names = ('genre_stats', 'decade_stats', 'rating_sum', 'total_rated_movies')
+        return [name for name, a, b in zip(names, current, expected) if a != b]
 
 
 class MovieLensMapping(models.Model):
@@ -195,3 +276,30 @@ class RecommendationLog(models.Model):
     
     def __str__(self):
         return f"{self.user.username} ← {self.movie.title} ({self.final_score:.2f})"
+
+
+class MovieNeighbour(models.Model):
+    """Önceden hesaplanmış benzer film (neighbours.refresh_neighbours)"""
+    
+    movie = models.ForeignKey(
+        'movies.Movie',
+        on_delete=models.CASCADE,
+        related_name='neighbours'
+    )
+    neighbour = models.ForeignKey(
+        'movies.Movie',
+        on_delete=models.CASCADE,
+        related_name='neighbour_of'
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        verbose_name = 'Benzer Film'
+        verbose_name_plural = 'Benzer Filmler'
+        ordering = ['movie', 'rank']
+        unique_together = ['movie', 'rank']
+    
+    def __str__(self):
+        return f"{self.movie_id} → {self.neighbour_id} (#{self.rank + 1}, {self.score:.2f})"
@@ -4,10 +4,13 @@ Neural Collaborative Filtering Model
 PyTorch tabanlı NCF öneri modeli
 """
 
+import queue
+import threading
+
 import torch
 import torch.nn as nn
 import numpy as np
-from typing import Optional, Tuple, List
+from typing import Callable, Dict, Iterator, Optional, Tuple, List
 
 
 class NCFModel(nn.Module):
@@ -69,30 +72,46 @@ class NCFModel(nn.Module):
                 if module.bias is not None:
                     nn.init.zeros_(module.bias)
     
-    def forward(self, user_ids: torch.Tensor, item_ids: torch.Tensor) -> torch.Tensor:
+    def forward(self, user_ids: torch.Tensor, item_ids: torch.Tensor, logits: bool = False) -> torch.Tensor:
         """
         Forward pass
         
         Args:
             user_ids: (batch_size,) user indices
             item_ids: (batch_size,) item indices
+            logits: True ise son Sigmoid uygulanmaz (BPR / BCEWithLogits için)
         
         Returns:
-            predictions: (batch_size,) predicted ratings (0-1)
+            predictions: (batch_size,) predicted ratings (0-1) veya logit
+        """
+        return self.score_embeddings(
+            self.user_embedding_gmf(user_ids), self.user_embedding_mlp(user_ids), item_ids, logits
+        )
+    
+    def score_embeddings(
+        self, user_gmf: torch.Tensor, user_mlp: torch.Tensor, item_ids: torch.Tensor, logits: bool = False
+    ) -> torch.Tensor:
+        """
+        Kullanıcı embedding'leri doğrudan verilerek forward
+        Eğitim setinde olmayan kullanıcılar için (foldin.FoldIn).
+        
+        Args:
+            user_gmf, user_mlp: (batch_size, embedding_dim)
+            item_ids: (batch_size,) item indices
         """
         # GMF path
-        user_gmf = self.user_embedding_gmf(user_ids)
         item_gmf = self.item_embedding_gmf(item_ids)
         gmf_output = user_gmf * item_gmf  # Element-wise product
         
         # MLP path
-        user_mlp = self.user_embedding_mlp(user_ids)
         item_mlp = self.item_embedding_mlp(item_ids)
         mlp_input = torch.cat([user_mlp, item_mlp], dim=1)
         mlp_output = self.mlp(mlp_input)
         
         # NeuMF
         neumf_input = torch.cat([gmf_output, mlp_output], dim=1)
+        if logits:
+            return self.neumf[:-1](neumf_input).squeeze()
         prediction = self.neumf(neumf_input)
         
         return prediction.squeeze()
@@ -102,11 +121,7 @@ class NCFModel(nn.Module):
         Tek kullanıcı için birden fazla item tahmini
         """
         self.eval()
-        with torch.no_grad():
-            user_tensor = torch.tensor([user_id] * len(item_ids))
-            item_tensor = torch.tensor(item_ids)
-            predictions = self.forward(user_tensor, item_tensor)
-            return predictions.numpy()
+        return NCFScorer(self).score(self.get_user_embedding(user_id), item_ids)
     
     def get_user_embedding(self, user_id: int) -> np.ndarray:
         """Kullanıcı embedding vektörünü al"""
@@ -129,16 +144,281 @@ class NCFModel(nn.Module):
             return combined.numpy().flatten()
 
 
+class NCFScorer:
+    """
+    Servis tarafı NCF skorlayıcı: tek kullanıcı vektörü, çok aday
+    
+    Tüm adaylar tek inference_mode geçişinde skorlanır. Kullanıcıya bağlı
+    kısımlar aday başına tekrarlanmaz:
+    - MLP ilk katmanı kullanıcı ve item sütunlarına ayrılır; kullanıcı
+      terimi bir kez hesaplanıp bias'a eklenir (birleştirme yok).
+    - GMF çarpımı NeuMF ilk katmanının ağırlığına katlanır:
+      W_g (u * v) = (W_g * u) v.
+    Sonuç model.forward ile aynıdır (eval modu), float32 döner.
+    
+    quantize: Kullanıcıdan bağımsız Linear katmanları (item sütunları,
+    MLP'nin geri kalanı, NeuMF) torch dynamic quantization ile int8
+    çalışır; kullanıcı terimleri float32 kalır. Model değişmez (kopya).
+    """
+    
+    def __init__(self, model: NCFModel, num_threads: Optional[int] = None, quantize: bool = False):
+        if num_threads:
+            # Process geneli: web worker thread'leri çekirdekleri aşırı paylaşmasın
+            torch.set_num_threads(num_threads)
+        self.model = model.eval()
+        self.dim = model.embedding_dim
+        
+        first = model.mlp[0]
+        neumf = model.neumf[0]
+        with torch.no_grad():
+            self._mlp_user = first.weight[:, :self.dim].detach().clone()
+            self._mlp_bias = first.bias.detach().clone()
+            self._gmf_weight = neumf.weight[:, :self.dim].detach().clone()
+            self._neumf_bias = neumf.bias.detach().clone()
+            self._layers = nn.ModuleDict({
+                'item': self._projection(first.weight[:, self.dim:]),
+                'mlp': model.mlp[1:],
+                'neumf': self._projection(neumf.weight[:, self.dim:]),
+                'head': model.neumf[1:],
+            }).eval()
+        if quantize:
+            self._layers = torch.ao.quantization.quantize_dynamic(self._layers, {nn.Linear}, dtype=torch.qint8)
+    
+    @staticmethod
+    def _projection(weight: torch.Tensor) -> nn.Linear:
+        layer = nn.Linear(weight.shape[1], weight.shape[0], bias=False)
+        layer.weight.data.copy_(weight)
+        return layer
+    
+    def score(self, user_vector: np.ndarray, item_rows) -> np.ndarray:
+        """
+        Args:
+            user_vector: [gmf, mlp] birleşik vektör (2 * embedding_dim)
+            item_rows: Aday model item index'leri (int dizisi)
+        
+        Returns:
+            (len(item_rows),) float32 tahminler (0-1)
+        """
+        rows = torch.as_tensor(np.asarray(item_rows, dtype=np.int64))
+        if not len(rows):
+            return np.zeros(0, dtype=np.float32)
+        user = torch.as_tensor(np.asarray(user_vector, dtype=np.float32))
+        user_gmf, user_mlp = user[:self.dim], user[self.dim:]
+        
+        model, layers = self.model, self._layers
+        with torch.inference_mode():
+            hidden = layers['item'](model.item_embedding_mlp(rows))
+            hidden += self._mlp_bias + self._mlp_user @ user_mlp
+            neumf = layers['neumf'](layers['mlp'](hidden))
+            neumf.addmm_(model.item_embedding_gmf(rows), (self._gmf_weight * user_gmf).t())
+            neumf += self._neumf_bias
+            return layers['head'](neumf).reshape(-1).numpy()
+
+
+class TensorBatchLoader:
+    """
+    Tensör dilimleriyle batch üretici (Dataset + DataLoader yerine)
+    
+    DataLoader her örnek için __getitem__ çağırıp batch başına 1024 küçük
+    dict'i birleştirir. Burada diziler bir kez tensöre çevrilir; her epoch
+    tek bir permütasyonla karıştırılır ve batch'ler ardışık dilimler olarak
+    üretilir. Batch'ler DataLoader ile aynı dict biçimindedir
+    (user_id, item_id, label).
+    
+    Args:
+        shuffle: Her epoch'ta yeni permütasyon (seed ile tekrarlanabilir)
+        pin_memory: CUDA varsa epoch tensörlerini pinned belleğe al
+                    (trainer non_blocking kopyalar)
+        prefetch: > 0 ise batch'ler arka plan thread'inde bu kadar önden
+                  hazırlanır
+    """
+    
+    def __init__(
+        self,
+        user_ids,
+        item_ids,
+        labels,
+        batch_size: int = 1024,
+        shuffle: bool = False,
+        pin_memory: bool = False,
+        prefetch: int = 0,
+        seed: Optional[int] = None,
+    ):
+        self.user_ids = torch.as_tensor(np.asarray(user_ids), dtype=torch.long)
+        self.item_ids = torch.as_tensor(np.asarray(item_ids), dtype=torch.long)
+        self.labels = torch.as_tensor(np.asarray(labels), dtype=torch.float32)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self.prefetch = prefetch
+        self.generator = torch.Generator()
+        if seed is not None:
+            self.generator.manual_seed(seed)
+        else:
+            self.generator.seed()
+    
+    def __len__(self) -> int:
+        return (len(self.labels) + self.batch_size - 1) // self.batch_size
+    
+    @property
+    def num_samples(self) -> int:
+        return len(self.labels)
+    
+    def _batches(self) -> Iterator[Dict[str, torch.Tensor]]:
+        tensors = (self.user_ids, self.item_ids, self.labels)
+        if self.shuffle:
+            perm = torch.randperm(len(self.labels), generator=self.generator)
+            tensors = tuple(t[perm] for t in tensors)
+        if self.pin_memory:
+            tensors = tuple(t.pin_memory() for t in tensors)
+        users, items, labels = tensors
+        for start in range(0, len(labels), self.batch_size):
+            end = start + self.batch_size
+            yield {'user_id': users[start:end], 'item_id': items[start:end], 'label': labels[start:end]}
+    
+    def __iter__(self) -> Iterator[Dict[str, torch.Tensor]]:
+        if self.prefetch <= 0:
+            return self._batches()
+        return self._prefetched()
+    
+    def _prefetched(self) -> Iterator[Dict[str, torch.Tensor]]:
+        """Batch'leri sınırlı kuyrukla arka plan thread'inde hazırla"""
+        done = object()
+        batches = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        
+        def produce():
+            try:
+                for batch in self._batches():
+                    if stop.is_set():
+                        return
+                    batches.put(batch)
+            finally:
+                batches.put(done)
+        
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is done:
+                    break
+                yield batch
+        finally:
+            stop.set()
+            while thread.is_alive():
+                try:
+                    batches.get_nowait()
+                except queue.Empty:
+                    thread.join(0.01)
+
+
+class NegativeSampler:
+    """
+    Eğitim sırasında batch başına negatif item üretici
+    
+    Açık negatifler (train_model'in sample_negatives'i) veri setini
+    (1 + ratio) katına çıkarır. Bununla veri seti sadece pozitiflerden
+    oluşur; negatifler her batch'te yeniden çekilir. Çekilen item
+    kullanıcının bir pozitifi olabilir (seyrek veride ihmal edilebilir).
+    
+    Stratejiler:
+        uniform:    Tüm item'lardan eşit olasılıkla
+        popularity: Etkileşim sayısı ** alpha ile orantılı (word2vec tarzı)
+        in_batch:   Aynı batch'teki diğer pozitiflerin item'ları (ek
+                    örnekleme yok, popülerliğe göre dağılır)
+    """
+    
+    UNIFORM = 'uniform'
+    POPULARITY = 'popularity'
+    IN_BATCH = 'in_batch'
+    STRATEGIES = (UNIFORM, POPULARITY, IN_BATCH)
+    
+    def __init__(
+        self,
+        num_items: int,
+        strategy: str = UNIFORM,
+        num_negatives: int = 4,
+        item_counts=None,
+        alpha: float = 0.75,
+        seed: Optional[int] = None,
+    ):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Bilinmeyen negatif ornekleme stratejisi: {strategy}")
+        self.num_items = num_items
+        self.strategy = strategy
+        self.num_negatives = num_negatives
+        self.generator = torch.Generator()
+        if seed is not None:
+            self.generator.manual_seed(seed)
+        else:
+            self.generator.seed()
+        self.weights = None
+        if strategy == self.POPULARITY:
+            if item_counts is None:
+                raise ValueError('popularity stratejisi item_counts gerektirir')
+            counts = torch.as_tensor(np.asarray(item_counts), dtype=torch.float64)
+            self.weights = counts.clamp(min=0) ** alpha
+    
+    def sample(self, item_ids: torch.Tensor) -> torch.Tensor:
+        """Batch'in pozitif item'ları için (batch, num_negatives) negatif item'lar"""
+        size = (len(item_ids), self.num_negatives)
+        if self.strategy == self.UNIFORM:
+            return torch.randint(0, self.num_items, size, generator=self.generator)
+        if self.strategy == self.POPULARITY:
+            flat = torch.multinomial(self.weights, size[0] * size[1], replacement=True, generator=self.generator)
+            return flat.view(size)
+        # in_batch: her sütun batch'in kaydırılmış bir permütasyonu
+        perm = torch.randperm(len(item_ids), generator=self.generator)
+        shuffled = item_ids[perm]
+        return torch.stack([shuffled.roll(j + 1) for j in range(self.num_negatives)], dim=1)
+
+
+def _all_gather(tensor: torch.Tensor) -> torch.Tensor:
+    """Farklı uzunluktaki 1-D tensörleri tüm rank'lerden rank sırasıyla topla"""
+    import torch.distributed as dist
+    
+    sizes = [torch.zeros(1, dtype=torch.long) for _ in range(dist.get_world_size())]
+    dist.all_gather(sizes, torch.tensor([len(tensor)]))
+    padded = torch.zeros(max(int(size) for size in sizes), dtype=tensor.dtype)
+    padded[:len(tensor)] = tensor
+    gathered = [torch.empty_like(padded) for _ in sizes]
+    dist.all_gather(gathered, padded)
+    return torch.cat([part[:int(size)] for part, size in zip(gathered, sizes)])
+
+
 class NCFTrainer:
     """NCF Model eğitimi"""
     
+    BCE = 'bce'
+    BPR = 'bpr'
+    LOSSES = (BCE, BPR)
+    
     def __init__(
         self,
         model: NCFModel,
         learning_rate: float = 0.001,
-        weight_decay: float = 1e-5
+        weight_decay: float = 1e-5,
+        negatives: Optional[NegativeSampler] = None,
+        loss: str = BCE,
     ):
+        """
+        Args:
+            negatives: Verilirse eğitim batch'leri sadece pozitif kabul
+                       edilir (label yok sayılır) ve negatifler her batch'te
+                       bu sampler ile çekilir
+            loss: 'bce' (noktasal) veya 'bpr' (pozitif > negatif, ikili);
+                  bpr sadece negatives ile kullanılabilir
+        """
+        if loss not in self.LOSSES:
+            raise ValueError(f"Bilinmeyen loss: {loss}")
+        if loss == self.BPR and negatives is None:
+            raise ValueError('bpr loss negatif sampler gerektirir')
         self.model = model
+        self.network = model          # İleri geçiş (distribute() sonrası DDP sarmalı)
+        self.distributed = False
+        self.negatives = negatives
+        self.loss = loss
         self.optimizer = torch.optim.Adam(
             model.parameters(),
             lr=learning_rate,
@@ -146,71 +426,169 @@ class NCFTrainer:
         )
         self.criterion = nn.BCELoss()
     
-    def _train_batch(self, batch: dict, device: str = 'cpu') -> float:
-        """Tek batch eğitimi"""
-        self.model.train()
-        self.model.to(device)
+    def distribute(self):
+        """
+        Modeli DistributedDataParallel ile sar (process group açık olmalı)
+        
+        Gradyanlar her adımda rank'ler arasında all-reduce edilir;
+        evaluate tahminleri tüm rank'lerden toplar. save() sarılmamış
+        modeli yazar.
+        """
+        from torch.nn.parallel import DistributedDataParallel
+        
+        self.network = DistributedDataParallel(self.model)
+        self.distributed = True
+    
+    @classmethod
+    def from_config(cls, config: dict) -> 'NCFTrainer':
+        """
+        train_model / distributed worker ayarlarından model + trainer
         
-        user_ids = batch['user_id'].to(device)
-        item_ids = batch['item_id'].to(device)
-        labels = batch['label'].float().to(device)
+        config: num_users, num_items, embedding_dim, mlp_layers, dropout,
+        learning_rate ve opsiyonel negatives (strateji, None: açık negatif),
+        num_negatives, item_counts, loss, seed
+        """
+        model = NCFModel(
+            num_users=config['num_users'],
+            num_items=config['num_items'],
+            embedding_dim=config['embedding_dim'],
+            mlp_layers=config['mlp_layers'],
+            dropout=config['dropout'],
+        )
+        negatives = None
+        if config.get('negatives'):
+            negatives = NegativeSampler(
+                config['num_items'],
+                strategy=config['negatives'],
+                num_negatives=config.get('num_negatives', 4),
+                item_counts=config.get('item_counts'),
+                seed=config.get('seed'),
+            )
+        return cls(
+            model,
+            learning_rate=config['learning_rate'],
+            negatives=negatives,
+            loss=config.get('loss', cls.BCE),
+        )
+    
+    @staticmethod
+    def _to_device(batch: dict, device: str) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Batch tensörlerini cihaza taşı (pinned bellekte kopya asenkron)"""
+        return (
+            batch['user_id'].to(device, non_blocking=True),
+            batch['item_id'].to(device, non_blocking=True),
+            batch['label'].float().to(device, non_blocking=True),
+        )
+    
+    def _step(self, batch: dict, device: str) -> float:
+        """Model train modunda ve cihazdayken tek optimizasyon adımı"""
+        if self.negatives is not None:
+            return self._sampled_step(batch, device)
+        user_ids, item_ids, labels = self._to_device(batch, device)
         
         self.optimizer.zero_grad()
-        predictions = self.model(user_ids, item_ids)
+        predictions = self.network(user_ids, item_ids).reshape(-1)
         loss = self.criterion(predictions, labels)
         loss.backward()
         self.optimizer.step()
         
         return loss.item()
     
+    def _sampled_step(self, batch: dict, device: str) -> float:
+        """Pozitif batch + anında çekilen negatiflerle tek adım (tek ileri geçiş)"""
+        negatives = self.negatives.sample(batch['item_id'])
+        k = negatives.shape[1]
+        user_ids = torch.cat([batch['user_id'], batch['user_id'].repeat_interleave(k)]).to(device)
+        item_ids = torch.cat([batch['item_id'], negatives.reshape(-1)]).to(device)
+        n_pos = len(batch['item_id'])
+        
+        self.optimizer.zero_grad()
+        logits = self.network(user_ids, item_ids, logits=True).reshape(-1)
+        pos, neg = logits[:n_pos], logits[n_pos:].view(n_pos, k)
+        if self.loss == self.BPR:
+            loss = -nn.functional.logsigmoid(pos.unsqueeze(1) - neg).mean()
+        else:
+            labels = torch.cat([torch.ones_like(pos), torch.zeros_like(logits[n_pos:])])
+            loss = nn.functional.binary_cross_entropy_with_logits(logits, labels)
+        loss.backward()
+        self.optimizer.step()
+        
+        return loss.item()
+    
+    def _train_batch(self, batch: dict, device: str = 'cpu') -> float:
+        """Tek batch eğitimi"""
+        self.network.train()
+        self.network.to(device)
+        return self._step(batch, device)
+    
     def train_epoch(
         self,
-        train_loader: torch.utils.data.DataLoader,
-        device: str = 'cpu'
+        train_loader: 'TensorBatchLoader',
+        device: str = 'cpu',
+        on_batch: Optional[Callable[[int, float], None]] = None,
     ) -> float:
-        """Bir epoch eğitim"""
-        self.model.train()
-        self.model.to(device)
+        """
+        Bir epoch eğitim
+        
+        Args:
+            train_loader: TensorBatchLoader (veya aynı dict batch'lerini
+                          üreten herhangi bir iterable, örn. DataLoader)
+            on_batch: Her batch sonrası (batch_idx, loss) ile çağrılır
+        """
+        self.network.train()
+        self.network.to(device)
         
         total_loss = 0.0
-        for batch in train_loader:
-            loss = self._train_batch(batch, device)
+        batches = 0
+        for batch_idx, batch in enumerate(train_loader):
+            loss = self._step(batch, device)
             total_loss += loss
+            batches += 1
+            if on_batch:
+                on_batch(batch_idx, loss)
         
-        return total_loss / len(train_loader)
+        return total_loss / max(batches, 1)
     
     def evaluate(
         self,
-        test_loader: torch.utils.data.DataLoader,
+        test_loader: 'TensorBatchLoader',
         device: str = 'cpu'
     ) -> Tuple[float, float]:
-        """Model değerlendirme"""
-        self.model.eval()
-        self.model.to(device)
+        """Model değerlendirme (loss, AUC)"""
+        self.network.eval()
+        self.network.to(device)
         
         total_loss = 0.0
+        batches = 0
         all_preds = []
         all_labels = []
         
         with torch.no_grad():
             for batch in test_loader:
-                user_ids = batch['user_id'].to(device)
-                item_ids = batch['item_id'].to(device)
-                labels = batch['label'].float().to(device)
+                user_ids, item_ids, labels = self._to_device(batch, device)
                 
-                predictions = self.model(user_ids, item_ids)
+                predictions = self.network(user_ids, item_ids).reshape(-1)
                 loss = self.criterion(predictions, labels)
                 
                 total_loss += loss.item()
-                all_preds.extend(predictions.cpu().numpy())
-                all_labels.extend(labels.cpu().numpy())
+                batches += 1
+                all_preds.append(predictions.cpu())
+                all_labels.append(labels.cpu())
         
-        avg_loss = total_loss / len(test_loader)
+        avg_loss = total_loss / max(batches, 1)
+        preds = torch.cat(all_preds) if all_preds else torch.zeros(0)
+        labels = torch.cat(all_labels) if all_labels else torch.zeros(0)
+        if self.distributed:
+            # Senkron değerlendirme: tüm rank'lerin tahminleri
+            preds, labels = _all_gather(preds), _all_gather(labels)
+            avg_loss = self.criterion(preds, labels).item() if len(preds) else 0.0
         
         # AUC hesapla
         from sklearn.metrics import roc_auc_score
         try:
-            auc = roc_auc_score(all_labels, all_preds)
+            if not len(preds):
+                raise ValueError('Bos test seti')
+            auc = roc_auc_score(labels.numpy(), preds.numpy())
         except ValueError:
             auc = 0.5
         
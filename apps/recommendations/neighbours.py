@@ -0,0 +1,249 @@
+"""
+Movie Neighbours
+================
+Her film için önceden hesaplanmış benzer film tablosu (MovieNeighbour).
+
+Skor get_similar_movies ile aynı content formülüdür (tür Jaccard 0.5,
+ortak yönetmen 0.3, ortak oyuncu 0.2) ve NCF embedding'i olan filmlerde
+cosine benzerliği eklenir. Hesap blok blok matris çarpımlarıyla yapılır;
+film başına sorgu atılmaz.
+
+refresh_neighbours: build_movie_neighbours command'ı ve
+refresh_movie_neighbours Celery task'ı tarafından kullanılır.
+"""
+
+import time
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.movies.models import Movie
+from apps.recommendations import scoring
+
+
+NEIGHBOUR_COUNT = 20      # Film başına saklanan komşu sayısı
+BLOCK_SIZE = 256          # Aynı anda skorlanan kaynak film sayısı
+
+# get_similar_movies ağırlıkları
+GENRE_WEIGHT = 0.5
+DIRECTOR_WEIGHT = 0.3
+ACTOR_WEIGHT = 0.2
+EMBEDDING_WEIGHT = 0.3    # Pozitif cosine benzerliği için ek ağırlık
+
+
+def _incidence(rows: np.ndarray, persons: np.ndarray, n_rows: int):
+    """(satır, person_id) çiftlerinden 0/1 seyrek matris (scipy.sparse.csr_matrix)"""
+    from scipy import sparse
+    
+    if not len(rows):
+        return sparse.csr_matrix((n_rows, 1), dtype=np.float32)
+    _, cols = np.unique(persons, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(n_rows, cols.max() + 1),
+    )
+    matrix.data[:] = 1.0  # Tekrarlanan çiftler toplanmasın
+    return matrix
+
+
+class NeighbourScorer:
+    """Aday filmler arasında benzerlik skorları (CandidateFeatures üzerinden)"""
+    
+    def __init__(self, features: scoring.CandidateFeatures, embedding_index=None):
+        n = len(features)
+        self.features = features
+        self.genres = features.genre_matrix.astype(np.float32)
+        self.genre_counts = features.genre_counts.astype(np.float32)
+        self.directors = _incidence(features.director_rows, features.director_persons, n)
+        self.actors = _incidence(features.actor_rows, features.actor_persons, n)
+        
+        self.embeddings = None
+        if embedding_index is not None and len(embedding_index):
+            rows = embedding_index.rows(features.movie_ids)
+            self.embeddings = np.zeros((n, embedding_index.dim), dtype=np.float32)
+            self.embeddings[rows >= 0] = embedding_index.matrix[rows[rows >= 0]]
+    
+    def scores(self, source_rows: np.ndarray) -> np.ndarray:
+        """(len(source_rows), n) skor matrisi"""
+        # Tür Jaccard benzerliği (union 0 ise intersection da 0)
+        scores = self.genres[source_rows] @ self.genres.T
+        union = self.genre_counts[source_rows, None] + self.genre_counts[None, :] - scores
+        scores /= np.maximum(union, 1)
+        scores *= GENRE_WEIGHT
+        
+        # Ortak yönetmen / oyuncu (seyrek çarpım, sadece sıfır olmayanlar eklenir)
+        shared = (self.directors[source_rows] @ self.directors.T).tocoo()
+        scores[shared.row, shared.col] += DIRECTOR_WEIGHT
+        shared = (self.actors[source_rows] @ self.actors.T).tocoo()
+        scores[shared.row, shared.col] += ACTOR_WEIGHT * shared.data / scoring.TOP_CAST
+        
+        # NCF embedding benzerliği (embedding'i olmayan satırlar sıfır vektör)
+        if self.embeddings is not None:
+            cosine = self.embeddings[source_rows] @ self.embeddings.T
+            scores += EMBEDDING_WEIGHT * np.maximum(cosine, 0.0)
+        
+        return scores
+    
+    def top_neighbours(
+        self,
+        source_rows: Iterable[int],
+        n: int = NEIGHBOUR_COUNT,
+        candidate_mask: np.ndarray = None,
+        block_size: int = BLOCK_SIZE,
+    ):
+        """
+        Her kaynak satır için en benzer n satır
+        
+        Yields:
+            (kaynak satır, komşu satırları, skorlar) azalan skor sırasıyla
+            (eşitlikte düşük movie_id önce)
+        """
+        source_rows = np.asarray(list(source_rows), dtype=np.int64)
+        movie_ids = self.features.movie_ids
+        for start in range(0, len(source_rows), block_size):
+            block = source_rows[start:start + block_size]
+            scores = self.scores(block)
+            if candidate_mask is not None:
+                scores[:, ~candidate_mask] = -np.inf
+            scores[np.arange(len(block)), block] = -np.inf  # Kendisi hariç
+            
+            k = min(n, scores.shape[1] - 1)
+            if k <= 0:
+                continue
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            values = np.take_along_axis(scores, top, axis=1)
+            order = np.lexsort((movie_ids[top], -values), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            values = np.take_along_axis(values, order, axis=1)
+            for row, cols, row_values in zip(block, top, values):
+                keep = np.isfinite(row_values)
+                yield row, cols[keep], row_values[keep]
+
+
+def load_scorer(movie_ids: List[int] = None, embedding_index=None) -> NeighbourScorer:
+    """Verilen (veya tüm) filmler için scorer oluştur"""
+    queryset = Movie.objects.order_by('id')
+    if movie_ids is not None:
+        queryset = queryset.filter(id__in=movie_ids)
+    features = scoring.CandidateFeatures.load(queryset.values_list('id', 'vote_average', 'vote_count'))
+    return NeighbourScorer(features, embedding_index)
+
+
+def _candidate_mask(movie_ids: np.ndarray) -> np.ndarray:
+    """Posteri olan filmler (get_similar_movies ile aynı filtre)"""
+    with_poster = np.fromiter(
+        Movie.objects.filter(poster_path__isnull=False).values_list('id', flat=True),
+        dtype=np.int64,
+    )
+    return np.isin(movie_ids, with_poster)
+
+
+def _stale_movie_ids(since) -> List[int]:
+    """
+    since'ten sonra güncellenen filmler ve komşu listesinde bu filmler
+    bulunan filmler
+    """
+    from apps.recommendations.models import MovieNeighbour
+    
+    touched = set(Movie.objects.filter(updated_at__gt=since).values_list('id', flat=True))
+    if not touched:
+        return []
+    pointing = set(
+        MovieNeighbour.objects.filter(neighbour_id__in=touched).values_list('movie_id', flat=True)
+    )
+    return sorted(touched | pointing)
+
+
+def _insert_rows(rows: List[tuple], batch_size: int):
+    """
+    (movie_id, neighbour_id, rank, score, computed_at) satırlarını yaz
+    Yüz binlerce satırda bulk_create'in model nesnesi maliyetinden
+    kaçınmak için doğrudan executemany kullanılır.
+    """
+    from apps.recommendations.models import MovieNeighbour
+    
+    qn = connection.ops.quote_name
+    columns = ['movie_id', 'neighbour_id', 'rank', 'score', 'computed_at']
+    sql = (
+        f"INSERT INTO {qn(MovieNeighbour._meta.db_table)} "
+        f"({', '.join(qn(c) for c in columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+
+
+def refresh_neighbours(
+    full: bool = False,
+    n: int = NEIGHBOUR_COUNT,
+    embedding_index=None,
+    batch_size: int = 5000,
+) -> Dict:
+    """
+    MovieNeighbour tablosunu güncelle
+    
+    Varsayılan olarak sadece son çalıştırmadan (en son computed_at) sonra
+    updated_at'i değişen filmler ve onları komşu olarak tutan filmler
+    yeniden hesaplanır. Tablo boşsa veya full=True ise tüm katalog.
+    Yeni filmlerin değişmeyen filmlerin listelerine girmesi için
+    periyodik olarak full çalıştırılmalıdır.
+    """
+    from apps.recommendations.models import MovieNeighbour
+    
+    start = time.perf_counter()
+    computed_at = timezone.now()
+    last_run = MovieNeighbour.objects.aggregate(last=Max('computed_at'))['last']
+    
+    if full or last_run is None:
+        targets = None
+    else:
+        targets = _stale_movie_ids(last_run)
+        if not targets:
+            return {'movies': 0, 'rows': 0, 'seconds': time.perf_counter() - start, 'full': False}
+    
+    scorer = load_scorer(embedding_index=embedding_index)
+    movie_ids = scorer.features.movie_ids
+    if targets is None:
+        source_rows = np.arange(len(movie_ids))
+    else:
+        source_rows = scoring.RowIndex(movie_ids).rows(np.asarray(targets, dtype=np.int64))
+    
+    mask = _candidate_mask(movie_ids)
+    stamp = connection.ops.adapt_datetimefield_value(computed_at)
+    rows = []
+    for row, cols, values in scorer.top_neighbours(source_rows, n=n, candidate_mask=mask):
+        source_id = int(movie_ids[row])
+        rows.extend(
+            (source_id, neighbour_id, rank, score, stamp)
+            for rank, (neighbour_id, score) in enumerate(
+                zip(movie_ids[cols].tolist(), values.tolist())
+            )
+        )
+    
+    source_ids = movie_ids[source_rows].tolist()
+    with transaction.atomic():
+        if targets is None:
+            MovieNeighbour.objects.all().delete()
+        else:
+            for chunk in scoring._chunks(source_ids):
+                MovieNeighbour.objects.filter(movie_id__in=chunk).delete()
+        _insert_rows(rows, batch_size)
+    
+    return {
+        'movies': len(source_ids),
+        'rows': len(rows),
+        'seconds': time.perf_counter() - start,
+        'full': targets is None,
+    }
+
+
+def similar_movies(movie_id: int, n: int = 10) -> List[Movie]:
+    """Önceden hesaplanmış komşular (tek indeksli sorgu, tablo boşsa boş liste)"""
+    return list(
+        Movie.objects.filter(neighbour_of__movie_id=movie_id)
+        .order_by('neighbour_of__rank')[:n]
+    )
@@ -0,0 +1,336 @@
+"""
+Profile Updates
+===============
+UserTasteProfile yeniden hesaplamalarının zamanlanması.
+
+- Rating ekleme/güncelleme/silme profile artımlı uygulanır
+  (apply_rating_change): tür/dönem toplamları sabit sürede güncellenir,
+  kullanıcının tüm puanları okunmaz.
+- Tam yeniden hesaplama (schedule_profile_update) kısa bir gecikmeyle
+  Celery task'ı üzerinden yapılır; aynı kullanıcı için art arda gelen
+  istekler tek hesaplamada birleşir (debounce). PROFILE_UPDATE_ASYNC
+  kapalıysa (Redis/Celery yok, testler) senkron yapılır.
+- Toplu yazımlarda deferred_profile_updates() ile sinyaller bastırılır,
+  blok sonunda kullanıcı başına tek güncelleme yapılır.
+- bulk_rebuild_profiles tüm kullanıcıları kullanıcı ID aralıkları halinde
+  gruplu SQL toplamlarıyla yeniden hesaplar (update_profiles --bulk).
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.db.models import Case, Count, Sum, Value, When
+from django.utils import timezone
+
+
+DEBOUNCE_KEY = 'profile_update:pending:{user_id}'
+
+# deferred_profile_updates bloğu içinde güncellenecek kullanıcılar
+_deferred_users: ContextVar = ContextVar('deferred_profile_users', default=None)
+
+
+def rebuild_profile(user_id: int):
+    """
+    Profili puanlardan yeniden hesapla (senkron)
+    Profili ve puanı olmayan kullanıcı için (örn. kullanıcı silinirken
+    cascade ile silinen puanlar) profil oluşturulmaz.
+    """
+    from apps.movies.models import Rating
+    from apps.recommendations.models import UserTasteProfile
+    
+    profile = UserTasteProfile.objects.filter(user_id=user_id).first()
+    if profile is None:
+        if not Rating.objects.filter(user_id=user_id).exists():
+            return None
+        profile, _ = UserTasteProfile.objects.get_or_create(user_id=user_id)
+    profile.update_from_ratings()
+    return profile
+
+
+def apply_rating_change(user_id: int, old=None, new=None):
+    """
+    Tek bir puan değişikliğini profile artımlı uygula
+    
+    Args:
+        old: Değişiklik öncesi (movie_id, score) veya None (yeni puan)
+        new: Değişiklik sonrası (movie_id, score) veya None (silinen puan)
+    
+    Sadece profil yoksa (veya silme/güncellemede profilde hiç puan
+    görünmüyorsa) tam hesaplamaya düşer. Toplamların puanlarla tutarlılığı
+    burada kontrol edilmez: sinyalleri atlayan yazımlardan (bulk_create,
+    queryset.update) sonra verify_taste_profiles --fix çalıştırılmalı.
+    """
+    from apps.recommendations.models import UserTasteProfile
+    
+    deferred = _deferred_users.get()
+    if deferred is not None:
+        deferred.add(user_id)
+        return
+    
+    with transaction.atomic():
+        # Aynı kullanıcının eşzamanlı puanları toplamları ezmesin
+        profile = UserTasteProfile.objects.select_for_update().filter(user_id=user_id).first()
+        if profile is None or (old is not None and profile.total_rated_movies <= 0):
+            if new is not None:
+                rebuild_profile(user_id)
+            return
+        
+        if old is not None:
+            profile.apply_rating(*old, sign=-1, save=False)
+        if new is not None:
+            profile.apply_rating(*new, sign=1, save=False)
+        profile.save()
+
+
+def schedule_profile_update(user_id: int):
+    """
+    Profil güncellemesini zamanla
+    
+    Aynı kullanıcı için bekleyen bir güncelleme varsa yeni task
+    oluşturulmaz; bekleyen task çalıştığında tüm değişiklikleri görür.
+    """
+    deferred = _deferred_users.get()
+    if deferred is not None:
+        deferred.add(user_id)
+        return
+    
+    if not getattr(settings, 'PROFILE_UPDATE_ASYNC', False):
+        rebuild_profile(user_id)
+        return
+    
+    debounce = getattr(settings, 'PROFILE_UPDATE_DEBOUNCE', 5)
+    key = DEBOUNCE_KEY.format(user_id=user_id)
+    if not cache.add(key, 1, debounce * 4):
+        return  # Zaten bekleyen bir güncelleme var
+    
+    # Task, puanlar commit edilmeden çalışmasın
+    transaction.on_commit(lambda: _enqueue(user_id, debounce))
+
+
+def _enqueue(user_id: int, countdown: int):
+    from apps.recommendations.tasks import update_taste_profile
+    
+    try:
+        update_taste_profile.apply_async(args=[user_id], countdown=countdown)
+    except Exception as e:
+        # Broker yoksa senkron çalıştır
+        print(f"[WARN] Profil guncelleme kuyruga alinamadi, senkron calisiyor: {e}")
+        cache.delete(DEBOUNCE_KEY.format(user_id=user_id))
+        rebuild_profile(user_id)
+
+
+@contextmanager
+def deferred_profile_updates(sync: bool = False):
+    """
+    Blok içindeki profil güncellemelerini topla, sonunda kullanıcı başına
+    bir kez çalıştır
+    
+    Args:
+        sync: True ise blok sonunda senkron hesapla (örn. onboarding sonrası
+              yönlendirmeden önce profilin hazır olması için)
+    
+    Kullanım:
+        with deferred_profile_updates(sync=True):
+            for item in ratings_data:
+                Rating.objects.update_or_create(...)
+    """
+    if _deferred_users.get() is not None:
+        # İç içe blok: dıştaki blok güncellemeyi yapar
+        yield
+        return
+    
+    users = set()
+    token = _deferred_users.set(users)
+    try:
+        yield
+    finally:
+        _deferred_users.reset(token)
+    
+    for user_id in users:
+        if sync:
+            rebuild_profile(user_id)
+        else:
+            schedule_profile_update(user_id)
+
+
+BULK_CHUNK_SIZE = 1000    # Tek seferde hesaplanan kullanıcı sayısı
+
+# Toplu modda yazılan alanlar (update_from_ratings'in kaydettikleri)
+_BULK_FIELDS = [
+    'genre_stats', 'decade_stats', 'rating_sum', 'total_rated_movies',
+    'genre_weights', 'preferred_decades', 'average_rating', 'rating_style',
+    'user_vector', 'user_vector_model', 'updated_at',
+]
+
+
+def _decade_case():
+    """UserTasteProfile.decade_of'un SQL karşılığı"""
+    from apps.recommendations.models import CLASSIC_DECADE, DECADE_STARTS
+    
+    whens = [
+        When(movie__release_date__year__gte=start, then=Value(decade))
+        for start, decade in DECADE_STARTS
+    ]
+    whens.append(When(movie__release_date__isnull=False, then=Value(CLASSIC_DECADE)))
+    return Case(*whens, default=None)
+
+
+def rebuild_profiles_range(first_id: int, last_id: int) -> int:
+    """
+    first_id..last_id aralığındaki puanı olan kullanıcıların profillerini
+    üç gruplu sorguyla (toplam, tür, dönem) hesapla ve toplu yaz
+    
+    Returns:
+        Güncellenen profil sayısı
+    """
+    from apps.movies.cache import invalidate_users_recommendations
+    from apps.movies.models import Rating
+    from apps.recommendations.models import UserTasteProfile
+    
+    ratings = Rating.objects.filter(user_id__gte=first_id, user_id__lte=last_id)
+    
+    totals = {
+        row['user_id']: row
+        for row in ratings.values('user_id').annotate(total=Sum('score'), n=Count('id'))
+    }
+    if not totals:
+        return 0
+    
+    genre_stats = {user_id: {} for user_id in totals}
+    for user_id, genre_id, total, n in (
+        ratings.values('user_id', 'movie__genres')
+        .annotate(total=Sum('score'), n=Count('id'))
+        .values_list('user_id', 'movie__genres', 'total', 'n')
+    ):
+        if genre_id is not None:  # Türü olmayan filmler
+            genre_stats[user_id][str(genre_id)] = {'sum': total, 'n': n}
+    
+    decade_stats = {user_id: {} for user_id in totals}
+    for user_id, decade, total, n in (
+        ratings.filter(movie__release_date__isnull=False)
+        .annotate(decade=_decade_case())
+        .values('user_id', 'decade')
+        .annotate(total=Sum('score'), n=Count('id'))
+        .values_list('user_id', 'decade', 'total', 'n')
+    ):
+        decade_stats[user_id][decade] = {'sum': total, 'n': n}
+    
+    now = timezone.now()
+    with transaction.atomic():
+        UserTasteProfile.objects.bulk_create(
+            [UserTasteProfile(user_id=user_id) for user_id in totals],
+            ignore_conflicts=True,
+        )
+        profiles = list(UserTasteProfile.objects.filter(user_id__in=list(totals)))
+        for profile in profiles:
+            row = totals[profile.user_id]
+            profile.genre_stats = genre_stats[profile.user_id]
+            profile.decade_stats = decade_stats[profile.user_id]
+            profile.rating_sum = row['total']
+            profile.total_rated_movies = row['n']
+            profile.derive_from_stats()
+            profile.updated_at = now
+        _write_profiles(profiles)
+    
+    # Doğrudan yazım post_save sinyali göndermez
+    invalidate_users_recommendations(totals)
+    return len(profiles)
+
+
+def _write_profiles(profiles: List, batch_size: int = 1000):
+    """
+    Profilleri tek UPDATE cümlesiyle (executemany) yaz
+    bulk_update'in satır başına CASE/WHEN ifadesi üretme maliyetinden
+    kaçınmak için kullanılır.
+    """
+    from apps.recommendations.models import UserTasteProfile
+    
+    meta = UserTasteProfile._meta
+    fields = [meta.get_field(name) for name in _BULK_FIELDS]
+    qn = connection.ops.quote_name
+    sql = (
+        f"UPDATE {qn(meta.db_table)} SET "
+        f"{', '.join(f'{qn(f.column)} = %s' for f in fields)} "
+        f"WHERE {qn(meta.pk.column)} = %s"
+    )
+    rows = [
+        [f.get_db_prep_save(getattr(p, f.attname), connection) for f in fields] + [p.pk]
+        for p in profiles
+    ]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+
+
+def _user_id_ranges(user_ids: List[int], chunk_size: int) -> List[tuple]:
+    return [
+        (user_ids[start], user_ids[min(start + chunk_size, len(user_ids)) - 1])
+        for start in range(0, len(user_ids), chunk_size)
+    ]
+
+
+def _rebuild_range(bounds) -> int:
+    return rebuild_profiles_range(*bounds)
+
+
+def bulk_rebuild_profiles(
+    user_ids: List[int] = None,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    workers: int = 1,
+    progress=None,
+) -> Dict:
+    """
+    Puanı olan tüm (veya verilen) kullanıcıların profillerini toplu hesapla
+    
+    Args:
+        user_ids: Sadece bu kullanıcılar (parçalar ID aralığı olduğundan
+                  aradaki diğer kullanıcılar da hesaplanabilir)
+        chunk_size: Parça başına kullanıcı sayısı
+        workers: >1 ise parçalar process havuzuna dağıtılır (her process
+                 kendi DB bağlantısını açar; eşzamanlı yazım için
+                 PostgreSQL önerilir)
+        progress: Her parça sonrası çağrılır: progress(işlenen, toplam)
+    
+    Returns:
+        {'users', 'chunks', 'seconds', 'users_per_sec'}
+    """
+    from apps.movies.models import Rating
+    
+    start = time.perf_counter()
+    queryset = Rating.objects.order_by('user_id').values_list('user_id', flat=True).distinct()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    ranges = _user_id_ranges(list(queryset), chunk_size)
+    
+    done = 0
+    total = len(ranges)
+    if workers > 1 and len(ranges) > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        
+        # Fork edilen process'ler ebeveynin bağlantısını paylaşmasın
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for index, count in enumerate(pool.map(_rebuild_range, ranges), 1):
+                done += count
+                if progress:
+                    progress(index, total)
+    else:
+        for index, bounds in enumerate(ranges, 1):
+            done += rebuild_profiles_range(*bounds)
+            if progress:
+                progress(index, total)
+    
+    seconds = time.perf_counter() - start
+    return {
+        'users': done,
+        'chunks': len(ranges),
+        'seconds': seconds,
+        'users_per_sec': done / seconds if seconds else 0.0,
+    }
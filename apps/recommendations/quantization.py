@@ -0,0 +1,166 @@
+"""
+Serving Network
+===============
+Servis için küçültülmüş NCF ağı (export_serving_bundle --network / --quantize).
+
+- Kullanıcı tabloları atılır: uygulama kullanıcıları fold-in ile
+  çözülür (foldin.FoldIn), sadece başlangıç noktası olan ortalama
+  kullanıcı vektörü tek satır olarak tutulur.
+- Item tabloları sadece Movie'ye eşlenen filmlerle sınırlanır; satırlar
+  bundle'daki movie_ids sırasındadır (item index = bundle satırı).
+- quantize: item embedding'leri satır başına simetrik int8 (+ float32
+  ölçek) saklanır; skorlama katmanları torch dynamic quantization ile
+  int8 çalışır (NCFScorer(quantize=True)). Fold-in gradyanı için MLP
+  ağırlıkları float32 saklanır (birkaç yüz KB).
+"""
+
+from typing import Dict
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from apps.recommendations.ncf_model import NCFModel, NCFScorer
+
+
+class QuantizedEmbedding(nn.Module):
+    """Satır başına simetrik int8 embedding tablosu (nn.Embedding yerine)"""
+    
+    def __init__(self, codes: torch.Tensor, scales: torch.Tensor):
+        super().__init__()
+        self.register_buffer('codes', codes)     # (n, dim) int8
+        self.register_buffer('scales', scales)   # (n,) float32
+    
+    @classmethod
+    def from_float(cls, weight: torch.Tensor) -> 'QuantizedEmbedding':
+        weight = weight.detach().float()
+        scales = weight.abs().amax(dim=1) / 127.0
+        scales = torch.where(scales > 0, scales, torch.ones_like(scales))
+        codes = torch.round(weight / scales[:, None]).clamp(-127, 127).to(torch.int8)
+        return cls(codes, scales)
+    
+    @classmethod
+    def empty(cls, num_embeddings: int, embedding_dim: int) -> 'QuantizedEmbedding':
+        """load_state_dict için boş tablo"""
+        return cls(
+            torch.zeros((num_embeddings, embedding_dim), dtype=torch.int8),
+            torch.ones(num_embeddings),
+        )
+    
+    @property
+    def num_embeddings(self) -> int:
+        return self.codes.shape[0]
+    
+    @property
+    def embedding_dim(self) -> int:
+        return self.codes.shape[1]
+    
+    @property
+    def weight(self) -> torch.Tensor:
+        """Geri açılmış float32 tablo"""
+        return self.codes.float() * self.scales[:, None]
+    
+    def forward(self, ids: torch.Tensor) -> torch.Tensor:
+        return self.codes[ids].float() * self.scales[ids].unsqueeze(-1)
+
+
+def _mlp_layers(model: NCFModel) -> list:
+    return [layer.out_features for layer in model.mlp if isinstance(layer, nn.Linear)]
+
+
+def prune_for_serving(model: NCFModel, item_rows: np.ndarray, quantize: bool = False) -> NCFModel:
+    """
+    Kullanıcı tablosu ortalama vektöre indirgenmiş, sadece item_rows
+    filmlerini içeren model (item i = item_rows[i])
+    """
+    rows = torch.as_tensor(np.asarray(item_rows, dtype=np.int64))
+    pruned = NCFModel(
+        num_users=1, num_items=len(rows), embedding_dim=model.embedding_dim, mlp_layers=_mlp_layers(model)
+    )
+    with torch.no_grad():
+        pruned.user_embedding_gmf.weight.copy_(model.user_embedding_gmf.weight.mean(dim=0, keepdim=True))
+        pruned.user_embedding_mlp.weight.copy_(model.user_embedding_mlp.weight.mean(dim=0, keepdim=True))
+        pruned.item_embedding_gmf.weight.copy_(model.item_embedding_gmf.weight[rows])
+        pruned.item_embedding_mlp.weight.copy_(model.item_embedding_mlp.weight[rows])
+    pruned.mlp.load_state_dict(model.mlp.state_dict())
+    pruned.neumf.load_state_dict(model.neumf.state_dict())
+    if quantize:
+        pruned.item_embedding_gmf = QuantizedEmbedding.from_float(pruned.item_embedding_gmf.weight)
+        pruned.item_embedding_mlp = QuantizedEmbedding.from_float(pruned.item_embedding_mlp.weight)
+    return pruned.eval()
+
+
+def save_network(model: NCFModel, path: str, quantized: bool = False):
+    torch.save({
+        'num_items': model.num_items,
+        'embedding_dim': model.embedding_dim,
+        'mlp_layers': _mlp_layers(model),
+        'quantized': quantized,
+        'state_dict': model.state_dict(),
+    }, path)
+
+
+def load_network(path: str) -> NCFModel:
+    """save_network çıktısını yükle (eval modunda)"""
+    data = torch.load(path, map_location='cpu', weights_only=True)
+    model = NCFModel(
+        num_users=1, num_items=data['num_items'], embedding_dim=data['embedding_dim'],
+        mlp_layers=data['mlp_layers'],
+    )
+    if data['quantized']:
+        model.item_embedding_gmf = QuantizedEmbedding.empty(data['num_items'], data['embedding_dim'])
+        model.item_embedding_mlp = QuantizedEmbedding.empty(data['num_items'], data['embedding_dim'])
+    model.load_state_dict(data['state_dict'])
+    return model.eval()
+
+
+def network_bytes(model: NCFModel) -> int:
+    """Parametre + buffer boyutu (byte)"""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def score_agreement(
+    reference: NCFModel,
+    served: NCFModel,
+    item_rows: np.ndarray,
+    quantize: bool = False,
+    users: int = 100,
+    k: int = 10,
+    seed: int = 42,
+) -> Dict:
+    """
+    Servis ağının skorlarının tam float32 modelle karşılaştırılması
+    
+    Rastgele eğitim kullanıcılarının kendi embedding'leriyle eşlenen tüm
+    filmler iki modelde skorlanır.
+    
+    Returns:
+        {'users', 'max_abs', 'mean_abs', 'topk_overlap'} - topk_overlap:
+        ortak top-k film oranı (ortalama)
+    """
+    item_rows = np.asarray(item_rows, dtype=np.int64)
+    served_rows = np.arange(len(item_rows))
+    k = min(k, len(item_rows))
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(reference.num_users, min(users, reference.num_users), replace=False)
+    
+    reference_scorer = NCFScorer(reference)
+    served_scorer = NCFScorer(served, quantize=quantize)
+    max_abs, abs_sum, overlap = 0.0, 0.0, 0.0
+    for user_id in sample.tolist():
+        vector = reference.get_user_embedding(user_id)
+        expected = reference_scorer.score(vector, item_rows)
+        scores = served_scorer.score(vector, served_rows)
+        diff = np.abs(scores - expected)
+        max_abs = max(max_abs, float(diff.max()))
+        abs_sum += float(diff.mean())
+        top_expected = np.argpartition(-expected, k - 1)[:k]
+        top_served = np.argpartition(-scores, k - 1)[:k]
+        overlap += len(np.intersect1d(top_expected, top_served)) / k
+    return {
+        'users': len(sample),
+        'max_abs': max_abs,
+        'mean_abs': abs_sum / len(sample),
+        'topk_overlap': overlap / len(sample),
+    }
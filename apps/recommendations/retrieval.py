@@ -0,0 +1,283 @@
+"""
+Candidate Retrieval
+===================
+recommend() için çok kaynaklı aday üretimi.
+
+Her kaynak (tür posting listeleri, NCF embedding top-k, favori
+yönetmen/oyuncu filmleri, yeni çıkanlar, popülerlik) filtrelenmiş aday
+queryset'inden hızlıca birkaç yüz ID getirir. Sonuçlar sırayla
+(round-robin) birleştirilip tekrarlar atılır ve sınırlı bir havuz olarak
+skorlamaya verilir.
+
+Bütçeler (kaynak başına):
+- Aday kotası (share * limit) kesindir: kaynağın döndürdüğü fazla ID'ler
+  kesilir ve birleştirmede kaynak kotasından fazla yer kaplayamaz. Boş
+  kalan yerleri PopularSource (share 1.0) doldurur.
+- Gecikme bütçesi (budget_ms) yumuşaktır: çalışan sorgu kesilmez
+  (GenreSource türler arasında kontrol eder); aşım over_budget sayacına
+  yazılır, toplam bütçe aşılınca sonraki opsiyonel kaynaklar atlanır.
+
+Sayaçlar stats() ile okunur.
+"""
+
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+from django.db.models import Q
+
+
+class CandidateSource:
+    """
+    Aday kaynağı
+    
+    Alt sınıflar fetch() metodunu uygular ve en iyiden kötüye sıralı
+    movie_id listesi döndürür.
+    """
+    
+    name = 'base'
+    share = 0.25          # Havuz limitinin bu kaynağa ayrılan oranı (kesin kota)
+    budget_ms = 30.0      # Gecikme bütçesi (yumuşak)
+    required = False      # Toplam bütçe aşılsa da çalıştır
+    
+    def quota(self, limit: int) -> int:
+        return max(1, int(limit * self.share))
+    
+    def fetch(self, context, base, limit: int, deadline: float) -> List[int]:
+        raise NotImplementedError
+
+
+class EmbeddingSource(CandidateSource):
+    """Beğenilen filmlerin NCF embedding ortalamasına en yakın filmler"""
+    
+    name = 'embedding'
+    share = 0.35
+    budget_ms = 20.0
+    OVERFETCH = 3         # Filtrelerle elenecekler için fazladan çekilen oran
+    
+    def fetch(self, context, base, limit, deadline):
+        index = context.embedding_index
+        query = context.liked_vector
+        if index is None or query is None:
+            return []
+        
+        # Görülen filmler burada değil base queryset'inde elenir (exclude_watched);
+        # onlar kadar fazladan çekilir ki kota boşa gitmesin
+        movie_ids, _ = index.top_k(query, limit * self.OVERFETCH + len(context.seen_ids))
+        ranked = movie_ids.tolist()
+        allowed = set(base.filter(id__in=ranked).values_list('id', flat=True))
+        return [m for m in ranked if m in allowed][:limit]
+
+
+class GenreSource(CandidateSource):
+    """
+    Kullanıcının en sevdiği türlerin posting listeleri
+    Her türün payı genre_weights ile orantılıdır.
+    """
+    
+    name = 'genre'
+    share = 0.35
+    budget_ms = 40.0
+    MAX_GENRES = 3
+    
+    def fetch(self, context, base, limit, deadline):
+        weights = context.profile.genre_weights or {}
+        top = sorted(
+            ((int(g), w) for g, w in weights.items() if w > 0),
+            key=lambda x: x[1],
+            reverse=True,
+        )[:self.MAX_GENRES]
+        total = sum(w for _, w in top)
+        if not total:
+            return []
+        
+        result = []
+        for genre_id, weight in top:
+            # Bütçe dolduysa kalan türleri atla (kısmi sonuç)
+            if time.perf_counter() > deadline:
+                break
+            quota = max(1, round(limit * weight / total))
+            result.extend(
+                base.filter(genres__id=genre_id)
+                .order_by('-popularity', 'id')
+                .values_list('id', flat=True)[:quota]
+            )
+        return result
+
+
+class PeopleSource(CandidateSource):
+    """Favori yönetmen ve oyuncuların filmleri"""
+    
+    name = 'people'
+    share = 0.2
+    budget_ms = 30.0
+    
+    def fetch(self, context, base, limit, deadline):
+        profile = context.profile
+        condition = Q()
+        if profile.favorite_directors:
+            condition |= Q(crew__person_id__in=profile.favorite_directors, crew__job='Director')
+        if profile.favorite_actors:
+            condition |= Q(cast__person_id__in=profile.favorite_actors, cast__cast_order__lt=5)
+        if not condition:
+            return []
+        
+        return list(
+            base.filter(condition)
+            .order_by('-popularity', 'id')
+            .values_list('id', flat=True)
+            .distinct()[:limit]
+        )
+
+
+class RecentSource(CandidateSource):
+    """Son yıllarda çıkan popüler filmler"""
+    
+    name = 'recent'
+    share = 0.15
+    budget_ms = 20.0
+    YEARS = 3
+    
+    def fetch(self, context, base, limit, deadline):
+        since = date.today() - timedelta(days=365 * self.YEARS)
+        return list(
+            base.filter(release_date__gte=since)
+            .order_by('-popularity', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+
+
+class PopularSource(CandidateSource):
+    """
+    Popülerlik sırası (eski aday havuzu)
+    Diğer kaynaklar yetersiz kalırsa havuzu tamamlar.
+    """
+    
+    name = 'popular'
+    share = 1.0
+    budget_ms = 20.0
+    required = True
+    
+    def fetch(self, context, base, limit, deadline):
+        return list(
+            base.order_by('-popularity', 'id').values_list('id', flat=True)[:limit]
+        )
+
+
+class CandidateRetriever:
+    """
+    Kaynakları çalıştırıp sınırlı, tekrarsız aday havuzu oluştur
+    
+    Sayaçlar (kaynak başına):
+        calls, hits (dönen ID), kept (havuza giren), over_budget,
+        skipped (toplam bütçe aşıldığı için çalıştırılmadı), errors, total_ms
+    """
+    
+    TOTAL_BUDGET_MS = 120.0
+    
+    def __init__(self, sources: List[CandidateSource] = None, total_budget_ms: float = None):
+        self.sources = sources if sources is not None else default_sources()
+        self.total_budget_ms = total_budget_ms or self.TOTAL_BUDGET_MS
+        self._lock = threading.Lock()
+        self._stats = {}
+    
+    def _record(self, name: str, **values):
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                'calls': 0, 'hits': 0, 'kept': 0, 'over_budget': 0,
+                'skipped': 0, 'errors': 0, 'total_ms': 0.0,
+            })
+            for key, value in values.items():
+                stats[key] += value
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Kaynak başına sayaçların kopyası (ortalama süre dahil)"""
+        with self._lock:
+            snapshot = {name: dict(values) for name, values in self._stats.items()}
+        for values in snapshot.values():
+            values['avg_ms'] = values['total_ms'] / values['calls'] if values['calls'] else 0.0
+        return snapshot
+    
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+    
+    def retrieve(self, context, base, limit: int) -> List[int]:
+        """
+        Args:
+            context: UserContext
+            base: Filtreleri uygulanmış Movie queryset'i
+            limit: Havuz boyutu
+        
+        Returns:
+            Tekrarsız movie_id listesi (en fazla limit)
+        """
+        start = time.perf_counter()
+        results = []
+        quotas = {}
+        for source in self.sources:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms > self.total_budget_ms and not source.required:
+                self._record(source.name, skipped=1)
+                continue
+            
+            source_start = time.perf_counter()
+            deadline = source_start + source.budget_ms / 1000
+            quota = source.quota(limit)
+            try:
+                ids = source.fetch(context, base, quota, deadline)[:quota]
+            except Exception as e:
+                print(f"[WARN] Aday kaynagi hatasi ({source.name}): {e}")
+                self._record(source.name, errors=1)
+                ids = []
+            took_ms = (time.perf_counter() - source_start) * 1000
+            self._record(
+                source.name,
+                calls=1,
+                hits=len(ids),
+                total_ms=took_ms,
+                over_budget=int(took_ms > source.budget_ms),
+            )
+            results.append((source.name, ids))
+            quotas[source.name] = quota
+        
+        pool, kept = merge(results, limit, quotas)
+        for name, count in kept.items():
+            self._record(name, kept=count)
+        return pool
+
+
+def merge(results, limit: int, quotas: Dict[str, int] = None):
+    """
+    Kaynak sonuçlarını sırayla (her kaynaktan birer ID) birleştir
+    quotas verilirse bir kaynak havuza kotasından fazla ID ekleyemez.
+    
+    Returns:
+        (movie_id listesi, kaynak başına havuza giren ID sayısı)
+    """
+    pool = []
+    seen = set()
+    kept = {name: 0 for name, _ in results}
+    quotas = quotas or {}
+    iterators = [(name, iter(ids)) for name, ids in results]
+    while iterators and len(pool) < limit:
+        active = []
+        for name, iterator in iterators:
+            if kept[name] >= quotas.get(name, limit):
+                continue
+            for movie_id in iterator:
+                if movie_id not in seen:
+                    seen.add(movie_id)
+                    pool.append(movie_id)
+                    kept[name] += 1
+                    active.append((name, iterator))
+                    break
+            if len(pool) >= limit:
+                break
+        iterators = active
+    return pool, kept
+
+
+def default_sources() -> List[CandidateSource]:
+    return [EmbeddingSource(), GenreSource(), PeopleSource(), RecentSource(), PopularSource()]
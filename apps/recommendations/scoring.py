@@ -0,0 +1,333 @@
+"""
+Batch Scoring
+=============
+Aday filmlerin özelliklerini tek seferde yükleyip (tür, yönetmen, oyuncu,
+oy istatistikleri) content / collaborative / popülerlik skorlarını NumPy
+dizi işlemleriyle hesaplar.
+
+HybridRecommender.get_*_score metodlarının vektörel karşılıklarıdır; aynı
+formülleri kullanır, sadece film başına sorgu atmaz.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from apps.movies.models import Movie, MovieCast, MovieCrew
+
+
+# Tek sorguda gönderilecek maksimum ID sayısı (SQLite/PostgreSQL parametre limiti)
+ID_CHUNK_SIZE = 10000
+
+# get_content_score ile aynı bonuslar
+DIRECTOR_BONUS = 0.15
+ACTOR_BONUS = 0.1
+ACTOR_BONUS_MAX = 0.2
+TOP_CAST = 5
+
+
+def _chunks(ids: Sequence[int], size: int = ID_CHUNK_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _pairs(queryset_for_chunk, ids: Sequence[int]) -> np.ndarray:
+    """(movie_id, x) çiftlerini parça parça çekip (k, 2) int dizisine çevir"""
+    pairs = []
+    for chunk in _chunks(ids):
+        pairs.extend(queryset_for_chunk(chunk))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.array(pairs, dtype=np.int64)
+
+
+class RowIndex:
+    """movie_id dizisi -> satır indeksi (vektörel arama)"""
+    
+    def __init__(self, movie_ids: np.ndarray):
+        self._order = np.argsort(movie_ids, kind='stable')
+        self._sorted = movie_ids[self._order]
+    
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        return self._order[np.searchsorted(self._sorted, ids)]
+
+
+def candidate_rows(movie_ids: Sequence[int]) -> List[tuple]:
+    """
+    Aday havuzu için (movie_id, vote_average, vote_count) satırları
+    Havuz sırası korunur (eşit skorlarda sıralama buna göre).
+    """
+    rows = {}
+    for chunk in _chunks(list(movie_ids)):
+        rows.update(
+            (row[0], row)
+            for row in Movie.objects.filter(id__in=chunk).values_list('id', 'vote_average', 'vote_count')
+        )
+    return [rows[m] for m in movie_ids if m in rows]
+
+
+class CandidateFeatures:
+    """
+    Aday filmlerin skor hesaplamasında kullanılan özellikleri
+    
+    Satır sırası movie_ids ile aynıdır; ilişkiler (yönetmen, oyuncu)
+    (satır, person_id) çiftleri olarak tutulur.
+    """
+    
+    def __init__(
+        self,
+        movie_ids: np.ndarray,
+        vote_average: np.ndarray,
+        vote_count: np.ndarray,
+        genre_ids: np.ndarray,
+        genre_matrix: np.ndarray,
+        director_rows: np.ndarray,
+        director_persons: np.ndarray,
+        actor_rows: np.ndarray,
+        actor_persons: np.ndarray,
+    ):
+        self.movie_ids = movie_ids
+        self.vote_average = vote_average
+        self.vote_count = vote_count
+        self.genre_ids = genre_ids          # Sütun -> Genre.id
+        self.genre_matrix = genre_matrix    # (n_movies, n_genres) 0/1
+        self.director_rows = director_rows
+        self.director_persons = director_persons
+        self.actor_rows = actor_rows        # Sadece ilk 5 oyuncu
+        self.actor_persons = actor_persons
+        self.genre_counts = genre_matrix.sum(axis=1)
+    
+    def __len__(self):
+        return len(self.movie_ids)
+    
+    @classmethod
+    def empty(cls) -> 'CandidateFeatures':
+        empty_int = np.zeros(0, dtype=np.int64)
+        empty_float = np.zeros(0, dtype=np.float64)
+        return cls(
+            empty_int, empty_float, empty_float,
+            empty_int, np.zeros((0, 0), dtype=np.float64),
+            empty_int, empty_int, empty_int, empty_int,
+        )
+    
+    @classmethod
+    def load(cls, rows: Iterable[Sequence]) -> 'CandidateFeatures':
+        """
+        (movie_id, vote_average, vote_count) satırlarından özellikleri yükle
+        
+        Aday sayısından bağımsız olarak ilişki başına tek sorgu
+        (ID_CHUNK_SIZE'ı aşan listelerde parça başına bir sorgu) atılır.
+        """
+        rows = list(rows)
+        if not rows:
+            return cls.empty()
+        
+        movie_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        vote_average = np.array([r[1] or 0 for r in rows], dtype=np.float64)
+        vote_count = np.array([r[2] or 0 for r in rows], dtype=np.float64)
+        index = RowIndex(movie_ids)
+        id_list = movie_ids.tolist()
+        
+        # Türler (M2M ara tablosu)
+        through = Movie.genres.through
+        genre_pairs = _pairs(
+            lambda chunk: through.objects.filter(movie_id__in=chunk).values_list('movie_id', 'genre_id'),
+            id_list,
+        )
+        genre_ids, genre_cols = np.unique(genre_pairs[:, 1], return_inverse=True)
+        genre_matrix = np.zeros((len(movie_ids), len(genre_ids)), dtype=np.float64)
+        genre_matrix[index.rows(genre_pairs[:, 0]), genre_cols] = 1.0
+        
+        # Yönetmenler
+        director_pairs = _pairs(
+            lambda chunk: MovieCrew.objects.filter(movie_id__in=chunk, job='Director')
+            .values_list('movie_id', 'person_id'),
+            id_list,
+        )
+        director_rows = index.rows(director_pairs[:, 0])
+        director_persons = director_pairs[:, 1]
+        
+        # Oyuncular (film başına cast_order'a göre ilk 5)
+        cast_pairs = _pairs(
+            lambda chunk: MovieCast.objects.filter(movie_id__in=chunk)
+            .order_by('movie_id', 'cast_order', 'id')
+            .values_list('movie_id', 'person_id'),
+            id_list,
+        )
+        c_movies = cast_pairs[:, 0]
+        # Her filmin grubu içindeki sıra (sorgu movie_id'ye göre sıralı)
+        starts = np.r_[0, np.flatnonzero(np.diff(c_movies)) + 1] if len(c_movies) else np.zeros(0, dtype=np.int64)
+        group_sizes = np.diff(np.r_[starts, len(c_movies)])
+        position = np.arange(len(c_movies)) - np.repeat(starts, group_sizes)
+        keep = position < TOP_CAST
+        actor_rows = index.rows(c_movies[keep])
+        actor_persons = cast_pairs[keep, 1]
+        
+        return cls(
+            movie_ids, vote_average, vote_count,
+            genre_ids, genre_matrix,
+            director_rows, director_persons,
+            actor_rows, actor_persons,
+        )
+
+
+def content_scores(profile, features: CandidateFeatures) -> np.ndarray:
+    """get_content_score'un vektörel hali (0-1)"""
+    n = len(features)
+    if not profile or not profile.genre_weights:
+        return np.full(n, 0.5)
+    
+    if sum(profile.genre_weights.values()) == 0:
+        return np.full(n, 0.5)
+    
+    # Tür benzerliği (filmin türleri üzerinden ağırlık ortalaması)
+    weights = np.array(
+        [profile.genre_weights.get(str(g), 0) for g in features.genre_ids],
+        dtype=np.float64,
+    )
+    counts = features.genre_counts
+    genre_sum = features.genre_matrix @ weights if len(weights) else np.zeros(n)
+    scores = np.where(counts > 0, genre_sum / np.maximum(counts, 1), 0.0)
+    
+    # Favori yönetmen bonusu
+    if profile.favorite_directors and len(features.director_rows):
+        hit = np.isin(features.director_persons, list(profile.favorite_directors))
+        has_director = np.zeros(n, dtype=bool)
+        has_director[features.director_rows[hit]] = True
+        scores = scores + DIRECTOR_BONUS * has_director
+    
+    # Favori oyuncu bonusu (oyuncu başına +0.1, max 0.2)
+    if profile.favorite_actors and len(features.actor_rows):
+        hit = np.isin(features.actor_persons, list(profile.favorite_actors))
+        matches = np.bincount(features.actor_rows[hit], minlength=n)
+        scores = scores + np.minimum(ACTOR_BONUS * matches, ACTOR_BONUS_MAX)
+    
+    return np.clip(scores, 0.0, 1.0)
+
+
+def collaborative_scores(
+    features: CandidateFeatures,
+    has_likes: bool,
+    liked_genre_ids: Iterable[int],
+    liked_vector: Optional[np.ndarray] = None,
+    embedding_index=None,
+    ncf_scores: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    get_collaborative_score'un vektörel hali (0-1)
+    
+    Fold-in NCF tahmini (ncf_scores, NaN olmayanlar) varsa o, yoksa
+    embedding'i olan filmler için beğeni vektörüyle cosine benzerliği,
+    diğerleri için beğenilen türlerle Jaccard benzerliği kullanılır.
+    """
+    n = len(features)
+    scores = np.full(n, 0.5)
+    if not has_likes:
+        return scores
+    
+    # Fallback: tür Jaccard benzerliği
+    liked_genre_ids = set(liked_genre_ids)
+    if liked_genre_ids:
+        liked_mask = np.isin(features.genre_ids, list(liked_genre_ids)).astype(np.float64)
+        if len(liked_mask):
+            intersection = features.genre_matrix @ liked_mask
+        else:
+            intersection = np.zeros(n)
+        union = len(liked_genre_ids) + features.genre_counts - intersection
+        scores = np.where(union > 0, intersection / np.maximum(union, 1), 0.5)
+    
+    # NCF embedding benzerliği (ItemEmbeddingIndex, tek matris çarpımı)
+    if liked_vector is not None and embedding_index is not None and len(embedding_index):
+        sims = embedding_index.similarity(liked_vector, features.movie_ids)
+        found = ~np.isnan(sims)
+        scores[found] = (sims[found].astype(np.float64) + 1) / 2
+    
+    # Fold-in NCF tahmini (tek batch'li forward, UserContext.ncf_scores)
+    if ncf_scores is not None:
+        found = ~np.isnan(ncf_scores)
+        scores[found] = ncf_scores[found]
+    
+    return scores
+
+
+def popularity_scores(features: CandidateFeatures) -> np.ndarray:
+    """get_popularity_score'un vektörel hali (0-1)"""
+    vote_score = features.vote_average / 10.0
+    count_bonus = np.where(
+        features.vote_count > 0,
+        np.minimum(np.log10(features.vote_count + 1) / 5, 0.2),
+        0.0,
+    )
+    return np.minimum(vote_score + count_bonus, 1.0)
+
+
+def rank(final_scores: np.ndarray, n: int) -> np.ndarray:
+    """En yüksek n skorun satır indeksleri (eşitlikte orijinal sıra korunur)"""
+    order = np.argsort(-final_scores, kind='stable')
+    return order[:n]
+
+
+def movies_by_id(movie_ids: List[int]) -> Dict[int, Movie]:
+    """Sıralanmış ID'ler için Movie nesnelerini tek sorguda getir"""
+    return Movie.objects.in_bulk(movie_ids)
+
+
+def content_score_matrix(profiles: List, features: CandidateFeatures) -> np.ndarray:
+    """
+    Birden çok profil için content_scores (m, n) matrisi
+    
+    Tür ağırlıkları tek matris çarpımıyla, favori yönetmen/oyuncu
+    bonusları sadece favori kişiler üzerinden kurulan küçük sayım
+    matrisleriyle hesaplanır. Her satır content_scores(profile) ile aynıdır.
+    """
+    m, n = len(profiles), len(features)
+    scores = np.full((m, n), 0.5)
+    active = [
+        i for i, p in enumerate(profiles)
+        if p and p.genre_weights and sum(p.genre_weights.values()) != 0
+    ]
+    if not active or not n:
+        return scores
+    
+    # Tür benzerliği (filmin türleri üzerinden ağırlık ortalaması)
+    weights = np.array(
+        [[profiles[i].genre_weights.get(str(g), 0) for g in features.genre_ids] for i in active],
+        dtype=np.float64,
+    ).reshape(len(active), len(features.genre_ids))
+    counts = features.genre_counts
+    genre_sum = weights @ features.genre_matrix.T if len(features.genre_ids) else np.zeros((len(active), n))
+    block = np.where(counts > 0, genre_sum / np.maximum(counts, 1), 0.0)
+    
+    # Favori yönetmen bonusu
+    directors = _favourite_hits(
+        [profiles[i].favorite_directors for i in active],
+        features.director_rows, features.director_persons, n,
+    )
+    block += DIRECTOR_BONUS * (directors > 0)
+    
+    # Favori oyuncu bonusu (oyuncu başına +0.1, max 0.2)
+    actors = _favourite_hits(
+        [profiles[i].favorite_actors for i in active],
+        features.actor_rows, features.actor_persons, n,
+    )
+    block += np.minimum(ACTOR_BONUS * actors, ACTOR_BONUS_MAX)
+    
+    scores[active] = np.clip(block, 0.0, 1.0)
+    return scores
+
+
+def _favourite_hits(favourites: List, rows: np.ndarray, persons: np.ndarray, n: int) -> np.ndarray:
+    """(profil, film) başına filmdeki favori kişi sayısı"""
+    people = sorted({p for fav in favourites for p in (fav or [])})
+    if not people or not len(rows):
+        return np.zeros((len(favourites), n))
+    
+    column = {person: j for j, person in enumerate(people)}
+    membership = np.zeros((len(favourites), len(people)))
+    for i, fav in enumerate(favourites):
+        membership[i, [column[p] for p in set(fav or [])]] = 1.0
+    
+    hit = np.isin(persons, people)
+    incidence = np.zeros((n, len(people)))
+    np.add.at(incidence, (rows[hit], [column[p] for p in persons[hit].tolist()]), 1.0)
+    return membership @ incidence.T
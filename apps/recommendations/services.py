@@ -6,16 +6,26 @@ Content-Based + Collaborative Filtering hibrit öneri sistemi
 
 import os
 import pickle
+import threading
+import time
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from functools import cached_property
+from typing import List, Dict, Optional, Set, Tuple
 from collections import defaultdict
 
 from django.conf import settings
 from django.db.models import Q, Avg, Count
-from sklearn.metrics.pairwise import cosine_similarity
+from django.utils import timezone
 
+from apps.movies import cache as movie_cache
 from apps.movies.models import Movie, Rating, Genre
 from apps.recommendations.models import UserTasteProfile, MovieLensMapping, RecommendationLog
+from apps.recommendations import compatibility, group, neighbours, scoring
+from apps.recommendations.embeddings import ItemEmbeddingIndex
+from apps.recommendations.ann import IVFIndex, ann_path_for
+from apps.recommendations import model_registry
+from apps.recommendations.bundle import ServingBundle, load_bundle, mapping_path_for
+from apps.recommendations.retrieval import CandidateRetriever
 
 
 # Mood → Genre eşleştirmesi
@@ -29,6 +39,118 @@ MOOD_GENRE_MAP = {
 }
 
 
+class UserContext:
+    """
+    İstek boyunca kullanıcı verisi cache'i
+    
+    Profil, puanlar ve izlenenler bir kez yüklenir; skor metodları
+    (recommend, get_*_score) aynı nesneyi paylaşır. Singleton recommender üzerinde tutulmaz, istek başına oluşturulur.
+    """
+    
+    LIKED_THRESHOLD = 7       # Bu puan ve üstü "beğenildi"
+    DISLIKED_THRESHOLD = 4    # Bu puan ve altı "beğenilmedi" (fold-in negatifi)
+    LIKED_VECTOR_SIZE = 20    # Ortalama vektör için max film
+    
+    def __init__(
+        self,
+        user,
+        profile: UserTasteProfile,
+        embedding_index: Optional[ItemEmbeddingIndex] = None,
+        fold_in=None,
+    ):
+        from apps.movies.models import WatchedMovie
+        
+        self.user = user
+        self.profile = profile
+        self._embedding_index = embedding_index
+        self._fold_in = fold_in
+        
+        # movie_id -> puan (Rating varsayılan sırası: en yeni önce)
+        rating_rows = list(Rating.objects.filter(user=user).values_list('movie_id', 'score'))
+        self.scores: Dict[int, int] = dict(rating_rows)
+        self.rated_ids: Set[int] = set(self.scores)
+        self.liked_ids: List[int] = [
+            movie_id for movie_id, score in rating_rows if score >= self.LIKED_THRESHOLD
+        ]
+        self.watched_ids: Set[int] = set(
+            WatchedMovie.objects.filter(user=user).values_list('movie_id', flat=True)
+        )
+    
+    @property
+    def embedding_index(self) -> Optional[ItemEmbeddingIndex]:
+        return self._embedding_index
+    
+    @property
+    def seen_ids(self) -> Set[int]:
+        """Puanlanan + izlendi işaretlenen filmler"""
+        return self.rated_ids | self.watched_ids
+    
+    @cached_property
+    def watchlist_ids(self) -> Set[int]:
+        from apps.movies.models import Watchlist
+        return set(Watchlist.objects.filter(user=self.user).values_list('movie_id', flat=True))
+    
+    @cached_property
+    def liked_genre_ids(self) -> Set[int]:
+        """Beğenilen filmlerin türleri (tek sorgu)"""
+        if not self.liked_ids:
+            return set()
+        return set(
+            Movie.genres.through.objects.filter(movie_id__in=self.liked_ids)
+            .values_list('genre_id', flat=True)
+        )
+    
+    @cached_property
+    def liked_vector(self) -> Optional[np.ndarray]:
+        """Beğenilen filmlerin (ilk 20) ortalama NCF embedding'i"""
+        if not self._embedding_index or not self.liked_ids:
+            return None
+        return self._embedding_index.mean_vector(self.liked_ids[:self.LIKED_VECTOR_SIZE])
+    
+    @cached_property
+    def user_vector(self) -> Optional[np.ndarray]:
+        """
+        NCF fold-in kullanıcı vektörü (foldin.FoldIn)
+        Profilde aynı model için saklanmışsa okunur; yoksa çözülüp profile yazılır.
+        """
+        fold_in = self._fold_in
+        if fold_in is None or not self.liked_ids:
+            return None
+        profile = self.profile
+        if profile.user_vector and profile.user_vector_model == fold_in.key:
+            return np.asarray(profile.user_vector, dtype=np.float32)
+        
+        disliked = [m for m, score in self.scores.items() if score <= self.DISLIKED_THRESHOLD]
+        vector = fold_in.solve(self.liked_ids, disliked, seed=self.user.id)
+        if vector is None:
+            return None
+        profile.user_vector = vector.tolist()
+        profile.user_vector_model = fold_in.key
+        # update(): post_save (öneri cache temizliği) tetiklenmez; arada puan
+        # değiştiyse (updated_at farklı) eski vektör yazılmaz
+        UserTasteProfile.objects.filter(pk=profile.pk, updated_at=profile.updated_at).update(
+            user_vector=profile.user_vector, user_vector_model=fold_in.key
+        )
+        return vector
+    
+    def ncf_scores(self, movie_ids) -> Optional[np.ndarray]:
+        """Fold-in vektörüyle NCF tahminleri (tek batch; modelde olmayanlar NaN)"""
+        vector = self.user_vector
+        if vector is None:
+            return None
+        return self._fold_in.score(vector, movie_ids)
+
+
+class LoadedModel:
+    """Etkin model: embedding index'i, fold-in ve sürüm birlikte değiştirilir"""
+    
+    def __init__(self, index: Optional[ItemEmbeddingIndex] = None, version: Optional[str] = None, fold_in=None):
+        self.index = index
+        self.version = version
+        self.fold_in = fold_in    # foldin.FoldIn (checkpoint veya ağlı bundle yüklendiyse)
+        self.loaded_at = timezone.now()
+
+
 class HybridRecommender:
     """
     Hibrit Öneri Sistemi
@@ -42,21 +164,151 @@ class HybridRecommender:
     _item_map = None          # MovieLens ID -> Model index
     _ml_to_movie = None       # MovieLens ID -> Our Movie ID
     _movie_to_ml = None       # Our Movie ID -> MovieLens ID
-    _item_embeddings = None   # Film embedding cache
+    _active = None            # Etkin model (LoadedModel), tek atamayla değiştirilir
+    _loaded = False           # Model ilk kullanımda yüklenir (ensure_loaded)
+    _load_lock = threading.Lock()
+    _reload_lock = threading.Lock()
+    _checked_at = 0.0         # Son sürüm kontrolü (time.monotonic)
+    
+    CANDIDATE_LIMIT = 300     # Skorlanacak maksimum aday sayısı
+    batch_scoring = True      # False: film başına skor hesabı (eski yol)
+    cache_results = True      # recommend() sonuçlarını cache'le (apps.movies.cache)
     
     def __new__(cls):
+        # Model burada yüklenmez: import, migration, Celery ve model
+        # gerektirmeyen çağrılar (uyumluluk, grup) torch/checkpoint maliyeti ödemez
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._load_model()
+            cls._instance.retriever = CandidateRetriever()
         return cls._instance
     
+    @property
+    def _embeddings(self) -> Optional[ItemEmbeddingIndex]:
+        """Etkin modelin index'i (yükleme yapmaz)"""
+        return self._active.index if self._active else None
+    
+    @_embeddings.setter
+    def _embeddings(self, index: Optional[ItemEmbeddingIndex]):
+        self._active = LoadedModel(index, self._active.version if self._active else None)
+    
+    @property
+    def _embedding_index(self) -> Optional[ItemEmbeddingIndex]:
+        """Film embedding index'i (ilk erişimde model yüklenir)"""
+        self.ensure_loaded()
+        return self._embeddings
+    
+    @property
+    def _fold_in(self):
+        """Etkin modelin fold-in'i (NCF ağı yüklenmediyse None, yükleme yapmaz)"""
+        return self._active.fold_in if self._active else None
+    
+    @_embedding_index.setter
+    def _embedding_index(self, index: Optional[ItemEmbeddingIndex]):
+        self._embeddings = index
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        """Etkin model sürümü (model_registry dışından yüklendiyse None)"""
+        self.ensure_loaded()
+        return self._active.version if self._active else None
+    
+    def model_info(self) -> Dict:
+        """İzleme için etkin model bilgisi"""
+        self.ensure_loaded()
+        active = self._active
+        return {
+            'version': active.version if active else None,
+            'items': len(active.index) if active and active.index is not None else 0,
+            'loaded_at': active.loaded_at.isoformat() if active else None,
+        }
+    
+    def ensure_loaded(self):
+        """Model yüklenmemişse yükle (thread-safe, bir kez); yüklüyse sürüm kontrolü"""
+        if self._loaded:
+            self.check_for_update()
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._checked_at = time.monotonic()
+                self._load_model()
+                self._loaded = True
+    
+    def check_for_update(self, force: bool = False) -> bool:
+        """
+        MODEL_RELOAD_INTERVAL dolduysa etkin sürümü kontrol et, değiştiyse
+        yeni bundle'ı yükleyip değiştir
+        
+        Yükleme sırasında diğer istekler beklemez, eski modelle devam eder;
+        başlamış istekler başladıkları modeli (UserContext) kullanır.
+        
+        Returns:
+            Model değiştiyse True
+        """
+        interval = getattr(settings, 'MODEL_RELOAD_INTERVAL', 60)
+        now = time.monotonic()
+        if not force and (interval <= 0 or now - self._checked_at < interval):
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False  # Başka bir thread kontrol ediyor
+        try:
+            self._checked_at = now
+            version = model_registry.current_version()
+            current = self._active.version if self._active else None
+            if not version or version == current:
+                return False
+            active = self._open_version(version)
+            if active is None:
+                return False
+            self._active = active
+            print(f"[OK] Model surumu degisti: {current or '-'} -> {version} ({len(active.index)} film)")
+            return True
+        finally:
+            self._reload_lock.release()
+    
+    def _open_version(self, version: str) -> Optional['LoadedModel']:
+        """model_registry sürümünü aç (hata olursa None, etkin model korunur)"""
+        path = model_registry.version_path(version)
+        try:
+            bundle = ServingBundle.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARN] Model surumu {version} yuklenemedi: {e}")
+            return None
+        self._load_ann_index(os.path.join(path, 'ann.npz'), bundle.index)
+        return LoadedModel(bundle.index, version, self._bundle_fold_in(bundle))
+    
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Modeli önceden yükle (web worker'larda ilk isteğin beklememesi için)
+        background=True ise daemon thread'de; ilk istek yükleme bitene kadar bekler.
+        """
+        if self._loaded:
+            return None
+        if not background:
+            self.ensure_loaded()
+            return None
+        thread = threading.Thread(target=self.ensure_loaded, name='recommender-warmup', daemon=True)
+        thread.start()
+        return thread
+    
     def _load_model(self):
-        """NCF modelini ve mappingleri yükle"""
+        """
+        NCF modelini ve mappingleri yükle
+        Güncel serving bundle varsa (export_serving_bundle) checkpoint yerine
+        memory-map ile açılır.
+        """
         try:
             model_path = getattr(settings, 'NCF_MODEL_PATH', 'ncf_model.pkl')
-            mapping_path = model_path.replace('.pkl', '_ml_mapping.pkl')
+            mapping_path = mapping_path_for(model_path)
             
-            if os.path.exists(model_path):
+            # Sürümlü bundle (model_registry) varsa öncelikli
+            version = model_registry.current_version()
+            active = self._open_version(version) if version else None
+            if active is not None:
+                self._active = active
+                print(f"[OK] Model surumu {version} yuklendi ({len(active.index)} film)")
+            elif self._load_bundle(model_path):
+                self._load_ann_index(ann_path_for(model_path))
+            elif os.path.exists(model_path):
                 from apps.recommendations.ncf_model import NCFTrainer
                 trainer = NCFTrainer.load(model_path)
                 self._ncf_model = trainer.model
@@ -75,6 +327,8 @@ class HybridRecommender:
                 
                 # Film embedding'lerini önceden hesapla
                 self._precompute_embeddings()
+                self._enable_fold_in(model_path)
+                self._load_ann_index(ann_path_for(model_path))
             else:
                 print("[INFO] NCF modeli bulunamadi, sadece Content-Based kullanilacak")
                 self._ncf_model = None
@@ -82,29 +336,118 @@ class HybridRecommender:
             print(f"[WARN] NCF model yukleme hatasi: {e}")
             self._ncf_model = None
     
+    def _load_bundle(self, model_path: str) -> bool:
+        """Serving bundle'ı aç (torch ve checkpoint gerekmez)"""
+        try:
+            bundle = load_bundle(model_path, getattr(settings, 'NCF_BUNDLE_PATH', None))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARN] Serving bundle okunamadi, checkpoint kullanilacak: {e}")
+            return False
+        if bundle is None:
+            return False
+        
+        self._active = LoadedModel(
+            bundle.index, self._active.version if self._active else None, self._bundle_fold_in(bundle)
+        )
+        print(f"[OK] Serving bundle yuklendi: {bundle.path} ({len(bundle.index)} film)")
+        return True
+    
+    def _bundle_fold_in(self, bundle: ServingBundle):
+        """Bundle'daki küçültülmüş ağla fold-in (ağ yoksa veya okunamazsa None)"""
+        if not bundle.has_network or not len(bundle.index):
+            return None
+        try:
+            from apps.recommendations.foldin import FoldIn, model_key
+            
+            return FoldIn(
+                bundle.load_network(), bundle.index, np.arange(len(bundle.index)),
+                model_key(bundle.manifest['source']),
+                num_threads=getattr(settings, 'NCF_TORCH_THREADS', 1),
+                quantize=bundle.manifest['network']['quantized'],
+            )
+        except Exception as e:
+            print(f"[WARN] Bundle NCF agi yuklenemedi, fold-in kapali: {e}")
+            return None
+    
     def _precompute_embeddings(self):
-        """Film embedding'lerini önceden hesapla (performans için)"""
+        """Film embedding matrisini tek seferde oluştur (performans için)"""
         if self._ncf_model is None or not self._item_map:
             return
         
-        import torch
-        self._item_embeddings = {}
+        self._embeddings = ItemEmbeddingIndex.from_model(
+            self._ncf_model, self._item_map, self._ml_to_movie or {}
+        )
         
-        for ml_id, idx in self._item_map.items():
-            if ml_id in self._ml_to_movie:
-                movie_id = self._ml_to_movie[ml_id]
-                emb = self._ncf_model.get_item_embedding(idx)
-                self._item_embeddings[movie_id] = emb
+        print(f"[OK] {len(self._embeddings)} film embedding'i hesaplandi")
+    
+    def _enable_fold_in(self, model_path: str):
+        """Uygulama kullanıcıları için NCF fold-in (checkpoint ağı gerekir)"""
+        if self._embeddings is None or not len(self._embeddings):
+            return
+        from apps.recommendations.foldin import FoldIn, checkpoint_key
+        
+        movie_to_idx = ItemEmbeddingIndex.movie_item_rows(self._item_map, self._ml_to_movie or {})
+        index = self._embeddings
+        item_rows = np.array([movie_to_idx[int(m)] for m in index.movie_ids], dtype=np.int64)
+        self._active = LoadedModel(
+            index, self._active.version,
+            fold_in=FoldIn(
+                self._ncf_model, index, item_rows, checkpoint_key(model_path),
+                num_threads=getattr(settings, 'NCF_TORCH_THREADS', 1),
+            ),
+        )
+    
+    def _load_ann_index(self, ann_path: str, index: ItemEmbeddingIndex = None):
+        """build_ann_index ile oluşturulmuş yaklaşık arama index'ini yükle (opsiyonel)"""
+        index = index if index is not None else self._embeddings
+        if index is None or not os.path.exists(ann_path):
+            return
         
-        print(f"[OK] {len(self._item_embeddings)} film embedding'i hesaplandi")
+        ann = IVFIndex.load(ann_path, index.movie_ids, index.matrix)
+        if ann is None:
+            print(f"[WARN] ANN index modelle uyusmuyor, tam arama kullanilacak: {ann_path}")
+            return
+        
+        index.ann = ann
+        print(f"[OK] ANN index yuklendi: {ann.nlist} liste, nprobe={ann.nprobe}")
+    
+    def similar_by_embedding(
+        self,
+        query_vec: np.ndarray,
+        k: int = 100,
+        allowed_ids=None,
+        exclude_ids=None
+    ) -> List[Tuple[int, float]]:
+        """
+        Tüm katalog üzerinde embedding benzerliğiyle en yakın k film
+        NCF modeli yoksa boş liste döner.
+        """
+        index = self._embedding_index
+        if index is None or query_vec is None:
+            return []
+        movie_ids, scores = index.top_k(
+            query_vec, k, allowed_ids=allowed_ids, exclude_ids=exclude_ids
+        )
+        return [(int(m), float(s)) for m, s in zip(movie_ids, scores)]
     
     def get_or_create_profile(self, user) -> UserTasteProfile:
         """Kullanıcı profili al veya oluştur"""
         profile, created = UserTasteProfile.objects.get_or_create(user=user)
-        if created or not profile.genre_weights:
+        # Toplamlar sinyallerle güncel tutulur; sadece hiç hesaplanmamış
+        # (örn. bulk_create ile puan eklenmiş) profiller baştan kurulur
+        if (created or not profile.genre_weights) and user.ratings.exists():
             profile.update_from_ratings()
         return profile
     
+    def get_user_context(self, user) -> UserContext:
+        """İstek boyunca paylaşılacak kullanıcı verisini yükle"""
+        # Index ve fold-in aynı model sürümünden gelsin (tek okuma)
+        self.ensure_loaded()
+        active = self._active
+        index = active.index if active else None
+        fold_in = active.fold_in if active else None
+        return UserContext(user, self.get_or_create_profile(user), index, fold_in)
+    
     def get_content_score(self, profile: UserTasteProfile, movie: Movie) -> float:
         """
         Content-Based skor (0-1)
@@ -121,7 +464,7 @@ class HybridRecommender:
             return 0.5
         
         # Tür benzerliği (weighted average)
-        movie_genre_ids = list(movie.genres.values_list('id', flat=True))
+        movie_genre_ids = [g.id for g in movie.genres.all()]
         for genre_id in movie_genre_ids:
             weight = profile.genre_weights.get(str(genre_id), 0)
             score += weight
@@ -131,7 +474,7 @@ class HybridRecommender:
         
         # Favori yönetmen bonusu (+0.15)
         if profile.favorite_directors:
-            director_ids = list(movie.crew.filter(job='Director').values_list('person_id', flat=True))
+            director_ids = [c.person_id for c in movie.crew.all() if c.job == 'Director']
             for d_id in director_ids:
                 if d_id in profile.favorite_directors:
                     score += 0.15
@@ -139,7 +482,8 @@ class HybridRecommender:
         
         # Favori oyuncu bonusu (+0.1 per actor, max 0.2)
         if profile.favorite_actors:
-            actor_ids = list(movie.cast.all()[:5].values_list('person_id', flat=True))
+            # Prefetch edilmiş cast'te .values_list çalışmaz, person_id'yi nesneden al
+            actor_ids = [c.person_id for c in movie.cast.all()[:5]]
             actor_bonus = 0
             for a_id in actor_ids:
                 if a_id in profile.favorite_actors:
@@ -148,47 +492,38 @@ class HybridRecommender:
         
         return min(max(score, 0.0), 1.0)
     
-    def get_collaborative_score(self, user, movie: Movie) -> float:
+    def get_collaborative_score(self, user, movie: Movie, context: UserContext = None) -> float:
         """
         Collaborative Filtering skor (0-1)
         NCF embedding benzerliği kullan (varsa)
         """
+        if context is None:
+            context = self.get_user_context(user)
+        
+        # Fold-in NCF tahmini (model ağı yüklüyse)
+        ncf = context.ncf_scores([movie.id])
+        if ncf is not None and not np.isnan(ncf[0]):
+            return float(ncf[0])
+        
         # NCF embedding-based similarity
-        if self._item_embeddings and movie.id in self._item_embeddings:
+        index = context.embedding_index
+        if index and movie.id in index:
             try:
-                # Kullanıcının beğendiği filmler
-                user_ratings = Rating.objects.filter(user=user, score__gte=7)
-                if user_ratings.exists():
-                    liked_ids = list(user_ratings.values_list('movie_id', flat=True))
-                    
-                    # Beğenilen filmlerin embedding'leri
-                    liked_embeddings = []
-                    for lid in liked_ids[:20]:  # Max 20 film
-                        if lid in self._item_embeddings:
-                            liked_embeddings.append(self._item_embeddings[lid])
-                    
-                    if liked_embeddings:
-                        # Ortalama beğeni vektörü
-                        avg_liked = np.mean(liked_embeddings, axis=0)
-                        movie_emb = self._item_embeddings[movie.id]
-                        
-                        # Cosine similarity
-                        sim = cosine_similarity([avg_liked], [movie_emb])[0][0]
-                        return float((sim + 1) / 2)  # [-1,1] -> [0,1]
+                # Ortalama beğeni vektörü (context'te bir kez hesaplanır)
+                avg_liked = context.liked_vector
+                if avg_liked is not None:
+                    # Cosine similarity
+                    sim = index.similarity(avg_liked, [movie.id])[0]
+                    return float((sim + 1) / 2)  # [-1,1] -> [0,1]
             except Exception:
                 pass
         
         # Fallback: Basit item-based CF (tür benzerliği)
-        user_ratings = Rating.objects.filter(user=user, score__gte=7)
-        if not user_ratings.exists():
+        if not context.liked_ids:
             return 0.5
         
-        liked_movie_ids = list(user_ratings.values_list('movie_id', flat=True))
-        liked_genres = set()
-        for m in Movie.objects.filter(id__in=liked_movie_ids).prefetch_related('genres'):
-            liked_genres.update(m.genres.values_list('id', flat=True))
-        
-        movie_genres = set(movie.genres.values_list('id', flat=True))
+        liked_genres = context.liked_genre_ids
+        movie_genres = {g.id for g in movie.genres.all()}
         
         if not liked_genres:
             return 0.5
@@ -221,7 +556,10 @@ class HybridRecommender:
         era: str = None,
         genre_id: int = None,
         exclude_watched: bool = True,
-        exclude_watchlist: bool = False
+        exclude_watchlist: bool = False,
+        candidate_limit: int = None,
+        context: UserContext = None,
+        use_cache: bool = None
     ) -> List[Dict]:
         """
         Hibrit öneri al
@@ -235,13 +573,81 @@ class HybridRecommender:
             genre_id: Belirli tür filtresi
             exclude_watched: İzlenenleri hariç tut
             exclude_watchlist: Watchlist'tekileri hariç tut
+            candidate_limit: Skorlanacak maksimum aday sayısı (varsayılan CANDIDATE_LIMIT)
+            context: Önceden yüklenmiş kullanıcı verisi (yoksa yüklenir)
+            use_cache: Sonuç cache'i (varsayılan cache_results)
         
         Returns:
-            List of dicts with movie and scores
+            List of dicts with movie, scores and model_version
         """
         
-        # Kullanıcı profili
-        profile = self.get_or_create_profile(user)
+        # Sonuçlar hangi model sürümüyle üretildiğini taşır; sürüm değişince cache ayrışır
+        model_version = self.model_version
+        if use_cache is None:
+            use_cache = self.cache_results
+        if not use_cache:
+            return self._with_version(self._recommend(
+                user, n, mood, time_available, era, genre_id,
+                exclude_watched, exclude_watchlist, candidate_limit, context
+            ), model_version)
+        
+        # Cache: sadece ID ve skorlar saklanır, Movie nesneleri tek sorguda yüklenir
+        params = {
+            'n': n, 'mood': mood, 'time': time_available, 'era': era, 'genre': genre_id,
+            'exclude_watched': exclude_watched, 'exclude_watchlist': exclude_watchlist,
+            'limit': candidate_limit, 'model': model_version,
+        }
+        version = movie_cache.get_user_recommendations_version(user.id)
+        entries = movie_cache.get_cached_user_recommendations(user.id, version, params)
+        if entries is not None:
+            movies = scoring.movies_by_id([entry[0] for entry in entries])
+            return [
+                {
+                    'movie': movies[movie_id],
+                    'final_score': final,
+                    'content_score': content,
+                    'collab_score': collab,
+                    'pop_score': pop,
+                    'model_version': model_version,
+                }
+                for movie_id, final, content, collab, pop in entries
+                if movie_id in movies
+            ]
+        
+        results = self._with_version(self._recommend(
+            user, n, mood, time_available, era, genre_id,
+            exclude_watched, exclude_watchlist, candidate_limit, context
+        ), model_version)
+        movie_cache.cache_user_recommendations(user.id, version, params, [
+            (r['movie'].id, r['final_score'], r['content_score'], r['collab_score'], r['pop_score'])
+            for r in results
+        ])
+        return results
+    
+    @staticmethod
+    def _with_version(results: List[Dict], model_version: Optional[str]) -> List[Dict]:
+        for result in results:
+            result['model_version'] = model_version
+        return results
+    
+    def _recommend(
+        self,
+        user,
+        n: int,
+        mood: str,
+        time_available: str,
+        era: str,
+        genre_id: int,
+        exclude_watched: bool,
+        exclude_watchlist: bool,
+        candidate_limit: int,
+        context: UserContext
+    ) -> List[Dict]:
+        """recommend() hesaplaması (cache'siz)"""
+        # Kullanıcı verisi (profil, puanlar, izlenenler) tek seferde
+        if context is None:
+            context = self.get_user_context(user)
+        profile = context.profile
         
         # Ağırlıklar (cold start'a göre ayarla)
         if profile.total_rated_movies < 3:
@@ -255,6 +661,37 @@ class HybridRecommender:
             # Yeterli veri var
             content_w, collab_w, pop_w = 0.4, 0.5, 0.1
         
+        candidates = self._filtered_candidates(
+            context,
+            mood=mood,
+            time_available=time_available,
+            era=era,
+            genre_id=genre_id,
+            exclude_watched=exclude_watched,
+            exclude_watchlist=exclude_watchlist,
+        )
+        
+        limit = candidate_limit or self.CANDIDATE_LIMIT
+        weights = (content_w, collab_w, pop_w)
+        
+        # Aday havuzu: kaynaklardan birleştirilmiş, tekrarsız ID listesi
+        candidate_ids = self.retriever.retrieve(context, candidates, limit)
+        
+        if self.batch_scoring:
+            return self._score_batch(context, candidate_ids, weights, n)
+        return self._score_iterative(context, candidate_ids, weights, n)
+    
+    def _filtered_candidates(
+        self,
+        context: UserContext,
+        mood: str = None,
+        time_available: str = None,
+        era: str = None,
+        genre_id: int = None,
+        exclude_watched: bool = True,
+        exclude_watchlist: bool = False
+    ):
+        """recommend() filtrelerini uygulanmış aday queryset'i"""
         # Base queryset
         candidates = Movie.objects.filter(
             poster_path__isnull=False
@@ -262,20 +699,11 @@ class HybridRecommender:
         
         # İzlenenleri hariç tut (Rating + WatchedMovie)
         if exclude_watched:
-            from apps.movies.models import Watchlist, WatchedMovie
-            # Puanlanan filmler
-            rated_ids = set(Rating.objects.filter(user=user).values_list('movie_id', flat=True))
-            # İzlendi olarak işaretlenen filmler
-            watched_ids = set(WatchedMovie.objects.filter(user=user).values_list('movie_id', flat=True))
-            # Birleştir ve hariç tut
-            all_watched_ids = rated_ids | watched_ids
-            candidates = candidates.exclude(id__in=all_watched_ids)
+            candidates = candidates.exclude(id__in=context.seen_ids)
         
         # Watchlist'tekileri hariç tut
         if exclude_watchlist:
-            from apps.movies.models import Watchlist
-            watchlist_ids = Watchlist.objects.filter(user=user).values_list('movie_id', flat=True)
-            candidates = candidates.exclude(id__in=watchlist_ids)
+            candidates = candidates.exclude(id__in=context.watchlist_ids)
         
         # Mood filtresi
         if mood and mood in MOOD_GENRE_MAP:
@@ -304,14 +732,24 @@ class HybridRecommender:
         if genre_id:
             candidates = candidates.filter(genres__id=genre_id)
         
-        # Performans için limit
-        candidates = candidates.distinct().prefetch_related('genres', 'cast', 'crew')[:300]
+        # Tür join'i satırları çoğaltabilir; join yoksa DISTINCT popülerlik
+        # index'iyle sıralı taramayı engellediği için eklenmez
+        if (mood and mood in MOOD_GENRE_MAP) or genre_id:
+            candidates = candidates.distinct()
+        return candidates
+    
+    def _score_iterative(self, context: UserContext, candidate_ids: List[int], weights, n: int) -> List[Dict]:
+        """Film başına skor hesabı (eski yol, karşılaştırma için tutuluyor)"""
+        content_w, collab_w, pop_w = weights
+        
+        movies = Movie.objects.filter(id__in=candidate_ids).prefetch_related('genres', 'cast', 'crew')
+        by_id = {movie.id: movie for movie in movies}
         
-        # Skorları hesapla
+        # Skorları hesapla (havuz sırasıyla)
         scored_movies = []
-        for movie in candidates:
-            content_score = self.get_content_score(profile, movie)
-            collab_score = self.get_collaborative_score(user, movie)
+        for movie in (by_id[m] for m in candidate_ids if m in by_id):
+            content_score = self.get_content_score(context.profile, movie)
+            collab_score = self.get_collaborative_score(context.user, movie, context=context)
             pop_score = self.get_popularity_score(movie)
             
             final_score = (
@@ -333,146 +771,253 @@ class HybridRecommender:
         
         return scored_movies[:n]
     
+    def _score_batch(self, context: UserContext, candidate_ids: List[int], weights, n: int) -> List[Dict]:
+        """
+        Vektörel skor hesabı
+        Aday özellikleri tek seferde yüklenir, skorlar NumPy ile hesaplanır.
+        """
+        content_w, collab_w, pop_w = weights
+        
+        features = scoring.CandidateFeatures.load(scoring.candidate_rows(candidate_ids))
+        if not len(features):
+            return []
+        
+        content = scoring.content_scores(context.profile, features)
+        collab = scoring.collaborative_scores(
+            features,
+            has_likes=bool(context.liked_ids),
+            liked_genre_ids=context.liked_genre_ids,
+            liked_vector=context.liked_vector,
+            embedding_index=context.embedding_index,
+            ncf_scores=context.ncf_scores(features.movie_ids),
+        )
+        pop = scoring.popularity_scores(features)
+        final = content_w * content + collab_w * collab + pop_w * pop
+        
+        top_rows = scoring.rank(final, n)
+        top_ids = [int(features.movie_ids[row]) for row in top_rows]
+        movies = scoring.movies_by_id(top_ids)
+        
+        return [
+            {
+                'movie': movies[int(features.movie_ids[row])],
+                'final_score': float(final[row]),
+                'content_score': float(content[row]),
+                'collab_score': float(collab[row]),
+                'pop_score': float(pop[row]),
+            }
+            for row in top_rows
+            if int(features.movie_ids[row]) in movies
+        ]
+    
     def get_similar_movies(self, movie: Movie, n: int = 10) -> List[Movie]:
-        """Bir filme benzer filmler"""
-        
-        movie_genres = set(movie.genres.values_list('id', flat=True))
-        movie_directors = set(movie.crew.filter(job='Director').values_list('person_id', flat=True))
-        movie_actors = set(movie.cast.all()[:5].values_list('person_id', flat=True))
-        
-        candidates = Movie.objects.exclude(id=movie.id).filter(
-            poster_path__isnull=False
-        ).prefetch_related('genres', 'cast', 'crew')[:200]
-        
-        scored = []
-        for candidate in candidates:
-            score = 0.0
-            
-            # Tür benzerliği (0.5 weight)
-            cand_genres = set(candidate.genres.values_list('id', flat=True))
-            if movie_genres and cand_genres:
-                genre_sim = len(movie_genres & cand_genres) / len(movie_genres | cand_genres)
-                score += 0.5 * genre_sim
-            
-            # Yönetmen benzerliği (0.3 weight)
-            cand_directors = set(candidate.crew.filter(job='Director').values_list('person_id', flat=True))
-            if movie_directors & cand_directors:
-                score += 0.3
-            
-            # Oyuncu benzerliği (0.2 weight)
-            cand_actors = set(candidate.cast.all()[:5].values_list('person_id', flat=True))
-            if movie_actors and cand_actors:
-                actor_overlap = len(movie_actors & cand_actors) / 5
-                score += 0.2 * actor_overlap
-            
-            scored.append((candidate, score))
+        """
+        Bir filme benzer filmler
         
-        scored.sort(key=lambda x: x[1], reverse=True)
-        return [m for m, _ in scored[:n]]
+        Önce önceden hesaplanmış MovieNeighbour tablosuna bakılır (tek sorgu).
+        Film tabloda yoksa aynı türdeki 200 aday aynı formülle skorlanır.
+        """
+        similar = neighbours.similar_movies(movie.id, n)
+        if similar:
+            return similar
+        
+        candidate_ids = list(
+            Movie.objects.filter(genres__in=movie.genres.all(), poster_path__isnull=False)
+            .exclude(id=movie.id)
+            .values_list('id', flat=True)
+            .distinct()[:200]
+        )
+        if not candidate_ids:
+            return []
+        
+        scorer = neighbours.load_scorer([movie.id] + candidate_ids, self._embedding_index)
+        source_row = scoring.RowIndex(scorer.features.movie_ids).rows(np.array([movie.id]))
+        block = next(scorer.top_neighbours(source_row, n=n), None)
+        if block is None:
+            return []
+        _, cols, _ = block
+        top_ids = scorer.features.movie_ids[cols].tolist()
+        by_id = scoring.movies_by_id(top_ids)
+        return [by_id[m] for m in top_ids if m in by_id]
     
     def calculate_compatibility(self, user_a, user_b) -> Dict:
-        """İki kullanıcı arasında uyumluluk skoru"""
-        
-        profile_a = self.get_or_create_profile(user_a)
-        profile_b = self.get_or_create_profile(user_b)
-        
-        # 1. Tür benzerliği
-        all_genres = set(profile_a.genre_weights.keys()) | set(profile_b.genre_weights.keys())
-        if all_genres:
-            vec_a = [profile_a.genre_weights.get(g, 0) for g in all_genres]
-            vec_b = [profile_b.genre_weights.get(g, 0) for g in all_genres]
-            
-            if sum(vec_a) > 0 and sum(vec_b) > 0:
-                genre_sim = cosine_similarity([vec_a], [vec_b])[0][0]
-            else:
-                genre_sim = 0.5
-        else:
-            genre_sim = 0.5
-        
-        # 2. Ortak izlenen filmler (WatchedMovie tablosundan)
-        from apps.movies.models import WatchedMovie
-        watched_a = set(WatchedMovie.objects.filter(user=user_a).values_list('movie_id', flat=True))
-        watched_b = set(WatchedMovie.objects.filter(user=user_b).values_list('movie_id', flat=True))
-        common_movies = watched_a & watched_b
-        
-        if common_movies:
-            # Puan benzerliği (MAE tabanlı)
-            diffs = []
-            for movie_id in list(common_movies)[:50]:  # Performans limiti
-                try:
-                    r_a = Rating.objects.get(user=user_a, movie_id=movie_id).score
-                    r_b = Rating.objects.get(user=user_b, movie_id=movie_id).score
-                    diffs.append(abs(r_a - r_b))
-                except Rating.DoesNotExist:
-                    continue
-            
-            if diffs:
-                rating_sim = 1 - (sum(diffs) / len(diffs) / 10)
-            else:
-                rating_sim = 0.5
-        else:
-            rating_sim = 0.5
-        
-        # 3. Favori kişi benzerliği
-        common_actors = set(profile_a.favorite_actors or []) & set(profile_b.favorite_actors or [])
-        common_directors = set(profile_a.favorite_directors or []) & set(profile_b.favorite_directors or [])
-        person_sim = min((len(common_actors) + len(common_directors) * 2) / 10, 1.0)
+        """
+        İki kullanıcı arasında uyumluluk skoru (kaydetmeden)
+        Hesap compatibility.compute_pairs ile yapılır. Saklanan skor için
+        compatibility.get_compatibility.
+        """
+        result = compatibility.compute_pairs([(user_a.id, user_b.id)])
+        values = result[compatibility.pair_key(user_a.id, user_b.id)]
+        return {key: values[key] for key in compatibility.RESULT_KEYS}
+    
+    def recommend_for_group(
+        self,
+        users: List,
+        n: int = 10,
+        strategy: str = group.LEAST_MISERY,
+        mood: str = None,
+        time_available: str = None,
+        era: str = None,
+        genre_id: int = None,
+        candidate_limit: int = None,
+        use_cache: bool = None,
+    ) -> List[Dict]:
+        """
+        2-10 kişilik grup için ortak film önerileri
         
-        # Final skor
-        final_score = (genre_sim * 0.4) + (rating_sim * 0.4) + (person_sim * 0.2)
+        Args:
+            users: Grup üyeleri
+            strategy: least_misery, average veya fairness (group.aggregate)
+            mood, time_available, era, genre_id: recommend() ile aynı filtreler;
+                aday havuzu oluşturulurken uygulanır
+            candidate_limit: Aday havuzu boyutu (varsayılan CANDIDATE_LIMIT)
+            use_cache: Sonuç cache'i (varsayılan cache_results); kayıtlar
+                üyelerin öneri cache versiyonlarıyla anahtarlanır
         
-        return {
-            'score': int(final_score * 100),
-            'common_movies': len(common_movies),
-            'genre_similarity': int(genre_sim * 100),
-            'rating_similarity': int(rating_sim * 100),
-            'common_actors': len(common_actors),
-            'common_directors': len(common_directors),
+        Returns:
+            [{'movie', 'group_score', 'member_scores': {user_id: skor}, 'pop_score', 'model_version'}]
+            Skorlar 0-100 arası.
+        """
+        users = group.validate_members(users)
+        if strategy not in group.STRATEGIES:
+            raise ValueError(f"Bilinmeyen grup stratejisi: {strategy}")
+        
+        model_version = self.model_version
+        if use_cache is None:
+            use_cache = self.cache_results
+        if not use_cache:
+            return self._with_version(self._recommend_for_group(
+                users, n, strategy, mood, time_available, era, genre_id, candidate_limit
+            ), model_version)
+        
+        user_ids = [u.id for u in users]
+        params = {
+            'n': n, 'strategy': strategy, 'mood': mood, 'time': time_available,
+            'era': era, 'genre': genre_id, 'limit': candidate_limit, 'model': model_version,
         }
+        versions = movie_cache.get_group_recommendations_versions(user_ids)
+        entries = movie_cache.get_cached_group_recommendations(user_ids, versions, params)
+        if entries is not None:
+            movies = scoring.movies_by_id([entry[0] for entry in entries])
+            return [
+                {
+                    'movie': movies[movie_id],
+                    'group_score': group_score,
+                    'member_scores': dict(member_scores),
+                    'pop_score': pop,
+                    'model_version': model_version,
+                }
+                for movie_id, group_score, member_scores, pop in entries
+                if movie_id in movies
+            ]
+        
+        results = self._with_version(self._recommend_for_group(
+            users, n, strategy, mood, time_available, era, genre_id, candidate_limit
+        ), model_version)
+        movie_cache.cache_group_recommendations(user_ids, versions, params, [
+            (r['movie'].id, r['group_score'], r['member_scores'], r['pop_score'])
+            for r in results
+        ])
+        return results
     
-    def get_movies_for_both(self, user_a, user_b, n: int = 10) -> List[Dict]:
-        """İki kullanıcı için ortak film önerileri (birlikte izlemek için)"""
-        from apps.movies.models import WatchedMovie
-        
-        # Her iki kullanıcının da izlemediği filmler (Rating + WatchedMovie)
-        rated_a = set(Rating.objects.filter(user=user_a).values_list('movie_id', flat=True))
-        rated_b = set(Rating.objects.filter(user=user_b).values_list('movie_id', flat=True))
-        watched_a = set(WatchedMovie.objects.filter(user=user_a).values_list('movie_id', flat=True))
-        watched_b = set(WatchedMovie.objects.filter(user=user_b).values_list('movie_id', flat=True))
-        
-        all_watched = rated_a | rated_b | watched_a | watched_b
-        
-        profile_a = self.get_or_create_profile(user_a)
-        profile_b = self.get_or_create_profile(user_b)
-        
-        candidates = Movie.objects.exclude(id__in=all_watched).filter(
-            poster_path__isnull=False
-        ).prefetch_related('genres', 'cast', 'crew')[:200]
-        
-        scored = []
-        for movie in candidates:
-            score_a = self.get_content_score(profile_a, movie)
-            score_b = self.get_content_score(profile_b, movie)
-            
-            # Minimum skoru al (her ikisinin de sevmesi gerekiyor)
-            combined = min(score_a, score_b)
-            
-            # Popülerlik bonusu
-            pop_bonus = self.get_popularity_score(movie) * 0.2
-            combined += pop_bonus
-            
-            # Skorları yüzdelik olarak kaydet (0-100)
-            scored.append({
-                'movie': movie,
-                'combined_score': min(combined * 100, 100),
-                'score_a': min(score_a * 100, 100),
-                'score_b': min(score_b * 100, 100),
-            })
-        
-        scored.sort(key=lambda x: x['combined_score'], reverse=True)
-        return scored[:n]
+    def _recommend_for_group(
+        self,
+        users: List,
+        n: int,
+        strategy: str,
+        mood: str,
+        time_available: str,
+        era: str,
+        genre_id: int,
+        candidate_limit: int,
+    ) -> List[Dict]:
+        """recommend_for_group() hesaplaması (cache'siz)"""
+        context = group.GroupContext.load(users, self.get_or_create_profile, self._embedding_index)
+        candidates = self._filtered_candidates(
+            context,
+            mood=mood,
+            time_available=time_available,
+            era=era,
+            genre_id=genre_id,
+        )
+        candidate_ids = self.retriever.retrieve(context, candidates, candidate_limit or self.CANDIDATE_LIMIT)
+        
+        features = scoring.CandidateFeatures.load(scoring.candidate_rows(candidate_ids))
+        if not len(features):
+            return []
+        
+        # (üye, aday) skor matrisi tek geçişte
+        member_scores = scoring.content_score_matrix(context.profiles, features)
+        pop = scoring.popularity_scores(features)
+        final = group.aggregate(member_scores, strategy) + group.POPULARITY_BONUS * pop
+        
+        top_rows = scoring.rank(final, n)
+        movies = scoring.movies_by_id([int(features.movie_ids[row]) for row in top_rows])
+        
+        return [
+            {
+                'movie': movies[int(features.movie_ids[row])],
+                'group_score': min(float(final[row]) * 100, 100),
+                'member_scores': {
+                    user_id: min(float(member_scores[i, row]) * 100, 100)
+                    for i, user_id in enumerate(context.member_ids)
+                },
+                'pop_score': float(pop[row]),
+            }
+            for row in top_rows
+            if int(features.movie_ids[row]) in movies
+        ]
+    
+    def get_movies_for_both(
+        self,
+        user_a,
+        user_b,
+        n: int = 10,
+        mood: str = None,
+        time_available: str = None,
+        era: str = None,
+        genre_id: int = None,
+        use_cache: bool = None,
+    ) -> List[Dict]:
+        """
+        İki kullanıcı için ortak film önerileri (birlikte izlemek için)
+        Filtreler recommend() ile aynıdır (quick_match arkadaş modu).
+        """
+        results = self.recommend_for_group(
+            [user_a, user_b],
+            n=n,
+            strategy=group.LEAST_MISERY,
+            mood=mood,
+            time_available=time_available,
+            era=era,
+            genre_id=genre_id,
+            use_cache=use_cache,
+        )
+        return [
+            {
+                'movie': r['movie'],
+                'combined_score': r['group_score'],
+                'score_a': r['member_scores'][user_a.id],
+                'score_b': r['member_scores'][user_b.id],
+                'model_version': r['model_version'],
+            }
+            for r in results
+        ]
+
+
+def _reset_load_lock():
+    """
+    Fork sonrası çocuk process'te kilidi yenile (gunicorn --preload: ana
+    process'teki warm-up thread'i kilidi tutarken fork edilirse)
+    """
+    HybridRecommender._load_lock = threading.Lock()
+    HybridRecommender._reload_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_load_lock)
 
 
-# Singleton instance
+# Singleton instance (model ilk kullanımda yüklenir)
 recommender = HybridRecommender()
 
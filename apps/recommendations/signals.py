@@ -4,12 +4,14 @@ Recommendation Signals
 Otomatik profil oluşturma ve güncelleme
 """
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
-from apps.movies.models import Rating
+from apps.movies.cache import invalidate_user_recommendations
+from apps.movies.models import Rating, WatchedMovie, Watchlist
 from apps.recommendations.models import UserTasteProfile
+from apps.recommendations.profile_updates import apply_rating_change
 
 User = get_user_model()
 
@@ -21,13 +23,45 @@ def create_taste_profile(sender, instance, created, **kwargs):
         UserTasteProfile.objects.get_or_create(user=instance)
 
 
+@receiver(pre_save, sender=Rating)
+def remember_previous_rating(sender, instance, **kwargs):
+    """Güncellemede eski puanı sakla (profilden çıkarılmak üzere)"""
+    instance._previous_rating = None
+    if not instance._state.adding and instance.pk:
+        instance._previous_rating = (
+            Rating.objects.filter(pk=instance.pk).values_list('movie_id', 'score').first()
+        )
+
+
 @receiver(post_save, sender=Rating)
 def update_taste_profile_on_rating(sender, instance, **kwargs):
-    """Rating eklendiğinde/güncellendiğinde profili güncelle"""
+    """Rating eklendiğinde/güncellendiğinde profili artımlı güncelle"""
+    old = getattr(instance, '_previous_rating', None)
+    new = (instance.movie_id, instance.score)
+    if old == new:
+        return  # Sadece yorum vb. değişti
     try:
-        profile, created = UserTasteProfile.objects.get_or_create(user=instance.user)
-        # Profili güncelle (async olabilir, şimdilik sync)
-        profile.update_from_ratings()
+        apply_rating_change(instance.user_id, old=old, new=new)
     except Exception as e:
         print(f"Profil güncelleme hatası: {e}")
 
+
+@receiver(post_delete, sender=Rating)
+def update_taste_profile_on_rating_delete(sender, instance, **kwargs):
+    """Rating silindiğinde puanı profilden çıkar"""
+    try:
+        apply_rating_change(instance.user_id, old=(instance.movie_id, instance.score))
+    except Exception as e:
+        print(f"Profil güncelleme hatası: {e}")
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+@receiver(post_save, sender=WatchedMovie)
+@receiver(post_delete, sender=WatchedMovie)
+@receiver(post_save, sender=Watchlist)
+@receiver(post_delete, sender=Watchlist)
+@receiver(post_save, sender=UserTasteProfile)
+def invalidate_recommendations(sender, instance, **kwargs):
+    """Kullanıcının puan/izleme/watchlist/profil değişikliğinde öneri cache'ini temizle"""
+    invalidate_user_recommendations(instance.user_id)
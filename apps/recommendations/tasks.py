@@ -0,0 +1,48 @@
+"""
+Celery Tasks for Recommendations
+================================
+Öneri sistemi için periyodik görevler.
+"""
+
+from celery import shared_task
+
+
+@shared_task
+def refresh_movie_neighbours(full: bool = False):
+    """
+    Benzer film tablosunu güncelle (varsayılan: sadece değişen filmler)
+    """
+    from apps.recommendations.neighbours import refresh_neighbours
+    from apps.recommendations.services import recommender
+    
+    stats = refresh_neighbours(full=full, embedding_index=recommender._embedding_index)
+    return {'status': 'ok', **stats}
+
+
+@shared_task
+def refresh_compatibility_scores(full: bool = False):
+    """
+    Arkadaş çiftlerinin uyumluluk skorlarını güncelle (varsayılan: sadece
+    profili değişen çiftler)
+    """
+    from apps.recommendations.compatibility import refresh_compatibility
+    
+    stats = refresh_compatibility(full=full)
+    return {'status': 'ok', **stats}
+
+
+@shared_task
+def update_taste_profile(user_id: int):
+    """
+    Kullanıcı profilini yeniden hesapla (profile_updates.schedule_profile_update)
+    Bekleme anahtarı önce silinir; hesaplama sırasında gelen değişiklikler
+    yeni bir task zamanlar.
+    """
+    from django.core.cache import cache
+    from apps.recommendations.profile_updates import DEBOUNCE_KEY, rebuild_profile
+    
+    cache.delete(DEBOUNCE_KEY.format(user_id=user_id))
+    profile = rebuild_profile(user_id)
+    if profile is None:
+        return {'status': 'skipped', 'user_id': user_id}
+    return {'status': 'ok', 'user_id': user_id, 'total_rated_movies': profile.total_rated_movies}
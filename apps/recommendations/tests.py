@@ -1,3 +1,2073 @@
-from django.test import TestCase
+"""
+Recommendations App Tests
+=========================
+HybridRecommender ve skor hesaplama testleri
+"""
 
-# Create your tests here.
+import pytest
+from datetime import date
+
+from apps.movies.models import Movie, Person, MovieCast, MovieCrew, Rating
+from apps.recommendations.models import UserTasteProfile
+from apps.recommendations.services import HybridRecommender
+
+
+@pytest.fixture
+def catalog(db, create_genre):
+    """Tür, yönetmen ve oyuncuları olan küçük bir film kataloğu"""
+    genres = [create_genre(tmdb_id=tid, name=name) for tid, name in [
+        (28, 'Action'), (35, 'Comedy'), (18, 'Drama'), (27, 'Horror'),
+    ]]
+    people = [
+        Person.objects.create(tmdb_id=9000 + i, name=f'Person {i}')
+        for i in range(8)
+    ]
+    movies = []
+    for i in range(24):
+        movie = Movie.objects.create(
+            tmdb_id=50000 + i,
+            title=f'Film {i}',
+            original_title=f'Film {i}',
+            original_language='en',
+            poster_path=f'/poster{i}.jpg',
+            release_date=date(1995 + i, 1, 1),
+            runtime=80 + i * 3,
+            vote_average=4.0 + (i % 6),
+            vote_count=(i * 137) % 5000,
+            popularity=100.0 - i,
+        )
+        movie.genres.add(genres[i % 4], genres[(i * 3) % 4])
+        MovieCrew.objects.create(
+            movie=movie, person=people[i % 3], job='Director', department='Directing'
+        )
+        for order in range(7):
+            MovieCast.objects.create(
+                movie=movie,
+                person=people[(i + order) % 8],
+                character_name=f'Role {order}',
+                cast_order=order,
+            )
+        movies.append(movie)
+    return {'genres': genres, 'people': people, 'movies': movies}
+
+
+@pytest.fixture
+def rated_user(user, catalog, create_rating):
+    """Birkaç film puanlamış, favori kişileri olan kullanıcı"""
+    for i, score in enumerate([9, 8, 3, 7, 10, 2, 6, 8, 9, 4, 7, 8]):
+        create_rating(user, catalog['movies'][i], score=score)
+    profile = UserTasteProfile.objects.get(user=user)
+    profile.favorite_directors = [catalog['people'][1].id]
+    profile.favorite_actors = [catalog['people'][2].id, catalog['people'][5].id]
+    profile.save()
+    return user
+
+
+class TestBatchScoring:
+    """Vektörel skor hesabı testleri"""
+    
+    def _recommend(self, user, batch, **kwargs):
+        recommender = HybridRecommender()
+        previous = recommender.batch_scoring
+        recommender.batch_scoring = batch
+        try:
+            return recommender.recommend(user=user, use_cache=False, **kwargs)
+        finally:
+            recommender.batch_scoring = previous
+    
+    @pytest.mark.django_db
+    def test_batch_matches_iterative_ranking(self, rated_user):
+        """Batch ve film başına hesap aynı sıralamayı vermeli"""
+        batch = self._recommend(rated_user, True, n=10, exclude_watched=False)
+        iterative = self._recommend(rated_user, False, n=10, exclude_watched=False)
+        
+        assert [r['movie'].id for r in batch] == [r['movie'].id for r in iterative]
+        for b, it in zip(batch, iterative):
+            assert b['final_score'] == pytest.approx(it['final_score'])
+            assert b['content_score'] == pytest.approx(it['content_score'])
+            assert b['collab_score'] == pytest.approx(it['collab_score'])
+            assert b['pop_score'] == pytest.approx(it['pop_score'])
+    
+    @pytest.mark.django_db
+    def test_batch_matches_iterative_with_filters(self, rated_user, catalog):
+        """Filtreler iki yolda da aynı adayları üretmeli"""
+        genre_id = catalog['genres'][1].id
+        batch = self._recommend(rated_user, True, n=5, genre_id=genre_id, era='2000s')
+        iterative = self._recommend(rated_user, False, n=5, genre_id=genre_id, era='2000s')
+        
+        assert [r['movie'].id for r in batch] == [r['movie'].id for r in iterative]
+    
+    @pytest.mark.django_db
+    def test_batch_query_count_independent_of_candidates(
+        self, rated_user, django_assert_max_num_queries
+    ):
+        """Sorgu sayısı aday sayısıyla artmamalı"""
+        with django_assert_max_num_queries(15):
+            results = self._recommend(rated_user, True, n=5, exclude_watched=False)
+        assert len(results) == 5
+    
+    @pytest.mark.django_db
+    def test_batch_empty_candidates(self, user):
+        """Aday yoksa boş liste"""
+        assert self._recommend(user, True, n=5) == []
+
+
+class TestUserContext:
+    """İstek başına kullanıcı verisi testleri"""
+    
+    @pytest.mark.django_db
+    def test_context_loads_user_ids(self, rated_user, catalog):
+        """Puanlanan, beğenilen ve izlenen filmler bir kez yüklenir"""
+        from apps.movies.models import WatchedMovie
+        
+        movies = catalog['movies']
+        WatchedMovie.objects.create(user=rated_user, movie=movies[20])
+        context = HybridRecommender().get_user_context(rated_user)
+        
+        assert context.rated_ids == {m.id for m in movies[:12]}
+        assert set(context.liked_ids) == {
+            movies[i].id for i in [0, 1, 3, 4, 7, 8, 10, 11]
+        }
+        assert context.watched_ids == {movies[20].id}
+        assert movies[20].id in context.seen_ids
+    
+    @pytest.mark.django_db
+    def test_collaborative_score_uses_context(
+        self, rated_user, catalog, django_assert_num_queries
+    ):
+        """Context hazırsa film başına sorgu atılmamalı"""
+        recommender = HybridRecommender()
+        context = recommender.get_user_context(rated_user)
+        context.liked_genre_ids  # Tek seferlik sorgu
+        movies = list(Movie.objects.filter(id__in=[m.id for m in catalog['movies'][12:]])
+                      .prefetch_related('genres'))
+        
+        with django_assert_num_queries(0):
+            scores = [
+                recommender.get_collaborative_score(rated_user, m, context=context)
+                for m in movies
+            ]
+        assert all(0 <= s <= 1 for s in scores)
+    
+    @pytest.mark.django_db
+    def test_iterative_query_count_independent_of_candidates(
+        self, rated_user, django_assert_max_num_queries
+    ):
+        """Film başına yol da prefetch + context ile sabit sorgu atmalı"""
+        recommender = HybridRecommender()
+        recommender.batch_scoring = False
+        try:
+            with django_assert_max_num_queries(15):
+                recommender.recommend(user=rated_user, n=5, exclude_watched=False, use_cache=False)
+        finally:
+            recommender.batch_scoring = True
+    
+    @pytest.mark.django_db
+    def test_compatibility_rating_similarity_from_context(self, user, user2, catalog, create_rating):
+        """Ortak izlenen filmlerin puan farkı context'ten hesaplanır"""
+        from apps.movies.models import WatchedMovie
+        
+        movies = catalog['movies'][:2]
+        for movie, (score_a, score_b) in zip(movies, [(8, 6), (4, 4)]):
+            create_rating(user, movie, score=score_a)
+            create_rating(user2, movie, score=score_b)
+            WatchedMovie.objects.create(user=user, movie=movie)
+            WatchedMovie.objects.create(user=user2, movie=movie)
+        
+        result = HybridRecommender().calculate_compatibility(user, user2)
+        
+        assert result['common_movies'] == 2
+        assert result['rating_similarity'] == 90  # 1 - (2+0)/2/10
+    
+    @pytest.mark.django_db
+    def test_movies_for_both_excludes_seen(self, user, user2, catalog, create_rating):
+        """Her iki kullanıcının puanladığı filmler hariç tutulur"""
+        movies = catalog['movies']
+        create_rating(user, movies[0], score=9)
+        create_rating(user2, movies[1], score=9)
+        
+        results = HybridRecommender().get_movies_for_both(user, user2, n=30)
+        result_ids = {r['movie'].id for r in results}
+        
+        assert movies[0].id not in result_ids
+        assert movies[1].id not in result_ids
+        assert len(results) == len(movies) - 2
+
+
+class TestItemEmbeddingIndex:
+    """Film embedding matrisi testleri"""
+    
+    def _index(self, n=200, dim=16, seed=0):
+        import numpy as np
+        from apps.recommendations.embeddings import ItemEmbeddingIndex
+        
+        rng = np.random.default_rng(seed)
+        movie_ids = rng.permutation(np.arange(1000, 1000 + n))
+        vectors = rng.standard_normal((n, dim))
+        return ItemEmbeddingIndex(movie_ids, vectors), dict(zip(movie_ids.tolist(), vectors))
+    
+    def test_top_k_matches_brute_force(self):
+        """top_k sonuçları tam sıralamayla aynı olmalı"""
+        import numpy as np
+        
+        index, raw = self._index()
+        query = np.ones(16)
+        expected = sorted(
+            raw,
+            key=lambda m: -raw[m] @ query / np.linalg.norm(raw[m]) / np.linalg.norm(query)
+        )[:10]
+        
+        movie_ids, scores = index.top_k(query, 10)
+        
+        assert movie_ids.tolist() == expected
+        assert all(scores[i] >= scores[i + 1] for i in range(len(scores) - 1))
+    
+    def test_top_k_allowed_and_excluded(self):
+        """allowed_ids dışındaki ve exclude_ids'teki filmler dönmemeli"""
+        import numpy as np
+        
+        index, raw = self._index()
+        allowed = list(raw)[:50]
+        excluded = allowed[:10]
+        
+        movie_ids, _ = index.top_k(np.ones(16), 100, allowed_ids=allowed, exclude_ids=excluded)
+        
+        assert set(movie_ids.tolist()) == set(allowed) - set(excluded)
+    
+    def test_mean_vector_uses_raw_embeddings(self):
+        """Ortalama vektör normalize edilmemiş embedding'lerden hesaplanır"""
+        import numpy as np
+        
+        index, raw = self._index()
+        ids = list(raw)[:5] + [1]  # 1 index'te yok
+        
+        expected = np.mean([raw[m] for m in ids[:5]], axis=0)
+        assert np.allclose(index.mean_vector(ids), expected, atol=1e-5)
+        assert 1 not in index
+        assert index.rows([1])[0] == -1
+    
+    def test_from_model_matches_item_embedding(self):
+        """Matris satırları NCFModel.get_item_embedding ile aynı yönde olmalı"""
+        import numpy as np
+        from apps.recommendations.embeddings import ItemEmbeddingIndex
+        from apps.recommendations.ncf_model import NCFModel
+        
+        model = NCFModel(num_users=4, num_items=6, embedding_dim=8)
+        item_map = {101: 0, 102: 3, 103: 5}
+        ml_to_movie = {101: 7, 103: 9}
+        
+        index = ItemEmbeddingIndex.from_model(model, item_map, ml_to_movie)
+        
+        assert len(index) == 2
+        assert np.allclose(index.vector(7), model.get_item_embedding(0), atol=1e-6)
+        assert np.allclose(index.vector(9), model.get_item_embedding(5), atol=1e-6)
+        assert np.allclose(np.linalg.norm(index.matrix, axis=1), 1.0, atol=1e-6)
+    
+    @pytest.mark.django_db
+    def test_batch_matches_iterative_with_embeddings(self, rated_user, catalog):
+        """Embedding varken de iki skor yolu aynı sıralamayı vermeli"""
+        import numpy as np
+        from apps.recommendations.embeddings import ItemEmbeddingIndex
+        
+        rng = np.random.default_rng(1)
+        movie_ids = [m.id for m in catalog['movies'][::2]]
+        recommender = HybridRecommender()
+        previous = recommender._embedding_index
+        recommender._embedding_index = ItemEmbeddingIndex(movie_ids, rng.standard_normal((len(movie_ids), 8)))
+        try:
+            recommender.batch_scoring = True
+            batch = recommender.recommend(user=rated_user, n=10, exclude_watched=False, use_cache=False)
+            recommender.batch_scoring = False
+            iterative = recommender.recommend(user=rated_user, n=10, exclude_watched=False, use_cache=False)
+        finally:
+            recommender.batch_scoring = True
+            recommender._embedding_index = previous
+        
+        assert [r['movie'].id for r in batch] == [r['movie'].id for r in iterative]
+        for b, it in zip(batch, iterative):
+            assert b['collab_score'] == pytest.approx(it['collab_score'], abs=1e-5)
+
+
+class TestANNIndex:
+    """IVF-flat yaklaşık arama testleri"""
+    
+    def _index(self, n=600, dim=16, seed=0):
+        import numpy as np
+        from apps.recommendations.embeddings import ItemEmbeddingIndex
+        
+        rng = np.random.default_rng(seed)
+        centers = rng.standard_normal((12, dim))
+        vectors = centers[rng.integers(0, 12, size=n)] + 0.3 * rng.standard_normal((n, dim))
+        return ItemEmbeddingIndex(np.arange(1, n + 1), vectors)
+    
+    def test_all_probes_matches_exact(self):
+        """Tüm listeler taranınca sonuç tam aramayla aynı olmalı"""
+        import numpy as np
+        from apps.recommendations.ann import IVFIndex
+        
+        index = self._index()
+        query = index.matrix[7]
+        exact_ids, _ = index.top_k(query, 20)
+        
+        index.ann = IVFIndex.build(index.matrix, nlist=10)
+        index.ann.nprobe = index.ann.nlist
+        approx_ids, scores = index.top_k(query, 20)
+        
+        assert approx_ids.tolist() == exact_ids.tolist()
+        assert np.all(np.diff(scores) <= 1e-6)
+    
+    def test_tune_reaches_recall_target(self):
+        """tune hedef recall'ı sağlayan nprobe'u seçmeli"""
+        from apps.recommendations.ann import IVFIndex
+        
+        index = self._index()
+        ann = IVFIndex.build(index.matrix, nlist=24)
+        result = ann.tune(index.matrix, recall_target=0.9, k=10, n_queries=50)
+        
+        assert result['selected']['recall'] >= 0.9
+        assert ann.nprobe == result['selected']['nprobe']
+    
+    def test_top_k_excludes_with_ann(self):
+        """ANN yolunda da exclude_ids'teki filmler dönmemeli"""
+        from apps.recommendations.ann import IVFIndex
+        
+        index = self._index()
+        index.ann = IVFIndex.build(index.matrix, nlist=10)
+        query = index.matrix[0]
+        excluded = index.top_k(query, 5, exact=True)[0].tolist()
+        
+        movie_ids, _ = index.top_k(query, 10, exclude_ids=excluded)
+        
+        assert len(movie_ids) == 10
+        assert not set(movie_ids.tolist()) & set(excluded)
+    
+    def test_save_and_load(self, tmp_path):
+        """Farklı embedding matrisi için kaydedilmiş index yüklenmemeli"""
+        import numpy as np
+        from apps.recommendations.ann import IVFIndex, ann_path_for
+        
+        index = self._index()
+        ann = IVFIndex.build(index.matrix, nlist=10)
+        ann.nprobe = 3
+        path = ann_path_for(str(tmp_path / 'ncf_model.pkl'))
+        ann.save(path, index.movie_ids, index.matrix)
+        
+        loaded = IVFIndex.load(path, index.movie_ids, index.matrix)
+        assert path.endswith('ncf_model_ann.npz')
+        assert loaded.nprobe == 3
+        assert np.array_equal(loaded.list_rows, ann.list_rows)
+        assert IVFIndex.load(path, index.movie_ids[:-1]) is None
+    
+    def test_retrained_embeddings_rejected(self, tmp_path):
+        """Aynı filmler, yeniden eğitilmiş (farklı) vektörler: eski index yüklenmemeli"""
+        import numpy as np
+        from apps.recommendations.ann import IVFIndex
+        
+        index = self._index()
+        ann = IVFIndex.build(index.matrix, nlist=10)
+        path = str(tmp_path / 'ann.npz')
+        ann.save(path, index.movie_ids, index.matrix)
+        retrained = index.matrix[::-1].copy()
+        
+        assert IVFIndex.load(path, index.movie_ids, retrained) is None
+        
+        # Parmak izi olmayan (eski format) dosya da reddedilir
+        np.savez(path, centroids=ann.centroids, list_rows=ann.list_rows, offsets=ann.offsets,
+                 nprobe=np.array(3), movie_ids=index.movie_ids)
+        assert IVFIndex.load(path, index.movie_ids, index.matrix) is None
+        assert IVFIndex.load(path, index.movie_ids) is not None
+    
+    def test_side_file_paths(self):
+        """Yan dosya yolları sadece uzantıyı değiştirir, model dosyasının üzerine yazılmaz"""
+        from apps.recommendations.ann import ann_path_for
+        from apps.recommendations.bundle import bundle_path_for, mapping_path_for
+        
+        assert ann_path_for('models.pkl/ncf_model.pkl') == 'models.pkl/ncf_model_ann.npz'
+        assert ann_path_for('models/ncf_model') == 'models/ncf_model_ann.npz'
+        assert bundle_path_for('models/ncf_model.pt') == 'models/ncf_model_bundle'
+        assert mapping_path_for('models.pkl/ncf_model.pkl') == 'models.pkl/ncf_model_ml_mapping.pkl'
+
+
+def write_checkpoint(path, ml_to_movie=None, embedding_dim=8):
+    """Küçük NCF checkpoint'ı + mapping pickle'ı (item_map: 101-104)"""
+    import pickle
+    from apps.recommendations.bundle import mapping_path_for
+    from apps.recommendations.ncf_model import NCFModel, NCFTrainer
+    
+    model = NCFModel(num_users=4, num_items=6, embedding_dim=embedding_dim)
+    model_path = str(path)
+    NCFTrainer(model).save(model_path)
+    item_map = {101: 0, 102: 3, 103: 5, 104: 1}
+    with open(mapping_path_for(model_path), 'wb') as f:
+        pickle.dump({'item_map': item_map, 'ml_to_movie': ml_to_movie or {101: 9, 103: 7, 104: 8}}, f)
+    return model, model_path
+
+
+class TestServingBundle:
+    """Memory-map serving bundle testleri"""
+    
+    def _checkpoint(self, tmp_path):
+        return write_checkpoint(tmp_path / 'ncf_model.pkl')
+    
+    def test_export_and_load(self, tmp_path):
+        """Bundle memory-map ile açılır ve from_model ile aynı index'i verir"""
+        import numpy as np
+        from apps.recommendations.bundle import ServingBundle, bundle_path_for, export_bundle
+        
+        model, model_path = self._checkpoint(tmp_path)
+        manifest = export_bundle(model_path)
+        bundle = ServingBundle.load(bundle_path_for(model_path))
+        
+        assert manifest['items'] == 3
+        assert isinstance(bundle.index.matrix, np.memmap)
+        assert bundle.index.movie_ids.tolist() == [7, 8, 9]
+        assert bundle.arrays['item_rows'].tolist() == [5, 1, 0]
+        assert bundle.arrays['ml_ids'].tolist() == [101, 102, 103, 104]
+        assert bundle.arrays['ml_movie_ids'].tolist() == [9, -1, 7, 8]
+        assert np.allclose(bundle.index.vector(9), model.get_item_embedding(0), atol=1e-6)
+        query = bundle.index.matrix[0]
+        assert bundle.index.top_k(query, 3)[0].tolist()[0] == 7
+    
+    def test_stale_bundle_ignored(self, tmp_path):
+        """Checkpoint bundle'dan sonra değişirse bundle kullanılmaz"""
+        import os
+        from apps.recommendations.bundle import export_bundle, load_bundle
+        
+        _, model_path = self._checkpoint(tmp_path)
+        assert load_bundle(model_path) is None
+        
+        export_bundle(model_path)
+        assert load_bundle(model_path) is not None
+        
+        stat = os.stat(model_path)
+        os.utime(model_path, (stat.st_atime, stat.st_mtime + 10))
+        assert load_bundle(model_path) is None
+    
+    def test_recommender_loads_bundle(self, tmp_path, settings):
+        """Bundle varsa recommender checkpoint'ı açmadan embedding'leri yükler"""
+        from unittest import mock
+        from apps.recommendations.bundle import export_bundle
+        
+        _, model_path = self._checkpoint(tmp_path)
+        export_bundle(model_path)
+        settings.NCF_MODEL_PATH = model_path
+        
+        recommender = HybridRecommender()
+        previous = recommender._embedding_index
+        try:
+            with mock.patch('apps.recommendations.ncf_model.NCFTrainer.load') as load:
+                recommender._load_model()
+            assert not load.called
+            assert recommender._embedding_index.movie_ids.tolist() == [7, 8, 9]
+        finally:
+            recommender._embedding_index = previous
+
+
+class TestModelVersions:
+    """Sürümlü model bundle'ları ve hot reload testleri"""
+    
+    @pytest.fixture
+    def registry(self, tmp_path, settings, monkeypatch):
+        from apps.recommendations import services
+        
+        settings.MODEL_BUNDLE_ROOT = str(tmp_path / 'bundles')
+        settings.NCF_MODEL_PATH = str(tmp_path / 'missing.pkl')
+        monkeypatch.setattr(services.HybridRecommender, '_instance', None)
+        monkeypatch.setattr(services, 'recommender', services.HybridRecommender())
+        return tmp_path
+    
+    def test_publish_activate_rollback(self, registry):
+        """current işaretçisi değişir, art arda rollback geriye doğru ilerler"""
+        from apps.recommendations import model_registry
+        
+        _, model_path = write_checkpoint(registry / 'ncf_model.pkl')
+        for version in ['v1', 'v2', 'v3']:
+            model_registry.publish(model_path, version=version)
+        
+        assert model_registry.list_versions() == ['v1', 'v2', 'v3']
+        assert model_registry.current_version() == 'v3'
+        
+        assert model_registry.rollback()['version'] == 'v2'
+        assert model_registry.rollback()['version'] == 'v1'
+        with pytest.raises(ValueError):
+            model_registry.rollback()
+        with pytest.raises(ValueError):
+            model_registry.activate('v9')
+        assert model_registry.current_version() == 'v1'
+    
+    def test_worker_swaps_to_new_version(self, registry, settings):
+        """Kontrol aralığında yeni sürüm yüklenir; eski index'i tutan istek etkilenmez"""
+        from apps.recommendations import model_registry
+        from apps.recommendations.services import HybridRecommender
+        
+        _, first = write_checkpoint(registry / 'first.pkl')
+        _, second = write_checkpoint(registry / 'second.pkl', ml_to_movie={101: 1, 102: 2})
+        model_registry.publish(first, version='v1')
+        
+        recommender = HybridRecommender()
+        in_flight = recommender._embedding_index
+        assert recommender.model_version == 'v1'
+        
+        model_registry.publish(second, version='v2')
+        settings.MODEL_RELOAD_INTERVAL = 3600
+        assert not recommender.check_for_update()      # Aralık dolmadı
+        assert recommender.check_for_update(force=True)
+        
+        assert recommender.model_version == 'v2'
+        assert recommender._embedding_index.movie_ids.tolist() == [1, 2]
+        assert in_flight.movie_ids.tolist() == [7, 8, 9]
+        
+        model_registry.rollback()
+        settings.MODEL_RELOAD_INTERVAL = 0.001
+        import time
+        time.sleep(0.01)
+        assert recommender.model_version == 'v1'        # Erişimde kontrol
+    
+    @pytest.mark.django_db
+    def test_context_keeps_model_across_swap(self, registry, rated_user, catalog):
+        """Context oluşturulduktan sonra sürüm değişse de skorlar context'in modeliyle hesaplanır"""
+        from apps.recommendations import model_registry
+        from apps.recommendations.services import HybridRecommender
+        
+        movies = catalog['movies']
+        ml_to_movie = {101: movies[0].id, 102: movies[1].id, 103: movies[4].id, 104: movies[13].id}
+        _, first = write_checkpoint(registry / 'first.pkl', ml_to_movie=ml_to_movie)
+        _, second = write_checkpoint(registry / 'second.pkl', ml_to_movie=ml_to_movie, embedding_dim=4)
+        model_registry.publish(first, version='v1')
+        
+        recommender = HybridRecommender()
+        context = recommender.get_user_context(rated_user)
+        in_flight = context.embedding_index
+        assert in_flight is recommender._active.index
+        
+        model_registry.publish(second, version='v2')
+        assert recommender.check_for_update(force=True)
+        assert recommender._embedding_index.matrix.shape[1] != in_flight.matrix.shape[1]
+        
+        # Farklı boyutlu yeni index'le karşılaştırılsaydı similarity() hata verirdi
+        sim = in_flight.similarity(context.liked_vector, [movies[13].id])[0]
+        score = recommender.get_collaborative_score(rated_user, movies[13], context=context)
+        assert score == pytest.approx((sim + 1) / 2)
+        
+        results = recommender.recommend(user=rated_user, n=len(movies), context=context, use_cache=False)
+        by_id = {r['movie'].id: r for r in results}
+        assert movies[13].id in by_id
+        assert by_id[movies[13].id]['collab_score'] == pytest.approx(score)
+    
+    @pytest.mark.django_db
+    def test_version_in_results_and_cache(self, registry, rated_user, client):
+        """Sonuçlar model sürümünü taşır; sürüm değişince cache ayrışır"""
+        from apps.movies.cache import get_recommendation_cache_stats
+        from apps.recommendations import model_registry
+        from apps.recommendations.services import HybridRecommender
+        
+        _, model_path = write_checkpoint(registry / 'ncf_model.pkl')
+        model_registry.publish(model_path, version='v1')
+        recommender = HybridRecommender()
+        
+        assert {r['model_version'] for r in recommender.recommend(user=rated_user, n=3)} == {'v1'}
+        model_registry.publish(model_path, version='v2')
+        recommender.check_for_update(force=True)
+        assert {r['model_version'] for r in recommender.recommend(user=rated_user, n=3)} == {'v2'}
+        assert get_recommendation_cache_stats()['hits'] == 0
+        
+        rated_user.is_staff = True
+        rated_user.save()
+        client.force_login(rated_user)
+        assert client.get('/api/recommendations/stats/').json()['model']['version'] == 'v2'
+
+
+class TestLazyModelLoading:
+    """Model yüklemenin ilk kullanıma / web warm-up'a ertelenmesi"""
+    
+    @pytest.fixture
+    def fresh(self, monkeypatch):
+        from apps.recommendations import services
+        
+        calls = []
+        monkeypatch.setattr(services.HybridRecommender, '_instance', None)
+        monkeypatch.setattr(services.HybridRecommender, '_load_model', lambda self: calls.append(1))
+        return services.HybridRecommender(), calls
+    
+    def test_loaded_once_on_first_use(self, fresh):
+        """Oluşturma modeli yüklemez, ilk embedding erişimi bir kez yükler"""
+        recommender, calls = fresh
+        assert calls == []
+        
+        recommender._embedding_index
+        recommender._embedding_index
+        assert calls == [1]
+    
+    def test_background_warm_up(self, fresh):
+        """warm_up thread'i modeli yükler, yüklüyse tekrar başlatılmaz"""
+        recommender, calls = fresh
+        recommender.warm_up().join()
+        
+        assert calls == [1]
+        assert recommender.warm_up() is None
+    
+    def test_web_process_detection(self, monkeypatch):
+        """Sadece web sunucuları (ve runserver çocuk process'i) warm-up yapar"""
+        from apps.recommendations.apps import is_web_process
+        
+        monkeypatch.delenv('RUN_MAIN', raising=False)
+        assert is_web_process(['/usr/local/bin/gunicorn', 'config.wsgi'])
+        assert not is_web_process(['manage.py', 'migrate'])
+        assert not is_web_process(['/usr/local/bin/celery', '-A', 'config', 'worker'])
+        assert not is_web_process(['manage.py', 'runserver'])
+        monkeypatch.setenv('RUN_MAIN', 'true')
+        assert is_web_process(['manage.py', 'runserver'])
+
+
+class TestMovieNeighbours:
+    """Önceden hesaplanmış benzer film tablosu testleri"""
+    
+    def _expected_score(self, a, b):
+        """get_similar_movies formülünün film başına hali"""
+        genres_a = set(a.genres.values_list('id', flat=True))
+        genres_b = set(b.genres.values_list('id', flat=True))
+        directors_a = set(a.crew.filter(job='Director').values_list('person_id', flat=True))
+        directors_b = set(b.crew.filter(job='Director').values_list('person_id', flat=True))
+        actors_a = set(a.cast.order_by('cast_order')[:5].values_list('person_id', flat=True))
+        actors_b = set(b.cast.order_by('cast_order')[:5].values_list('person_id', flat=True))
+        
+        score = 0.5 * len(genres_a & genres_b) / len(genres_a | genres_b)
+        score += 0.3 if directors_a & directors_b else 0.0
+        score += 0.2 * len(actors_a & actors_b) / 5
+        return score
+    
+    @pytest.mark.django_db
+    def test_full_refresh_matches_formula(self, catalog):
+        """Tablodaki skorlar film başına formülle aynı, sıralama azalan"""
+        from apps.recommendations.models import MovieNeighbour
+        from apps.recommendations.neighbours import refresh_neighbours
+        
+        stats = refresh_neighbours(n=5)
+        movies = {m.id: m for m in catalog['movies']}
+        
+        assert stats['full'] and stats['movies'] == 24
+        assert MovieNeighbour.objects.count() == 24 * 5
+        source = catalog['movies'][0]
+        rows = list(MovieNeighbour.objects.filter(movie=source).order_by('rank'))
+        all_scores = sorted(
+            (self._expected_score(source, m) for m in movies.values() if m.id != source.id),
+            reverse=True,
+        )
+        assert [r.score for r in rows] == pytest.approx(all_scores[:5], abs=1e-5)
+        for row in rows:
+            assert row.score == pytest.approx(
+                self._expected_score(source, movies[row.neighbour_id]), abs=1e-5
+            )
+    
+    @pytest.mark.django_db
+    def test_similar_movies_single_query(self, catalog, django_assert_num_queries):
+        """Tablo hazırsa get_similar_movies tek sorgu atmalı"""
+        from apps.recommendations.models import MovieNeighbour
+        from apps.recommendations.neighbours import refresh_neighbours
+        
+        refresh_neighbours(n=5)
+        movie = catalog['movies'][3]
+        expected = list(
+            MovieNeighbour.objects.filter(movie=movie).order_by('rank')
+            .values_list('neighbour_id', flat=True)[:4]
+        )
+        
+        with django_assert_num_queries(1):
+            similar = HybridRecommender().get_similar_movies(movie, n=4)
+        assert [m.id for m in similar] == expected
+    
+    @pytest.mark.django_db
+    def test_fallback_without_table(self, catalog):
+        """Tablo boşken aynı türdeki adaylar aynı formülle skorlanır"""
+        movie = catalog['movies'][0]
+        
+        similar = HybridRecommender().get_similar_movies(movie, n=5)
+        scores = [self._expected_score(movie, m) for m in similar]
+        
+        assert len(similar) == 5
+        assert movie not in similar
+        assert scores == sorted(scores, reverse=True)
+        assert HybridRecommender().get_similar_movies(movie, n=0) == []
+    
+    @pytest.mark.django_db
+    def test_incremental_refresh_only_touched(self, catalog):
+        """Artımlı çalıştırma sadece güncellenen filmleri ve onları gösterenleri hesaplar"""
+        from apps.recommendations.models import MovieNeighbour
+        from apps.recommendations.neighbours import refresh_neighbours
+        
+        refresh_neighbours(n=3)
+        assert refresh_neighbours()['movies'] == 0
+        
+        touched = catalog['movies'][5]
+        touched.save()
+        pointing = set(
+            MovieNeighbour.objects.filter(neighbour=touched).values_list('movie_id', flat=True)
+        )
+        
+        stats = refresh_neighbours(n=3)
+        
+        assert not stats['full']
+        assert stats['movies'] == len(pointing | {touched.id})
+        assert MovieNeighbour.objects.count() == 24 * 3
+
+
+class TestCandidateRetrieval:
+    """Çok kaynaklı aday üretimi testleri"""
+    
+    def test_merge_round_robin_dedup(self):
+        """Kaynaklar sırayla birleşir, tekrarlar atılır, limit aşılmaz"""
+        from apps.recommendations.retrieval import merge
+        
+        pool, kept = merge([('a', [1, 2, 3]), ('b', [2, 4]), ('c', [5, 6, 7, 8])], limit=6)
+        
+        assert pool == [1, 2, 5, 3, 4, 6]
+        assert kept == {'a': 2, 'b': 2, 'c': 2}
+    
+    def test_merge_respects_quotas(self):
+        """Kotasını dolduran kaynak sıradan çıkar, boşluğu diğerleri doldurur"""
+        from apps.recommendations.retrieval import merge
+        
+        pool, kept = merge([('a', [1, 2, 3, 4]), ('b', [5, 6, 7, 8])], limit=6, quotas={'a': 2, 'b': 6})
+        
+        assert pool == [1, 5, 2, 6, 7, 8]
+        assert kept == {'a': 2, 'b': 4}
+    
+    @pytest.mark.django_db
+    def test_source_quota_enforced(self, rated_user):
+        """Kotasından fazla ID döndüren kaynak havuza kotası kadar girer"""
+        from apps.recommendations.retrieval import CandidateRetriever, CandidateSource, PopularSource
+        
+        class GreedySource(CandidateSource):
+            name = 'greedy'
+            share = 0.2
+            
+            def fetch(self, context, base, limit, deadline):
+                return list(base.order_by('popularity').values_list('id', flat=True))
+        
+        recommender = HybridRecommender()
+        context = recommender.get_user_context(rated_user)
+        base = recommender._filtered_candidates(context)
+        retriever = CandidateRetriever([GreedySource(), PopularSource()])
+        
+        pool = retriever.retrieve(context, base, 10)
+        stats = retriever.stats()
+        
+        assert len(pool) == 10
+        assert stats['greedy']['hits'] == 2 and stats['greedy']['kept'] == 2
+        assert stats['popular']['kept'] == 8
+    
+    @pytest.mark.django_db
+    def test_people_source_reaches_unpopular_movies(self, rated_user, catalog):
+        """Favori yönetmenin popüler olmayan filmi de havuza girer"""
+        from apps.recommendations.retrieval import CandidateRetriever, PeopleSource, PopularSource
+        
+        profile = UserTasteProfile.objects.get(user=rated_user)
+        profile.favorite_actors = []
+        profile.save()
+        recommender = HybridRecommender()
+        context = recommender.get_user_context(rated_user)
+        base = recommender._filtered_candidates(context)
+        director = catalog['people'][1]
+        least_popular = catalog['movies'][22]  # people[22 % 3] == people[1]
+        people = PeopleSource()
+        people.share = 1.0
+        
+        popular_only = CandidateRetriever([PopularSource()]).retrieve(context, base, 8)
+        retriever = CandidateRetriever([people, PopularSource()])
+        pool = retriever.retrieve(context, base, 8)
+        
+        assert least_popular.crew.filter(person=director, job='Director').exists()
+        assert least_popular.id not in popular_only
+        assert least_popular.id in pool
+        assert len(pool) == 8 and len(set(pool)) == 8
+        stats = retriever.stats()
+        assert stats['people']['calls'] == 1 and stats['people']['hits'] == 4
+        assert stats['popular']['kept'] + stats['people']['kept'] == 8
+    
+    @pytest.mark.django_db
+    def test_total_budget_skips_optional_sources(self, rated_user):
+        """Toplam bütçe aşılınca opsiyonel kaynaklar atlanır, zorunlu olan çalışır"""
+        from apps.recommendations.retrieval import (
+            CandidateRetriever, CandidateSource, GenreSource, PopularSource,
+        )
+        
+        class SlowSource(CandidateSource):
+            name = 'slow'
+            budget_ms = 1.0
+            
+            def fetch(self, context, base, limit, deadline):
+                import time
+                time.sleep(0.01)
+                return []
+        
+        recommender = HybridRecommender()
+        context = recommender.get_user_context(rated_user)
+        base = recommender._filtered_candidates(context)
+        retriever = CandidateRetriever(
+            [SlowSource(), GenreSource(), PopularSource()], total_budget_ms=5
+        )
+        
+        pool = retriever.retrieve(context, base, 10)
+        stats = retriever.stats()
+        
+        assert len(pool) == 10
+        assert stats['slow']['over_budget'] == 1
+        assert stats['genre']['skipped'] == 1 and stats['genre']['calls'] == 0
+        assert stats['popular']['calls'] == 1
+
+
+class TestRecommendationCache:
+    """recommend() sonuç cache'i testleri"""
+    
+    @pytest.mark.django_db
+    def test_second_call_served_from_cache(self, rated_user, django_assert_num_queries):
+        """Aynı parametrelerle ikinci çağrı tek sorguyla (Movie in_bulk) dönmeli"""
+        from apps.movies.cache import get_recommendation_cache_stats
+        
+        recommender = HybridRecommender()
+        first = recommender.recommend(user=rated_user, n=5, era='2000s')
+        
+        with django_assert_num_queries(1):
+            second = recommender.recommend(user=rated_user, n=5, era='2000s')
+        
+        assert [r['movie'].id for r in second] == [r['movie'].id for r in first]
+        assert [r['final_score'] for r in second] == [r['final_score'] for r in first]
+        assert get_recommendation_cache_stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+    
+    @pytest.mark.django_db
+    def test_parameters_are_part_of_key(self, rated_user):
+        """Farklı filtreler ayrı kayıtlardır"""
+        from apps.movies.cache import get_recommendation_cache_stats
+        
+        recommender = HybridRecommender()
+        recommender.recommend(user=rated_user, n=5)
+        recommender.recommend(user=rated_user, n=5, mood='happy')
+        recommender.recommend(user=rated_user, n=3)
+        
+        assert get_recommendation_cache_stats()['misses'] == 3
+    
+    @pytest.mark.django_db
+    def test_invalidated_on_user_activity(self, rated_user, catalog, create_rating):
+        """Rating, WatchedMovie ve Watchlist değişince cache geçersiz olmalı"""
+        from apps.movies.cache import get_recommendation_cache_stats
+        from apps.movies.models import Watchlist, WatchedMovie
+        
+        recommender = HybridRecommender()
+        movie = catalog['movies'][20]
+        actions = [
+            lambda: create_rating(rated_user, movie, score=9),
+            lambda: Rating.objects.filter(user=rated_user, movie=movie).delete(),
+            lambda: WatchedMovie.objects.create(user=rated_user, movie=movie),
+            lambda: Watchlist.objects.create(user=rated_user, movie=movie),
+            lambda: Watchlist.objects.filter(user=rated_user, movie=movie).delete(),
+        ]
+        recommender.recommend(user=rated_user, n=5)
+        for action in actions:
+            action()
+            recommender.recommend(user=rated_user, n=5)
+        
+        assert get_recommendation_cache_stats()['hits'] == 0
+        recommender.recommend(user=rated_user, n=5)
+        assert get_recommendation_cache_stats()['hits'] == 1
+    
+    @pytest.mark.django_db
+    def test_watched_movie_not_served_after_invalidation(self, rated_user):
+        """İzlenen film cache'ten tekrar önerilmemeli"""
+        from apps.movies.models import WatchedMovie
+        
+        recommender = HybridRecommender()
+        top = recommender.recommend(user=rated_user, n=5)[0]['movie']
+        WatchedMovie.objects.create(user=rated_user, movie=top)
+        
+        assert top.id not in [r['movie'].id for r in recommender.recommend(user=rated_user, n=5)]
+    
+    @pytest.mark.django_db
+    def test_write_with_stale_version_is_ignored(self, user):
+        """Hesaplama sırasında invalidate olursa sonuç okunmamalı"""
+        from apps.movies import cache as movie_cache
+        
+        params = {'n': 5}
+        version = movie_cache.get_user_recommendations_version(user.id)
+        movie_cache.invalidate_user_recommendations(user.id)
+        movie_cache.cache_user_recommendations(user.id, version, params, [(1, 1.0, 1.0, 1.0, 1.0)])
+        
+        current = movie_cache.get_user_recommendations_version(user.id)
+        assert current != version
+        assert movie_cache.get_cached_user_recommendations(user.id, current, params) is None
+    
+    @pytest.mark.django_db
+    def test_stats_endpoint_staff_only(self, client, user, rated_user):
+        """Sayaçlar sadece staff kullanıcılara açık"""
+        HybridRecommender().recommend(user=rated_user, n=5)
+        
+        client.force_login(user)
+        assert client.get('/api/recommendations/stats/').status_code == 302
+        
+        user.is_staff = True
+        user.save()
+        data = client.get('/api/recommendations/stats/').json()
+        assert data['cache']['misses'] == 1
+        assert 'popular' in data['retrieval']
+
+
+class TestProfileUpdates:
+    """Profil güncelleme zamanlaması testleri"""
+    
+    @pytest.fixture
+    def queued(self, monkeypatch, settings):
+        """Async mod: kuyruğa alınan task'ları kaydet"""
+        from apps.recommendations.tasks import update_taste_profile
+        
+        settings.PROFILE_UPDATE_ASYNC = True
+        calls = []
+        monkeypatch.setattr(
+            update_taste_profile, 'apply_async',
+            lambda args, countdown: calls.append((args, countdown))
+        )
+        return calls
+    
+    @pytest.mark.django_db
+    def test_sync_fallback_updates_immediately(self, user, catalog, create_rating):
+        """Async kapalıyken profil puan kaydıyla birlikte güncellenir"""
+        create_rating(user, catalog['movies'][0], score=8)
+        
+        assert UserTasteProfile.objects.get(user=user).total_rated_movies == 1
+    
+    @pytest.mark.django_db
+    def test_burst_collapses_into_one_task(self, user, queued, django_capture_on_commit_callbacks):
+        """Art arda istekler tek task oluşturmalı"""
+        from apps.recommendations.profile_updates import schedule_profile_update
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            for _ in range(5):
+                schedule_profile_update(user.id)
+        
+        assert queued == [([user.id], 5)]
+    
+    @pytest.mark.django_db
+    def test_task_rebuilds_and_releases_debounce(
+        self, user, catalog, create_rating, queued, django_capture_on_commit_callbacks
+    ):
+        """Task çalışınca profil güncellenir, sonraki istek yeni task zamanlar"""
+        from apps.recommendations.profile_updates import schedule_profile_update
+        from apps.recommendations.tasks import update_taste_profile
+        
+        create_rating(user, catalog['movies'][0], score=9)
+        create_rating(user, catalog['movies'][1], score=5)
+        with django_capture_on_commit_callbacks(execute=True):
+            schedule_profile_update(user.id)
+        
+        result = update_taste_profile(user.id)
+        
+        assert result['total_rated_movies'] == 2
+        with django_capture_on_commit_callbacks(execute=True):
+            schedule_profile_update(user.id)
+        assert len(queued) == 2
+    
+    @pytest.mark.django_db
+    def test_deferred_block_rebuilds_once(self, user, catalog, monkeypatch):
+        """Toplu yazımda profil blok sonunda bir kez hesaplanır"""
+        from apps.recommendations import profile_updates
+        
+        rebuilds = []
+        original = profile_updates.rebuild_profile
+        monkeypatch.setattr(
+            profile_updates, 'rebuild_profile',
+            lambda user_id: rebuilds.append(user_id) or original(user_id)
+        )
+        
+        with profile_updates.deferred_profile_updates(sync=True):
+            for movie in catalog['movies'][:6]:
+                Rating.objects.create(user=user, movie=movie, score=8)
+            assert rebuilds == []
+        
+        assert rebuilds == [user.id]
+        assert UserTasteProfile.objects.get(user=user).total_rated_movies == 6
+    
+    @pytest.mark.django_db
+    def test_onboarding_rebuilds_once(self, client_with_user, user, catalog, monkeypatch):
+        """Onboarding N puan için tek profil hesaplaması yapar"""
+        import json
+        from apps.recommendations import profile_updates
+        
+        rebuilds = []
+        original = profile_updates.rebuild_profile
+        monkeypatch.setattr(
+            profile_updates, 'rebuild_profile',
+            lambda user_id: rebuilds.append(user_id) or original(user_id)
+        )
+        payload = {'ratings': [{'movie_id': m.id, 'score': 8} for m in catalog['movies'][:5]]}
+        
+        response = client_with_user.post(
+            '/onboarding/', data=json.dumps(payload), content_type='application/json'
+        )
+        
+        assert response.status_code == 200
+        assert rebuilds == [user.id]
+        assert UserTasteProfile.objects.get(user=user).total_rated_movies == 5
+
+
+class TestIncrementalProfile:
+    """Artımlı profil toplamları testleri"""
+    
+    def _assert_matches_rebuild(self, user):
+        profile = UserTasteProfile.objects.get(user=user)
+        rebuilt = UserTasteProfile.objects.get(user=user)
+        rebuilt.update_from_ratings()
+        rebuilt.refresh_from_db()
+        
+        assert profile.stats_mismatches() == []
+        assert profile.genre_weights == rebuilt.genre_weights
+        assert profile.preferred_decades == rebuilt.preferred_decades
+        assert profile.average_rating == rebuilt.average_rating
+        assert profile.rating_style == rebuilt.rating_style
+        return profile
+    
+    @pytest.mark.django_db
+    def test_create_update_delete_match_full_rebuild(self, user, catalog, create_rating):
+        """Ekleme, puan değişikliği ve silme tam hesaplamayla aynı sonucu vermeli"""
+        movies = catalog['movies']
+        ratings = [create_rating(user, m, score=s) for m, s in zip(movies[:6], [9, 3, 7, 10, 6, 8])]
+        self._assert_matches_rebuild(user)
+        
+        ratings[1].score = 10
+        ratings[1].save()
+        ratings[2].movie = movies[20]
+        ratings[2].save()
+        ratings[3].delete()
+        
+        profile = self._assert_matches_rebuild(user)
+        assert profile.total_rated_movies == 5
+        assert profile.rating_sum == 9 + 10 + 7 + 6 + 8
+    
+    @pytest.mark.django_db
+    def test_update_does_not_read_all_ratings(
+        self, user, catalog, create_rating, django_assert_max_num_queries
+    ):
+        """Puan değişikliğinin sorgu sayısı puan sayısından bağımsız"""
+        ratings = [create_rating(user, m, score=7) for m in catalog['movies'][:20]]
+        
+        ratings[0].score = 2
+        with django_assert_max_num_queries(10):
+            ratings[0].save()
+        
+        profile = UserTasteProfile.objects.get(user=user)
+        assert profile.total_rated_movies == 20
+        assert profile.rating_sum == 19 * 7 + 2
+    
+    @pytest.mark.django_db
+    def test_deleting_all_ratings_resets_profile(self, user, catalog, create_rating):
+        """Son puan silinince türetilmiş alanlar sıfırlanır"""
+        rating = create_rating(user, catalog['movies'][0], score=9)
+        assert UserTasteProfile.objects.get(user=user).rating_style == 'generous'
+        
+        rating.delete()
+        
+        profile = UserTasteProfile.objects.get(user=user)
+        assert profile.genre_weights == {}
+        assert profile.genre_stats == {}
+        assert profile.total_rated_movies == 0
+        assert profile.rating_style == 'balanced'
+    
+    @pytest.mark.django_db
+    def test_verify_command_detects_and_fixes_drift(self, user, catalog, create_rating):
+        """bulk_create sinyalleri atlar; verify_taste_profiles farkı bulup düzeltir"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        create_rating(user, catalog['movies'][0], score=8)
+        Rating.objects.bulk_create([
+            Rating(user=user, movie=m, score=4) for m in catalog['movies'][1:4]
+        ])
+        
+        out = StringIO()
+        call_command('verify_taste_profiles', stdout=out)
+        assert 'Uyusmayan: 1' in out.getvalue()
+        
+        call_command('verify_taste_profiles', '--fix', stdout=StringIO())
+        profile = self._assert_matches_rebuild(user)
+        assert profile.total_rated_movies == 4
+
+
+class TestBulkProfileRebuild:
+    """update_profiles --bulk testleri"""
+    
+    @pytest.fixture
+    def many_users(self, catalog, create_user):
+        """Sinyaller atlanarak (bulk_create) puanlanmış kullanıcılar"""
+        users = [create_user(username=f'bulk{i}', email=f'bulk{i}@test.com') for i in range(5)]
+        movies = catalog['movies']
+        Rating.objects.bulk_create([
+            Rating(user=u, movie=movies[(i * 5 + j) % len(movies)], score=(i + j) % 10 + 1)
+            for i, u in enumerate(users)
+            for j in range(3 + i * 2)
+        ])
+        # Türü olmayan ve tarihi olmayan film
+        bare = Movie.objects.create(tmdb_id=59999, title='Bare', original_title='Bare')
+        Rating.objects.create(user=users[0], movie=bare, score=2)
+        return users
+    
+    @pytest.mark.django_db
+    def test_bulk_matches_per_user_rebuild(self, many_users):
+        """Gruplu hesaplama update_from_ratings ile aynı profili üretmeli"""
+        from apps.recommendations.profile_updates import bulk_rebuild_profiles
+        
+        result = bulk_rebuild_profiles(chunk_size=2)
+        
+        assert result['users'] == 5
+        assert result['chunks'] == 3
+        for user in many_users:
+            profile = UserTasteProfile.objects.get(user=user)
+            expected = UserTasteProfile.objects.get(user=user)
+            expected.update_from_ratings()
+            expected.refresh_from_db()
+            assert profile.stats_mismatches() == []
+            assert profile.genre_weights == expected.genre_weights
+            assert profile.preferred_decades == expected.preferred_decades
+            assert profile.average_rating == expected.average_rating
+            assert profile.rating_style == expected.rating_style
+    
+    @pytest.mark.django_db
+    def test_bulk_query_count_independent_of_users(self, many_users, django_assert_max_num_queries):
+        """Parça başına sabit sayıda sorgu"""
+        from apps.recommendations.profile_updates import bulk_rebuild_profiles
+        
+        with django_assert_max_num_queries(12):
+            bulk_rebuild_profiles(chunk_size=100)
+    
+    @pytest.mark.django_db
+    def test_bulk_command_reports_throughput(self, many_users):
+        """Komut kullanıcı/s raporlar"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        out = StringIO()
+        call_command('update_profiles', '--bulk', '--chunk-size', '2', stdout=out)
+        
+        assert 'Guncellenen: 5' in out.getvalue()
+        assert 'kullanici/s' in out.getvalue()
+
+
+class TestCompatibilityEngine:
+    """Toplu uyumluluk hesabı testleri"""
+    
+    @pytest.fixture
+    def friends(self, user, user2, user3, catalog, create_rating, create_friendship):
+        """user-user2 ve user-user3 arkadaş, user2-user3 istek beklemede"""
+        from apps.movies.models import WatchedMovie
+        
+        movies = catalog['movies']
+        for i, movie in enumerate(movies[:6]):
+            create_rating(user, movie, score=8 - i % 3)
+            create_rating(user2, movie, score=6 + i % 4)
+            WatchedMovie.objects.create(user=user, movie=movie)
+            if i % 2:
+                WatchedMovie.objects.create(user=user2, movie=movie)
+        for movie in movies[4:10]:
+            create_rating(user3, movie, score=3)
+        create_friendship(user, user2, 'accepted')
+        create_friendship(user3, user, 'accepted')
+        create_friendship(user2, user3, 'pending')
+        return user, user2, user3
+    
+    @pytest.mark.django_db
+    def test_refresh_stores_accepted_pairs(self, friends):
+        """Sadece kabul edilmiş çiftler saklanır, değerler tekil hesapla aynı"""
+        from apps.recommendations.compatibility import pair_key, refresh_compatibility
+        from apps.users.models import CompatibilityScore
+        
+        user, user2, user3 = friends
+        stats = refresh_compatibility()
+        
+        assert stats['pairs'] == 2
+        assert stats['computed'] == 2
+        assert CompatibilityScore.objects.count() == 2
+        
+        recommender = HybridRecommender()
+        for other in (user2, user3):
+            a, b = pair_key(user.id, other.id)
+            row = CompatibilityScore.objects.get(user_1_id=a, user_2_id=b)
+            expected = recommender.calculate_compatibility(user, other)
+            assert row.score == expected['score']
+            assert row.common_movies == expected['common_movies']
+            assert row.rating_similarity == expected['rating_similarity']
+        
+        a, b = pair_key(user.id, user2.id)
+        assert CompatibilityScore.objects.get(user_1_id=a, user_2_id=b).common_movies == 3
+    
+    @pytest.mark.django_db
+    def test_co_aggregates_limited_to_pairs(self, friends):
+        """Ortak film sayıları sadece verilen çiftler için hesaplanır"""
+        from apps.recommendations.compatibility import _co_aggregates, pair_key
+        
+        user, user2, user3 = friends
+        pairs = sorted([pair_key(user.id, user2.id), pair_key(user.id, user3.id)])
+        
+        co_rated = _co_aggregates(Rating._meta.db_table, pairs, diff=True)
+        
+        assert set(co_rated) == set(pairs)    # user2-user3 de ortak puanlamış ama çift değil
+        assert co_rated[pair_key(user.id, user2.id)] == (6, sum(abs((8 - i % 3) - (6 + i % 4)) for i in range(6)))
+        assert co_rated[pair_key(user.id, user3.id)][0] == 2
+    
+    @pytest.mark.django_db
+    def test_refresh_only_recomputes_changed_pairs(self, friends, create_rating, catalog):
+        """Puanı değişen kullanıcının çiftleri yeniden hesaplanır"""
+        from apps.recommendations.compatibility import refresh_compatibility
+        
+        user, user2, user3 = friends
+        refresh_compatibility()
+        assert refresh_compatibility()['computed'] == 0
+        
+        create_rating(user3, catalog['movies'][0], score=10)
+        
+        assert refresh_compatibility()['computed'] == 1
+    
+    @pytest.mark.django_db
+    def test_unfriended_pairs_removed(self, friends):
+        """Arkadaşlık bitince skor silinir"""
+        from apps.recommendations.compatibility import refresh_compatibility
+        from apps.users.models import CompatibilityScore, Friendship
+        
+        user, _, user3 = friends
+        refresh_compatibility()
+        Friendship.objects.filter(user=user3, friend=user).delete()
+        
+        assert refresh_compatibility()['removed'] == 1
+        assert CompatibilityScore.objects.count() == 1
+    
+    @pytest.mark.django_db
+    def test_get_compatibility_reads_stored_value(self, friends, django_assert_num_queries):
+        """Güncel skor iki sorguyla okunur; eskimişse yeniden hesaplanır"""
+        from apps.recommendations.compatibility import get_compatibility, refresh_compatibility
+        from apps.users.models import CompatibilityScore
+        
+        user, user2, _ = friends
+        refresh_compatibility()
+        CompatibilityScore.objects.update(score=42)
+        
+        with django_assert_num_queries(2):
+            result = get_compatibility(user, user2)
+        assert result['score'] == 42
+        
+        UserTasteProfile.objects.get(user=user2).save()
+        assert get_compatibility(user, user2)['score'] != 42
+
+
+class TestGroupRecommendations:
+    """Grup önerisi testleri"""
+    
+    @pytest.fixture
+    def members(self, rated_user, create_user, catalog, create_rating):
+        """rated_user + farklı zevklerde 3 üye"""
+        from apps.movies.models import WatchedMovie
+        
+        movies = catalog['movies']
+        others = [create_user(username=f'member{i}', email=f'member{i}@test.com') for i in range(3)]
+        for i, member in enumerate(others):
+            for j in range(3):
+                create_rating(member, movies[i * 3 + j], score=4 + i * 2 + j)
+            WatchedMovie.objects.create(user=member, movie=movies[12 + i])
+        return [rated_user] + others
+    
+    @pytest.mark.django_db
+    def test_score_matrix_matches_single_profile(self, members, catalog):
+        """content_score_matrix satırları content_scores ile aynı"""
+        import numpy as np
+        from apps.recommendations import scoring
+        
+        profiles = [UserTasteProfile.objects.get(user=m) for m in members] + [None]
+        features = scoring.CandidateFeatures.load(
+            scoring.candidate_rows([m.id for m in catalog['movies']])
+        )
+        
+        matrix = scoring.content_score_matrix(profiles, features)
+        
+        for row, profile in zip(matrix, profiles):
+            np.testing.assert_allclose(row, scoring.content_scores(profile, features))
+    
+    @pytest.mark.django_db
+    def test_excludes_union_of_seen(self, members, catalog):
+        """Herhangi bir üyenin puanladığı/izlediği film önerilmez"""
+        from apps.movies.models import WatchedMovie
+        
+        seen = set(Rating.objects.filter(user__in=members).values_list('movie_id', flat=True))
+        seen |= set(WatchedMovie.objects.filter(user__in=members).values_list('movie_id', flat=True))
+        
+        results = HybridRecommender().recommend_for_group(members, n=30)
+        
+        assert results
+        assert not {r['movie'].id for r in results} & seen
+        assert len(results) == len(catalog['movies']) - len(seen)
+    
+    @pytest.mark.django_db
+    def test_strategies(self, members):
+        """least_misery en düşük üye skorunu, average ortalamayı kullanır"""
+        recommender = HybridRecommender()
+        for strategy, combine in [('least_misery', min), ('average', lambda s: sum(s) / len(s))]:
+            for r in recommender.recommend_for_group(members, n=5, strategy=strategy):
+                expected = combine(list(r['member_scores'].values())) + 20 * r['pop_score']
+                assert r['group_score'] == pytest.approx(min(expected, 100))
+        
+        fair = recommender.recommend_for_group(members, n=5, strategy='fairness')
+        assert len(fair) == 5
+    
+    @pytest.mark.django_db
+    def test_liked_vector_matches_user_context(self, members, catalog, create_rating, monkeypatch):
+        """Grup vektörü üyelerin en yeni beğenileriyle (UserContext.liked_ids sırası) hesaplanır"""
+        import numpy as np
+        from apps.recommendations import group
+        from apps.recommendations.embeddings import ItemEmbeddingIndex
+        
+        monkeypatch.setattr(group.GroupContext, 'LIKED_VECTOR_SIZE', 3)
+        movies = catalog['movies']
+        for movie in movies[18:24]:
+            create_rating(members[0], movie, score=9)
+        index = ItemEmbeddingIndex([m.id for m in movies], np.random.default_rng(0).normal(size=(len(movies), 8)))
+        recommender = HybridRecommender()
+        
+        context = group.GroupContext.load(members, recommender.get_or_create_profile, index)
+        expected = [recommender.get_user_context(m).liked_ids[:3] for m in members]
+        
+        assert expected[0] != sorted(context.liked_ids[members[0].id])[:3]   # En düşük ID'ler değil
+        assert [context.liked_ids[m.id][:3] for m in members] == expected
+        vectors = [index.mean_vector(liked) for liked in expected if liked]
+        np.testing.assert_allclose(context.liked_vector, np.mean(vectors, axis=0), rtol=1e-6)
+    
+    @pytest.mark.django_db
+    def test_missing_profile_rebuilt(self, members):
+        """Profili olmayan üyenin profili tek kullanıcı yolu gibi oluşturulur"""
+        from apps.recommendations import group
+        
+        UserTasteProfile.objects.filter(user=members[1]).delete()
+        
+        context = group.GroupContext.load(members, HybridRecommender().get_or_create_profile)
+        
+        assert context.profiles[1] is not None and context.profiles[1].genre_weights
+        assert UserTasteProfile.objects.filter(user=members[1]).exists()
+    
+    @pytest.mark.django_db
+    def test_invalid_groups_rejected(self, members):
+        """Grup 2-10 kişi olmalı, strateji bilinmeli"""
+        recommender = HybridRecommender()
+        with pytest.raises(ValueError):
+            recommender.recommend_for_group(members[:1])
+        with pytest.raises(ValueError):
+            recommender.recommend_for_group(members[:1] * 3)
+        with pytest.raises(ValueError):
+            recommender.recommend_for_group(members, strategy='dictator')
+    
+    @pytest.mark.django_db
+    def test_query_count_independent_of_members(self, members, django_assert_max_num_queries):
+        """Üye sayısı sorgu sayısını artırmaz"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        recommender = HybridRecommender()
+        with CaptureQueriesContext(connection) as pair:
+            recommender.recommend_for_group(members[:2], n=5)
+        with django_assert_max_num_queries(len(pair.captured_queries)):
+            recommender.recommend_for_group(members, n=5)
+    
+    @pytest.mark.django_db
+    def test_filters_applied_to_candidates(self, user, user2, catalog, create_rating):
+        """Filtreler ilk n sonuca değil aday havuzuna uygulanır"""
+        movies = catalog['movies']
+        create_rating(user, movies[0], score=9)
+        create_rating(user2, movies[10], score=9)
+        
+        results = HybridRecommender().get_movies_for_both(user, user2, n=3, time_available='short')
+        
+        # Kısa filmler (runtime < 90): movies[0:4], biri puanlanmış
+        assert {r['movie'].id for r in results} == {m.id for m in movies[1:4]}
+        
+        classic = HybridRecommender().get_movies_for_both(user, user2, n=30, era='classic', time_available='long')
+        assert classic == []
+    
+    @pytest.mark.django_db
+    def test_pair_cache_invalidated_by_member_change(self, user, user2, catalog, create_rating):
+        """Aynı çift + filtreler cache'ten gelir; üyenin puanı cache'i geçersiz kılar"""
+        from apps.movies.cache import get_recommendation_cache_stats
+        
+        recommender = HybridRecommender()
+        first = recommender.get_movies_for_both(user, user2, n=5, era='2010s')
+        assert recommender.get_movies_for_both(user2, user, n=5, era='2010s') == [
+            {**r, 'score_a': r['score_b'], 'score_b': r['score_a']} for r in first
+        ]
+        assert get_recommendation_cache_stats()['hits'] == 1
+        
+        # Farklı filtre ayrı kayıt
+        recommender.get_movies_for_both(user, user2, n=5, era='2000s')
+        assert get_recommendation_cache_stats()['hits'] == 1
+        
+        create_rating(user2, first[0]['movie'], score=9)
+        again = recommender.get_movies_for_both(user, user2, n=5, era='2010s')
+        assert get_recommendation_cache_stats()['hits'] == 1
+        assert first[0]['movie'].id not in [r['movie'].id for r in again]
+
+
+class TestNegativeSampling:
+    """Vektörize negatif örnekleme testleri (training.sample_negatives)"""
+    
+    def _interactions(self, seed=0):
+        import numpy as np
+        
+        rng = np.random.default_rng(seed)
+        users = np.repeat(np.arange(50), rng.integers(1, 30, 50))
+        items = rng.integers(0, 200, len(users))
+        # Çok yoğun kullanıcı: 200 filmin 150'si
+        users = np.concatenate([users, np.full(150, 50)])
+        items = np.concatenate([items, np.arange(150)])
+        return users, items
+    
+    def test_counts_and_no_positives(self):
+        """Kullanıcı başına min(pozitif * ratio, kalan) tekrarsız negatif, hiçbiri pozitif değil"""
+        import numpy as np
+        from apps.recommendations.training import sample_negatives
+        
+        users, items = self._interactions()
+        neg_users, neg_items = sample_negatives(users, items, 200, ratio=3, seed=1)
+        
+        positives = set(zip(users.tolist(), items.tolist()))
+        negatives = list(zip(neg_users.tolist(), neg_items.tolist()))
+        assert not positives & set(negatives)
+        assert len(negatives) == len(set(negatives))
+        
+        neg_counts = np.bincount(neg_users, minlength=51)
+        for user in range(51):
+            n_pos = len({i for u, i in positives if u == user})
+            assert neg_counts[user] == min(n_pos * 3, 200 - n_pos)
+        assert neg_counts[50] == 50
+    
+    def test_seeded_sampling_is_reproducible(self):
+        """Aynı seed aynı örnekleri, farklı seed farklı örnekleri üretir"""
+        from apps.recommendations.training import sample_negatives
+        
+        users, items = self._interactions()
+        first = sample_negatives(users, items, 200, ratio=2, seed=7)
+        second = sample_negatives(users, items, 200, ratio=2, seed=7)
+        other = sample_negatives(users, items, 200, ratio=2, seed=8)
+        
+        assert first[1].tolist() == second[1].tolist()
+        assert first[1].tolist() != other[1].tolist()
+
+
+def write_ratings_csv(path, n_users=30, n_movies=40, seed=0):
+    """MovieLens formatında sentetik ratings.csv; (userId, movieId) satırlarını döner"""
+    import numpy as np
+    
+    rng = np.random.default_rng(seed)
+    rows = [
+        (u, m, float(rng.integers(1, 11)) / 2, 1_000_000 + u * 100 + m)
+        for u in range(1, n_users + 1)
+        for m in rng.choice(np.arange(1, n_movies + 1), 8, replace=False).tolist()
+    ]
+    with open(path, 'w') as f:
+        f.write('userId,movieId,rating,timestamp\n')
+        f.writelines(f'{u},{m},{r},{t}\n' for u, m, r, t in rows)
+    return [(u, m) for u, m, _, _ in rows]
+
+
+class TestRatingsLoader:
+    """Parça parça ratings yükleme testleri (training.load_ratings)"""
+    
+    def test_filters_and_dtypes(self, tmp_path):
+        """Eşleşmeyen filmler atılır, diziler int32/float32"""
+        import numpy as np
+        from apps.recommendations.training import load_ratings
+        
+        rows = write_ratings_csv(tmp_path / 'ratings.csv')
+        valid = set(range(1, 21))
+        arrays, stats = load_ratings(str(tmp_path / 'ratings.csv'), valid, chunksize=7)
+        
+        expected = [(u, m) for u, m in rows if m in valid]
+        assert list(zip(arrays['user_ids'].tolist(), arrays['movie_ids'].tolist())) == expected
+        assert arrays['user_ids'].dtype == np.int32 and arrays['ratings'].dtype == np.float32
+        assert stats == {'total': len(rows), 'matched': len(expected), 'cached': False}
+    
+    def test_reservoir_sampling_is_seeded(self, tmp_path):
+        """max_ratings satır seçilir; aynı seed aynı örneği verir"""
+        from apps.recommendations.training import load_ratings
+        
+        rows = write_ratings_csv(tmp_path / 'ratings.csv')
+        path = str(tmp_path / 'ratings.csv')
+        valid = set(range(1, 41))
+        
+        first, stats = load_ratings(path, valid, max_ratings=50, seed=3, chunksize=16)
+        second, _ = load_ratings(path, valid, max_ratings=50, seed=3, chunksize=64)
+        other, _ = load_ratings(path, valid, max_ratings=50, seed=4, chunksize=16)
+        
+        assert len(first['user_ids']) == 50 and stats['matched'] == len(rows)
+        assert first['movie_ids'].tolist() == second['movie_ids'].tolist()
+        assert first['user_ids'].tolist() != other['user_ids'].tolist() or \
+            first['movie_ids'].tolist() != other['movie_ids'].tolist()
+        assert set(zip(first['user_ids'].tolist(), first['movie_ids'].tolist())) <= set(rows)
+    
+    def test_npy_cache_skips_csv(self, tmp_path, monkeypatch):
+        """İkinci çağrı CSV okumadan cache'ten gelir; CSV değişince yeniden okunur"""
+        import os
+        import pandas as pd
+        from apps.recommendations.training import load_ratings
+        
+        write_ratings_csv(tmp_path / 'ratings.csv')
+        path, cache = str(tmp_path / 'ratings.csv'), str(tmp_path / 'cache')
+        valid = set(range(1, 41))
+        first, _ = load_ratings(path, valid, cache_dir=cache)
+        
+        def fail(*args, **kwargs):
+            raise AssertionError('CSV okunmamali')
+        
+        monkeypatch.setattr(pd, 'read_csv', fail)
+        cached, stats = load_ratings(path, valid, cache_dir=cache)
+        assert stats['cached'] is True
+        assert cached['movie_ids'].tolist() == first['movie_ids'].tolist()
+        monkeypatch.undo()
+        
+        write_ratings_csv(tmp_path / 'ratings.csv', seed=1)
+        os.utime(path, (0, 0))
+        assert load_ratings(path, valid, cache_dir=cache)[1]['cached'] is False
+
+
+class TestTrainModelCommand:
+    """train_model uçtan uca (küçük veri)"""
+    
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('workers,negatives', [(1, 'explicit'), (2, 'explicit'), (1, 'in_batch')])
+    def test_trains_and_writes_mappings(self, tmp_path, catalog, workers, negatives):
+        import pickle
+        from io import StringIO
+        from django.core.management import call_command
+        from apps.recommendations.models import MovieLensMapping
+        
+        movies = catalog['movies']
+        MovieLensMapping.objects.bulk_create([
+            MovieLensMapping(movielens_id=i + 1, movie=movie, tmdb_id=movie.tmdb_id)
+            for i, movie in enumerate(movies)
+        ])
+        write_ratings_csv(tmp_path / 'ratings.csv')
+        output = str(tmp_path / 'ncf_model.pkl')
+        
+        out = StringIO()
+        call_command(
+            'train_model', '--ratings-path', str(tmp_path / 'ratings.csv'), '--output', output,
+            '--epochs', '1', '--batch-size', '64', '--embedding-dim', '8', '--workers', str(workers),
+            '--negatives', negatives, stdout=out,
+        )
+        
+        assert 'EGITIM TAMAMLANDI' in out.getvalue()
+        with open(output.replace('.pkl', '_ml_mapping.pkl'), 'rb') as f:
+            ml_data = pickle.load(f)
+        assert set(ml_data['item_map']) <= set(range(1, 25))
+        assert ml_data['ml_to_movie'][1] == movies[0].id
+        assert (tmp_path / 'ratings_cache').is_dir()
+
+
+class TestTensorBatchLoader:
+    """Tensör dilimli batch loader testleri (ncf_model.TensorBatchLoader)"""
+    
+    def _arrays(self, n=1000):
+        import numpy as np
+        
+        return np.arange(n), np.arange(n) % 37, (np.arange(n) % 3 == 0).astype(float)
+    
+    def test_epoch_covers_every_sample_once(self):
+        """Karıştırılmış epoch her örneği bir kez verir; satırlar hizalı kalır"""
+        import torch
+        from apps.recommendations.ncf_model import TensorBatchLoader
+        
+        users, items, labels = self._arrays()
+        loader = TensorBatchLoader(users, items, labels, batch_size=64, shuffle=True, seed=1)
+        batches = list(loader)
+        
+        assert len(batches) == len(loader) == 16
+        assert len(batches[-1]['user_id']) == 1000 - 15 * 64
+        seen = torch.cat([b['user_id'] for b in batches])
+        assert sorted(seen.tolist()) == list(range(1000))
+        assert seen.tolist() != list(range(1000))
+        for batch in batches:
+            assert batch['item_id'].tolist() == (batch['user_id'] % 37).tolist()
+            assert batch['label'].dtype == torch.float32
+    
+    def test_seeded_order_and_prefetch(self):
+        """Aynı seed aynı sırayı verir; prefetch sırayı değiştirmez, erken çıkış takılmaz"""
+        from apps.recommendations.ncf_model import TensorBatchLoader
+        
+        def order(loader):
+            return [b['user_id'].tolist() for b in loader]
+        
+        users, items, labels = self._arrays()
+        plain = TensorBatchLoader(users, items, labels, batch_size=100, shuffle=True, seed=5)
+        prefetched = TensorBatchLoader(users, items, labels, batch_size=100, shuffle=True, seed=5, prefetch=2)
+        
+        assert order(plain) == order(prefetched)
+        for i, _ in enumerate(prefetched):
+            if i == 1:
+                break
+        assert len(order(prefetched)) == 10
+    
+    def test_trainer_epoch_and_evaluate(self):
+        """NCFTrainer.train_epoch/evaluate loader ile çalışır"""
+        import torch
+        from apps.recommendations.ncf_model import NCFModel, NCFTrainer, TensorBatchLoader
+        
+        torch.manual_seed(0)
+        users, items, labels = self._arrays(600)
+        trainer = NCFTrainer(NCFModel(600, 37, embedding_dim=8))
+        calls = []
+        loss = trainer.train_epoch(
+            TensorBatchLoader(users, items, labels, batch_size=128, shuffle=True, seed=0),
+            on_batch=lambda idx, batch_loss: calls.append(idx),
+        )
+        test_loss, auc = trainer.evaluate(TensorBatchLoader(users, items, labels, batch_size=128))
+        
+        assert calls == [0, 1, 2, 3, 4]
+        assert loss > 0 and test_loss > 0
+        assert 0 <= auc <= 1
+
+
+class TestDistributedTraining:
+    """train_model --workers (distributed.train_distributed) testleri"""
+    
+    def test_shards_are_equal_and_disjoint(self):
+        import numpy as np
+        from apps.recommendations.distributed import shard
+        
+        arrays = {'user_ids': np.arange(11), 'labels': np.arange(11) * 2}
+        parts = [shard(arrays, rank, 3) for rank in range(3)]
+        
+        assert [p['user_ids'].tolist() for p in parts] == [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+        assert parts[1]['labels'].tolist() == [6, 8, 10]
+    
+    def test_two_workers_train_and_rank0_saves(self, tmp_path):
+        """İki gloo process'i eğitir, AUC senkron hesaplanır, checkpoint yüklenebilir"""
+        import numpy as np
+        from apps.recommendations.distributed import train_distributed
+        from apps.recommendations.ncf_model import NCFTrainer
+        
+        rng = np.random.default_rng(0)
+        
+        def split(n):
+            return {
+                'user_ids': rng.integers(0, 50, n),
+                'item_ids': rng.integers(0, 40, n),
+                'labels': (rng.random(n) < 0.3).astype(np.float32),
+            }
+        
+        output = str(tmp_path / 'ncf_model.pkl')
+        history = train_distributed(2, split(2000), split(400), {
+            'num_users': 50, 'num_items': 40, 'embedding_dim': 8,
+            'mlp_layers': [128, 64, 32], 'dropout': 0.2, 'learning_rate': 0.001,
+            'batch_size': 128, 'epochs': 2, 'seed': 1, 'output': output, 'threads': 1,
+        })
+        
+        assert [row['epoch'] for row in history] == [1, 2]
+        assert all(row['samples'] == 2000 for row in history)
+        assert history[0]['saved']
+        assert NCFTrainer.load(output).model.num_items == 40
+
+
+class TestOnTheFlyNegatives:
+    """Batch başına negatif örnekleme (NegativeSampler, NCFTrainer negatives/loss)"""
+    
+    def test_sampler_strategies(self):
+        import torch
+        from apps.recommendations.ncf_model import NegativeSampler
+        
+        items = torch.arange(10, 74)
+        uniform = NegativeSampler(100, 'uniform', num_negatives=3, seed=0).sample(items)
+        assert uniform.shape == (64, 3) and 0 <= int(uniform.min()) and int(uniform.max()) < 100
+        
+        counts = [0] * 100
+        counts[7] = 50
+        popular = NegativeSampler(100, 'popularity', num_negatives=2, item_counts=counts, seed=0).sample(items)
+        assert set(popular.reshape(-1).tolist()) == {7}
+        
+        in_batch = NegativeSampler(100, 'in_batch', num_negatives=2, seed=0).sample(items)
+        assert set(in_batch.reshape(-1).tolist()) <= set(items.tolist())
+        assert not (in_batch == items.unsqueeze(1)).any()
+        
+        with pytest.raises(ValueError):
+            NegativeSampler(100, 'popularity')
+    
+    @pytest.mark.parametrize('strategy,loss', [('uniform', 'bce'), ('in_batch', 'bpr')])
+    def test_trainer_learns_from_positives_only(self, strategy, loss):
+        """Sadece pozitiflerle eğitim; loss düşer"""
+        import numpy as np
+        import torch
+        from apps.recommendations.ncf_model import NCFTrainer, TensorBatchLoader
+        
+        torch.manual_seed(0)
+        users = np.repeat(np.arange(40), 5)
+        items = (users * 7 + np.tile(np.arange(5), 40)) % 60
+        trainer = NCFTrainer.from_config({
+            'num_users': 40, 'num_items': 60, 'embedding_dim': 8, 'mlp_layers': [16, 8],
+            'dropout': 0.0, 'learning_rate': 0.01, 'negatives': strategy, 'num_negatives': 4,
+            'loss': loss, 'seed': 0,
+        })
+        loader = TensorBatchLoader(users, items, np.ones(len(users)), batch_size=50, shuffle=True, seed=0)
+        
+        losses = [trainer.train_epoch(loader) for _ in range(15)]
+        assert losses[-1] < losses[0]
+        
+        with pytest.raises(ValueError):
+            NCFTrainer(trainer.model, loss='bpr')
+    
+    def test_positive_dataset_keeps_negatives_out_of_train(self):
+        """Eğitim seti sadece pozitif; test negatifleri hiçbir pozitifle çakışmaz"""
+        import numpy as np
+        from apps.recommendations.training import positive_dataset
+        
+        rng = np.random.default_rng(0)
+        keys = np.unique(rng.integers(0, 30, 400) * 50 + rng.integers(0, 50, 400))
+        users, items = keys // 50, keys % 50
+        train, test = positive_dataset(users, items, 50, ratio=2, seed=0)
+        
+        assert train['labels'].min() == 1 and len(train['labels']) == int(0.8 * len(keys))
+        positives = set(zip(users.tolist(), items.tolist()))
+        negatives = test['labels'] == 0
+        assert (~negatives).sum() == len(keys) - len(train['labels'])
+        assert negatives.sum() == 2 * (~negatives).sum()
+        assert not positives & set(zip(test['user_ids'][negatives].tolist(), test['item_ids'][negatives].tolist()))
+    
+    def test_leave_one_out_metrics(self):
+        import numpy as np
+        from apps.recommendations.training import leave_one_out_metrics
+        
+        scores = np.array([
+            [0.9, 0.1, 0.2, 0.3],    # 1. sırada
+            [0.1, 0.5, 0.6, 0.7],    # 4. sırada
+        ])
+        metrics = leave_one_out_metrics(scores, k=2)
+        
+        assert metrics['hr'] == 0.5
+        assert metrics['ndcg'] == pytest.approx(0.5)
+        assert metrics['auc'] == pytest.approx(0.5)
+
+
+class TestOfflineEvaluation:
+    """Çevrimdışı sıralama değerlendirmesi (evaluation, evaluate_recommender)"""
+    
+    class ItemIndexModel:
+        """Skor = film index'i (büyük index önce gelir)"""
+        
+        def eval(self):
+            return self
+        
+        def __call__(self, user_ids, item_ids):
+            return item_ids.float() + user_ids.float() * 0
+    
+    def test_leave_last_out_holds_latest_interaction(self):
+        import numpy as np
+        from apps.recommendations.evaluation import split_leave_last_out
+        
+        users = np.array([0, 0, 0, 1, 1, 2])
+        stamps = np.array([30, 10, 20, 5, 7, 1])
+        test = split_leave_last_out(users, stamps, min_interactions=2)
+        
+        # Kullanıcı 2'nin tek etkileşimi eğitimde kalır
+        assert test.tolist() == [True, False, False, False, True, False]
+    
+    def test_temporal_drops_unseen_users_and_items(self):
+        import numpy as np
+        from apps.recommendations.evaluation import split_temporal
+        
+        users = np.array([0, 0, 1, 1, 0, 1, 2])
+        items = np.array([0, 1, 0, 2, 2, 3, 0])
+        stamps = np.array([1, 2, 3, 4, 5, 6, 7])
+        test = split_temporal(users, items, stamps, test_fraction=0.4)
+        
+        # Son 3 etkileşimden film 3 ve kullanıcı 2 eğitimde yok
+        assert test.tolist() == [False, False, False, False, True, False, False]
+    
+    def test_full_catalog_ranking_masks_train_positives(self):
+        import numpy as np
+        from apps.recommendations.evaluation import rank_full_catalog
+        
+        train_users = np.array([0, 0, 1])
+        train_items = np.array([9, 7, 8])
+        top = rank_full_catalog(self.ItemIndexModel(), np.array([0, 1, 2]), train_users, train_items, 10, k=3)
+        
+        assert top.tolist() == [[8, 6, 5], [9, 7, 6], [9, 8, 7]]
+        batched = rank_full_catalog(
+            self.ItemIndexModel(), np.array([0, 1, 2]), train_users, train_items, 10, k=3, max_pairs=10
+        )
+        assert np.array_equal(top, batched)
+    
+    def test_ranking_metrics(self):
+        import numpy as np
+        from apps.recommendations.evaluation import ranking_metrics
+        
+        top = np.array([[3, 1, -1], [4, 5, 6]])
+        metrics = ranking_metrics(
+            top, np.array([0, 1]), np.array([0, 0, 1]), np.array([1, 2, 9]), key_space=10
+        )
+        
+        assert metrics['hr'] == 0.5
+        # Kullanıcı 0: 2. sırada isabet, 2 ilgili film
+        assert metrics['ndcg'] == pytest.approx((1 / np.log2(3)) / (1 + 1 / np.log2(3)) / 2)
+        assert metrics['recall'] == pytest.approx(0.25)
+        assert metrics['coverage'] == pytest.approx(0.5)
+    
+    def test_hybrid_end_to_end_rolls_back(self, rated_user):
+        from apps.recommendations.evaluation import StageTimer, evaluate_hybrid
+        
+        before = list(Rating.objects.filter(user=rated_user).values_list('movie_id', 'score'))
+        timer = StageTimer()
+        metrics = evaluate_hybrid([rated_user], k=10, timer=timer)
+        
+        assert metrics['users'] == 1
+        assert 0 <= metrics['ndcg'] <= metrics['hr'] <= 1
+        assert metrics['p95_ms'] > 0
+        assert {'split', 'holdout', 'recommend', 'metrics'} <= set(timer.stages)
+        assert list(Rating.objects.filter(user=rated_user).values_list('movie_id', 'score')) == before
+    
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('split', ['leave-last-out', 'temporal'])
+    def test_command_trains_and_reports(self, tmp_path, catalog, split):
+        from io import StringIO
+        from django.core.management import call_command
+        from apps.recommendations.models import MovieLensMapping
+        
+        MovieLensMapping.objects.bulk_create([
+            MovieLensMapping(movielens_id=i + 1, movie=movie, tmdb_id=movie.tmdb_id)
+            for i, movie in enumerate(catalog['movies'])
+        ])
+        write_ratings_csv(tmp_path / 'ratings.csv')
+        
+        out = StringIO()
+        call_command(
+            'evaluate_recommender', '--ratings-path', str(tmp_path / 'ratings.csv'), '--split', split,
+            '--epochs', '1', '--embedding-dim', '8', '--min-ratings', '2', stdout=out,
+        )
+        
+        output = out.getvalue()
+        assert 'HR@10:' in output and 'NDCG@10:' in output
+        assert 'score' in output and '[DONE]' in output
+
+
+class TestFoldIn:
+    """Uygulama kullanıcıları için NCF fold-in (foldin.FoldIn)"""
+    
+    def _model(self, seed=0):
+        import torch
+        from apps.recommendations.ncf_model import NCFModel
+        
+        torch.manual_seed(seed)
+        return NCFModel(num_users=10, num_items=30, embedding_dim=8)
+    
+    def _fold_in(self, model, movie_ids, item_rows):
+        import numpy as np
+        from apps.recommendations.embeddings import ItemEmbeddingIndex
+        from apps.recommendations.foldin import FoldIn
+        
+        index = ItemEmbeddingIndex(movie_ids, np.ones((len(movie_ids), 16)))
+        return FoldIn(model, index, item_rows, key='test')
+    
+    def test_score_matches_forward_for_training_user(self):
+        """Eğitim kullanıcısının kendi embedding'iyle skor = model.predict; bilinmeyen film NaN"""
+        import numpy as np
+        
+        movie_ids = list(range(100, 120))
+        model = self._model()
+        item_rows = np.arange(20)[::-1].copy()
+        fold_in = self._fold_in(model, movie_ids, item_rows)
+        scores = fold_in.score(model.get_user_embedding(3), movie_ids + [999])
+        
+        assert np.allclose(scores[:-1], model.predict(3, item_rows.tolist()), atol=1e-6)
+        assert np.isnan(scores[-1])
+    
+    def test_solve_generalizes_and_keeps_model_frozen(self):
+        """
+        İki zevk grubuyla eğitilmiş modelde, bir grubun filmlerini beğenen yeni
+        kullanıcı o grubun puanlamadığı filmlerine yüksek skor alır; model
+        ağırlıkları değişmez, sonuç seed'li
+        """
+        import numpy as np
+        import torch
+        from apps.recommendations.ncf_model import NCFTrainer, TensorBatchLoader
+        
+        movie_ids = list(range(100, 130))
+        model = self._model()
+        users, items = np.repeat(np.arange(10), 30), np.tile(np.arange(30), 10)
+        labels = ((users < 5) == (items < 15)).astype(np.float32)
+        trainer = NCFTrainer(model, learning_rate=0.01)
+        loader = TensorBatchLoader(users, items, labels, batch_size=64, shuffle=True, seed=0)
+        for _ in range(30):
+            trainer.train_epoch(loader)
+        fold_in = self._fold_in(model, movie_ids, np.arange(30))
+        before = {name: p.detach().clone() for name, p in model.state_dict().items()}
+        
+        vector = fold_in.solve(movie_ids[:4], movie_ids[15:18], seed=1)
+        
+        assert vector.shape == (16,) and vector.dtype == np.float32
+        scores = fold_in.score(vector, movie_ids)
+        assert scores[4:15].mean() > scores[18:].mean() + 0.2
+        assert np.array_equal(vector, fold_in.solve(movie_ids[:4], movie_ids[15:18], seed=1))
+        assert all(torch.equal(before[name], p) for name, p in model.state_dict().items())
+        assert fold_in.solve([999], seed=1) is None
+    
+    @pytest.mark.django_db
+    def test_checkpoint_enables_fold_in_and_profile_cache(self, tmp_path, settings, monkeypatch, rated_user, catalog, create_rating):
+        """Checkpoint yüklenince collab skoru fold-in tahmini; vektör profilde saklanır, puan değişince temizlenir"""
+        import numpy as np
+        from apps.recommendations import services
+        
+        movies = catalog['movies']
+        settings.MODEL_BUNDLE_ROOT = str(tmp_path / 'bundles')
+        _, settings.NCF_MODEL_PATH = write_checkpoint(
+            tmp_path / 'ncf_model.pkl',
+            ml_to_movie={101: movies[14].id, 102: movies[15].id, 103: movies[0].id, 104: movies[16].id},
+        )
+        monkeypatch.setattr(services.HybridRecommender, '_instance', None)
+        recommender = services.HybridRecommender()
+        
+        results = recommender.recommend(user=rated_user, n=24, use_cache=False)
+        fold_in = recommender._fold_in
+        profile = UserTasteProfile.objects.get(user=rated_user)
+        assert fold_in is not None and len(profile.user_vector) == 16
+        assert profile.user_vector_model == fold_in.key
+        
+        vector = np.asarray(profile.user_vector, dtype=np.float32)
+        by_id = {r['movie'].id: r for r in results}
+        for movie in (movies[15], movies[16]):
+            assert by_id[movie.id]['collab_score'] == pytest.approx(fold_in.score(vector, [movie.id])[0], abs=1e-5)
+        
+        recommender.batch_scoring = False
+        try:
+            iterative = recommender.recommend(user=rated_user, n=24, use_cache=False)
+        finally:
+            recommender.batch_scoring = True
+        assert [r['movie'].id for r in iterative] == [r['movie'].id for r in results]
+        
+        create_rating(rated_user, movies[20], score=9)
+        profile.refresh_from_db()
+        assert profile.user_vector == [] and profile.user_vector_model == ''
+
+
+class TestNCFScorer:
+    """Servis tarafı batch'li NCF skorlama (ncf_model.NCFScorer)"""
+    
+    def test_matches_forward(self):
+        """Katlanmış ilk katmanlar forward ile aynı sonucu verir (BatchNorm istatistikleri dahil)"""
+        import numpy as np
+        import torch
+        from apps.recommendations.ncf_model import NCFModel, NCFScorer
+        
+        torch.manual_seed(0)
+        model = NCFModel(num_users=20, num_items=500, embedding_dim=16).eval()
+        for layer in model.mlp:
+            if isinstance(layer, torch.nn.BatchNorm1d):
+                layer.running_mean.uniform_(-1, 1)
+                layer.running_var.uniform_(0.5, 2)
+        rows = np.random.default_rng(0).integers(0, 500, 300)
+        
+        scores = NCFScorer(model).score(model.get_user_embedding(4), rows)
+        with torch.no_grad():
+            expected = model(torch.full((300,), 4), torch.as_tensor(rows)).numpy()
+        
+        assert scores.dtype == np.float32 and scores.shape == (300,)
+        assert np.allclose(scores, expected, atol=1e-6)
+        assert np.allclose(model.predict(4, rows[:3].tolist()), expected[:3], atol=1e-6)
+        assert NCFScorer(model).score(model.get_user_embedding(4), []).shape == (0,)
+    
+    def test_num_threads(self):
+        import torch
+        from apps.recommendations.ncf_model import NCFModel, NCFScorer
+        
+        previous = torch.get_num_threads()
+        try:
+            NCFScorer(NCFModel(num_users=2, num_items=5, embedding_dim=4), num_threads=1)
+            assert torch.get_num_threads() == 1
+        finally:
+            torch.set_num_threads(previous)
+
+
+class TestServingNetwork:
+    """Küçültülmüş / int8 servis ağı (quantization, bundle network.pt)"""
+    
+    def _model(self):
+        import torch
+        from apps.recommendations.ncf_model import NCFModel
+        
+        torch.manual_seed(0)
+        return NCFModel(num_users=50, num_items=400, embedding_dim=16).eval()
+    
+    def test_quantized_embedding_round_trip(self):
+        """Satır başına ölçekli int8: hata ölçeğin yarısını aşmaz, sıfır satır korunur"""
+        import torch
+        from apps.recommendations.quantization import QuantizedEmbedding
+        
+        weight = torch.randn(100, 16)
+        weight[7] = 0
+        table = QuantizedEmbedding.from_float(weight)
+        
+        assert table.codes.dtype == torch.int8 and table.embedding_dim == 16
+        assert ((table.weight - weight).abs() <= table.scales[:, None] / 2 + 1e-7).all()
+        assert torch.equal(table(torch.tensor([3, 7])), table.weight[[3, 7]])
+        assert not table.weight[7].any()
+    
+    def test_pruned_network_matches_model(self):
+        """Kullanıcı tabloları atılmış float32 ağ eşlenen filmlerde modelle aynı skoru verir"""
+        import numpy as np
+        from apps.recommendations.ncf_model import NCFScorer
+        from apps.recommendations.quantization import prune_for_serving, score_agreement
+        
+        model = self._model()
+        rows = np.random.default_rng(0).choice(400, 120, replace=False)
+        pruned = prune_for_serving(model, rows)
+        vector = model.get_user_embedding(5)
+        
+        assert pruned.num_users == 1 and pruned.num_items == 120
+        assert np.allclose(pruned.get_user_embedding(0), model.user_embedding_gmf.weight.mean(0).tolist() + model.user_embedding_mlp.weight.mean(0).tolist(), atol=1e-6)
+        assert np.allclose(NCFScorer(pruned).score(vector, np.arange(120)), NCFScorer(model).score(vector, rows), atol=1e-6)
+        assert score_agreement(model, pruned, rows, users=10)['topk_overlap'] == 1.0
+    
+    def test_int8_network_round_trip(self, tmp_path):
+        """int8 ağ daha küçük, skorlar float32'ye yakın; kaydedilip yüklenince aynı"""
+        import numpy as np
+        from apps.recommendations.ncf_model import NCFScorer
+        from apps.recommendations.quantization import (
+            load_network, network_bytes, prune_for_serving, save_network, score_agreement,
+        )
+        
+        model = self._model()
+        rows = np.arange(0, 400, 2)
+        fp32 = prune_for_serving(model, rows)
+        int8 = prune_for_serving(model, rows, quantize=True)
+        save_network(int8, str(tmp_path / 'network.pt'), quantized=True)
+        loaded = load_network(str(tmp_path / 'network.pt'))
+        vector = model.get_user_embedding(2)
+        
+        assert network_bytes(int8) < network_bytes(fp32)
+        agreement = score_agreement(model, int8, rows, quantize=True, users=10)
+        assert agreement['max_abs'] < 0.01
+        assert np.array_equal(
+            NCFScorer(loaded, quantize=True).score(vector, np.arange(200)),
+            NCFScorer(int8, quantize=True).score(vector, np.arange(200)),
+        )
+    
+    @pytest.mark.django_db
+    def test_bundle_network_enables_fold_in(self, tmp_path, settings, monkeypatch, rated_user, catalog):
+        """Ağlı bundle'la recommender checkpoint açmadan fold-in yapar; anahtar checkpoint'la aynı"""
+        from unittest import mock
+        from apps.recommendations import services
+        from apps.recommendations.bundle import ServingBundle, bundle_path_for, export_bundle
+        from apps.recommendations.foldin import checkpoint_key
+        
+        movies = catalog['movies']
+        settings.MODEL_BUNDLE_ROOT = str(tmp_path / 'bundles')
+        _, settings.NCF_MODEL_PATH = write_checkpoint(
+            tmp_path / 'ncf_model.pkl',
+            ml_to_movie={101: movies[14].id, 102: movies[15].id, 103: movies[0].id, 104: movies[16].id},
+        )
+        manifest = export_bundle(settings.NCF_MODEL_PATH, quantize=True)
+        assert manifest['network']['quantized'] and manifest['network']['items'] == 4
+        assert ServingBundle.load(bundle_path_for(settings.NCF_MODEL_PATH)).load_network().num_users == 1
+        
+        monkeypatch.setattr(services.HybridRecommender, '_instance', None)
+        recommender = services.HybridRecommender()
+        with mock.patch('apps.recommendations.ncf_model.NCFTrainer.load') as load:
+            recommender.recommend(user=rated_user, n=10, use_cache=False)
+        
+        assert not load.called
+        assert recommender._fold_in.key == checkpoint_key(settings.NCF_MODEL_PATH)
+        assert UserTasteProfile.objects.get(user=rated_user).user_vector_model == recommender._fold_in.key
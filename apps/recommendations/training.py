@@ -0,0 +1,334 @@
+"""
+NCF Training Data
+=================
+train_model için vektörize veri hazırlama yardımcıları.
+
+- sample_negatives: Kullanıcı başına set farkı (all_items - positives)
+  yerine toplu rastgele item çekip pozitifleri sıralı anahtar dizisinde
+  (user * num_items + item) searchsorted ile reddeder. Bellek sadece
+  pozitif sayısıyla ölçeklenir; seed ile tekrarlanabilir.
+- explicit_dataset / positive_dataset: Eğitim/test bölmesi; ilki
+  negatifleri diziye yazar (bce), ikincisi sadece pozitifleri tutar ve
+  negatifleri eğitim sırasında NegativeSampler çeker.
+- load_ratings: ratings.csv'yi parça parça int32/float32 olarak okur
+  (timestamp okunmaz), eşleşmeyen filmleri okurken atar, --max-ratings
+  için reservoir örnekleme yapar ve sonucu .npy olarak cache'ler.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+
+RATINGS_DTYPES = {'userId': np.int32, 'movieId': np.int32, 'rating': np.float32}
+RATINGS_ARRAYS = {'userId': 'user_ids', 'movieId': 'movie_ids', 'rating': 'ratings'}
+TIMESTAMP_DTYPES = {'timestamp': np.int64}     # Sadece zamana göre bölme için (evaluation)
+TIMESTAMP_ARRAYS = {'timestamp': 'timestamps'}
+RATINGS_CACHE_META = 'meta.json'
+
+# İhtiyacı, pozitif olmayan item sayısının bu oranını aşan (çok yoğun)
+# kullanıcılar için reddetme yerine tam tümleyenden çekilir
+DENSE_USER_RATIO = 0.5
+
+
+def _contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """keys'in sıralı dizide olup olmadığı (vektörize)"""
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    pos = np.searchsorted(sorted_keys, keys)
+    pos = np.minimum(pos, len(sorted_keys) - 1)
+    return sorted_keys[pos] == keys
+
+
+def _sorted_unique(keys: np.ndarray) -> np.ndarray:
+    """Sıralı tekil anahtarlar (np.unique'in hash yolundan hızlı)"""
+    keys = np.sort(keys)
+    if len(keys):
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return keys
+
+
+def sample_negatives(
+    user_ids: np.ndarray,
+    item_ids: np.ndarray,
+    num_items: int,
+    ratio: int,
+    seed: int = None,
+    max_rounds: int = 50,
+    exclude: Tuple[np.ndarray, np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Her kullanıcı için pozitif sayısı * ratio kadar (en fazla etkileşimsiz
+    item sayısı) tekrarsız negatif item çek
+    
+    Args:
+        user_ids, item_ids: Pozitif etkileşimler (0..num_users-1, 0..num_items-1)
+        num_items: Toplam item sayısı
+        ratio: Pozitif başına negatif
+        seed: Rastgelelik tohumu (None: tekrarlanamaz)
+        exclude: (user_ids, item_ids) - negatif seçilmeyecek ama kotaya
+                 sayılmayan ek etkileşimler (örn. test negatifleri için
+                 eğitim pozitifleri)
+    
+    Returns:
+        (negatif user_id'ler, negatif item_id'ler), kullanıcıya göre sıralı
+    """
+    rng = np.random.default_rng(seed)
+    users = np.asarray(user_ids, dtype=np.int64)
+    items = np.asarray(item_ids, dtype=np.int64)
+    
+    keys = _sorted_unique(users * num_items + items)
+    positives = keys
+    if exclude is not None:
+        extra = np.asarray(exclude[0], dtype=np.int64) * num_items + np.asarray(exclude[1], dtype=np.int64)
+        positives = _sorted_unique(np.concatenate([keys, extra]))
+    num_users = int(positives[-1] // num_items) + 1 if len(positives) else 0
+    # CSR: kullanıcı u'nun pozitifleri positives[offsets[u]:offsets[u + 1]]
+    offsets = np.searchsorted(positives, np.arange(num_users + 1, dtype=np.int64) * num_items)
+    
+    available = num_items - np.diff(offsets)
+    need = np.minimum(np.bincount(keys // num_items, minlength=num_users) * ratio, available)
+    
+    dense = need > available * DENSE_USER_RATIO
+    parts = [_dense_negatives(np.flatnonzero(dense), need, positives, offsets, num_items, rng)]
+    
+    # Seyrek kullanıcılar: toplu çek, pozitifleri ve tekrarları reddet
+    need = np.where(dense, 0, need)
+    accepted = np.zeros(0, dtype=np.int64)
+    for _ in range(max_rounds):
+        if not need.any():
+            break
+        # Kabul olasılığına göre fazladan çek; çoğu kullanıcı tek turda tamamlanır
+        free = available - np.bincount(accepted // num_items, minlength=num_users)
+        draws = np.where(need > 0, np.ceil(need * num_items / np.maximum(free, 1) * 1.2).astype(np.int64) + 2, 0)
+        draw_users = np.repeat(np.arange(num_users, dtype=np.int64), draws)
+        keys = draw_users * num_items + rng.integers(0, num_items, size=len(draw_users))
+        keys = _sorted_unique(keys[~_contains(positives, keys) & ~_contains(accepted, keys)])
+        
+        # Kullanıcı başına rastgele need kadarını tut
+        key_users = keys // num_items
+        order = np.argsort(key_users + rng.random(len(keys)), kind='stable')
+        keys, key_users = keys[order], key_users[order]
+        starts = np.searchsorted(key_users, key_users)
+        keys = keys[np.arange(len(keys)) - starts < need[key_users]]
+        
+        accepted = np.sort(np.concatenate([accepted, keys]))
+        need -= np.bincount(keys // num_items, minlength=num_users)
+    else:
+        raise RuntimeError('Negatif ornekleme yakinsamadi (max_rounds)')
+    parts.append(accepted)
+    
+    keys = np.sort(np.concatenate(parts))
+    return keys // num_items, keys % num_items
+
+
+def _dense_negatives(dense_users, need, positives, offsets, num_items, rng) -> np.ndarray:
+    """Çok yoğun kullanıcılar için tümleyenden tekrarsız seçim (anahtar olarak)"""
+    keys = []
+    for user in dense_users.tolist():
+        mask = np.ones(num_items, dtype=bool)
+        mask[positives[offsets[user]:offsets[user + 1]] % num_items] = False
+        chosen = rng.choice(np.flatnonzero(mask), size=int(need[user]), replace=False)
+        keys.append(user * num_items + chosen)
+    return np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+
+
+def ratings_cache_dir(ratings_path: str) -> str:
+    """ratings.csv -> ratings_cache/"""
+    return os.path.splitext(ratings_path)[0] + '_cache'
+
+
+def _ratings_cache_key(ratings_path: str, valid_ml_ids: np.ndarray, max_ratings, seed, timestamps=False) -> str:
+    """CSV (yol, mtime, boyut), eşleşen ID'ler ve örnekleme parametrelerinin özeti"""
+    stat = os.stat(ratings_path)
+    digest = hashlib.sha1(
+        f"{os.path.abspath(ratings_path)}:{stat.st_mtime}:{stat.st_size}:{max_ratings}:{seed}:{timestamps}".encode()
+    )
+    digest.update(valid_ml_ids.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _reservoir(parts: list, priorities: list, size: int) -> Tuple[list, list]:
+    """En küçük önceliğe sahip size satırı tut (okuma sırası korunur)"""
+    priority = np.concatenate(priorities)
+    if len(priority) <= size:
+        return parts, priorities
+    keep = np.sort(np.argpartition(priority, size)[:size])
+    merged = {name: np.concatenate([p[name] for p in parts])[keep] for name in parts[0]}
+    return [merged], [priority[keep]]
+
+
+def load_ratings(
+    ratings_path: str,
+    valid_ml_ids: Iterable[int],
+    max_ratings: int = None,
+    seed: int = None,
+    chunksize: int = 1_000_000,
+    cache_dir: str = None,
+    timestamps: bool = False,
+) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """
+    MovieLens ratings.csv'yi eşleşen filmlerle sınırlı diziler olarak yükle
+    
+    max_ratings aşılırsa her satıra rastgele öncelik verilir ve en küçük
+    max_ratings öncelikli satır tutulur (tek geçişte düzgün reservoir
+    örnekleme); bellekte en fazla ~2 * max_ratings satır bulunur.
+    
+    Args:
+        valid_ml_ids: Filme eşlenmiş MovieLens ID'leri
+        cache_dir: Verilirse önişlenmiş diziler burada .npy olarak saklanır;
+                   aynı CSV + parametrelerle sonraki çağrılar CSV okumaz
+        timestamps: timestamp sütununu da oku (int64, 'timestamps')
+    
+    Returns:
+        ({'user_ids': int32, 'movie_ids': int32, 'ratings': float32},
+         {'total', 'matched', 'cached'})
+    """
+    dtypes = {**RATINGS_DTYPES, **(TIMESTAMP_DTYPES if timestamps else {})}
+    names = {**RATINGS_ARRAYS, **(TIMESTAMP_ARRAYS if timestamps else {})}
+    valid = np.unique(np.fromiter(valid_ml_ids, dtype=np.int64))
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, _ratings_cache_key(ratings_path, valid, max_ratings, seed, timestamps))
+        if os.path.exists(os.path.join(cache_path, RATINGS_CACHE_META)):
+            with open(os.path.join(cache_path, RATINGS_CACHE_META)) as f:
+                stats = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(cache_path, f'{name}.npy'))
+                for name in names.values()
+            }
+            return arrays, {**stats, 'cached': True}
+    
+    import pandas as pd
+    
+    rng = np.random.default_rng(seed)
+    parts, priorities = [], []
+    total = matched = buffered = 0
+    reader = pd.read_csv(
+        ratings_path, usecols=list(dtypes), dtype=dtypes, chunksize=chunksize
+    )
+    for chunk in reader:
+        total += len(chunk)
+        mask = _contains(valid, chunk['movieId'].to_numpy())
+        count = int(mask.sum())
+        if not count:
+            continue
+        matched += count
+        parts.append({
+            names[column]: chunk[column].to_numpy()[mask] for column in dtypes
+        })
+        if max_ratings:
+            priorities.append(rng.random(count))
+            buffered += count
+            if buffered > 2 * max_ratings:
+                parts, priorities = _reservoir(parts, priorities, max_ratings)
+                buffered = max_ratings
+    
+    if max_ratings and parts:
+        parts, priorities = _reservoir(parts, priorities, max_ratings)
+    arrays = {
+        name: np.concatenate([p[name] for p in parts]) if parts
+        else np.zeros(0, dtype=dtypes[column])
+        for column, name in names.items()
+    }
+    stats = {'total': total, 'matched': matched}
+    
+    if cache_path:
+        tmp = f"{cache_path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f'{name}.npy'), array)
+        with open(os.path.join(tmp, RATINGS_CACHE_META), 'w') as f:
+            json.dump(stats, f)
+        shutil.rmtree(cache_path, ignore_errors=True)
+        os.replace(tmp, cache_path)
+    return arrays, {**stats, 'cached': False}
+
+
+def _split(arrays: Dict[str, np.ndarray], rng, train_fraction: float) -> Tuple[Dict, Dict]:
+    """Karıştır ve train/test olarak böl"""
+    order = rng.permutation(len(arrays['labels']))
+    split_idx = int(train_fraction * len(order))
+    shuffled = {name: array[order] for name, array in arrays.items()}
+    return (
+        {name: array[:split_idx] for name, array in shuffled.items()},
+        {name: array[split_idx:] for name, array in shuffled.items()},
+    )
+
+
+def explicit_dataset(
+    user_ids, item_ids, num_items: int, ratio: int, seed: int = None, train_fraction: float = 0.8
+) -> Tuple[Dict, Dict]:
+    """
+    Pozitifler + ratio kat açık negatif, karıştırılıp bölünmüş
+    
+    Returns:
+        (train, test) - {'user_ids', 'item_ids', 'labels'}
+    """
+    rng = np.random.default_rng(seed)
+    neg_users, neg_items = sample_negatives(user_ids, item_ids, num_items, ratio, seed=seed)
+    arrays = {
+        'user_ids': np.concatenate([user_ids, neg_users]),
+        'item_ids': np.concatenate([item_ids, neg_items]),
+        'labels': np.concatenate([
+            np.ones(len(user_ids), dtype=np.float32), np.zeros(len(neg_users), dtype=np.float32)
+        ]),
+    }
+    return _split(arrays, rng, train_fraction)
+
+
+def positive_dataset(
+    user_ids, item_ids, num_items: int, ratio: int, seed: int = None, train_fraction: float = 0.8
+) -> Tuple[Dict, Dict]:
+    """
+    Anında negatif örnekleme için: eğitim seti sadece pozitifler (bellek
+    pozitif sayısıyla ölçeklenir); test pozitiflerine AUC için ratio kat
+    açık negatif eklenir (eğitim pozitifleri de negatif seçilmez)
+    
+    Returns:
+        (train, test) - {'user_ids', 'item_ids', 'labels'}
+    """
+    rng = np.random.default_rng(seed)
+    positives = {
+        'user_ids': np.asarray(user_ids, dtype=np.int64),
+        'item_ids': np.asarray(item_ids, dtype=np.int64),
+        'labels': np.ones(len(user_ids), dtype=np.float32),
+    }
+    train, test = _split(positives, rng, train_fraction)
+    neg_users, neg_items = sample_negatives(
+        test['user_ids'], test['item_ids'], num_items, ratio, seed=seed,
+        exclude=(train['user_ids'], train['item_ids']),
+    )
+    test = {
+        'user_ids': np.concatenate([test['user_ids'], neg_users]),
+        'item_ids': np.concatenate([test['item_ids'], neg_items]),
+        'labels': np.concatenate([test['labels'], np.zeros(len(neg_users), dtype=np.float32)]),
+    }
+    return train, test
+
+
+def leave_one_out_metrics(scores: np.ndarray, k: int = 10) -> Dict[str, float]:
+    """
+    Kullanıcı başına bir tutulan pozitif + örneklenmiş negatifler
+    
+    Args:
+        scores: (kullanıcı, aday) skor matrisi; 0. sütun tutulan pozitif
+    
+    Returns:
+        {'hr': HR@k, 'ndcg': NDCG@k, 'auc': pozitifin negatiflerden yüksek
+         skorlandığı çiftlerin oranı}
+    """
+    if not len(scores):
+        return {'hr': 0.0, 'ndcg': 0.0, 'auc': 0.5}
+    ranks = (scores[:, 1:] > scores[:, :1]).sum(axis=1)
+    hits = ranks < k
+    return {
+        'hr': float(hits.mean()),
+        'ndcg': float(np.where(hits, 1.0 / np.log2(ranks + 2), 0.0).mean()),
+        'auc': float(1.0 - ranks.mean() / max(scores.shape[1] - 1, 1)),
+    }
@@ -1,3 +1,27 @@
-from django.shortcuts import render
+"""
+Recommendation Views
+====================
+Öneri sistemi izleme endpoint'leri
+"""
 
-# Create your views here.
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from apps.movies.cache import get_recommendation_cache_stats
+
+
+@staff_member_required
+@require_GET
+def recommender_stats(request):
+    """
+    Öneri cache hit/miss sayaçları (tüm worker'lar), bu worker'ın aday
+    kaynağı sayaçları ve etkin model sürümü
+    """
+    from apps.recommendations.services import recommender
+    
+    return JsonResponse({
+        'cache': get_recommendation_cache_stats(),
+        'retrieval': recommender.retriever.stats(),
+        'model': recommender.model_info(),
+    })
@@ -0,0 +1,26 @@
+# Generated by Django 5.0 on 2026-10-17 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0004_user_favorite_genres_user_onboarding_completed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="compatibilityscore",
+            name="genre_similarity",
+            field=models.IntegerField(
+                default=0, help_text="0-100 tür vektörü benzerliği"
+            ),
+        ),
+        migrations.AddField(
+            model_name="compatibilityscore",
+            name="rating_similarity",
+            field=models.IntegerField(
+                default=0, help_text="0-100 ortak puan benzerliği"
+            ),
+        ),
+    ]
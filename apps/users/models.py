@@ -141,6 +141,8 @@ class CompatibilityScore(models.Model):
         help_text="0-100 arası uyumluluk puanı"
     )
     common_movies = models.IntegerField(default=0)
+    genre_similarity = models.IntegerField(default=0, help_text="0-100 tür vektörü benzerliği")
+    rating_similarity = models.IntegerField(default=0, help_text="0-100 ortak puan benzerliği")
     similar_genres = models.JSONField(default=dict, blank=True)
     similar_actors = models.JSONField(default=dict, blank=True)
     similar_directors = models.JSONField(default=dict, blank=True)
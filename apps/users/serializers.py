@@ -184,7 +184,8 @@ class CompatibilityScoreSerializer(serializers.ModelSerializer):
         model = CompatibilityScore
         fields = [
             'id', 'user_1', 'user_2', 'user_1_username', 'user_2_username',
-            'score', 'common_movies', 'similar_genres', 'similar_actors',
+            'score', 'common_movies', 'genre_similarity', 'rating_similarity',
+            'similar_genres', 'similar_actors',
             'similar_directors', 'calculated_at'
         ]
         read_only_fields = ['id', 'calculated_at']
\ No newline at end of file
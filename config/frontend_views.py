@@ -7,6 +7,7 @@ from django.db.models import Q, Avg
 from django.db import connection
 from apps.movies.models import Movie, Genre, Rating, Watchlist, WatchedMovie, Person, MovieCast, MovieCrew
 from apps.users.models import Friendship
+from apps.recommendations.neighbours import similar_movies as similar_movies_for
 from apps.movies.services import TMDBService
 import json
 
@@ -165,10 +166,12 @@ def movie_detail(request, movie_id):
     """Film detayı sayfası"""
     movie = get_object_or_404(Movie, id=movie_id)
     
-    # Benzer filmler
-    similar_movies = Movie.objects.filter(
-        genres__id__in=movie.genres.values_list('id', flat=True)
-    ).exclude(id=movie.id).distinct().order_by('-vote_average')[:6]
+    # Benzer filmler (önceden hesaplanmış tablo, yoksa aynı türdekiler)
+    similar_movies = similar_movies_for(movie.id, 6)
+    if not similar_movies:
+        similar_movies = Movie.objects.filter(
+            genres__id__in=movie.genres.values_list('id', flat=True)
+        ).exclude(id=movie.id).distinct().order_by('-vote_average')[:6]
     
     # Puanlamalar
     ratings = movie.ratings.select_related('user').order_by('-created_at')[:5]
@@ -208,6 +211,7 @@ def movie_detail(request, movie_id):
 @login_required
 def quick_match(request):
     """Hızlı Öneri - Tek başına veya arkadaşla film önerisi"""
+    from apps.recommendations.compatibility import get_compatibility
     from apps.recommendations.services import HybridRecommender
     from apps.users.models import User
     from apps.movies.models import Genre
@@ -257,42 +261,20 @@ def quick_match(request):
             try:
                 friend = User.objects.get(id=friend_id)
                 
-                # Uyumluluk hesapla
-                compatibility = recommender.calculate_compatibility(request.user, friend)
+                # Uyumluluk (saklanan skor, eskimişse sadece bu çift hesaplanır)
+                compatibility = get_compatibility(request.user, friend)
                 
-                # İkisi için ortak film önerileri
+                # İkisi için ortak film önerileri (filtreler aday havuzunda uygulanır)
                 joint_recommendations = recommender.get_movies_for_both(
-                    request.user, 
-                    friend, 
-                    n=12
+                    request.user,
+                    friend,
+                    n=12,
+                    mood=mood if mood else None,
+                    time_available=time_available if time_available else None,
+                    era=era if era else None,
+                    genre_id=int(genre_id) if genre_id else None,
                 )
                 
-                # Ek filtreleri uygula
-                if mood or time_available or era:
-                    filtered_recs = []
-                    for rec in joint_recommendations:
-                        movie = rec['movie']
-                        # Süre filtresi
-                        if time_available == 'short' and movie.runtime and movie.runtime >= 90:
-                            continue
-                        if time_available == 'medium' and movie.runtime and (movie.runtime < 90 or movie.runtime > 120):
-                            continue
-                        if time_available == 'long' and movie.runtime and movie.runtime <= 120:
-                            continue
-                        # Era filtresi
-                        if era and movie.release_date:
-                            year = movie.release_date.year
-                            if era == 'recent' and year < 2020:
-                                continue
-                            if era == '2010s' and (year < 2010 or year >= 2020):
-                                continue
-                            if era == '2000s' and (year < 2000 or year >= 2010):
-                                continue
-                            if era == 'classic' and year >= 2000:
-                                continue
-                        filtered_recs.append(rec)
-                    joint_recommendations = filtered_recs[:12]
-                
                 context = {
                     'friends': friends,
                     'genres': genres,
@@ -303,6 +285,7 @@ def quick_match(request):
                     'mood': mood,
                     'time_available': time_available,
                     'era': era,
+                    'genre_id': genre_id,
                     'show_results': True,
                 }
                 
@@ -1067,11 +1050,10 @@ def mark_as_watched(request):
         # Watchlist'ten kaldır (artık izlendi)
         Watchlist.objects.filter(user=request.user, movie=movie).delete()
         
-        # Kullanıcı profilini güncelle (tür tercihleri)
+        # Kullanıcı profilini güncelle (tür tercihleri, debounce'lu)
         try:
-            from apps.recommendations.models import UserTasteProfile
-            profile, _ = UserTasteProfile.objects.get_or_create(user=request.user)
-            profile.update_from_ratings()
+            from apps.recommendations.profile_updates import schedule_profile_update
+            schedule_profile_update(request.user.id)
         except Exception:
             pass  # Profil güncelleme opsiyonel
         
@@ -1590,28 +1572,33 @@ def onboarding(request):
         data = json.loads(request.body)
         
         # Film puanlarını kaydet
+        # Profil her puan için değil, blok sonunda bir kez (senkron) güncellenir;
+        # ana sayfa yönlendirmesinden önce profilin hazır olması gerekir.
+        from apps.recommendations.profile_updates import deferred_profile_updates
+        
         ratings_data = data.get('ratings', [])
-        for rating_item in ratings_data:
-            movie_id = rating_item.get('movie_id')
-            score = rating_item.get('score')  # 1-10 arası
-            
-            if movie_id and score:
-                try:
-                    movie = Movie.objects.get(id=movie_id)
-                    Rating.objects.update_or_create(
-                        user=request.user,
-                        movie=movie,
-                        defaults={'score': score}
-                    )
-                    
-                    # İzlendi olarak da işaretle
-                    WatchedMovie.objects.get_or_create(
-                        user=request.user,
-                        movie=movie,
-                        defaults={'liked': score >= 6}
-                    )
-                except Movie.DoesNotExist:
-                    pass
+        with deferred_profile_updates(sync=True):
+            for rating_item in ratings_data:
+                movie_id = rating_item.get('movie_id')
+                score = rating_item.get('score')  # 1-10 arası
+                
+                if movie_id and score:
+                    try:
+                        movie = Movie.objects.get(id=movie_id)
+                        Rating.objects.update_or_create(
+                            user=request.user,
+                            movie=movie,
+                            defaults={'score': score}
+                        )
+                        
+                        # İzlendi olarak da işaretle
+                        WatchedMovie.objects.get_or_create(
+                            user=request.user,
+                            movie=movie,
+                            defaults={'liked': score >= 6}
+                        )
+                    except Movie.DoesNotExist:
+                        pass
         
         # Favori türleri kaydet
         genre_ids = data.get('genres', [])
@@ -1619,14 +1606,6 @@ def onboarding(request):
             genres = Genre.objects.filter(id__in=genre_ids)
             request.user.favorite_genres.set(genres)
         
-        # Kullanıcı profilini güncelle
-        try:
-            from apps.recommendations.models import UserTasteProfile
-            profile, _ = UserTasteProfile.objects.get_or_create(user=request.user)
-            profile.update_from_ratings()
-        except Exception:
-            pass
-        
         # Onboarding'i tamamla
         request.user.onboarding_completed = True
         request.user.save()
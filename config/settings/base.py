@@ -229,6 +229,18 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Europe/Istanbul'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 dakika
+# Profil güncellemeleri: Redis/Celery varsa debounce'lu task, yoksa senkron
+PROFILE_UPDATE_ASYNC = config('PROFILE_UPDATE_ASYNC', default=bool(REDIS_URL), cast=bool)
+PROFILE_UPDATE_DEBOUNCE = config('PROFILE_UPDATE_DEBOUNCE', default=5, cast=int)  # saniye
+# Öneri modeli web worker'larda arka planda önceden yüklenir (diğer process'lerde ilk kullanımda)
+RECOMMENDER_WARMUP = config('RECOMMENDER_WARMUP', default=True, cast=bool)
+# Sürümlü model bundle'ları (boşsa NCF_MODEL_PATH'in yanında ncf_bundles/) ve sürüm kontrol aralığı
+MODEL_BUNDLE_ROOT = config('MODEL_BUNDLE_ROOT', default='')
+MODEL_RELOAD_INTERVAL = config('MODEL_RELOAD_INTERVAL', default=60, cast=int)  # saniye, 0: kapalı
+# Servis tarafı NCF skorlama için torch intra-op thread sayısı (process geneli);
+# gunicorn 2 worker x 4 thread çekirdekleri aşırı paylaşmasın diye 1
+NCF_TORCH_THREADS = config('NCF_TORCH_THREADS', default=1, cast=int)
+
 CELERY_BEAT_SCHEDULE = {
     'check-upcoming-movies-daily': {
         'task': 'apps.notifications.tasks.check_upcoming_movies',
@@ -238,6 +250,19 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.notifications.tasks.send_weekly_recommendations',
         'schedule': 60 * 60 * 24 * 7,  # Her hafta
     },
+    'refresh-movie-neighbours': {
+        'task': 'apps.recommendations.tasks.refresh_movie_neighbours',
+        'schedule': 60 * 60 * 6,  # Her 6 saatte bir (sadece değişen filmler)
+    },
+    'rebuild-movie-neighbours-weekly': {
+        'task': 'apps.recommendations.tasks.refresh_movie_neighbours',
+        'schedule': 60 * 60 * 24 * 7,  # Her hafta tam hesap
+        'kwargs': {'full': True},
+    },
+    'refresh-compatibility-scores': {
+        'task': 'apps.recommendations.tasks.refresh_compatibility_scores',
+        'schedule': 60 * 30,  # Her 30 dakikada bir (sadece değişen çiftler)
+    },
 }
 
 #TMDB API
@@ -7,6 +7,7 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from .views import api_root
+from apps.recommendations.views import recommender_stats
 from .frontend_views import (
     landing, home, movie_detail, quick_match, explore, profile, friends, watchlist,
     register, login, logout, add_rating, edit_profile, toggle_watchlist,
@@ -76,6 +77,7 @@ urlpatterns = [
     path('api/tmdb/async-search/', tmdb_async_search, name='tmdb_async_search'),
     path('api/live-search/', live_search, name='live_search'),
     path('api/live-search/tmdb/', live_search_tmdb, name='live_search_tmdb'),
+    path('api/recommendations/stats/', recommender_stats, name='recommender_stats'),
     
     #admin
     path('admin/', admin.site.urls),
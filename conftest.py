@@ -11,6 +11,15 @@ from datetime import date
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Testler arası cache sızıntısını önle (öneri cache'i vb.)"""
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
+
+
 # ============================================================================
 # USER FIXTURES
 # ============================================================================